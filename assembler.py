@@ -1,56 +1,245 @@
 # assembler.py
+"""
+Assembler hai lượt cho LEGv8.
+  Lượt 1: bỏ comment, ghi nhận nhãn và gán PC cho từng lệnh.
+  Lượt 2: phân tích toán hạng, mã hóa mỗi lệnh thành word 32-bit (R/I/D/B/CB/IW).
+Kết quả là một Program: array('I') mã máy + mảng song song số dòng nguồn.
+"""
+from array import array
 
-def placeholder_assembler(assembly_code):
+from decoder import (INSTRUCTION_SPECS, R_SHAMT_FIXED, CONDITION_CODES, CONDITION_NAMES,
+                     REGISTER_ALIASES, HALT_WORD, NOP_WORD, XZR, LR, DecodedInstruction)
+from program import Program
+from tracing import TRACER, DEBUG, WARNING
+
+
+# --- Phân tích cú pháp một lệnh ---
+def parse_register(token):
+    tok = token.strip().upper()
+    if tok in REGISTER_ALIASES:
+        return REGISTER_ALIASES[tok]
+    if tok.startswith('X') and tok[1:].isdigit():
+        idx = int(tok[1:])
+        if 0 <= idx <= 31:
+            return idx
+    raise ValueError(f"Invalid register '{token.strip()}'")
+
+
+def parse_immediate(token):
+    tok = token.strip()
+    if tok.startswith('#'):
+        tok = tok[1:].strip()
+    try:
+        return int(tok, 0)
+    except ValueError:
+        raise ValueError(f"Invalid immediate '{token.strip()}'") from None
+
+
+def _split_operands(rest):
+    # '[' và ']' chỉ đánh dấu địa chỉ bộ nhớ, tách theo dấu phẩy là đủ
+    cleaned = rest.replace('[', ' ').replace(']', ' ')
+    return [op.strip() for op in cleaned.split(',') if op.strip()]
+
+
+def _expect(operands, count, name):
+    if len(operands) != count:
+        raise ValueError(f"{name} expects {count} operand(s), got {len(operands)}")
+
+
+def _branch_target(token, pc, label_to_pc_map):
+    tok = token.strip()
+    if label_to_pc_map and tok in label_to_pc_map:
+        return label_to_pc_map[tok]
+    if tok.startswith('#') or tok.lstrip('-').isdigit():
+        return pc + parse_immediate(tok) * 4 # Offset tính theo số lệnh
+    raise ValueError(f"Undefined label '{tok}'")
+
+
+def parse_instruction(body, pc, label_to_pc_map=None, line=None):
     """
-    Placeholder rất đơn giản cho bộ biên dịch LEGv8.
-    CHỈ phân tích cơ bản để lấy instruction_memory, pc_to_line, label_to_pc.
-    KHÔNG thực hiện biên dịch sang mã máy thực sự.
+    Phân tích một lệnh LEGv8 (đã bỏ comment và nhãn) thành DecodedInstruction.
+    Pseudo-instruction (CMP, CMPI, MOV) được đổi sang lệnh thật tương ứng.
+    Ném ValueError nếu cú pháp không hợp lệ.
     """
-    print("Running Placeholder Assembler...")
-    instruction_memory = {} # {address: (line_number, instruction_string)}
-    pc_to_line_map = {}     # {address: line_number}
-    label_to_pc_map = {}    # {label_name: address}
-    current_pc = 0x00000000 # Bắt đầu từ địa chỉ 0
-    line_number = 0
-
-    lines = assembly_code.splitlines()
-    for i, line in enumerate(lines):
-        line_number = i + 1
-        original_line = line # Giữ lại dòng gốc
-        # Xóa comment và khoảng trắng thừa
-        line = line.split('//')[0].strip()
-        if not line:
-            continue
+    text = body
+    parts = body.split(None, 1)
+    mnemonic = parts[0].upper()
+    operands = _split_operands(parts[1]) if len(parts) > 1 else []
 
-        # Kiểm tra nhãn (ví dụ: "LOOP:")
-        if line.endswith(':'):
-            label_name = line[:-1].strip()
-            if label_name:
-                if label_name in label_to_pc_map:
-                    print(f"Assembler Warning: Duplicate label '{label_name}' at line {line_number}")
-                else:
-                    label_to_pc_map[label_name] = current_pc
-                    print(f"  Found label '{label_name}' at address {current_pc:#0x}")
-            # Dòng chứa nhãn không tạo ra lệnh, trừ khi có lệnh trên cùng dòng (ít phổ biến)
-            parts = line[:-1].split(maxsplit=1) # Tách nhãn khỏi phần còn lại nếu có
-            if len(parts) > 1 and parts[1].strip(): # Có lệnh sau nhãn trên cùng dòng
-                 line = parts[1].strip()
-            else:
-                 continue # Chỉ có nhãn, đi tiếp dòng sau
+    # --- Pseudo-instructions ---
+    if mnemonic == 'CMP':
+        _expect(operands, 2, mnemonic)
+        mnemonic, operands = 'SUBS', ['XZR'] + operands
+    elif mnemonic == 'CMPI':
+        _expect(operands, 2, mnemonic)
+        mnemonic, operands = 'SUBIS', ['XZR'] + operands
+    elif mnemonic == 'MOV':
+        _expect(operands, 2, mnemonic)
+        if operands[1].startswith('#'):
+            mnemonic = 'MOVZ'
+        else:
+            mnemonic, operands = 'ORR', [operands[0], 'XZR', operands[1]]
+
+    cond = None
+    if mnemonic.startswith('B.'):
+        cond_name = mnemonic[2:]
+        if cond_name not in CONDITION_CODES:
+            raise ValueError(f"Unknown branch condition '{cond_name}'")
+        cond = CONDITION_CODES[cond_name]
+        mnemonic = 'B.cond'
+
+    if mnemonic not in INSTRUCTION_SPECS:
+        raise ValueError(f"Unknown instruction '{parts[0]}'")
+    fmt = INSTRUCTION_SPECS[mnemonic][0]
 
+    if fmt == 'R':
+        if mnemonic == 'BR':
+            _expect(operands, 1, mnemonic)
+            return DecodedInstruction(mnemonic, rd=0, rn=parse_register(operands[0]), line=line, text=text)
+        _expect(operands, 3, mnemonic)
+        rd, rn = parse_register(operands[0]), parse_register(operands[1])
+        if mnemonic in ('LSL', 'LSR'):
+            shamt = parse_immediate(operands[2])
+            if not 0 <= shamt <= 63:
+                raise ValueError(f"Shift amount out of range: {shamt}")
+            return DecodedInstruction(mnemonic, rd=rd, rn=rn, shamt=shamt, line=line, text=text)
+        return DecodedInstruction(mnemonic, rd=rd, rn=rn, rm=parse_register(operands[2]),
+                                  shamt=R_SHAMT_FIXED.get(mnemonic, 0), line=line, text=text)
 
-        # Giả định mọi dòng còn lại là một lệnh và chiếm 4 byte
-        # Lưu trữ dòng lệnh gốc thay vì mã máy thực sự trong ví dụ này
-        instruction_data = (line_number, original_line) # Lưu cả số dòng gốc và lệnh text
-        instruction_memory[current_pc] = instruction_data
-        pc_to_line_map[current_pc] = line_number
-        print(f"  Mapping PC {current_pc:#0x} to line {line_number}: '{line}'")
+    if fmt == 'I':
+        _expect(operands, 3, mnemonic)
+        imm = parse_immediate(operands[2])
+        # ADDI/SUBI với immediate âm được đổi sang lệnh ngược lại
+        if imm < 0 and mnemonic in ('ADDI', 'SUBI', 'ADDIS', 'SUBIS'):
+            imm = -imm
+            mnemonic = {'ADDI': 'SUBI', 'SUBI': 'ADDI', 'ADDIS': 'SUBIS', 'SUBIS': 'ADDIS'}[mnemonic]
+        if not 0 <= imm <= 0xFFF:
+            raise ValueError(f"Immediate out of range (0..4095): {imm}")
+        return DecodedInstruction(mnemonic, rd=parse_register(operands[0]),
+                                  rn=parse_register(operands[1]), imm=imm, line=line, text=text)
+
+    if fmt == 'D':
+        if len(operands) not in (2, 3):
+            raise ValueError(f"{mnemonic} expects 'Rt, [Rn, #offset]'")
+        imm = parse_immediate(operands[2]) if len(operands) == 3 else 0
+        if not -256 <= imm <= 255:
+            raise ValueError(f"Address offset out of range (-256..255): {imm}")
+        return DecodedInstruction(mnemonic, rd=parse_register(operands[0]),
+                                  rn=parse_register(operands[1]), imm=imm, line=line, text=text)
+
+    if fmt == 'B':
+        _expect(operands, 1, mnemonic)
+        target = _branch_target(operands[0], pc, label_to_pc_map)
+        rd = LR if mnemonic == 'BL' else XZR
+        return DecodedInstruction(mnemonic, rd=rd, imm=(target - pc) // 4, target=target,
+                                  line=line, text=text)
+
+    if fmt == 'CB':
+        if mnemonic == 'B.cond':
+            _expect(operands, 1, 'B.' + CONDITION_NAMES[cond])
+            target = _branch_target(operands[0], pc, label_to_pc_map)
+            return DecodedInstruction(mnemonic, imm=(target - pc) // 4, cond=cond,
+                                      target=target, line=line, text=text)
+        _expect(operands, 2, mnemonic)
+        target = _branch_target(operands[1], pc, label_to_pc_map)
+        return DecodedInstruction(mnemonic, rn=parse_register(operands[0]),
+                                  imm=(target - pc) // 4, target=target, line=line, text=text)
+
+    if fmt == 'IW':
+        if len(operands) not in (2, 3):
+            raise ValueError(f"{mnemonic} expects 'Rd, #imm16[, LSL #shift]'")
+        imm = parse_immediate(operands[1])
+        shift = 0
+        if len(operands) == 3:
+            mod = operands[2].upper().split()
+            if len(mod) != 2 or mod[0] != 'LSL':
+                raise ValueError(f"Invalid shift '{operands[2]}'")
+            shift = parse_immediate(mod[1])
+        if not 0 <= imm <= 0xFFFF or shift not in (0, 16, 32, 48):
+            raise ValueError(f"Invalid {mnemonic} immediate/shift: {imm}, LSL {shift}")
+        return DecodedInstruction(mnemonic, rd=parse_register(operands[0]), imm=imm,
+                                  shamt=shift, line=line, text=text)
+
+    # HALT / NOP
+    _expect(operands, 0, mnemonic)
+    return DecodedInstruction(mnemonic, line=line, text=text)
+
+
+# --- Mã hóa ---
+def encode_instruction(d):
+    """Mã hóa một DecodedInstruction thành word 32-bit."""
+    fmt, opcode, _, _ = INSTRUCTION_SPECS[d.name]
+    if fmt == 'R':
+        return (opcode << 21) | (d.rm << 16) | (d.shamt << 10) | (d.rn << 5) | d.rd
+    if fmt == 'I':
+        return (opcode << 22) | (d.imm << 10) | (d.rn << 5) | d.rd
+    if fmt == 'D':
+        return (opcode << 21) | ((d.imm & 0x1FF) << 12) | (d.rn << 5) | d.rd
+    if fmt == 'B':
+        if not -(1 << 25) <= d.imm < (1 << 25):
+            raise ValueError(f"Branch target out of range: {d.imm} instructions")
+        return (opcode << 26) | (d.imm & 0x3FFFFFF)
+    if fmt == 'CB':
+        if not -(1 << 18) <= d.imm < (1 << 18):
+            raise ValueError(f"Conditional branch target out of range: {d.imm} instructions")
+        rt = d.cond if d.name == 'B.cond' else d.rn
+        return (opcode << 24) | ((d.imm & 0x7FFFF) << 5) | rt
+    if fmt == 'IW':
+        return (opcode << 23) | ((d.shamt // 16) << 21) | (d.imm << 5) | d.rd
+    return HALT_WORD if d.name == 'HALT' else NOP_WORD
+
+
+def _is_label_name(name):
+    return bool(name) and name.replace('.', '_').replace('$', '_').isidentifier()
+
+
+def assemble(assembly_code, base_pc=0x00000000):
+    """
+    Biên dịch mã nguồn LEGv8 thành Program. Thời gian tuyến tính theo số dòng.
+    Ném ValueError("Line N: ...") ở lỗi đầu tiên; nhãn trùng được ghi vào program.warnings.
+    """
+    source_lines = assembly_code.splitlines()
+    label_to_pc_map = {}
+    warnings = []
+    pending = [] # (line_number, phần lệnh) của các dòng có lệnh
+
+    # --- Lượt 1: nhãn và PC ---
+    pc = base_pc
+    for line_number, raw in enumerate(source_lines, 1):
+        body = raw.split('//', 1)[0].strip()
+        # Một hoặc nhiều nhãn ở đầu dòng, có thể có lệnh phía sau ("LOOP: ADD ...")
+        while ':' in body:
+            head, _, rest = body.partition(':')
+            label_name = head.strip()
+            if not _is_label_name(label_name):
+                break
+            if label_name in label_to_pc_map:
+                warnings.append(f"Line {line_number}: duplicate label '{label_name}' ignored")
+            else:
+                label_to_pc_map[label_name] = pc
+            body = rest.strip()
+        if not body:
+            continue
+        pending.append((line_number, body))
+        pc += 4
 
-        current_pc += 4 # Tăng PC cho lệnh tiếp theo
+    # --- Lượt 2: mã hóa ---
+    words = array('I', bytes(4 * len(pending)))
+    lines = array('I', bytes(4 * len(pending)))
+    pc = base_pc
+    trace_lines = TRACER.enabled('assembler', DEBUG) # Kiểm tra một lần, không trong vòng lặp
+    for i, (line_number, body) in enumerate(pending):
+        try:
+            words[i] = encode_instruction(parse_instruction(body, pc, label_to_pc_map))
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {e}") from None
+        lines[i] = line_number
+        if trace_lines:
+            TRACER.emit('assembler', f"{pc:#010x}: {words[i]:08x}  line {line_number}: {body}", DEBUG)
+        pc += 4
 
-    print("Placeholder Assembly Complete.")
-    print(f"  Instructions: {len(instruction_memory)}, Labels: {len(label_to_pc_map)}")
-    print("Instruction Memory:", instruction_memory)
-    print("PC to Line Map:", pc_to_line_map)
-    print("Label to PC Map:", label_to_pc_map)
-    return instruction_memory, pc_to_line_map, label_to_pc_map
\ No newline at end of file
+    if TRACER.active:
+        for warning in warnings:
+            TRACER.emit('assembler', warning, WARNING)
+        TRACER.emit('assembler', f"Assembled {len(pending)} instructions, {len(label_to_pc_map)} labels")
+    return Program(base_pc, words, lines, source_lines, label_to_pc_map, warnings)
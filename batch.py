@@ -0,0 +1,276 @@
+# batch.py
+"""
+Chạy hàng loạt chương trình LEGv8 (vd. chấm bài) song song trên mọi core.
+Đầu vào là một thư mục chứa các file .s hoặc một manifest JSON:
+    {"defaults": {...}, "jobs": [{"file": "bai1.s", "name": "...", ...}, ...]}
+Mỗi job (và "defaults", file --fixture, file <tên>.json cạnh file .s) có thể có:
+    "max_steps", "timeout" (giây), "mem_size", "engine",
+    "inputs": {"registers": {"X0": 5}, "memory": {"0x100": 7}},
+    "expect": {"registers": {"X0": 55}, "memory": {"0x100": 7}}
+Mỗi job chạy trong một tiến trình của ProcessPoolExecutor với giới hạn số lệnh và
+thời gian (kiểm tra giữa các lát chạy của headless.run_program, nên vòng lặp vô
+hạn như 'B START' bị dừng đúng hạn). Báo cáo ghi ra JSON hoặc CSV.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from decoder import MASK64, REGISTER_ALIASES
+
+DEFAULT_MAX_STEPS = 10_000_000
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MEM_SIZE = 1 << 16
+JOB_FIELDS = ('max_steps', 'timeout', 'mem_size', 'engine', 'inputs', 'expect')
+CSV_COLUMNS = ('name', 'path', 'status', 'passed', 'steps', 'elapsed', 'failed_checks', 'error')
+
+
+def _parse_int(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid {what}: {value!r}")
+    try:
+        return int(value, 0) if isinstance(value, str) else value
+    except ValueError:
+        raise ValueError(f"Invalid {what}: {value!r}") from None
+
+
+def _parse_register(name):
+    key = str(name).strip().upper()
+    if key in REGISTER_ALIASES:
+        return REGISTER_ALIASES[key]
+    if key.startswith('X') and key[1:].isdigit() and 0 <= int(key[1:]) < 32:
+        return int(key[1:])
+    raise ValueError(f"Invalid register name '{name}'")
+
+
+def _parse_values(section, where):
+    """{'registers': {...}, 'memory': {...}} -> ({chỉ số: giá trị}, {địa chỉ: giá trị})."""
+    section = section or {}
+    registers = {_parse_register(reg): _parse_int(value, f"register value in {where}") & MASK64
+                 for reg, value in section.get('registers', {}).items()}
+    memory = {}
+    for addr, value in section.get('memory', {}).items():
+        addr = _parse_int(addr, f"memory address in {where}")
+        if addr % 8:
+            raise ValueError(f"Memory address {addr:#x} in {where} must be 8-byte aligned")
+        memory[addr] = _parse_int(value, f"memory value in {where}") & MASK64
+    return registers, memory
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path}: invalid JSON ({e})") from None
+
+
+def _merge(*settings):
+    """Gộp các bộ thiết lập job, bộ sau ghi đè bộ trước (inputs/expect gộp theo từng mục)."""
+    merged = {}
+    for setting in settings:
+        for key, value in (setting or {}).items():
+            if key in ('inputs', 'expect'):
+                section = merged.setdefault(key, {})
+                for part, values in value.items():
+                    section[part] = {**section.get(part, {}), **values}
+            elif key in JOB_FIELDS:
+                merged[key] = value
+    return merged
+
+
+def collect_jobs(source, fixture=None, defaults=None):
+    """
+    Danh sách job (dict) từ thư mục 'source' (mọi file .s, kèm <tên>.json nếu có)
+    hoặc manifest JSON 'source'. 'fixture' là file JSON áp cho mọi job,
+    'defaults' là thiết lập mặc định (vd. từ dòng lệnh). Ném ValueError nếu sai.
+    """
+    base = _merge(defaults, _load_json(fixture) if fixture else None)
+    entries = []
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if not filename.endswith('.s'):
+                continue
+            path = os.path.join(source, filename)
+            own = os.path.splitext(path)[0] + '.json'
+            entries.append((filename[:-2], path, _merge(base, _load_json(own) if os.path.exists(own) else None)))
+    else:
+        manifest = _load_json(source)
+        root = os.path.dirname(os.path.abspath(source))
+        common = _merge(base, manifest.get('defaults'))
+        for i, job in enumerate(manifest.get('jobs', [])):
+            if 'file' not in job:
+                raise ValueError(f"{source}: job #{i + 1} has no 'file'")
+            path = os.path.join(root, job['file'])
+            name = job.get('name') or os.path.splitext(os.path.basename(job['file']))[0]
+            entries.append((name, path, _merge(common, job)))
+
+    jobs = []
+    for name, path, settings in entries:
+        where = f"job '{name}'"
+        registers, memory = _parse_values(settings.get('inputs'), where)
+        expect_registers, expect_memory = _parse_values(settings.get('expect'), where)
+        jobs.append({
+            'name': name,
+            'path': path,
+            'max_steps': _parse_int(settings.get('max_steps', DEFAULT_MAX_STEPS), f"max_steps in {where}"),
+            'timeout': float(settings.get('timeout', DEFAULT_TIMEOUT)),
+            'mem_size': _parse_int(settings.get('mem_size', DEFAULT_MEM_SIZE), f"mem_size in {where}"),
+            'engine': settings.get('engine', 'interp'),
+            'registers': registers,
+            'memory': memory,
+            'expect_registers': expect_registers,
+            'expect_memory': expect_memory,
+        })
+    return jobs
+
+
+def run_job(job):
+    """Biên dịch + chạy một job (chạy trong tiến trình con), trả về dict kết quả."""
+    from headless import run_program
+    from memory import MemoryAccessError
+
+    result = {'name': job['name'], 'path': job['path'], 'status': 'error', 'passed': False,
+              'steps': 0, 'elapsed': 0.0, 'error': None, 'registers': None, 'checks': []}
+    try:
+        with open(job['path'], encoding='utf-8') as f:
+            code = f.read()
+        run = run_program(code, max_steps=job['max_steps'], engine=job['engine'],
+                          mem_size=job['mem_size'], initial_registers=job['registers'],
+                          initial_memory=job['memory'], timeout=job['timeout'])
+    except (OSError, ValueError, MemoryAccessError) as e: # Lỗi đọc file / biên dịch / nạp input
+        result['error'] = str(e)
+        return result
+
+    if run['error']:
+        status = 'error'
+    elif run['halted']:
+        status = 'halted'
+    elif run['timed_out']:
+        status = 'timeout'
+    else:
+        status = 'step_limit'
+    checks = check_expectations(run['registers'], run['memory'], job)
+    result.update(status=status, steps=run['steps'], elapsed=run['elapsed'], error=run['error'],
+                  registers=run['registers'], checks=checks,
+                  passed=status == 'halted' and all(check['ok'] for check in checks))
+    return result
+
+
+def check_expectations(registers, memory, job):
+    """So registers / bộ nhớ ({địa chỉ: word}) cuối với 'expect_registers' / 'expect_memory' của job."""
+    checks = []
+    for index, expected in sorted(job['expect_registers'].items()):
+        actual = registers[index]
+        checks.append({'check': f'X{index}', 'expected': expected, 'actual': actual, 'ok': actual == expected})
+    for addr, expected in sorted(job['expect_memory'].items()):
+        actual = memory.get(addr, 0)
+        checks.append({'check': f'mem[{addr:#x}]', 'expected': expected, 'actual': actual, 'ok': actual == expected})
+    return checks
+
+
+def collect_cases(path):
+    """
+    Các bộ input cho chạy vector hóa từ file JSON: danh sách
+    [{"name": ..., "inputs": {...}, "expect": {...}}, ...] hoặc {"defaults": {...}, "cases": [...]}.
+    """
+    data = _load_json(path)
+    defaults, cases = (data.get('defaults'), data.get('cases', [])) if isinstance(data, dict) else (None, data)
+    result = []
+    for i, case in enumerate(cases):
+        settings = _merge(defaults, case)
+        name = case.get('name') or f"case{i + 1}"
+        registers, memory = _parse_values(settings.get('inputs'), f"case '{name}'")
+        expect_registers, expect_memory = _parse_values(settings.get('expect'), f"case '{name}'")
+        result.append({'name': name, 'registers': registers, 'memory': memory,
+                       'expect_registers': expect_registers, 'expect_memory': expect_memory})
+    return result
+
+
+def run_vector_cases(path, cases, max_steps=DEFAULT_MAX_STEPS, mem_size=DEFAULT_MEM_SIZE):
+    """
+    Chạy chương trình 'path' một lần cho mọi bộ input bằng vector_engine (cần NumPy).
+    Kết quả cùng dạng với run_job(), một phần tử cho mỗi case.
+    """
+    import time
+    from assembler import assemble
+    from vector_engine import run_vectorized
+
+    with open(path, encoding='utf-8') as f:
+        program = assemble(f.read())
+    start = time.perf_counter()
+    _, states = run_vectorized(program, [(c['registers'], c['memory']) for c in cases],
+                               max_steps=max_steps, mem_size=mem_size)
+    elapsed = time.perf_counter() - start
+    results = []
+    for case, state in zip(cases, states):
+        status = 'error' if state['error'] else 'halted' if state['halted'] else 'step_limit'
+        checks = check_expectations(state['registers'], state['memory'], case)
+        results.append({'name': case['name'], 'path': path, 'status': status,
+                        'passed': status == 'halted' and all(c['ok'] for c in checks),
+                        'steps': state['steps'], 'elapsed': elapsed, 'error': state['error'],
+                        'registers': state['registers'], 'checks': checks})
+    return results
+
+
+def run_batch(jobs, workers=None, progress=None):
+    """
+    Chạy các job trên ProcessPoolExecutor ('workers' tiến trình, mặc định = số core;
+    1 = chạy tuần tự trong tiến trình hiện tại). Trả về kết quả theo thứ tự job.
+    """
+    if workers == 1:
+        results = []
+        for job in jobs:
+            results.append(run_job(job))
+            if progress:
+                progress(results[-1])
+        return results
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(results[futures[future]])
+    return results
+
+
+def summarize(results):
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return {'jobs': len(results), 'passed': sum(1 for r in results if r['passed']),
+            'statuses': counts, 'steps': sum(r['steps'] for r in results)}
+
+
+def write_report(results, path):
+    """Ghi báo cáo: JSON nếu 'path' kết thúc bằng .json, ngược lại CSV (mỗi job một dòng)."""
+    if path.lower().endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summarize(results), 'jobs': results}, f, indent=2)
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS + tuple(f'X{i}' for i in range(32)))
+        for r in results:
+            failed = ";".join(c['check'] for c in r['checks'] if not c['ok'])
+            writer.writerow([r['name'], r['path'], r['status'], r['passed'], r['steps'],
+                             f"{r['elapsed']:.6f}", failed, r['error'] or '']
+                            + (r['registers'] or [''] * 32))
+
+
+def format_results(results):
+    lines = [f"{'Job':<24} {'Status':<10} {'Steps':>12} {'Seconds':>9}  Result"]
+    for r in results:
+        failed = [c['check'] for c in r['checks'] if not c['ok']]
+        if r['error']:
+            verdict = f"ERROR: {r['error']}"
+        elif r['passed']:
+            verdict = f"PASS ({len(r['checks'])} checks)" if r['checks'] else "PASS"
+        else:
+            verdict = "FAIL" + (f" ({', '.join(failed)})" if failed else "")
+        lines.append(f"{r['name']:<24} {r['status']:<10} {r['steps']:>12} {r['elapsed']:>9.3f}  {verdict}")
+    summary = summarize(results)
+    lines.append(f"{summary['passed']}/{summary['jobs']} passed, "
+                 + ", ".join(f"{count} {status}" for status, count in sorted(summary['statuses'].items())))
+    return "\n".join(lines)
@@ -0,0 +1,35 @@
+# benchmarks/__init__.py
+"""
+Các workload LEGv8 chuẩn để đo hiệu năng simulator (xem harness.py).
+Mỗi workload là một file .s trong workloads/, tự khởi tạo dữ liệu bằng lệnh store
+và kết thúc bằng HALT với kết quả kiểm tra được trong X0.
+"""
+import os
+
+WORKLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workloads')
+
+# Bộ nhớ dữ liệu đủ cho mọi workload (mảng, ma trận, stack ở 0x8000)
+WORKLOAD_MEM_SIZE = 1 << 16
+
+# {tên: giá trị X0 mong đợi khi HALT}
+WORKLOADS = {
+    'bubble_sort': 1,
+    'insertion_sort': 1,
+    'matmul': 61440,
+    'fibonacci': 2584,
+    'memcpy': 71680,
+    'linked_list': 4186112,
+    'cbz_loop': 24577,
+}
+
+
+def workload_path(name):
+    return os.path.join(WORKLOAD_DIR, f"{name}.s")
+
+
+def load_workload(name):
+    """Mã nguồn assembly của workload 'name'. Ném ValueError nếu không có."""
+    if name not in WORKLOADS:
+        raise ValueError(f"Unknown workload '{name}' (use {', '.join(WORKLOADS)})")
+    with open(workload_path(name), encoding='utf-8') as f:
+        return f.read()
@@ -0,0 +1,318 @@
+# benchmarks/harness.py
+"""
+Harness đo hiệu năng, chạy từ thư mục gốc của repo:
+    python -m benchmarks.harness [--engines interp,block] [--output results.json]
+                                 [--baseline PATH] [--threshold 0.10] [--save-baseline]
+Đo: số lệnh/giây của simulator trên từng workload và engine, số dòng/giây của
+assembler, thời gian khởi động chế độ headless (không GUI, tiến trình riêng) và
+bộ nhớ cấp phát đỉnh (tracemalloc) khi chạy từng workload.
+Mỗi phép đo lấy trung vị của 'repeat' lần chạy. Tốc độ CPU của máy được đo bằng
+một vòng lặp hiệu chuẩn (calibrate()); chỉ số thời gian được so với baseline sau
+khi chia cho tốc độ đó, nên baseline ghi trên máy khác vẫn so được.
+Chỉ số nào xấu đi quá 'threshold' (tỉ lệ) được coi là regression và harness trả
+về mã thoát 1.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from assembler import assemble  # noqa: E402
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload  # noqa: E402
+from headless import run_program  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_REPEAT = 5
+ENGINES = ('interp', 'block')
+ASSEMBLER_MIN_LINES = 20000 # Số dòng tối thiểu cho một lần đo assembler
+MIN_SAMPLE_SECONDS = 0.1 # Thời gian tối thiểu cho một lần đo workload
+CALIBRATION_OPS = 200_000 # Số vòng của vòng lặp hiệu chuẩn trong một lần đo
+
+
+def _check(name, result):
+    """Ném ValueError nếu workload không HALT đúng hoặc X0 sai."""
+    if result['error'] or not result['halted']:
+        raise ValueError(f"Workload '{name}' did not halt cleanly: {result['error']}")
+    if result['registers'][0] != WORKLOADS[name]:
+        raise ValueError(f"Workload '{name}' produced X0={result['registers'][0]}, "
+                         f"expected {WORKLOADS[name]}")
+
+
+def calibrate(repeat=DEFAULT_REPEAT):
+    """
+    Tốc độ (vòng/giây, trung vị) của một vòng lặp Python thuần giống vòng dispatch của
+    interpreter: đọc/ghi list, phép số nguyên 64-bit, so sánh. Dùng để chuẩn hóa
+    các chỉ số thời gian giữa các máy.
+    """
+    rates = []
+    for _ in range(repeat):
+        regs = [0] * 32
+        start = time.perf_counter()
+        for i in range(CALIBRATION_OPS):
+            regs[i & 31] = (regs[(i + 1) & 31] + i) & 0xFFFFFFFFFFFFFFFF
+            if regs[i & 31] == 0:
+                regs[0] = 1
+        rates.append(CALIBRATION_OPS / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+
+def measure_workload(name, engine, repeat=DEFAULT_REPEAT):
+    """
+    Đo workload 'repeat' lần, lấy lần trung vị: {'instructions', 'seconds', 'ips'}.
+    Mỗi lần đo chạy lại workload đến khi đủ MIN_SAMPLE_SECONDS để giảm nhiễu.
+    """
+    source = load_workload(name)
+    samples = []
+    for _ in range(repeat):
+        instructions = 0
+        elapsed = 0.0
+        while elapsed < MIN_SAMPLE_SECONDS:
+            result = run_program(source, engine=engine, mem_size=WORKLOAD_MEM_SIZE)
+            _check(name, result)
+            instructions += result['steps']
+            elapsed += result['elapsed']
+        samples.append((instructions / elapsed, instructions, elapsed))
+    samples.sort()
+    ips, instructions, elapsed = samples[len(samples) // 2]
+    return {'instructions': instructions, 'seconds': elapsed, 'ips': ips}
+
+
+def measure_assembler(repeat=DEFAULT_REPEAT):
+    """Tốc độ assembler (dòng nguồn/giây) trên toàn bộ workload, lặp đến ASSEMBLER_MIN_LINES dòng."""
+    sources = [load_workload(name) for name in WORKLOADS]
+    lines_per_pass = sum(len(source.splitlines()) for source in sources)
+    passes = max(1, -(-ASSEMBLER_MIN_LINES // lines_per_pass))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(passes):
+            for source in sources:
+                assemble(source)
+        times.append(time.perf_counter() - start)
+    elapsed = statistics.median(times)
+    lines = lines_per_pass * passes
+    return {'lines': lines, 'seconds': elapsed, 'lines_per_second': lines / elapsed if elapsed > 0 else 0.0}
+
+
+def measure_startup(repeat=DEFAULT_REPEAT):
+    """Thời gian (giây, trung vị) chạy 'main.py --headless' cho chương trình chỉ có HALT, trong tiến trình mới."""
+    with tempfile.NamedTemporaryFile('w', suffix='.s', delete=False, encoding='utf-8') as f:
+        f.write("HALT\n")
+        path = f.name
+    command = [sys.executable, os.path.join(ROOT, 'main.py'), '--headless', path]
+    times = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=ROOT)
+            times.append(time.perf_counter() - start)
+    finally:
+        os.unlink(path)
+    return {'seconds': statistics.median(times)}
+
+
+def measure_peak_memory(name, engine='interp'):
+    """Bộ nhớ Python cấp phát đỉnh (byte) khi biên dịch + chạy workload 'name'."""
+    source = load_workload(name)
+    tracemalloc.start()
+    try:
+        result = run_program(source, engine=engine, mem_size=WORKLOAD_MEM_SIZE)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    _check(name, result)
+    return peak
+
+
+def _isolated(function, *args):
+    """
+    Gọi function(*args) trong một tiến trình con mới. CPython 3.11+ tự chuyên biệt hóa
+    bytecode của vòng dispatch theo các lệnh đã gặp, nên đo chung một tiến trình làm
+    tốc độ của một workload phụ thuộc các workload đo trước nó; các cấp phát chỉ xảy ra
+    một lần (cache, import trễ) cũng sẽ chỉ rơi vào bộ nhớ đỉnh của workload đầu tiên.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(function, *args).result()
+
+
+def run_benchmarks(workloads=None, engines=ENGINES, repeat=DEFAULT_REPEAT, progress=None):
+    """Chạy toàn bộ phép đo, trả về dict kết quả (ghi được ra JSON)."""
+    workloads = list(WORKLOADS) if workloads is None else workloads
+    if progress:
+        progress("calibration")
+    calibration = calibrate(repeat)
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'calibration': calibration,
+        },
+        'workloads': {},
+        'peak_memory': {},
+    }
+    for name in workloads:
+        results['workloads'][name] = {}
+        for engine in engines:
+            if progress:
+                progress(f"{name} ({engine})")
+            results['workloads'][name][engine] = _isolated(measure_workload, name, engine, repeat)
+        results['peak_memory'][name] = _isolated(measure_peak_memory, name)
+    if progress:
+        progress("assembler")
+    results['assembler'] = measure_assembler(repeat)
+    if progress:
+        progress("startup")
+    results['startup'] = measure_startup(repeat)
+    return results
+
+
+# --- So sánh với baseline ---
+def metrics(results, normalize=True):
+    """
+    {tên chỉ số: (giá trị, True nếu càng lớn càng tốt)} rút ra từ dict kết quả.
+    Với 'normalize', tốc độ được chia cho tốc độ hiệu chuẩn và thời gian được nhân
+    với nó (đơn vị: vòng hiệu chuẩn); bộ nhớ đỉnh không phụ thuộc tốc độ máy.
+    """
+    scale = 1.0
+    if normalize:
+        scale = results['meta']['calibration']
+    flat = {}
+    for name, engines in results.get('workloads', {}).items():
+        for engine, m in engines.items():
+            flat[f"workloads.{name}.{engine}.ips"] = (m['ips'] / scale, True)
+    for name, peak in results.get('peak_memory', {}).items():
+        flat[f"peak_memory.{name}"] = (peak, False)
+    if 'assembler' in results:
+        flat['assembler.lines_per_second'] = (results['assembler']['lines_per_second'] / scale, True)
+    if 'startup' in results:
+        flat['startup.seconds'] = (results['startup']['seconds'] * scale, False)
+    return flat
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    So từng chỉ số có trong cả hai bên (đã chuẩn hóa theo hiệu chuẩn nếu cả hai bên
+    đều có). Trả về danh sách dict {metric, baseline, current, change, regression};
+    'change' là tỉ lệ thay đổi theo hướng tốt (dương = tốt hơn), regression khi
+    change < -threshold.
+    """
+    normalize = bool(results['meta'].get('calibration') and baseline.get('meta', {}).get('calibration'))
+    current = metrics(results, normalize)
+    rows = []
+    for key, (base, higher_is_better) in metrics(baseline, normalize).items():
+        if key not in current or not base:
+            continue
+        value = current[key][0]
+        change = (value - base) / base
+        if not higher_is_better:
+            change = -change
+        rows.append({'metric': key, 'baseline': base, 'current': value,
+                     'change': change, 'regression': change < -threshold})
+    return rows
+
+
+def format_results(results):
+    lines = [f"{'Workload':<16} {'Engine':<7} {'Instructions':>12} {'Seconds':>9} {'Instr/s':>12}"]
+    for name, engines in results['workloads'].items():
+        for engine, m in engines.items():
+            lines.append(f"{name:<16} {engine:<7} {m['instructions']:>12} {m['seconds']:>9.4f} {m['ips']:>12,.0f}")
+    lines.append("")
+    lines.append("Peak memory: " + ", ".join(f"{name} {peak / 1024:,.0f} KiB"
+                                           for name, peak in results['peak_memory'].items()))
+    a = results['assembler']
+    lines.append(f"Assembler: {a['lines']} lines in {a['seconds']:.4f} s ({a['lines_per_second']:,.0f} lines/s)")
+    lines.append(f"Headless startup: {results['startup']['seconds'] * 1000:.1f} ms")
+    lines.append(f"Calibration: {results['meta']['calibration']:,.0f} loops/s")
+    return "\n".join(lines)
+
+
+def _format_value(value):
+    return f"{value:,.0f}" if abs(value) >= 1000 else f"{value:.4f}"
+
+
+def format_comparison(rows, threshold):
+    lines = [f"Comparison with baseline (threshold {threshold * 100:.0f}%, "
+             f"normalized to the calibration loop when both sides have one):"]
+    for row in rows:
+        flag = "  REGRESSION" if row['regression'] else ""
+        lines.append(f"  {row['metric']:<36} {_format_value(row['baseline']):>14} -> {_format_value(row['current']):>14} "
+                     f"{row['change'] * 100:+7.1f}%{flag}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LEGv8 simulator benchmark harness")
+    parser.add_argument('--workloads', default=None,
+                        help=f"Comma-separated workloads (default: all of {', '.join(WORKLOADS)})")
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help="Comma-separated execution engines (default: interp,block)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="Runs per measurement; the median is kept (default: 5)")
+    parser.add_argument('--output', metavar='PATH', default=None,
+                        help="Write the results as JSON to PATH")
+    parser.add_argument('--baseline', metavar='PATH', default=DEFAULT_BASELINE,
+                        help="Baseline JSON to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown counted as a regression (default: 0.10)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline instead of comparing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    for engine in engines:
+        if engine not in ENGINES:
+            sys.exit(f"Error: unknown engine '{engine}' (use {', '.join(ENGINES)})")
+    workloads = None
+    if args.workloads:
+        workloads = [w.strip() for w in args.workloads.split(',') if w.strip()]
+        for name in workloads:
+            if name not in WORKLOADS:
+                sys.exit(f"Error: unknown workload '{name}' (use {', '.join(WORKLOADS)})")
+
+    try:
+        results = run_benchmarks(workloads, engines, args.repeat,
+                                 progress=lambda what: print(f"Running {what}...", file=sys.stderr))
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} (use --save-baseline to create one)")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    print()
+    print(format_comparison(rows, args.threshold))
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
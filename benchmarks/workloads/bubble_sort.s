@@ -0,0 +1,54 @@
+// Bubble sort of N = 96 pseudo-random 64-bit words at address 0x100.
+// Result: X0 = 1 if the array ends up sorted (ascending), else 0.
+    MOVZ X9, #0x100          // X9  = array base
+    MOVZ X10, #96            // X10 = N
+    MOVZ X11, #12345         // X11 = LCG state
+    MOVZ X12, #0x4E6D        // X12 = multiplier 1103515245 (0x41C64E6D)
+    MOVK X12, #0x41C6, LSL #16
+    MOVZ X1, #0              // i = 0
+FILL:
+    MUL X11, X11, X12
+    ADDI X11, X11, #1234
+    LSR X2, X11, #16         // Value = upper bits of the state
+    LSL X3, X1, #3
+    ADD X3, X9, X3
+    STUR X2, [X3, #0]
+    ADDI X1, X1, #1
+    CMP X1, X10
+    B.LT FILL
+
+    SUBI X4, X10, #1         // X4 = passes left
+OUTER:
+    MOV X5, X9               // X5 = &a[j]
+    MOVZ X6, #0              // j = 0
+INNER:
+    LDUR X7, [X5, #0]
+    LDUR X8, [X5, #8]
+    CMP X7, X8
+    B.LS NOSWAP              // Unsigned a[j] <= a[j+1]
+    STUR X8, [X5, #0]
+    STUR X7, [X5, #8]
+NOSWAP:
+    ADDI X5, X5, #8
+    ADDI X6, X6, #1
+    CMP X6, X4
+    B.LT INNER
+    SUBIS X4, X4, #1
+    B.NE OUTER
+
+    // Check: a[k] <= a[k+1] for all k
+    MOVZ X0, #1
+    MOV X5, X9
+    SUBI X6, X10, #1
+CHECK:
+    LDUR X7, [X5, #0]
+    LDUR X8, [X5, #8]
+    CMP X7, X8
+    B.HI BAD
+    ADDI X5, X5, #8
+    SUBIS X6, X6, #1
+    B.NE CHECK
+    HALT
+BAD:
+    MOVZ X0, #0
+    HALT
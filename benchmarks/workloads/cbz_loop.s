@@ -0,0 +1,18 @@
+// CBZ/CBNZ-heavy loop: count the set bits of 4096 successive values with
+// CBZ-terminated inner loops. Result: X0 = total set bits of 1..4096 = 24577.
+    MOVZ X1, #4096           // Values left
+    MOVZ X0, #0
+OUTER:
+    MOV X2, X1
+BITS:
+    CBZ X2, DONE_VALUE
+    ANDI X3, X2, #1
+    CBZ X3, SKIP
+    ADDI X0, X0, #1
+SKIP:
+    LSR X2, X2, #1
+    B BITS
+DONE_VALUE:
+    SUBI X1, X1, #1
+    CBNZ X1, OUTER
+    HALT
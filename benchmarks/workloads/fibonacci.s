@@ -0,0 +1,25 @@
+// Recursive Fibonacci via BL/BR with a stack frame per call.
+// Result: X0 = fib(18) = 2584.
+    MOVZ SP, #0x8000         // Stack grows down from 0x8000
+    MOVZ X0, #18
+    BL FIB
+    HALT
+
+FIB:                         // X0 = fib(X0); clobbers X1
+    CMPI X0, #2
+    B.LT FIB_BASE
+    SUBI SP, SP, #24
+    STUR LR, [SP, #0]
+    STUR X0, [SP, #8]
+    SUBI X0, X0, #1
+    BL FIB                   // fib(n - 1)
+    STUR X0, [SP, #16]
+    LDUR X0, [SP, #8]
+    SUBI X0, X0, #2
+    BL FIB                   // fib(n - 2)
+    LDUR X1, [SP, #16]
+    ADD X0, X0, X1
+    LDUR LR, [SP, #0]
+    ADDI SP, SP, #24
+FIB_BASE:
+    BR LR
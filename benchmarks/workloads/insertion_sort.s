@@ -0,0 +1,54 @@
+// Insertion sort of N = 160 pseudo-random words at address 0x100.
+// Result: X0 = 1 if the array ends up sorted (ascending), else 0.
+    MOVZ X9, #0x100          // X9  = array base
+    MOVZ X10, #160           // X10 = N
+    MOVZ X11, #777           // X11 = LCG state
+    MOVZ X12, #0x4E6D        // X12 = multiplier 1103515245
+    MOVK X12, #0x41C6, LSL #16
+    MOVZ X1, #0
+FILL:
+    MUL X11, X11, X12
+    ADDI X11, X11, #1234
+    LSR X2, X11, #20
+    LSL X3, X1, #3
+    ADD X3, X9, X3
+    STUR X2, [X3, #0]
+    ADDI X1, X1, #1
+    CMP X1, X10
+    B.LT FILL
+
+    MOVZ X1, #1              // i = 1
+OUTER:
+    LSL X3, X1, #3
+    ADD X3, X9, X3           // X3 = &a[i]
+    LDUR X4, [X3, #0]        // key = a[i]
+SHIFT:
+    CMP X3, X9
+    B.EQ PLACE               // Reached a[0]
+    LDUR X5, [X3, #-8]
+    CMP X5, X4
+    B.LS PLACE               // a[j-1] <= key
+    STUR X5, [X3, #0]
+    SUBI X3, X3, #8
+    B SHIFT
+PLACE:
+    STUR X4, [X3, #0]
+    ADDI X1, X1, #1
+    CMP X1, X10
+    B.LT OUTER
+
+    MOVZ X0, #1
+    MOV X5, X9
+    SUBI X6, X10, #1
+CHECK:
+    LDUR X7, [X5, #0]
+    LDUR X8, [X5, #8]
+    CMP X7, X8
+    B.HI BAD
+    ADDI X5, X5, #8
+    SUBIS X6, X6, #1
+    B.NE CHECK
+    HALT
+BAD:
+    MOVZ X0, #0
+    HALT
@@ -0,0 +1,40 @@
+// Build a 512-node singly linked list in a scattered order (node k links to
+// node (k * 37) mod 512), then traverse it 32 times summing the node values.
+// Node layout at 0x1000 + 16 * k: [value, next pointer]; next = 0 ends the list.
+// Result: X0 = 32 * (0 + 1 + ... + 511) = 4186112.
+    MOVZ X20, #0x1000        // Node base
+    MOVZ X21, #512           // Nodes
+    MOVZ X22, #37            // Stride (coprime with 512)
+    SUBI X23, X21, #1        // Index mask
+    MOVZ X1, #0              // k
+    MOVZ X2, #0              // Current node index
+BUILD:
+    LSL X3, X2, #4
+    ADD X3, X20, X3          // &node[cur]
+    STUR X1, [X3, #0]        // value = k (visit order)
+    MUL X4, X2, X22
+    ADDI X4, X4, #1
+    AND X4, X4, X23          // next index = (cur * 37 + 1) mod 512
+    LSL X5, X4, #4
+    ADD X5, X20, X5
+    ADDI X1, X1, #1
+    CMP X1, X21
+    B.EQ LAST
+    STUR X5, [X3, #8]
+    MOV X2, X4
+    B BUILD
+LAST:
+    STUR XZR, [X3, #8]       // Terminate after N nodes
+
+    MOVZ X0, #0
+    MOVZ X6, #32             // Traversals
+WALK:
+    MOV X3, X20              // Head is node 0
+NEXT:
+    LDUR X4, [X3, #0]
+    ADD X0, X0, X4
+    LDUR X3, [X3, #8]
+    CBNZ X3, NEXT
+    SUBIS X6, X6, #1
+    B.NE WALK
+    HALT
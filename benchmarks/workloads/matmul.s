@@ -0,0 +1,71 @@
+// C = A x B for 16x16 matrices of words; A[i][j] = i + j, B[i][j] = i - j + 16.
+// A at 0x1000, B at 0x2000, C at 0x3000. Result: X0 = trace of C.
+    MOVZ X20, #0x1000        // A
+    MOVZ X21, #0x2000        // B
+    MOVZ X22, #0x3000        // C
+    MOVZ X23, #16            // N
+
+    MOVZ X1, #0              // i
+INIT_I:
+    MOVZ X2, #0              // j
+INIT_J:
+    LSL X3, X1, #4
+    ADD X3, X3, X2
+    LSL X3, X3, #3           // Offset of [i][j]
+    ADD X4, X1, X2
+    ADD X5, X20, X3
+    STUR X4, [X5, #0]
+    SUB X4, X1, X2
+    ADDI X4, X4, #16
+    ADD X5, X21, X3
+    STUR X4, [X5, #0]
+    ADDI X2, X2, #1
+    CMP X2, X23
+    B.LT INIT_J
+    ADDI X1, X1, #1
+    CMP X1, X23
+    B.LT INIT_I
+
+    MOVZ X1, #0              // i
+MUL_I:
+    MOVZ X2, #0              // j
+MUL_J:
+    MOVZ X6, #0              // sum
+    LSL X7, X1, #7
+    ADD X7, X20, X7          // &A[i][0]
+    LSL X8, X2, #3
+    ADD X8, X21, X8          // &B[0][j]
+    MOVZ X3, #0              // k
+MUL_K:
+    LDUR X4, [X7, #0]
+    LDUR X5, [X8, #0]
+    MUL X4, X4, X5
+    ADD X6, X6, X4
+    ADDI X7, X7, #8
+    ADDI X8, X8, #128
+    ADDI X3, X3, #1
+    CMP X3, X23
+    B.LT MUL_K
+    LSL X9, X1, #4
+    ADD X9, X9, X2
+    LSL X9, X9, #3
+    ADD X9, X22, X9
+    STUR X6, [X9, #0]
+    ADDI X2, X2, #1
+    CMP X2, X23
+    B.LT MUL_J
+    ADDI X1, X1, #1
+    CMP X1, X23
+    B.LT MUL_I
+
+    MOVZ X0, #0              // Trace of C
+    MOV X9, X22
+    MOVZ X1, #0
+TRACE:
+    LDUR X4, [X9, #0]
+    ADD X0, X0, X4
+    ADDI X9, X9, #136        // Next diagonal element: (N + 1) * 8
+    ADDI X1, X1, #1
+    CMP X1, X23
+    B.LT TRACE
+    HALT
@@ -0,0 +1,47 @@
+// memset a 2 KiB buffer with a pattern, then memcpy it to another buffer, 24 times.
+// Result: X0 = sum of the destination words after the last copy.
+    MOVZ X20, #0x1000        // Source
+    MOVZ X21, #0x2000        // Destination
+    MOVZ X22, #256           // Words per buffer
+    MOVZ X23, #24            // Repetitions
+    MOVZ X24, #0x0101        // Pattern seed
+ROUND:
+    // memset(src, pattern, 2048)
+    MOV X1, X20
+    MOV X2, X22
+SET:
+    STUR X24, [X1, #0]
+    ADDI X1, X1, #8
+    SUBIS X2, X2, #1
+    B.NE SET
+    // memcpy(dst, src, 2048), 4 words per iteration
+    MOV X1, X20
+    MOV X3, X21
+    LSR X2, X22, #2
+COPY:
+    LDUR X4, [X1, #0]
+    LDUR X5, [X1, #8]
+    LDUR X6, [X1, #16]
+    LDUR X7, [X1, #24]
+    STUR X4, [X3, #0]
+    STUR X5, [X3, #8]
+    STUR X6, [X3, #16]
+    STUR X7, [X3, #24]
+    ADDI X1, X1, #32
+    ADDI X3, X3, #32
+    SUBIS X2, X2, #1
+    B.NE COPY
+    ADDI X24, X24, #1
+    SUBIS X23, X23, #1
+    B.NE ROUND
+
+    MOVZ X0, #0
+    MOV X3, X21
+    MOV X2, X22
+SUM:
+    LDUR X4, [X3, #0]
+    ADD X0, X0, X4
+    ADDI X3, X3, #8
+    SUBIS X2, X2, #1
+    B.NE SUM
+    HALT
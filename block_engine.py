@@ -0,0 +1,411 @@
+# block_engine.py
+"""
+Engine dịch basic block cho LEGv8_Simplified_Simulator.
+Chương trình được chia thành basic block (ranh giới: nhãn, đích nhảy, lệnh sau
+B/BL/BR/CBZ/CBNZ/B.cond/HALT, cùng các PC phải dừng: breakpoint, until_pc). Các block đến
+được từ một PC vào (đi theo nhánh tĩnh, tối đa MAX_REGION_LENGTH lệnh) được sinh
+thành MỘT hàm Python (region): các block nối thẳng với nhau qua một cây so sánh PC
+trong hàm, không quay lại vòng dispatch giữa hai block.
+Load/store trên DataMemory truy cập trang trực tiếp trong mã sinh ra; chỉ truy cập
+vắt trang / ngoài phạm vi mới gọi handler của interpreter (để báo lỗi như cũ).
+Engine chỉ dùng cho run(); step() vẫn chạy từng lệnh để GUI có state chi tiết.
+"""
+import struct
+
+from decoder import MASK64, XZR, LR, MEM_ACCESS_WIDTH
+from memory import DataMemory, PAGE_SHIFT, PAGE_SIZE, PAGE_MASK
+
+MAX_BLOCK_LENGTH = 256 # Giới hạn số lệnh trong một block để mã sinh ra không quá lớn
+MAX_REGION_LENGTH = 2048 # Giới hạn tổng số lệnh của một region
+LINEAR_DISPATCH = 4 # Số block tối đa so sánh tuần tự ở một lá của cây dispatch
+UNLIMITED_STEPS = 1 << 62 # 'budget' khi không giới hạn số lệnh
+
+# Lệnh kết thúc một basic block
+BLOCK_TERMINATORS = {'B', 'BL', 'BR', 'CBZ', 'CBNZ', 'B.cond', 'HALT'}
+
+# Biểu thức điều kiện B.cond trên dict cờ 'f'
+CONDITION_EXPRS = (
+    "f['Z'] == 1", "f['Z'] == 0", "f['C'] == 1", "f['C'] == 0",
+    "f['N'] == 1", "f['N'] == 0", "f['V'] == 1", "f['V'] == 0",
+    "f['C'] == 1 and f['Z'] == 0", "not (f['C'] == 1 and f['Z'] == 0)",
+    "f['N'] == f['V']", "f['N'] != f['V']",
+    "f['Z'] == 0 and f['N'] == f['V']", "not (f['Z'] == 0 and f['N'] == f['V'])",
+    "True",
+)
+
+# Biểu thức kết quả cho các lệnh ALU được sinh inline
+_INLINE_R = {
+    'ADD': "(r[{rn}] + r[{rm}]) & M", 'SUB': "(r[{rn}] - r[{rm}]) & M",
+    'AND': "r[{rn}] & r[{rm}]", 'ORR': "r[{rn}] | r[{rm}]", 'EOR': "r[{rn}] ^ r[{rm}]",
+    'MUL': "(r[{rn}] * r[{rm}]) & M",
+    'LSL': "(r[{rn}] << {shamt}) & M", 'LSR': "r[{rn}] >> {shamt}",
+    'ADDI': "(r[{rn}] + {imm}) & M", 'SUBI': "(r[{rn}] - {imm}) & M",
+    'ANDI': "r[{rn}] & {imm}", 'ORRI': "r[{rn}] | {imm}", 'EORI': "r[{rn}] ^ {imm}",
+    'MOVZ': "{movz}", 'MOVK': "(r[{rd}] & {movk_mask}) | {movz}",
+}
+
+# Lệnh đặt cờ: (mã khi cần cờ, mã khi chỉ cần kết quả). Cờ được tính inline,
+# không gọi hàm, vì đây thường là lệnh so sánh trong vòng lặp nóng.
+_ADD_FLAGS = ("a = r[{rn}]; b = {b}; full = a + b{carry}; res = full & M; "
+              "sim.flags = {{'N': res >> 63, 'Z': 1 if res == 0 else 0, "
+              "'V': ((a ^ res) & (b ^ res)) >> 63 & 1, 'C': full >> 64 & 1}}")
+_LOGIC_FLAGS = ("res = r[{rn}] & {b}; "
+                "sim.flags = {{'N': res >> 63, 'Z': 1 if res == 0 else 0, 'V': 0, 'C': 0}}")
+_FLAG_SETTERS = {
+    'ADDS': (_ADD_FLAGS.replace('{b}', 'r[{rm}]').replace('{carry}', ''), "res = (r[{rn}] + r[{rm}]) & M"),
+    'SUBS': (_ADD_FLAGS.replace('{b}', '~r[{rm}] & M').replace('{carry}', ' + 1'), "res = (r[{rn}] - r[{rm}]) & M"),
+    'ADDIS': (_ADD_FLAGS.replace('{b}', '{imm}').replace('{carry}', ''), "res = (r[{rn}] + {imm}) & M"),
+    'SUBIS': (_ADD_FLAGS.replace('{b}', '{nimm}').replace('{carry}', ' + 1'), "res = (r[{rn}] - {imm}) & M"),
+    'ANDS': (_LOGIC_FLAGS.replace('{b}', 'r[{rm}]'), "res = r[{rn}] & r[{rm}]"),
+    'ANDIS': (_LOGIC_FLAGS.replace('{b}', '{imm}'), "res = r[{rn}] & {imm}"),
+}
+
+# Cờ tính lại từ biến cục bộ của lệnh đặt cờ ngay trước B.cond trong cùng block
+_LOCAL_FLAGS = {
+    'add': {"f['N']": "(res >> 63)", "f['Z']": "(res == 0)",
+            "f['V']": "(((a ^ res) & (b ^ res)) >> 63 & 1)", "f['C']": "(full >> 64 & 1)"},
+    'logic': {"f['N']": "(res >> 63)", "f['Z']": "(res == 0)", "f['V']": "0", "f['C']": "0"},
+}
+
+# Load/store truy cập trang trực tiếp: (hàm struct, có mở rộng dấu)
+_LOADS = {'LDUR': ('_U8', False), 'LDURSW': ('_S4', True), 'LDURH': ('_U2', False), 'LDURB': ('_U1', False)}
+_STORES = {'STUR': '_P8', 'STURW': '_P4', 'STURH': '_P2', 'STURB': '_P1'}
+_MEMORY_FUNCS = {
+    '_U8': struct.Struct('<Q').unpack_from, '_S4': struct.Struct('<i').unpack_from,
+    '_U2': struct.Struct('<H').unpack_from, '_U1': struct.Struct('<B').unpack_from,
+    '_P8': struct.Struct('<Q').pack_into, '_P4': struct.Struct('<I').pack_into,
+    '_P2': struct.Struct('<H').pack_into, '_P1': struct.Struct('<B').pack_into,
+}
+
+
+class Region:
+    """Các block đã dịch, đến được từ 'entry': fn(sim, budget, stops) -> next_pc."""
+    __slots__ = ('entry', 'starts', 'length', 'fn', 'source')
+
+    def __init__(self, entry, starts, length, fn, source):
+        self.entry = entry
+        self.starts = starts # PC đầu của từng block trong region
+        self.length = length # Tổng số lệnh
+        self.fn = fn
+        self.source = source
+
+
+class BlockEngine:
+    """Dịch và chạy basic block cho một simulator cụ thể."""
+
+    def __init__(self, simulator):
+        self.sim = simulator
+        self._regions = {}
+        self._leaders = None
+        self._stop_leaders = set() # PC dừng (breakpoint, until_pc) đã thành ranh giới block
+        self._memory = None # data_memory mà mã sinh ra đang truy cập trực tiếp
+
+    def invalidate(self):
+        """Xóa toàn bộ region đã dịch (gọi khi nạp chương trình mới)."""
+        self._regions = {}
+        self._leaders = None
+        self._stop_leaders = set()
+
+    def _add_stop(self, pc):
+        """Đảm bảo 'pc' là đầu một block, để region dừng đúng tại đó (dịch lại nếu cần)."""
+        if pc in self._stop_leaders:
+            return
+        self._stop_leaders.add(pc)
+        if self._leaders is not None and pc not in self._leaders:
+            self._leaders.add(pc)
+            self._regions = {}
+
+    # --- Phân tích chương trình ---
+    def _compute_leaders(self):
+        sim = self.sim
+        leaders = set(sim.label_to_pc_map.values())
+        leaders.add(sim.initial_pc)
+        leaders |= self._stop_leaders
+        for pc in sim.program.pcs():
+            try:
+                decoded = sim.decode_at(pc)
+            except ValueError:
+                continue # Lệnh lỗi sẽ được báo khi thông dịch tới
+            if decoded.name in BLOCK_TERMINATORS:
+                leaders.add(pc + 4)
+                if decoded.target is not None:
+                    leaders.add(decoded.target)
+        self._leaders = leaders
+
+    def _collect_block(self, start):
+        """Trả về danh sách lệnh đã giải mã của block bắt đầu tại 'start'."""
+        if self._leaders is None:
+            self._compute_leaders()
+        sim = self.sim
+        instrs = []
+        pc = start
+        while len(instrs) < MAX_BLOCK_LENGTH:
+            if instrs and pc in self._leaders:
+                break
+            try:
+                decoded = sim.decode_at(pc)
+            except ValueError:
+                break
+            if decoded is None:
+                break
+            instrs.append((pc, decoded))
+            if decoded.name in BLOCK_TERMINATORS:
+                break
+            pc += 4
+        return instrs
+
+    @staticmethod
+    def _successors(instrs):
+        """PC có thể chạy tiếp sau block (chỉ nhánh tĩnh; BR và HALT không có)."""
+        last_pc, last = instrs[-1]
+        if last.name in ('BR', 'HALT'):
+            return ()
+        if last.name == 'B':
+            return (last.target,)
+        if last.name in BLOCK_TERMINATORS: # BL (quay về pc + 4), CBZ, CBNZ, B.cond
+            return (last.target, last_pc + 4)
+        return (last_pc + 4,)
+
+    def _collect_region(self, entry):
+        """Các block đến được từ 'entry' theo nhánh tĩnh: {start: instrs}."""
+        blocks = {}
+        pending = [entry]
+        total = 0
+        while pending:
+            start = pending.pop()
+            if start in blocks:
+                continue
+            instrs = self._collect_block(start)
+            if not instrs:
+                continue
+            if blocks and total + len(instrs) > MAX_REGION_LENGTH:
+                break
+            blocks[start] = instrs
+            total += len(instrs)
+            pending.extend(pc for pc in reversed(self._successors(instrs)) if pc not in blocks)
+        return blocks
+
+    # --- Sinh mã ---
+    def _translate(self, entry):
+        blocks = self._collect_region(entry)
+        if not blocks:
+            return None
+        namespace = {'M': MASK64}
+        memory = self.sim.data_memory
+        inline_memory = type(memory) is DataMemory and not memory.strict_alignment
+        if inline_memory:
+            namespace.update(_MEMORY_FUNCS)
+        self._memory = memory
+
+        codes = {start: self._block_code(instrs, namespace, inline_memory) for start, instrs in blocks.items()}
+        source = [f"def _region_{entry:x}(sim, budget, stops):",
+                  "    r = sim.registers"]
+        if inline_memory:
+            source += ["    m = sim.data_memory", "    pg = m.pages", "    sh = m._shared"]
+        source += [f"    pc = {entry}", "    n = 0", "    k = 0", "    try:", "        while True:"]
+        self._dispatch(sorted(codes), codes, 3, source)
+        source += ["    except Exception:",
+                   "        sim._block_steps = n + k", # Lệnh thứ k của block đang chạy ném lỗi
+                   "        sim._block_pc = pc + 4 * k",
+                   "        raise",
+                   "    sim._block_steps = n",
+                   "    return pc"]
+        source = "\n".join(source) + "\n"
+
+        code = compile(source, f"<region {entry:#x}>", 'exec')
+        exec(code, namespace)
+        region = Region(entry, sorted(blocks), sum(map(len, blocks.values())),
+                        namespace[f'_region_{entry:x}'], source)
+        self._regions[entry] = region
+        return region
+
+    def _dispatch(self, starts, codes, depth, out):
+        """Cây so sánh PC (nhị phân, lá so tuần tự) chọn block cần chạy."""
+        indent = "    " * depth
+        if len(starts) <= LINEAR_DISPATCH:
+            for i, start in enumerate(starts):
+                out.append(f"{indent}{'if' if i == 0 else 'elif'} pc == {start}:")
+                out.extend(f"{indent}    {stmt}" for stmt in codes[start])
+            out.append(f"{indent}else:")
+            out.append(f"{indent}    break") # PC ra ngoài region
+            return
+        mid = len(starts) // 2
+        out.append(f"{indent}if pc < {starts[mid]}:")
+        self._dispatch(starts[:mid], codes, depth + 1, out)
+        out.append(f"{indent}else:")
+        self._dispatch(starts[mid:], codes, depth + 1, out)
+
+    def _block_code(self, instrs, namespace, inline_memory):
+        """Các câu lệnh của một block trong region (PC đầu block nằm trong biến 'pc')."""
+        length = len(instrs)
+        body = [f"if n + {length} > budget:", "    break"]
+
+        # Chỉ lệnh đặt cờ cuối cùng (trước lệnh có thể lỗi hoặc cuối block) mới cần ghi cờ
+        flags_needed = [False] * length
+        need = True
+        for i in range(length - 1, -1, -1):
+            name = instrs[i][1].name
+            if name in _FLAG_SETTERS:
+                flags_needed[i] = need
+                need = False
+            elif name not in _INLINE_R and name not in BLOCK_TERMINATORS and name != 'NOP':
+                need = True
+        local_flags = None # Biến cục bộ của lệnh đặt cờ cuối (nếu B.cond đọc được thẳng)
+
+        last_pc, last = instrs[-1]
+        for i, (pc, d) in enumerate(instrs):
+            fields = {
+                'rd': d.rd, 'rn': d.rn, 'rm': d.rm, 'imm': d.imm, 'shamt': d.shamt,
+                'nimm': ~d.imm & MASK64,
+                'movz': d.imm << d.shamt if d.name in ('MOVZ', 'MOVK') else 0,
+                'movk_mask': ~(0xFFFF << d.shamt) & MASK64,
+            }
+            name = d.name
+            if name in _INLINE_R:
+                if d.rd != XZR:
+                    body.append(f"r[{d.rd}] = " + _INLINE_R[name].format(**fields))
+            elif name in _FLAG_SETTERS:
+                with_flags, result_only = _FLAG_SETTERS[name]
+                if flags_needed[i]:
+                    body.append(with_flags.format(**fields))
+                    local_flags = _LOCAL_FLAGS['logic' if name in ('ANDS', 'ANDIS') else 'add']
+                elif d.rd != XZR:
+                    body.append(result_only.format(**fields))
+                if d.rd != XZR:
+                    body.append(f"r[{d.rd}] = res")
+            elif name == 'NOP' or name in BLOCK_TERMINATORS:
+                pass # Lệnh kết thúc block được sinh riêng bên dưới
+            else:
+                # Lệnh phức tạp (chia, load/store vắt trang hoặc lỗi...): gọi handler
+                # của interpreter, ghi vị trí k để khôi phục PC chính xác nếu handler ném lỗi.
+                namespace[f'_h{pc:x}'] = d.handler
+                namespace[f'_d{pc:x}'] = d
+                slow = ["k = %d" % i, f"_h{pc:x}(sim, _d{pc:x}, {pc})"]
+                if inline_memory and (name in _LOADS and d.rd != XZR or name in _STORES):
+                    body.extend(self._memory_access(d, slow, self._memory.size))
+                else:
+                    body.extend(slow)
+
+        body.append(f"n += {length}")
+        fall_pc = last_pc + 4
+        taken = self._branch_condition(last)
+        if last.name == 'B.cond' and taken != "True":
+            if local_flags is not None:
+                for key, expr in local_flags.items():
+                    taken = taken.replace(key, expr)
+            else:
+                body.append("f = sim.flags")
+        if last.name == 'HALT':
+            body.append("sim.halted = True")
+            body.append(f"pc = {last_pc}")
+            body.append("break")
+            return body
+        if last.name == 'BL':
+            body.append(f"r[{LR}] = {fall_pc}")
+            body.append(f"pc = {last.target}")
+        elif last.name == 'BR':
+            body.append(f"pc = r[{last.rn}]")
+        elif taken is None:
+            body.append(f"pc = {fall_pc}") # Rơi xuống block kế tiếp
+        elif taken == "True":
+            body.append(f"pc = {last.target}")
+        else:
+            body.append(f"pc = {last.target} if {taken} else {fall_pc}")
+        body.append("if pc in stops:")
+        body.append("    break")
+        return body
+
+    @staticmethod
+    def _memory_access(d, slow, size):
+        """Load/store truy cập thẳng trang của DataMemory; 'slow' cho trường hợp còn lại."""
+        width = MEM_ACCESS_WIDTH[d.name]
+        out = [f"ea = (r[{d.rn}] + {d.imm}) & M" if d.imm else f"ea = r[{d.rn}]",
+               f"if ea <= {size - width} and ea & {PAGE_MASK} <= {PAGE_SIZE - width}:"]
+        if d.name in _LOADS:
+            func, signed = _LOADS[d.name]
+            value = f"{func}(p, ea & {PAGE_MASK})[0]"
+            if signed:
+                value = f"({value} & M)"
+            out += [f"    p = pg.get(ea >> {PAGE_SHIFT})",
+                    f"    r[{d.rd}] = {value} if p is not None else 0"]
+        else:
+            value = f"r[{d.rd}]" if width == 8 else f"r[{d.rd}] & {(1 << width * 8) - 1}"
+            out += [f"    x = ea >> {PAGE_SHIFT}",
+                    "    p = pg.get(x)",
+                    "    if p is None or x in sh:",
+                    "        p = m._page_for_write(x)", # Cấp phát / copy-on-write như DataMemory.store
+                    f"    {_STORES[d.name]}(p, ea & {PAGE_MASK}, {value})"]
+        out.append("else:")
+        out.extend(f"    {stmt}" for stmt in slow)
+        return out
+
+    @staticmethod
+    def _branch_condition(decoded):
+        """Biểu thức 'nhánh được lấy' cho lệnh cuối block (None nếu không phải nhánh điều kiện/B)."""
+        if decoded.name == 'B':
+            return "True"
+        if decoded.name == 'CBZ':
+            return f"r[{decoded.rn}] == 0"
+        if decoded.name == 'CBNZ':
+            return f"r[{decoded.rn}] != 0"
+        if decoded.name == 'B.cond':
+            return CONDITION_EXPRS[decoded.cond]
+        return None
+
+    # --- Vòng chạy ---
+    def run(self, max_steps=None, until_pc=None):
+        """Giống simulator.run() nhưng thực thi theo region; trả về số lệnh đã chạy."""
+        sim = self.sim
+        if sim.halted:
+            return 0
+        if sim.observed:
+            # Block đã dịch không trace/ghi/theo dõi từng lệnh -> dùng interpreter
+            return sim._run_interpreter(max_steps, until_pc)
+        if sim.data_memory is not self._memory:
+            self._regions = {} # Bộ nhớ bị thay (vd. load_state đổi kích thước): dịch lại
+            self._memory = sim.data_memory
+        # Breakpoint và until_pc là đầu block: region chỉ so PC với tập dừng khi sang block mới
+        stops = sim._stop_pcs(until_pc)
+        for stop in stops:
+            self._add_stop(stop)
+        conditions = sim.breakpoint_conditions
+        sim.stop_reason = None
+        regions = self._regions
+        limit = UNLIMITED_STEPS if max_steps is None else max_steps
+        pc = sim.pc
+        steps = 0          # Tổng số lệnh (cả phần chạy qua interpreter)
+        block_steps = 0    # Số lệnh chạy bằng region (interpreter tự cộng instruction_count)
+        try:
+            while steps < limit:
+                region = regions.get(pc) or self._translate(pc)
+                if region is not None:
+                    try:
+                        pc = region.fn(sim, limit - steps, stops)
+                    except Exception:
+                        pc = sim._block_pc
+                        steps += sim._block_steps
+                        block_steps += sim._block_steps
+                        raise
+                    executed = sim._block_steps
+                    steps += executed
+                    block_steps += executed
+                    if sim.halted:
+                        break
+                    if executed and pc in stops:
+                        sim.pc = pc # Điều kiện breakpoint đọc trạng thái simulator
+                        if sim._breaks_at(pc, until_pc, conditions):
+                            break
+                    if executed:
+                        continue
+                # Không dịch được / block kế tiếp dài hơn số lệnh còn lại: chạy từng lệnh
+                sim.pc = pc
+                budget = 1 if region is None else limit - steps
+                executed = sim._run_interpreter(budget, until_pc)
+                steps += executed
+                pc = sim.pc
+                if sim.halted or executed == 0 or sim.stop_reason or (executed and pc == until_pc):
+                    break
+        finally:
+            sim.pc = pc
+            sim.instruction_count += block_steps
+        return steps
@@ -0,0 +1,212 @@
+# branch_predictor.py
+"""
+Các mô hình dự đoán rẽ nhánh cho B, B.cond và CBZ/CBNZ:
+static not-taken, BTFN (nhảy lùi = taken), 1-bit, 2-bit bão hòa và gshare.
+Bảng dự đoán là bytearray đánh chỉ số theo PC (và lịch sử toàn cục với gshare).
+- Simulator single-cycle: sim.attach_branch_predictor(p), mỗi nhánh đã chạy gọi record().
+- Pipeline: dự đoán ở IF bằng predict(), cập nhật ở EX bằng update(); dự đoán sai -> flush.
+"""
+
+# Nhóm lệnh (decoder iclass) được dự đoán
+PREDICTED_CLASSES = frozenset(('B', 'BCOND', 'CBZ'))
+
+DEFAULT_INDEX_BITS = 10
+DEFAULT_HISTORY_BITS = 8
+
+
+class BranchPredictor:
+    """Lớp cơ sở: thống kê độ chính xác toàn cục và theo từng nhánh."""
+    name = 'base'
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Xóa bảng dự đoán và thống kê."""
+        self.branches = 0
+        self.correct = 0
+        self.per_branch = {} # {pc: [số lần chạy, số lần đoán đúng, số lần taken]}
+
+    def predict(self, pc, target):
+        """True nếu dự đoán nhánh tại 'pc' (đích 'target') sẽ nhảy."""
+        return False
+
+    def train(self, pc, taken):
+        """Cập nhật bảng dự đoán theo kết quả thật."""
+
+    def update(self, pc, taken, predicted):
+        """Ghi nhận kết quả của một nhánh đã được dự đoán là 'predicted'."""
+        self.branches += 1
+        entry = self.per_branch.get(pc)
+        if entry is None:
+            entry = self.per_branch[pc] = [0, 0, 0]
+        entry[0] += 1
+        if taken == predicted:
+            self.correct += 1
+            entry[1] += 1
+        if taken:
+            entry[2] += 1
+        self.train(pc, taken)
+
+    def record(self, pc, target, taken):
+        """Dự đoán rồi cập nhật ngay (core single-cycle). Trả về True nếu đoán đúng."""
+        predicted = self.predict(pc, target)
+        self.update(pc, taken, predicted)
+        return predicted == taken
+
+    @property
+    def mispredictions(self):
+        return self.branches - self.correct
+
+    @property
+    def accuracy(self):
+        return self.correct / self.branches if self.branches else 0.0
+
+    def describe(self):
+        return self.name
+
+    def stats(self):
+        return {
+            'predictor': self.describe(),
+            'branches': self.branches,
+            'correct': self.correct,
+            'mispredictions': self.mispredictions,
+            'accuracy': self.accuracy,
+            'per_branch': {pc: {'executed': n, 'correct': ok, 'taken': taken,
+                                'accuracy': ok / n if n else 0.0}
+                           for pc, (n, ok, taken) in sorted(self.per_branch.items())},
+        }
+
+
+class NotTakenPredictor(BranchPredictor):
+    """Luôn dự đoán không nhảy."""
+    name = 'not-taken'
+
+
+class BTFNPredictor(BranchPredictor):
+    """Backward taken, forward not taken: nhánh nhảy lùi (vòng lặp) được đoán là nhảy."""
+    name = 'btfn'
+
+    def predict(self, pc, target):
+        return target is not None and target <= pc
+
+
+class OneBitPredictor(BranchPredictor):
+    """Mỗi mục một bit: nhớ kết quả lần trước của nhánh."""
+    name = '1bit'
+
+    def __init__(self, index_bits=DEFAULT_INDEX_BITS):
+        self.index_bits = index_bits
+        self._mask = (1 << index_bits) - 1
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.table = bytearray(1 << self.index_bits)
+
+    def predict(self, pc, target):
+        return self.table[(pc >> 2) & self._mask] == 1
+
+    def train(self, pc, taken):
+        self.table[(pc >> 2) & self._mask] = 1 if taken else 0
+
+    def describe(self):
+        return f"1-bit ({1 << self.index_bits} entries)"
+
+
+class TwoBitPredictor(BranchPredictor):
+    """Bộ đếm bão hòa 2 bit (0-1: not taken, 2-3: taken), khởi tạo weakly not taken."""
+    name = '2bit'
+
+    def __init__(self, index_bits=DEFAULT_INDEX_BITS):
+        self.index_bits = index_bits
+        self._mask = (1 << index_bits) - 1
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.table = bytearray([1]) * (1 << self.index_bits)
+
+    def _index(self, pc):
+        return (pc >> 2) & self._mask
+
+    def predict(self, pc, target):
+        return self.table[self._index(pc)] >= 2
+
+    def train(self, pc, taken):
+        table = self.table
+        i = self._index(pc)
+        if taken:
+            if table[i] < 3:
+                table[i] += 1
+        elif table[i] > 0:
+            table[i] -= 1
+
+    def describe(self):
+        return f"2-bit ({1 << self.index_bits} entries)"
+
+
+class GsharePredictor(TwoBitPredictor):
+    """Bộ đếm 2 bit đánh chỉ số bằng PC XOR thanh ghi lịch sử toàn cục 'history_bits' bit."""
+    name = 'gshare'
+
+    def __init__(self, history_bits=DEFAULT_HISTORY_BITS, index_bits=DEFAULT_INDEX_BITS):
+        if history_bits > index_bits:
+            raise ValueError("gshare history bits cannot exceed index bits")
+        self.history_bits = history_bits
+        self._history_mask = (1 << history_bits) - 1
+        super().__init__(index_bits)
+
+    def reset(self):
+        super().reset()
+        self.history = 0
+
+    def _index(self, pc):
+        return ((pc >> 2) ^ self.history) & self._mask
+
+    def train(self, pc, taken):
+        super().train(pc, taken)
+        self.history = ((self.history << 1) | (1 if taken else 0)) & self._history_mask
+
+    def describe(self):
+        return f"gshare ({self.history_bits}-bit history, {1 << self.index_bits} entries)"
+
+
+PREDICTORS = {
+    'not-taken': NotTakenPredictor,
+    'btfn': BTFNPredictor,
+    '1bit': OneBitPredictor,
+    '2bit': TwoBitPredictor,
+    'gshare': GsharePredictor,
+}
+
+
+def make_predictor(spec):
+    """
+    Tạo predictor từ chuỗi 'tên[:tham số]': not-taken, btfn, 1bit[:index_bits],
+    2bit[:index_bits], gshare[:history_bits[:index_bits]]. Ném ValueError nếu sai.
+    """
+    name, *params = [p.strip() for p in spec.strip().lower().split(':')]
+    cls = PREDICTORS.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown branch predictor '{name}' (use {', '.join(PREDICTORS)})")
+    try:
+        values = [int(p, 0) for p in params]
+    except ValueError:
+        raise ValueError(f"Invalid branch predictor parameter in '{spec}'") from None
+    max_params = {'not-taken': 0, 'btfn': 0, '1bit': 1, '2bit': 1, 'gshare': 2}[name]
+    if len(values) > max_params:
+        raise ValueError(f"Too many parameters for branch predictor '{name}'")
+    return cls(*values)
+
+
+def format_branch_stats(stats, top=10):
+    """Text cho BranchPredictor.stats(): độ chính xác toàn cục và các nhánh đoán sai nhiều nhất."""
+    lines = [f"  {stats['predictor']}: {stats['branches']} branches, "
+             f"{stats['mispredictions']} mispredicted, accuracy {stats['accuracy'] * 100:.2f}%"]
+    worst = sorted(stats['per_branch'].items(),
+                   key=lambda item: item[1]['executed'] - item[1]['correct'], reverse=True)[:top]
+    for pc, b in worst:
+        lines.append(f"    {pc:#010x}: {b['executed']:>10} executed  {b['taken']:>10} taken  "
+                     f"{b['accuracy'] * 100:6.2f}% correct")
+    return "\n".join(lines)
@@ -0,0 +1,289 @@
+# cache.py
+"""
+Mô hình cache (chỉ timing/thống kê, không giữ dữ liệu) cho instruction fetch và
+truy cập bộ nhớ dữ liệu: L1 I-cache, L1 D-cache và L2 dùng chung (tùy chọn).
+- Kích thước, độ kết hợp (associativity), kích thước block, chính sách ghi
+  (write-back / write-through) và thay thế (LRU / FIFO / random) cấu hình được.
+- Mảng tag là array('q') (block number, -1 = trống) và dấu thời gian array('Q'),
+  nên mỗi lần truy cập chỉ tốn vài phép tra mảng.
+Simulator gọi CacheHierarchy.record() cho mỗi lệnh đã chạy (xem attach_caches()).
+"""
+import random
+from array import array
+
+from decoder import MEM_ACCESS_WIDTH
+
+REPLACEMENT_POLICIES = ('lru', 'fifo', 'random')
+WRITE_POLICIES = ('write-back', 'write-through')
+
+DEFAULT_L1_HIT_TIME = 1 # Chu kỳ
+DEFAULT_L2_HIT_TIME = 10
+DEFAULT_MEMORY_LATENCY = 100
+
+# Cấu hình mặc định cho '--cache default' / GUI
+DEFAULT_CACHE_SPEC = "l1i=4k:2:32,l1d=4k:2:32:wb:lru,l2=64k:8:64:wb:lru"
+
+_SHORT_NAMES = {'wb': 'write-back', 'wt': 'write-through'}
+
+
+def _is_power_of_two(n):
+    return n > 0 and n & (n - 1) == 0
+
+
+class Cache:
+    """Một mức cache set-associative. 'next_level' là Cache mức dưới (None = bộ nhớ chính)."""
+
+    def __init__(self, name, size=4096, associativity=2, block_size=32, write_policy='write-back',
+                 replacement='lru', write_allocate=None, hit_time=DEFAULT_L1_HIT_TIME,
+                 next_level=None, seed=0):
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Invalid write policy '{write_policy}' (use {', '.join(WRITE_POLICIES)})")
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Invalid replacement policy '{replacement}' (use {', '.join(REPLACEMENT_POLICIES)})")
+        if not _is_power_of_two(block_size) or not _is_power_of_two(associativity):
+            raise ValueError(f"{name}: block size and associativity must be powers of two")
+        if size % (block_size * associativity) or not _is_power_of_two(size // (block_size * associativity)):
+            raise ValueError(f"{name}: size must be a power-of-two multiple of block size x associativity")
+        self.name = name
+        self.size = size
+        self.associativity = associativity
+        self.block_size = block_size
+        self.write_policy = write_policy
+        self.replacement = replacement
+        # Mặc định: write-back đi với write-allocate, write-through thì không
+        self.write_allocate = (write_policy == 'write-back') if write_allocate is None else write_allocate
+        self.hit_time = hit_time
+        self.next_level = next_level
+        self.num_sets = size // (block_size * associativity)
+        self._offset_bits = block_size.bit_length() - 1
+        self._set_mask = self.num_sets - 1
+        self._rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        """Làm rỗng cache và xóa thống kê."""
+        lines = self.num_sets * self.associativity
+        self.tags = array('q', [-1]) * lines # Block number đang nằm ở mỗi line
+        self.stamps = array('Q', [0]) * lines # LRU: lần dùng cuối; FIFO: lúc nạp
+        self.dirty = bytearray(lines)
+        self._clock = 0
+        self.reads = self.writes = 0
+        self.read_misses = self.write_misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    # --- Truy cập ---
+    def access(self, addr, width=1, is_write=False):
+        """Truy cập [addr, addr+width); trả về True nếu mọi block đều hit."""
+        first = addr >> self._offset_bits
+        last = (addr + width - 1) >> self._offset_bits
+        hit = self._access_block(first, is_write)
+        if last != first: # Truy cập vắt qua hai block
+            hit = self._access_block(last, is_write) and hit
+        return hit
+
+    def _access_block(self, block, is_write):
+        assoc = self.associativity
+        base = (block & self._set_mask) * assoc
+        tags = self.tags
+        self._clock += 1
+        if is_write:
+            self.writes += 1
+        else:
+            self.reads += 1
+        try:
+            way = tags.index(block, base, base + assoc)
+        except ValueError:
+            way = -1
+        if way >= 0:
+            if self.replacement == 'lru':
+                self.stamps[way] = self._clock
+            if is_write:
+                if self.write_policy == 'write-back':
+                    self.dirty[way] = 1
+                elif self.next_level is not None:
+                    self.next_level._access_block(self._next_block(block), True)
+            return True
+
+        # Miss
+        if is_write:
+            self.write_misses += 1
+            if not self.write_allocate:
+                if self.next_level is not None:
+                    self.next_level._access_block(self._next_block(block), True)
+                return False
+        else:
+            self.read_misses += 1
+        way = self._victim(base)
+        victim = tags[way]
+        if victim >= 0:
+            self.evictions += 1
+            if self.dirty[way]:
+                self.writebacks += 1
+                if self.next_level is not None:
+                    self.next_level._access_block(self._next_block(victim), True)
+        if self.next_level is not None: # Nạp block từ mức dưới
+            self.next_level._access_block(self._next_block(block), False)
+        tags[way] = block
+        self.stamps[way] = self._clock
+        self.dirty[way] = 0
+        if is_write:
+            if self.write_policy == 'write-back':
+                self.dirty[way] = 1
+            elif self.next_level is not None:
+                self.next_level._access_block(self._next_block(block), True)
+        return False
+
+    def _next_block(self, block):
+        """Đổi block number của mức này sang block number của mức dưới."""
+        return (block << self._offset_bits) >> self.next_level._offset_bits
+
+    def _victim(self, base):
+        tags = self.tags
+        end = base + self.associativity
+        try:
+            return tags.index(-1, base, end) # Còn line trống
+        except ValueError:
+            pass
+        if self.replacement == 'random':
+            return base + self._rng.randrange(self.associativity)
+        stamps = self.stamps
+        return min(range(base, end), key=stamps.__getitem__) # LRU và FIFO
+
+    # --- Thống kê ---
+    @property
+    def accesses(self):
+        return self.reads + self.writes
+
+    @property
+    def misses(self):
+        return self.read_misses + self.write_misses
+
+    @property
+    def hits(self):
+        return self.accesses - self.misses
+
+    @property
+    def miss_rate(self):
+        return self.misses / self.accesses if self.accesses else 0.0
+
+    def amat(self, memory_latency=DEFAULT_MEMORY_LATENCY):
+        """Thời gian truy cập trung bình (chu kỳ) = hit time + miss rate x miss penalty."""
+        penalty = self.next_level.amat(memory_latency) if self.next_level is not None else memory_latency
+        return self.hit_time + self.miss_rate * penalty
+
+    def describe(self):
+        size = f"{self.size // 1024}K" if self.size % 1024 == 0 else f"{self.size}B"
+        return f"{size} {self.associativity}-way {self.block_size}B {self.write_policy} {self.replacement}"
+
+    def stats(self, memory_latency=DEFAULT_MEMORY_LATENCY):
+        return {
+            'config': self.describe(),
+            'accesses': self.accesses, 'hits': self.hits, 'misses': self.misses,
+            'read_misses': self.read_misses, 'write_misses': self.write_misses,
+            'evictions': self.evictions, 'writebacks': self.writebacks,
+            'miss_rate': self.miss_rate, 'amat': self.amat(memory_latency),
+        }
+
+
+class CacheHierarchy:
+    """L1 I-cache / D-cache (mỗi cái có thể None) và L2 dùng chung tùy chọn."""
+
+    def __init__(self, icache=None, dcache=None, l2=None, memory_latency=DEFAULT_MEMORY_LATENCY):
+        self.icache = icache
+        self.dcache = dcache
+        self.l2 = l2
+        self.memory_latency = memory_latency
+        for l1 in (icache, dcache):
+            if l1 is not None and l2 is not None:
+                l1.next_level = l2
+
+    @property
+    def caches(self):
+        return [c for c in (self.icache, self.dcache, self.l2) if c is not None]
+
+    def reset(self):
+        for cache in self.caches:
+            cache.reset()
+
+    def record(self, pc, decoded, mem_addr):
+        """Ghi nhận fetch của lệnh tại 'pc' và truy cập dữ liệu của nó (nếu có)."""
+        if self.icache is not None:
+            self.icache._access_block(pc >> self.icache._offset_bits, False)
+        if mem_addr is not None and self.dcache is not None:
+            self.dcache.access(mem_addr, MEM_ACCESS_WIDTH[decoded.name], decoded.iclass == 'STORE')
+
+    def stats(self):
+        """{'l1i'/'l1d'/'l2': thống kê từng cache, 'amat': AMAT theo loại truy cập}."""
+        latency = self.memory_latency
+        result = {}
+        for key, cache in (('l1i', self.icache), ('l1d', self.dcache), ('l2', self.l2)):
+            if cache is not None:
+                result[key] = cache.stats(latency)
+        amat = {}
+        if self.icache is not None:
+            amat['instruction'] = self.icache.amat(latency)
+        if self.dcache is not None:
+            amat['data'] = self.dcache.amat(latency)
+        result['amat'] = amat
+        return result
+
+
+def _parse_size(text):
+    text = text.strip().lower()
+    scale = 1
+    if text.endswith('k'):
+        text, scale = text[:-1], 1024
+    elif text.endswith('m'):
+        text, scale = text[:-1], 1024 * 1024
+    return int(text, 0) * scale
+
+
+def parse_cache_spec(spec, memory_latency=DEFAULT_MEMORY_LATENCY):
+    """
+    Tạo CacheHierarchy từ chuỗi cấu hình, vd. "l1i=4k:2:32,l1d=8k:4:32:wb:lru,l2=64k:8:64".
+    Mỗi mục: tên (l1i, l1d, l2) = size[:assoc[:block[:wb|wt[:lru|fifo|random]]]].
+    'default' dùng DEFAULT_CACHE_SPEC. Ném ValueError nếu cấu hình sai.
+    """
+    if spec.strip() == 'default':
+        spec = DEFAULT_CACHE_SPEC
+    caches = {}
+    for entry in filter(None, (e.strip() for e in spec.split(','))):
+        name, sep, params = entry.partition('=')
+        name = name.strip().lower()
+        if not sep or name not in ('l1i', 'l1d', 'l2'):
+            raise ValueError(f"Invalid cache entry '{entry}' (expected l1i=..., l1d=... or l2=...)")
+        if name in caches:
+            raise ValueError(f"Cache '{name}' configured twice")
+        fields = [f.strip().lower() for f in params.split(':')]
+        if len(fields) > 5:
+            raise ValueError(f"Too many fields in cache entry '{entry}'")
+        try:
+            size = _parse_size(fields[0])
+            assoc = int(fields[1], 0) if len(fields) > 1 else 1
+            block = int(fields[2], 0) if len(fields) > 2 else 32
+        except ValueError:
+            raise ValueError(f"Invalid number in cache entry '{entry}'") from None
+        write_policy = _SHORT_NAMES.get(fields[3], fields[3]) if len(fields) > 3 else 'write-back'
+        replacement = fields[4] if len(fields) > 4 else 'lru'
+        caches[name] = Cache(name.upper(), size, assoc, block, write_policy, replacement,
+                             hit_time=DEFAULT_L2_HIT_TIME if name == 'l2' else DEFAULT_L1_HIT_TIME)
+    if not caches:
+        raise ValueError("Empty cache configuration")
+    return CacheHierarchy(caches.get('l1i'), caches.get('l1d'), caches.get('l2'), memory_latency)
+
+
+def format_cache_stats(stats):
+    """Bảng text cho thống kê của CacheHierarchy.stats()."""
+    lines = [f"  {'Cache':<5} {'Config':<36} {'Accesses':>10} {'Misses':>9} {'Miss %':>7} "
+             f"{'Evict':>8} {'WB':>8} {'AMAT':>7}"]
+    for key in ('l1i', 'l1d', 'l2'):
+        s = stats.get(key)
+        if s is None:
+            continue
+        lines.append(f"  {key.upper():<5} {s['config']:<36} {s['accesses']:>10} {s['misses']:>9} "
+                     f"{s['miss_rate'] * 100:>6.2f}% {s['evictions']:>8} {s['writebacks']:>8} {s['amat']:>7.2f}")
+    amat = stats.get('amat', {})
+    if amat:
+        lines.append("  AMAT: " + ", ".join(f"{kind} {value:.2f} cycles" for kind, value in amat.items()))
+    return "\n".join(lines)
@@ -1,7 +1,11 @@
 # datapath_visualizer.py
 import tkinter as tk
 import math
-import time # Dùng để tính toán thời gian animation (có thể không cần nếu dùng after chuẩn)
+import time # Đồng hồ animation dùng time.perf_counter()
+from bisect import bisect_right
+
+from decoder import INSTRUCTION_SPECS
+from tracing import TRACER
 
 # --- Constants ---
 COLOR_INACTIVE = "grey"
@@ -24,12 +28,110 @@ ANIM_DOT_SIZE = 3 # Bán kính chấm animation
 ANIM_DURATION_MS = 400 # Thời gian animation cho một tín hiệu (ms)
 ANIM_STEP_MS = 25 # Tần suất cập nhật vị trí chấm (ms) -> ~40 FPS
 
+
+# --- Bảng kích hoạt theo nhóm lệnh ---
+# Mỗi nhóm lệnh (decoder iclass) -> {element key: vai trò}; key của component có hậu tố '_box'.
+# Vai trò quyết định màu: 'active' (đường dữ liệu), 'mem' (truy cập bộ nhớ), 'regw' (ghi thanh ghi).
+_FETCH = {
+    'pc_box': 'active', 'imem_box': 'active', 'add4_box': 'active', 'control_box': 'active',
+    'mux_pcsource_box': 'active',
+    'path_pc_to_imem_addr': 'active', 'path_pc_to_add4': 'active', 'path_imem_to_control': 'active',
+    'path_add4_to_mux_pcsource': 'active', 'path_mux_pcsource_to_pc': 'active',
+}
+_ALU_COMMON = {
+    'regfile_box': 'active', 'alu_box': 'active', 'alucontrol_box': 'active', 'mux_alusrc_box': 'active',
+    'path_imem_to_reg_r1': 'active', 'path_reg_r1_to_alu_a': 'active',
+    'path_mux_alusrc_to_alu_b': 'active', 'path_imem_to_aluctrl': 'active', 'path_aluctrl_to_alu': 'active',
+}
+_IMMEDIATE = {
+    'signext_box': 'active', 'path_imem_to_signext': 'active', 'path_signext_to_mux_alusrc': 'active',
+}
+_WRITE_BACK_ALU = {
+    'mux_mem2reg_box': 'regw', 'path_alu_res_to_mux_mem2reg': 'regw', 'path_mux_mem2reg_to_reg_wdata': 'regw',
+}
+_BRANCH_TARGET = {
+    'signext_box': 'active', 'shiftleft2_box': 'active', 'add_branch_box': 'active',
+    'path_imem_to_signext': 'active', 'path_signext_to_shift': 'active',
+    'path_shift_to_addbr': 'active', 'path_add4_to_addbr': 'active',
+}
+
+ACTIVATION_TABLE = {
+    'R': {**_FETCH, **_ALU_COMMON, **_WRITE_BACK_ALU,
+          'mux_wreg_box': 'active', 'path_imem_to_mux_wreg1': 'active', 'path_mux_wreg_to_regaddr': 'active',
+          'path_reg_r2_to_mux_alusrc': 'active'},
+    'I': {**_FETCH, **_ALU_COMMON, **_IMMEDIATE, **_WRITE_BACK_ALU},
+    'IW': {**_FETCH, **_ALU_COMMON, **_IMMEDIATE, **_WRITE_BACK_ALU},
+    'LOAD': {**_FETCH, **_ALU_COMMON, **_IMMEDIATE,
+             'datamem_box': 'mem', 'path_alu_res_to_dmem_addr': 'mem',
+             'path_dmem_rdata_to_mux_mem2reg': 'mem',
+             'mux_mem2reg_box': 'regw', 'path_mux_mem2reg_to_reg_wdata': 'regw'},
+    'STORE': {**_FETCH, **_ALU_COMMON, **_IMMEDIATE,
+              'mux_wreg_box': 'active', 'path_imem_to_mux_wreg2': 'active', 'path_mux_wreg_to_regaddr': 'active',
+              'datamem_box': 'mem', 'path_alu_res_to_dmem_addr': 'mem', 'path_reg_r2_to_dmem_wdata': 'mem'},
+    'CBZ': {**_FETCH, **_BRANCH_TARGET,
+            'regfile_box': 'active', 'alu_box': 'active', 'mux_wreg_box': 'active', 'mux_alusrc_box': 'active',
+            'path_imem_to_mux_wreg2': 'active', 'path_mux_wreg_to_regaddr': 'active',
+            'path_reg_r2_to_mux_alusrc': 'active', 'path_mux_alusrc_to_alu_b': 'active'},
+    'BCOND': {**_FETCH, **_BRANCH_TARGET},
+    'B': {**_FETCH, **_BRANCH_TARGET},
+    'BL': {**_FETCH, **_BRANCH_TARGET, 'regfile_box': 'regw'},
+    'BR': {**_FETCH, 'regfile_box': 'active', 'path_imem_to_reg_r1': 'active'},
+    'HALT': {},
+    'NOP': dict(_FETCH),
+}
+
+# Khi rẽ nhánh: PC lấy từ bộ cộng nhánh thay vì PC+4
+_TAKEN_SWAP = ('path_add4_to_mux_pcsource', 'path_addbr_to_mux_pcsource')
+
+ROLE_STYLES = {
+    'active': (COLOR_ACTIVE, LINE_WIDTH_ACTIVE),
+    'mem': (COLOR_MEM_ACCESS, LINE_WIDTH_ACTIVE),
+    'regw': (COLOR_REG_WRITE, LINE_WIDTH_ACTIVE),
+    'control': (COLOR_CONTROL_ACTIVE, LINE_WIDTH_CONTROL_ACTIVE),
+}
+
+
+def _path_geometry(points):
+    """Tính sẵn (điểm, khoảng cách cộng dồn tại mỗi điểm, tổng độ dài) cho một đường gấp khúc."""
+    cumulative = [0.0]
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        cumulative.append(cumulative[-1] + math.hypot(x2 - x1, y2 - y1))
+    return points, cumulative, cumulative[-1]
+
+
+def _point_at(geometry, dist):
+    """Tọa độ của điểm cách đầu đường 'dist' pixel."""
+    points, cumulative, total = geometry
+    if dist >= total:
+        return points[-1]
+    i = max(0, bisect_right(cumulative, dist) - 1)
+    seg_len = cumulative[i + 1] - cumulative[i]
+    t = (dist - cumulative[i]) / seg_len if seg_len > 0 else 0.0
+    (x1, y1), (x2, y2) = points[i], points[i + 1]
+    return x1 + (x2 - x1) * t, y1 + (y2 - y1) * t
+
+
 class DatapathVisualizer:
     def __init__(self, canvas):
         self.canvas = canvas
         self.elements = {} # Dictionary to store canvas item IDs and path coords
-        self.animated_dots = [] # List to keep track of animation dot IDs
-        self.animation_busy = False # Flag to prevent overlapping animations (optional)
+        self.path_geometry = {} # {element_key: geometry} tính sẵn khi vẽ datapath tĩnh
+        # Animation: một đồng hồ chung cho mọi chấm đang chạy
+        self.active_dots = {} # {dot_id: [geometry, thời gian đã chạy (ms)]}
+        self.animation_busy = False # True khi còn chấm đang chạy
+        self.animation_duration = ANIM_DURATION_MS # Thời gian một chấm đi hết đường (ms)
+        self.paused = False
+        self._clock_id = None # after() id của tick kế tiếp
+        self._last_tick = 0.0
+        # Layout tĩnh chỉ vẽ một lần (tọa độ gốc theo kích thước 'layout_size'),
+        # sau đó chỉ scale theo kích thước canvas khi <Configure>
+        self.layout_size = None # (w, h) lúc vẽ layout gốc
+        self.scale = 1.0 # Tỉ lệ hiện tại so với layout gốc
+        self.canvas.bind('<Configure>', self._on_canvas_resize, add='+')
+        # Highlight theo diff: chỉ đổi những item khác với lần vẽ trước
+        self._default_styles = {} # {element key: (option màu, màu mặc định, width mặc định)}
+        self._highlighted = {} # {element key: (màu, width)} đang được highlight
+        self._highlight_cache = {} # {(mnemonic, taken, animate): {key: (màu, width)}}
 
     def _create_box(self, x, y, w, h, text, bg_color, element_key):
         """Creates a rectangle with text and stores its ID."""
@@ -37,6 +139,7 @@ class DatapathVisualizer:
         text_id = self.canvas.create_text(x + w / 2, y + h / 2, text=text, tags=("component_text", element_key + "_text"), state=tk.DISABLED) # Disable text selection
         self.elements[element_key + '_box'] = box_id
         self.elements[element_key + '_text'] = text_id
+        self._default_styles[element_key + '_box'] = ('outline', "black", LINE_WIDTH_INACTIVE)
         return box_id
 
     def _create_line(self, coords, color, width, element_key, tags=("path",)):
@@ -53,20 +156,34 @@ class DatapathVisualizer:
 
             line_id = self.canvas.create_line(*flat_coords, fill=color, width=width, tags=tags + (element_key,))
             self.elements[element_key] = line_id
+            self._default_styles[element_key] = ('fill', color, width)
             # Store detailed coordinates for animation
             self.elements[element_key + '_coords'] = path_points
+            self.path_geometry[element_key] = _path_geometry(path_points)
             return line_id
         return None
 
-    def draw_static_datapath(self):
+    def draw_static_datapath(self, force=False):
         """
         Vẽ datapath tĩnh dựa trên layout của image_80fd53.png.
+        Lớp tĩnh được giữ qua các lần nạp chương trình: nếu đã vẽ rồi (và không 'force')
+        thì chỉ xóa lớp động (highlight, chấm animation).
         """
+        if self.elements and not force:
+            self.reset_datapath_visualization()
+            return self.elements
+        self._stop_clock()
         self.canvas.delete("all")
         self.elements = {}
-        self.animated_dots = []
+        self._default_styles = {}
+        self._highlighted = {}
+        self.path_geometry = {}
+        self.active_dots = {}
+        self.animation_busy = False
         w = int(self.canvas.cget("width"))
         h = int(self.canvas.cget("height"))
+        self.layout_size = (w, h)
+        self.scale = 1.0
 
         # --- Component Dimensions (Adjust as needed) ---
         pc_w, pc_h = 50, 35
@@ -217,190 +334,187 @@ class DatapathVisualizer:
             path_coords = [start_point, (bend1_x, bend1_y), (bend2_x, bend2_y), target_coords]
             self._create_line(path_coords, COLOR_INACTIVE, LINE_WIDTH_CONTROL, f"ctrl_{name.lower()}", tags=("control_path",))
 
-        print("Static datapath drawn (Layout based on image_80fd53.png).")
+        TRACER.emit('datapath', "Static datapath drawn (Layout based on image_80fd53.png).")
+        self._fit_to_canvas()
         return self.elements # Return elements dictionary
 
+    # --- Resize ---
+    def _on_canvas_resize(self, event):
+        self._fit_to_canvas(event.width, event.height)
+
+    def _fit_to_canvas(self, width=None, height=None):
+        """Scale lớp tĩnh (giữ tỉ lệ) cho vừa canvas bằng canvas.scale, không vẽ lại."""
+        if self.layout_size is None:
+            return
+        if width is None:
+            width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if width <= 1 or height <= 1: # Canvas chưa được map
+            return
+        base_w, base_h = self.layout_size
+        new_scale = min(width / base_w, height / base_h)
+        if abs(new_scale - self.scale) < 1e-3:
+            return
+        self.drop_animations() # Chấm đang chạy theo tọa độ cũ
+        factor = new_scale / self.scale
+        self.canvas.scale('all', 0, 0, factor, factor)
+        self.scale = new_scale
+        # Tọa độ gốc giữ nguyên trong elements[key + '_coords']; hình học animation theo tỉ lệ mới
+        for key in self.path_geometry:
+            points = [(x * new_scale, y * new_scale) for x, y in self.elements[key + '_coords']]
+            self.path_geometry[key] = _path_geometry(points)
+
     def reset_datapath_visualization(self):
         """Đặt lại màu sắc/độ dày và xóa các chấm animation."""
         if not self.elements: return
-        for item_id in self.canvas.find_withtag("path"):
-            self.canvas.itemconfig(item_id, fill=COLOR_INACTIVE, width=LINE_WIDTH_INACTIVE)
-        for item_id in self.canvas.find_withtag("control_path"):
-            self.canvas.itemconfig(item_id, fill=COLOR_INACTIVE, width=LINE_WIDTH_CONTROL)
-        for item_id in self.canvas.find_withtag("component"):
-            self.canvas.itemconfig(item_id, outline="black", width=LINE_WIDTH_INACTIVE)
+        self._apply_highlights({})
 
         # Delete any existing animation dots
-        for dot_id in self.animated_dots:
-            self.canvas.delete(dot_id)
-        self.animated_dots = []
-        self.animation_busy = False
+        self.drop_animations()
         # print("Datapath visualization reset.")
 
+    # --- Animation engine ---
+    def drop_animations(self):
+        """Xóa mọi chấm đang chạy (dùng khi có lệnh mới: không để animation xếp hàng)."""
+        for dot_id in self.active_dots:
+            self.canvas.delete(dot_id)
+        self.active_dots = {}
+        self.animation_busy = False
+        self._stop_clock()
 
-    def _animate_dot(self, dot_id, path_coords, segment_lengths, total_length, start_time):
-        """Recursive function to move the dot along the path."""
-        elapsed_time = (time.perf_counter() - start_time) * 1000 # ms
-        progress = min(elapsed_time / ANIM_DURATION_MS, 1.0) # Normalize progress 0.0 to 1.0
-
-        # Calculate current distance along the total path
-        current_dist = progress * total_length
-
-        # Find which segment the dot is on and its position on that segment
-        cumulative_dist = 0
-        current_x, current_y = path_coords[0] # Default to start
-        for i in range(len(segment_lengths)):
-            segment_start = path_coords[i]
-            segment_end = path_coords[i+1]
-            seg_len = segment_lengths[i]
+    def pause_animations(self):
+        """Dừng đồng hồ animation; các chấm đứng yên tại chỗ."""
+        self.paused = True
+        self._stop_clock()
 
-            if current_dist <= cumulative_dist + seg_len + 1e-6: # Check if on or before this segment
-                segment_progress = (current_dist - cumulative_dist) / seg_len if seg_len > 0 else 0
-                segment_progress = max(0.0, min(1.0, segment_progress)) # Clamp progress
+    def resume_animations(self):
+        self.paused = False
+        self._start_clock()
 
-                current_x = segment_start[0] + (segment_end[0] - segment_start[0]) * segment_progress
-                current_y = segment_start[1] + (segment_end[1] - segment_start[1]) * segment_progress
-                break
-            cumulative_dist += seg_len
-        else:
-             # If loop completes, dot is at the very end
-             current_x, current_y = path_coords[-1]
+    def set_animation_speed(self, duration_ms):
+        """Đặt thời gian (ms) để một chấm đi hết đường tín hiệu (slider Speed của GUI)."""
+        self.animation_duration = max(1, int(duration_ms))
 
+    def _start_clock(self):
+        if self._clock_id is None and self.active_dots and not self.paused:
+            self._last_tick = time.perf_counter()
+            self._clock_id = self.canvas.after(ANIM_STEP_MS, self._tick)
 
-        # Move the dot
+    def _stop_clock(self):
+        if self._clock_id is not None:
+            try:
+                self.canvas.after_cancel(self._clock_id)
+            except tk.TclError:
+                pass
+            self._clock_id = None
+
+    def _tick(self):
+        """Một nhịp của đồng hồ chung: dời tất cả các chấm theo thời gian thực đã trôi qua."""
+        self._clock_id = None
+        now = time.perf_counter()
+        # Tính theo thời gian thực: nếu tick bị trễ, chấm nhảy tới đúng vị trí (bỏ frame)
+        elapsed = (now - self._last_tick) * 1000
+        self._last_tick = now
+        duration = self.animation_duration
         radius = ANIM_DOT_SIZE
+        finished = []
         try:
-            if self.canvas.winfo_exists() and dot_id in self.canvas.find_all():
-                 self.canvas.coords(dot_id, current_x - radius, current_y - radius, current_x + radius, current_y + radius)
-            else:
-                 # print(f"Dot {dot_id} deleted or canvas destroyed, stopping animation.")
-                 return # Stop if dot or canvas is gone
+            for dot_id, anim in self.active_dots.items():
+                anim[1] += elapsed
+                geometry = anim[0]
+                if anim[1] >= duration:
+                    finished.append(dot_id)
+                    continue
+                x, y = _point_at(geometry, anim[1] / duration * geometry[2])
+                self.canvas.coords(dot_id, x - radius, y - radius, x + radius, y + radius)
+            for dot_id in finished:
+                del self.active_dots[dot_id]
+                self.canvas.delete(dot_id)
         except tk.TclError:
-             # print(f"Error moving dot {dot_id}, stopping animation.")
-             return # Stop if error occurs
-
-
-        # Schedule next step or finish
-        if progress < 1.0:
-            self.canvas.after(ANIM_STEP_MS, self._animate_dot, dot_id, path_coords, segment_lengths, total_length, start_time)
-        else:
-            # Animation finished, remove dot from tracking but keep it visible for a moment?
-            # Or just delete it now. Let's delete it for simplicity.
-            if dot_id in self.animated_dots:
-                self.animated_dots.remove(dot_id)
-            # Slight delay before deleting? Optional.
-            # self.canvas.after(100, lambda: self.canvas.delete(dot_id) if dot_id in self.canvas.find_all() else None)
-            self.canvas.delete(dot_id) # Delete immediately
-            # print(f"Animation finished for dot {dot_id}")
-            # Check if all animations are done
-            # if not self.animated_dots:
-            #     self.animation_busy = False
-
+            self.active_dots = {} # Canvas đã bị hủy
+        self.animation_busy = bool(self.active_dots)
+        if self.active_dots and not self.paused:
+            self._clock_id = self.canvas.after(ANIM_STEP_MS, self._tick)
 
     def start_signal_animation(self, signal_name):
         """Initiates the animation for a specific control signal."""
-        path_key = f"ctrl_{signal_name.lower()}_coords"
-        if path_key in self.elements:
-            path_coords = self.elements[path_key]
-            if len(path_coords) < 2: return # Need at least start and end point
-
-            # Calculate segment lengths and total length
-            segment_lengths = []
-            total_length = 0
-            for i in range(len(path_coords) - 1):
-                x1, y1 = path_coords[i]
-                x2, y2 = path_coords[i+1]
-                length = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-                segment_lengths.append(length)
-                total_length += length
-
-            if total_length <= 0: return # Cannot animate zero length path
-
-            # Create the animation dot
-            start_x, start_y = path_coords[0]
-            radius = ANIM_DOT_SIZE
-            dot_id = self.canvas.create_oval(start_x - radius, start_y - radius, start_x + radius, start_y + radius, fill=COLOR_ANIM_DOT, outline=COLOR_ANIM_DOT, tags="anim_dot")
-            self.animated_dots.append(dot_id)
-            self.animation_busy = True
-
-            # Start the recursive animation movement
-            start_time = time.perf_counter()
-            # print(f"Starting animation for {signal_name} (dot {dot_id})")
-            self._animate_dot(dot_id, path_coords, segment_lengths, total_length, start_time)
-
-
-    def update_datapath_visualization(self, state):
+        geometry = self.path_geometry.get(f"ctrl_{signal_name.lower()}")
+        if geometry is None or geometry[2] <= 0:
+            return # Không có đường hoặc đường dài 0
+        start_x, start_y = geometry[0][0]
+        radius = ANIM_DOT_SIZE
+        dot_id = self.canvas.create_oval(start_x - radius, start_y - radius, start_x + radius, start_y + radius, fill=COLOR_ANIM_DOT, outline=COLOR_ANIM_DOT, tags="anim_dot")
+        self.active_dots[dot_id] = [geometry, 0.0]
+        self.animation_busy = True
+        self._start_clock()
+
+
+    def update_datapath_visualization(self, state, animate=True):
         """
         Cập nhật hình ảnh datapath VÀ bắt đầu animation cho tín hiệu control.
+        animate=False chỉ highlight tĩnh (dùng khi chạy liên tục, mỗi frame một lần).
+        Tập đường/khối sáng lấy từ ACTIVATION_TABLE theo nhóm lệnh; chỉ phần khác với
+        lần trước mới được itemconfig.
         """
-        # Reset previous state BUT keep ongoing animations running
-        # Reset colors/widths first
         if not self.elements: return
-        for item_id in self.canvas.find_withtag("path"):
-            self.canvas.itemconfig(item_id, fill=COLOR_INACTIVE, width=LINE_WIDTH_INACTIVE)
-        for item_id in self.canvas.find_withtag("control_path"):
-             # Don't reset color/width of control paths, let animation handle it?
-             # Or reset width, keep color default, animation adds color?
-             self.canvas.itemconfig(item_id, fill=COLOR_INACTIVE, width=LINE_WIDTH_CONTROL)
-        for item_id in self.canvas.find_withtag("component"):
-            self.canvas.itemconfig(item_id, outline="black", width=LINE_WIDTH_INACTIVE)
+        # Frame-drop: chấm của lệnh trước (nếu còn) bị bỏ, chỉ lệnh mới nhất được animate
+        self.drop_animations()
 
         # Check state
         if not state or state.get('halted'):
-            # If halted, ensure any lingering animations are cleared
-            for dot_id in self.animated_dots:
-                self.canvas.delete(dot_id)
-            self.animated_dots = []
-            self.animation_busy = False
+            self._apply_highlights({})
             return
 
-        signals = state.get('control_signals', {})
+        name = state.get('instruction')
         pc = state.get('pc')
         next_pc = state.get('next_pc')
         is_branch_taken = (next_pc != pc + 4) if pc is not None and next_pc is not None else False
+        signals = state.get('control_signals', {})
 
-        active_color = COLOR_ACTIVE
-        active_width = LINE_WIDTH_ACTIVE
-        mem_color = COLOR_MEM_ACCESS
-        regw_color = COLOR_REG_WRITE
-        # ctrl_color = COLOR_CONTROL_ACTIVE # Color used for static highlight
-        # ctrl_width = LINE_WIDTH_CONTROL_ACTIVE
-
-        # --- Highlight Data Paths and Components (Static) ---
-        # (Giữ lại logic highlight tĩnh cho đường dữ liệu và component outlines như trước)
-        # Ví dụ:
-        self._highlight_element("path_pc_to_imem_addr", active_color, active_width)
-        self._highlight_component("pc", active_color, active_width)
-        self._highlight_component("imem", active_color, active_width)
-        # ... (Thêm các highlight tĩnh khác cho đường data và component)
+        key = (name, is_branch_taken, animate)
+        desired = self._highlight_cache.get(key)
+        if desired is None:
+            desired = self._highlight_cache[key] = self._build_highlights(name, is_branch_taken, signals, animate)
+        self._apply_highlights(desired)
 
         # --- Trigger Control Signal Animations ---
-        active_control_signals = []
-        for signame, sigval in signals.items():
-             # Xác định tín hiệu có đang active hay không (logic có thể cần chi tiết hơn)
-            is_active_signal = (isinstance(sigval, (int, float)) and sigval != 0) or \
-                               (isinstance(sigval, str) and sigval != '??' and sigval != '0')
-            if is_active_signal:
-                 active_control_signals.append(signame)
-                 # Start animation for this signal
-                 # print(f"Triggering animation for: {signame}")
-                 self.start_signal_animation(signame)
-                 # Optionally, also highlight the static control line immediately?
-                 # ctrl_key = f"ctrl_{signame.lower()}"
-                 # self._highlight_element(ctrl_key, COLOR_CONTROL_ACTIVE, LINE_WIDTH_CONTROL_ACTIVE)
-
-
-    def _highlight_element(self, key, color, width):
-        """Helper to highlight a specific element if it exists."""
-        if key in self.elements:
-            try:
-                self.canvas.itemconfig(self.elements[key], fill=color, width=width)
-            except tk.TclError: pass # Ignore if element deleted
-
-    def _highlight_component(self, key, outline_color, outline_width):
-         """Helper to highlight a component's outline."""
-         comp_key = key + "_box"
-         if comp_key in self.elements:
-             try:
-                 self.canvas.itemconfig(self.elements[comp_key], outline=outline_color, width=outline_width)
-             except tk.TclError: pass # Ignore if element deleted
+        if animate:
+            for signame in self._active_signals(signals):
+                self.start_signal_animation(signame)
+
+    @staticmethod
+    def _active_signals(signals):
+        # Tín hiệu active: số khác 0 hoặc ALUOp có giá trị thật
+        return [signame for signame, sigval in signals.items()
+                if (isinstance(sigval, (int, float)) and sigval != 0)
+                or (isinstance(sigval, str) and sigval not in ('??', '0'))]
+
+    def _build_highlights(self, name, taken, signals, animate):
+        """Tập {key: (màu, width)} cần sáng cho một lệnh (được cache theo mnemonic)."""
+        iclass = INSTRUCTION_SPECS[name][2] if name in INSTRUCTION_SPECS else None
+        roles = dict(ACTIVATION_TABLE.get(iclass, _FETCH))
+        if taken and _TAKEN_SWAP[0] in roles:
+            del roles[_TAKEN_SWAP[0]]
+            roles[_TAKEN_SWAP[1]] = 'active'
+        if not animate:
+            # Không có chấm chạy -> tô tĩnh các đường control đang active
+            for signame in self._active_signals(signals):
+                roles[f"ctrl_{signame.lower()}"] = 'control'
+        return {k: ROLE_STYLES[role] for k, role in roles.items()}
+
+    def _apply_highlights(self, desired):
+        """Chỉ itemconfig các item có trạng thái highlight thay đổi so với lần trước."""
+        current = self._highlighted
+        elements = self.elements
+        canvas = self.canvas
+        try:
+            for key in current.keys() - desired.keys():
+                option, color, width = self._default_styles[key]
+                canvas.itemconfig(elements[key], **{option: color, 'width': width})
+            for key, style in desired.items():
+                if current.get(key) == style or key not in elements:
+                    continue
+                option = self._default_styles[key][0]
+                canvas.itemconfig(elements[key], **{option: style[0], 'width': style[1]})
+        except tk.TclError:
+            pass # Canvas đã bị hủy
+        self._highlighted = {k: v for k, v in desired.items() if k in elements}
@@ -0,0 +1,225 @@
+# decoder.py
+"""
+Bộ giải mã lệnh LEGv8 (mã máy 32-bit -> DecodedInstruction).
+Mỗi lệnh được giải mã MỘT lần thành DecodedInstruction (dùng __slots__ cho gọn),
+simulator sẽ cache bản ghi này theo PC và chỉ xóa cache khi nạp lại chương trình.
+Bảng lệnh ở đây được dùng chung với assembler (phần mã hóa).
+"""
+
+MASK64 = (1 << 64) - 1
+XZR = 31
+LR = 30
+
+# --- Bảng lệnh ---
+# mnemonic: (format, opcode, instruction class, ALUOp)
+#   format: R, I, D, B, CB, IW hoặc 'SYS' (HALT/NOP)
+#   instruction class: nhóm lệnh dùng cho control signals / visualizer
+INSTRUCTION_SPECS = {
+    'ADD':    ('R',  0x458, 'R',      'ADD'),
+    'ADDS':   ('R',  0x558, 'R',      'ADD'),
+    'SUB':    ('R',  0x658, 'R',      'SUB'),
+    'SUBS':   ('R',  0x758, 'R',      'SUB'),
+    'AND':    ('R',  0x450, 'R',      'AND'),
+    'ANDS':   ('R',  0x750, 'R',      'AND'),
+    'ORR':    ('R',  0x550, 'R',      'ORR'),
+    'EOR':    ('R',  0x650, 'R',      'EOR'),
+    'MUL':    ('R',  0x4D8, 'R',      'MUL'),
+    'SDIV':   ('R',  0x4D6, 'R',      'DIV'),
+    'UDIV':   ('R',  0x4D6, 'R',      'DIV'),
+    'LSL':    ('R',  0x69B, 'R',      'LSL'),
+    'LSR':    ('R',  0x69A, 'R',      'LSR'),
+    'BR':     ('R',  0x6B0, 'BR',     '??'),
+    'ADDI':   ('I',  0x244, 'I',      'ADD'),
+    'ADDIS':  ('I',  0x2C4, 'I',      'ADD'),
+    'SUBI':   ('I',  0x344, 'I',      'SUB'),
+    'SUBIS':  ('I',  0x3C4, 'I',      'SUB'),
+    'ANDI':   ('I',  0x248, 'I',      'AND'),
+    'ANDIS':  ('I',  0x3C8, 'I',      'AND'),
+    'ORRI':   ('I',  0x2C8, 'I',      'ORR'),
+    'EORI':   ('I',  0x348, 'I',      'EOR'),
+    'LDUR':   ('D',  0x7C2, 'LOAD',   'ADD'),
+    'LDURSW': ('D',  0x5C4, 'LOAD',   'ADD'),
+    'LDURH':  ('D',  0x3C2, 'LOAD',   'ADD'),
+    'LDURB':  ('D',  0x1C2, 'LOAD',   'ADD'),
+    'STUR':   ('D',  0x7C0, 'STORE',  'ADD'),
+    'STURW':  ('D',  0x5C0, 'STORE',  'ADD'),
+    'STURH':  ('D',  0x3C0, 'STORE',  'ADD'),
+    'STURB':  ('D',  0x1C0, 'STORE',  'ADD'),
+    'B':      ('B',  0x05,  'B',      '??'),
+    'BL':     ('B',  0x25,  'BL',     '??'),
+    'CBZ':    ('CB', 0xB4,  'CBZ',    'PASS'),
+    'CBNZ':   ('CB', 0xB5,  'CBZ',    'PASS'),
+    'B.cond': ('CB', 0x54,  'BCOND',  '??'),
+    'MOVZ':   ('IW', 0x1A5, 'IW',     'MOV'),
+    'MOVK':   ('IW', 0x1E5, 'IW',     'MOV'),
+    'HALT':   ('SYS', 0,    'HALT',   '??'),
+    'NOP':    ('SYS', 0,    'NOP',    '??'),
+}
+
+# HALT/NOP không có trong LEGv8 gốc, dùng mã của ARMv8 (HLT #0, NOP)
+HALT_WORD = 0xD4400000
+NOP_WORD = 0xD503201F
+
+# Shamt phân biệt các lệnh dùng chung opcode (MUL/SDIV/UDIV)
+R_SHAMT_FIXED = {'MUL': 0x1F, 'SDIV': 0x02, 'UDIV': 0x03}
+
+# Độ rộng truy cập (byte) của các lệnh load/store
+MEM_ACCESS_WIDTH = {
+    'LDUR': 8, 'STUR': 8,
+    'LDURSW': 4, 'STURW': 4,
+    'LDURH': 2, 'STURH': 2,
+    'LDURB': 1, 'STURB': 1,
+}
+
+CONDITION_CODES = {
+    'EQ': 0, 'NE': 1, 'HS': 2, 'CS': 2, 'LO': 3, 'CC': 3, 'MI': 4, 'PL': 5,
+    'VS': 6, 'VC': 7, 'HI': 8, 'LS': 9, 'GE': 10, 'LT': 11, 'GT': 12, 'LE': 13,
+    'AL': 14,
+}
+CONDITION_NAMES = {
+    0: 'EQ', 1: 'NE', 2: 'HS', 3: 'LO', 4: 'MI', 5: 'PL', 6: 'VS', 7: 'VC',
+    8: 'HI', 9: 'LS', 10: 'GE', 11: 'LT', 12: 'GT', 13: 'LE', 14: 'AL',
+}
+
+REGISTER_ALIASES = {'XZR': 31, 'SP': 28, 'FP': 29, 'LR': 30, 'IP0': 16, 'IP1': 17}
+
+
+def _signals(reg2loc=0, alusrc=0, memtoreg=0, regwrite=0, memread=0,
+             memwrite=0, branch=0, uncond=0, aluop='??'):
+    return {
+        'Reg2Loc': reg2loc, 'ALUSrc': alusrc, 'MemToReg': memtoreg,
+        'RegWrite': regwrite, 'MemRead': memread, 'MemWrite': memwrite,
+        'Branch': branch, 'UncondBranch': uncond, 'ALUOp': aluop,
+    }
+
+
+# Bộ tín hiệu điều khiển tính sẵn cho từng nhóm lệnh (ALUOp được gán theo lệnh)
+CONTROL_SIGNALS_BY_CLASS = {
+    'R':      _signals(regwrite=1),
+    'I':      _signals(alusrc=1, regwrite=1),
+    'IW':     _signals(alusrc=1, regwrite=1),
+    'LOAD':   _signals(alusrc=1, memtoreg=1, regwrite=1, memread=1),
+    'STORE':  _signals(reg2loc=1, alusrc=1, memwrite=1),
+    'CBZ':    _signals(reg2loc=1, branch=1),
+    'BCOND':  _signals(branch=1),
+    'B':      _signals(uncond=1),
+    'BL':     _signals(uncond=1, regwrite=1),
+    'BR':     _signals(uncond=1),
+    'HALT':   _signals(),
+    'NOP':    _signals(),
+}
+
+ACTIVE_COMPONENT_BY_CLASS = {
+    'R': 'ALU', 'I': 'ALU', 'IW': 'ALU',
+    'LOAD': 'MEM', 'STORE': 'MEM',
+    'CBZ': 'BRANCH', 'BCOND': 'BRANCH', 'B': 'BRANCH', 'BL': 'BRANCH', 'BR': 'BRANCH',
+    'HALT': 'NONE', 'NOP': 'DECODE',
+}
+
+_SIGNAL_CACHE = {}
+
+
+def control_signals_for(name):
+    """Trả về bộ control signals (dict dùng chung, chỉ đọc) cho một mnemonic."""
+    signals = _SIGNAL_CACHE.get(name)
+    if signals is None:
+        _, _, iclass, aluop = INSTRUCTION_SPECS[name]
+        signals = dict(CONTROL_SIGNALS_BY_CLASS[iclass])
+        signals['ALUOp'] = aluop
+        _SIGNAL_CACHE[name] = signals
+    return signals
+
+
+class DecodedInstruction:
+    """Bản ghi lệnh đã giải mã. 'handler' do simulator gán khi nạp vào cache."""
+    __slots__ = ('name', 'fmt', 'iclass', 'rd', 'rn', 'rm', 'imm', 'shamt',
+                 'cond', 'target', 'signals', 'active_component', 'handler',
+                 'line', 'text', 'word')
+
+    def __init__(self, name, rd=XZR, rn=XZR, rm=XZR, imm=0, shamt=0, cond=None,
+                 target=None, line=None, text='', word=None):
+        fmt, _, iclass, _ = INSTRUCTION_SPECS[name]
+        self.name = name
+        self.fmt = fmt
+        self.iclass = iclass
+        self.rd = rd
+        self.rn = rn
+        self.rm = rm
+        self.imm = imm
+        self.shamt = shamt
+        self.cond = cond
+        self.target = target
+        self.signals = control_signals_for(name)
+        self.active_component = ACTIVE_COMPONENT_BY_CLASS[iclass]
+        self.handler = None
+        self.line = line
+        self.text = text
+        self.word = word
+
+    def __repr__(self):
+        return (f"DecodedInstruction({self.name}, rd={self.rd}, rn={self.rn}, "
+                f"rm={self.rm}, imm={self.imm}, target={self.target})")
+
+
+# --- Giải mã mã máy ---
+def _build_decode_table():
+    """Bảng 2048 phần tử theo 11 bit cao [31:21] -> mnemonic (None nếu không hợp lệ)."""
+    table = [None] * 2048
+    opcode_bits = {'R': 11, 'D': 11, 'I': 10, 'IW': 9, 'CB': 8, 'B': 6}
+    for name, (fmt, opcode, _, _) in INSTRUCTION_SPECS.items():
+        if fmt == 'SYS' or name == 'UDIV': # UDIV dùng chung opcode với SDIV
+            continue
+        free_bits = 11 - opcode_bits[fmt]
+        base = opcode << free_bits
+        for low in range(1 << free_bits):
+            table[base | low] = name
+    return table
+
+
+DECODE_TABLE = _build_decode_table()
+
+
+def _sign_extend(value, bits):
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+
+def decode_word(word, pc=0, line=None, text=''):
+    """Giải mã một lệnh 32-bit tại địa chỉ 'pc'. Ném ValueError nếu không hợp lệ."""
+    if word == HALT_WORD:
+        return DecodedInstruction('HALT', line=line, text=text, word=word)
+    if word == NOP_WORD:
+        return DecodedInstruction('NOP', line=line, text=text, word=word)
+    name = DECODE_TABLE[word >> 21]
+    if name is None:
+        raise ValueError(f"Invalid instruction word {word:#010x} at PC {pc:#x}")
+    fmt = INSTRUCTION_SPECS[name][0]
+    rd = word & 0x1F
+    rn = (word >> 5) & 0x1F
+
+    if fmt == 'R':
+        rm = (word >> 16) & 0x1F
+        shamt = (word >> 10) & 0x3F
+        if name == 'SDIV' and shamt == R_SHAMT_FIXED['UDIV']:
+            name = 'UDIV'
+        return DecodedInstruction(name, rd=rd, rn=rn, rm=rm, shamt=shamt, line=line, text=text, word=word)
+    if fmt == 'I':
+        return DecodedInstruction(name, rd=rd, rn=rn, imm=(word >> 10) & 0xFFF, line=line, text=text, word=word)
+    if fmt == 'D':
+        return DecodedInstruction(name, rd=rd, rn=rn, imm=_sign_extend(word >> 12, 9), line=line, text=text, word=word)
+    if fmt == 'B':
+        offset = _sign_extend(word, 26)
+        return DecodedInstruction(name, rd=LR if name == 'BL' else XZR, imm=offset,
+                                  target=pc + offset * 4, line=line, text=text, word=word)
+    if fmt == 'CB':
+        offset = _sign_extend(word >> 5, 19)
+        if name == 'B.cond':
+            if rd not in CONDITION_NAMES:
+                raise ValueError(f"Invalid branch condition {rd} at PC {pc:#x}")
+            return DecodedInstruction(name, imm=offset, cond=rd, target=pc + offset * 4,
+                                      line=line, text=text, word=word)
+        return DecodedInstruction(name, rn=rd, imm=offset, target=pc + offset * 4,
+                                  line=line, text=text, word=word)
+    # IW: MOVZ/MOVK
+    return DecodedInstruction(name, rd=rd, imm=(word >> 5) & 0xFFFF, shamt=((word >> 21) & 0x3) * 16,
+                              line=line, text=text, word=word)
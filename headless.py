@@ -0,0 +1,197 @@
+# headless.py
+"""
+Chạy chương trình LEGv8 không cần GUI (không import tkinter).
+Dùng cho batch job: biên dịch, nạp, chạy bằng simulator.run() rồi báo cáo kết quả.
+"""
+import time
+
+from assembler import assemble
+from decoder import MASK64, XZR
+from legv8_simulator import LEGv8_Simplified_Simulator
+from memory import MemoryAccessError
+
+TIMEOUT_SLICE_STEPS = 1 << 16 # Số lệnh giữa hai lần kiểm tra timeout
+
+
+def run_program(assembly_code, max_steps=None, until_pc=None, engine='interp',
+                mem_size=1024, memory_image=None, record_trace=None, pipeline=False,
+                forwarding=True, cache_spec=None, predictor_spec=None, profile_path=None,
+                load_state=None, save_state=None, initial_registers=None, initial_memory=None,
+                timeout=None):
+    """
+    Biên dịch + chạy 'assembly_code' bằng engine 'interp' (từng lệnh) hoặc
+    'block' (basic block đã dịch), với bộ nhớ dữ liệu 'mem_size' byte
+    (hoặc file image mmap 'memory_image'), trả về dict kết quả:
+    registers, flags, memory, pc, steps, halted, error, elapsed, ips.
+    Nếu có 'record_trace', mọi lệnh được ghi vào file trace nhị phân đó
+    (xem trace_recorder; khi ghi trace luôn chạy bằng interpreter).
+    Nếu 'pipeline' thì chạy trên lõi pipeline 5 tầng (pipeline.PipelineSimulator,
+    bỏ qua 'engine') và kết quả có thêm 'pipeline': cycles, stalls, flushes, CPI...
+    'cache_spec' (xem cache.parse_cache_spec) gắn mô hình cache; kết quả có thêm 'caches'.
+    'predictor_spec' (xem branch_predictor.make_predictor) gắn bộ dự đoán rẽ nhánh;
+    kết quả có thêm 'branch_prediction'.
+    Nếu có 'profile_path', số đếm theo PC được xuất ra file đó (.json -> JSON, còn lại CSV)
+    và kết quả có thêm 'profile': instruction mix và các dòng chạy nhiều nhất.
+    Nếu có 'load_state', chạy tiếp từ state file đó (chương trình lấy từ file,
+    'assembly_code' có thể là None); 'save_state' ghi trạng thái cuối ra file.
+    'steps' chỉ đếm các lệnh của lần chạy này.
+    'initial_registers' ({chỉ số: giá trị}) và 'initial_memory' ({địa chỉ: word 8 byte})
+    được nạp trước khi chạy. Với 'timeout' (giây), chương trình chạy theo từng lát
+    và dừng khi hết giờ; kết quả có 'timed_out' = True.
+    """
+    caches = None
+    if cache_spec:
+        from cache import parse_cache_spec
+        caches = parse_cache_spec(cache_spec)
+    predictor = None
+    if predictor_spec:
+        from branch_predictor import make_predictor
+        predictor = make_predictor(predictor_spec)
+    simulator = LEGv8_Simplified_Simulator(mem_size=mem_size, memory_image=memory_image)
+    if load_state:
+        simulator.load_state(load_state)
+        program = simulator.program
+    else:
+        program = assemble(assembly_code)
+        simulator.load_program(program)
+    for index, value in (initial_registers or {}).items():
+        if index != XZR:
+            simulator.registers[index] = value & MASK64
+    for addr, value in (initial_memory or {}).items():
+        simulator.data_memory.store(addr, 8, value)
+    if engine == 'block':
+        simulator.enable_block_engine()
+    if caches is not None:
+        simulator.attach_caches(caches)
+    if predictor is not None:
+        simulator.attach_branch_predictor(predictor)
+    profiler = None
+    if profile_path:
+        from profiler import Profiler
+        profiler = Profiler(program)
+        simulator.attach_profiler(profiler)
+    recorder = None
+    if record_trace:
+        from trace_recorder import TraceRecorder
+        recorder = TraceRecorder(record_trace)
+        simulator.attach_recorder(recorder)
+    core = None
+    if pipeline:
+        from pipeline import PipelineSimulator
+        core = PipelineSimulator(simulator, forwarding=forwarding, timeline_cycles=0)
+
+    error = None
+    timed_out = False
+    start_count = simulator.instruction_count
+    start = time.perf_counter()
+    try:
+        run = core.run if core is not None else simulator.run
+        if timeout is None:
+            run(max_steps=max_steps, until_pc=until_pc)
+        else:
+            timed_out = _run_until(run, simulator, core, max_steps, until_pc, start + timeout)
+    except (MemoryAccessError, ValueError) as e:
+        simulator.halted = True
+        error = str(e)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    elapsed = time.perf_counter() - start
+    steps = simulator.instruction_count - start_count
+    if save_state:
+        simulator.save_state(save_state)
+    profile = None
+    if profiler is not None:
+        profiler.export(profile_path)
+        profile = {'mix': profiler.report()['mix'], 'hot_spots': profiler.hot_spots(),
+                   'source': {line: program.source_lines[line - 1].strip()
+                              for line, _, _ in profiler.hot_spots()}}
+
+    return {
+        'registers': list(simulator.registers),
+        'flags': simulator.flags.copy(),
+        'memory': dict(simulator.data_memory.nonzero_words()),
+        'pc': simulator.pc,
+        'steps': steps,
+        'halted': simulator.halted,
+        'error': error or simulator.last_state.get('error'),
+        'elapsed': elapsed,
+        'ips': steps / elapsed if elapsed > 0 else 0.0,
+        'pipeline': core.stats.as_dict() if core is not None else None,
+        'caches': caches.stats() if caches is not None else None,
+        'branch_prediction': predictor.stats() if predictor is not None else None,
+        'profile': profile,
+        'timed_out': timed_out,
+    }
+
+
+def _run_until(run, simulator, core, max_steps, until_pc, deadline):
+    """Gọi run() theo lát TIMEOUT_SLICE_STEPS lệnh đến khi xong hoặc quá 'deadline'. True nếu hết giờ."""
+    start_count = simulator.instruction_count
+    while True:
+        budget = TIMEOUT_SLICE_STEPS
+        if max_steps is not None:
+            budget = min(budget, max_steps - (simulator.instruction_count - start_count))
+            if budget <= 0:
+                return False
+        before = simulator.instruction_count
+        run(max_steps=budget, until_pc=until_pc)
+        if (core.finished if core is not None else simulator.halted) or simulator.stop_reason:
+            return False
+        if simulator.instruction_count - before < budget or simulator.pc == until_pc:
+            return False # Dừng ở until_pc
+        if time.perf_counter() >= deadline:
+            return True
+
+
+def format_report(result):
+    """Định dạng kết quả run_program thành text để in ra console."""
+    lines = []
+    if result['error']:
+        status = f"ERROR ({result['error']})"
+    elif result['halted']:
+        status = "HALTED"
+    elif result.get('timed_out'):
+        status = "TIMEOUT"
+    else:
+        status = "STOPPED (step limit / until-pc reached)"
+    lines.append(f"Status: {status}")
+    lines.append(f"PC: {result['pc']:#010x}")
+    flags = result['flags']
+    lines.append("Flags: " + " ".join(f"{k}={flags[k]}" for k in ('N', 'Z', 'V', 'C')))
+    lines.append(f"Steps: {result['steps']}")
+    lines.append(f"Elapsed: {result['elapsed']:.6f} s ({result['ips']:,.0f} instructions/s)")
+    stats = result.get('pipeline')
+    if stats:
+        lines.append(f"Pipeline: {stats['cycles']} cycles, {stats['retired']} retired, "
+                     f"{stats['stalls']} stall cycles, {stats['flushes']} flushes "
+                     f"({stats['flush_cycles']} cycles, {stats['squashed']} squashed), CPI = {stats['cpi']:.3f}")
+    if result.get('caches'):
+        from cache import format_cache_stats
+        lines.append("Caches:")
+        lines.append(format_cache_stats(result['caches']))
+    if result.get('branch_prediction'):
+        from branch_predictor import format_branch_stats
+        lines.append("Branch prediction:")
+        lines.append(format_branch_stats(result['branch_prediction']))
+    profile = result.get('profile')
+    if profile:
+        total = sum(profile['mix'].values()) or 1
+        lines.append("Instruction mix: " + ", ".join(
+            f"{iclass} {count / total * 100:.1f}%" for iclass, count in profile['mix'].items()))
+        lines.append("Hot lines:")
+        for line, count, share in profile['hot_spots']:
+            lines.append(f"  line {line:>5}: {count:>12} ({share * 100:5.1f}%)  {profile['source'][line]}")
+
+    lines.append("Registers:")
+    regs = result['registers']
+    for row in range(0, len(regs), 4):
+        cells = [f"X{i:<2} = 0x{regs[i]:016x}" for i in range(row, min(row + 4, len(regs)))]
+        lines.append("  " + "   ".join(cells))
+
+    lines.append("Memory:")
+    if not result['memory']:
+        lines.append("  (empty)")
+    for addr, val in result['memory'].items():
+        lines.append(f"  {addr:#010x}: {val:#x}")
+    return "\n".join(lines)
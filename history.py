@@ -0,0 +1,174 @@
+# history.py
+"""
+Lịch sử thực thi cho debug ngược thời gian (Step Back / Run Back).
+- Cứ 'snapshot_interval' lệnh chụp một snapshot đầy đủ: PC, registers, flags,
+  halted và bộ nhớ (copy-on-write nên gần như không tốn).
+- Giữa hai snapshot, mỗi lệnh để lại một bản ghi undo nhỏ: PC, cờ, giá trị cũ
+  của thanh ghi đích và các byte cũ tại địa chỉ bị ghi.
+- run() không cần theo dõi từng lệnh thì không ghi undo: chỉ chụp snapshot ở đầu
+  mỗi đoạn 'snapshot_interval' lệnh và khi dừng (checkpoint()).
+Lùi một lệnh = áp một bản ghi undo. Lùi qua ranh giới snapshot = khôi phục snapshot
+trước đó rồi chạy lại tối đa 'snapshot_interval' lệnh, không chạy lại từ initial_pc.
+"""
+from decoder import MASK64, XZR, MEM_ACCESS_WIDTH
+
+DEFAULT_SNAPSHOT_INTERVAL = 1000
+DEFAULT_MAX_SNAPSHOTS = 1000
+
+
+class Snapshot:
+    """Trạng thái đầy đủ của simulator sau 'count' lệnh."""
+    __slots__ = ('count', 'pc', 'registers', 'flags', 'halted', 'memory')
+
+    def __init__(self, sim):
+        self.count = sim.instruction_count
+        self.pc = sim.pc
+        self.registers = list(sim.registers)
+        self.flags = sim.flags.copy()
+        self.halted = sim.halted
+        self.memory = sim.data_memory.snapshot()
+
+    def restore(self, sim):
+        sim.instruction_count = self.count
+        sim.pc = self.pc
+        sim.registers[:] = self.registers
+        sim.flags.update(self.flags)
+        sim.halted = self.halted
+        sim.data_memory.restore(self.memory)
+
+
+class ExecutionHistory:
+    """
+    Gắn vào simulator qua sim.enable_history(). Simulator gọi before_execute()
+    trước mỗi lệnh của step() / run() có theo dõi, và checkpoint() giữa các đoạn
+    của run() nhanh; các hàm seek/step_back/run_back đi lùi.
+    Chỉ giữ tối đa 'max_snapshots' snapshot gần nhất: không lùi được quá snapshot cũ nhất.
+    """
+
+    def __init__(self, sim, snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL,
+                 max_snapshots=DEFAULT_MAX_SNAPSHOTS):
+        if snapshot_interval < 1:
+            raise ValueError("snapshot_interval must be at least 1")
+        self.sim = sim
+        self.snapshot_interval = snapshot_interval
+        self.max_snapshots = max_snapshots
+        self.clear()
+
+    def clear(self):
+        """Bỏ toàn bộ lịch sử (sau reset / nạp chương trình mới)."""
+        self.snapshots = [] # Theo thứ tự count tăng dần
+        self.undo_log = [] # Bản ghi undo của các lệnh sau snapshot cuối
+
+    @property
+    def earliest(self):
+        """Số lệnh nhỏ nhất còn quay về được (None nếu chưa có lịch sử)."""
+        return self.snapshots[0].count if self.snapshots else None
+
+    def can_step_back(self):
+        return bool(self.snapshots) and self.sim.instruction_count > self.snapshots[0].count
+
+    # --- Ghi ---
+    def before_execute(self, pc, decoded):
+        """Ghi bản ghi undo cho lệnh 'decoded' sắp chạy tại 'pc' (simulator gọi)."""
+        sim = self.sim
+        if not self.snapshots or len(self.undo_log) >= self.snapshot_interval:
+            self._take_snapshot()
+        r = sim.registers
+        f = sim.flags
+        rd = decoded.rd
+        reg = rd if decoded.signals['RegWrite'] and rd != XZR else -1
+        mem = None
+        if decoded.iclass == 'STORE':
+            width = MEM_ACCESS_WIDTH[decoded.name]
+            addr = (r[decoded.rn] + decoded.imm) & MASK64
+            mem = (addr, sim.data_memory.read_block(addr, width))
+        self.undo_log.append((pc, (f['N'], f['Z'], f['V'], f['C']), sim.halted,
+                              reg, r[reg] if reg >= 0 else 0, mem))
+
+    def checkpoint(self):
+        """Chụp snapshot tại trạng thái hiện tại nếu chưa có (run() nhanh gọi giữa các đoạn)."""
+        if not self.snapshots or self.snapshots[-1].count != self.sim.instruction_count:
+            self._take_snapshot()
+
+    def discard_last(self):
+        """Bỏ bản ghi undo vừa ghi khi lệnh đó ném lỗi (lệnh coi như chưa chạy)."""
+        if self.undo_log:
+            self.undo_log.pop()
+
+    def _take_snapshot(self):
+        self.snapshots.append(Snapshot(self.sim))
+        self.undo_log = []
+        if len(self.snapshots) > self.max_snapshots:
+            del self.snapshots[0]
+
+    # --- Đi lùi ---
+    def _undo_one(self):
+        sim = self.sim
+        pc, (n, z, v, c), halted, reg, old_value, mem = self.undo_log.pop()
+        sim.pc = pc
+        flags = sim.flags
+        flags['N'], flags['Z'], flags['V'], flags['C'] = n, z, v, c
+        sim.halted = halted
+        if reg >= 0:
+            sim.registers[reg] = old_value
+        if mem is not None:
+            sim.data_memory.write_block(mem[0], mem[1])
+        sim.instruction_count -= 1
+
+    def _replay(self, count):
+        """Chạy lại 'count' lệnh từ trạng thái hiện tại, ghi lại undo log (không trace)."""
+        sim = self.sim
+        for _ in range(count):
+            pc = sim.pc
+            decoded = sim.decode_at(pc)
+            self.before_execute(pc, decoded)
+            next_pc = decoded.handler(sim, decoded, pc)
+            if not sim.halted:
+                sim.pc = next_pc
+            sim.instruction_count += 1
+
+    def seek(self, count):
+        """
+        Đưa simulator về trạng thái ngay sau 'count' lệnh (count <= hiện tại).
+        Trả về False nếu 'count' đã ra khỏi lịch sử còn giữ.
+        """
+        sim = self.sim
+        if not self.snapshots or count < self.snapshots[0].count or count > sim.instruction_count:
+            return False
+        last = self.snapshots[-1]
+        if count >= last.count:
+            while sim.instruction_count > count: # Trong đoạn hiện tại: áp undo
+                self._undo_one()
+        else:
+            # Khôi phục snapshot gần nhất <= count rồi chạy lại phần còn thiếu
+            while self.snapshots[-1].count > count:
+                self.snapshots.pop()
+            self.snapshots[-1].restore(sim)
+            self.undo_log = []
+            # Các snapshot cách nhau đúng snapshot_interval lệnh -> chạy lại ít hơn chừng đó
+            self._replay(count - sim.instruction_count)
+        sim.last_state = {}
+        return True
+
+    def step_back(self):
+        """Lùi một lệnh. Trả về False nếu đã ở đầu lịch sử."""
+        if not self.can_step_back():
+            return False
+        return self.seek(self.sim.instruction_count - 1)
+
+    def run_back(self, breakpoints=None, max_steps=None):
+        """
+        Lùi từng lệnh cho đến khi PC nằm trong 'breakpoints' (mặc định: breakpoint của
+        simulator, có xét điều kiện) sau ít nhất một bước, hết lịch sử, hoặc đã lùi
+        'max_steps' lệnh. Trả về số lệnh đã lùi.
+        """
+        sim = self.sim
+        should_break = sim.should_break if breakpoints is None else breakpoints.__contains__
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if not self.step_back():
+                break
+            steps += 1
+            if should_break(sim.pc):
+                break
+        return steps
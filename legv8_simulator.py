@@ -1,200 +1,813 @@
 # legv8_simulator.py
-import random # Để ví dụ thay đổi giá trị thanh ghi/bộ nhớ
+from decoder import MASK64, XZR, LR, decode_word
+from program import Program
+from tracing import TRACER, INFO, WARNING
+from memory import DataMemory, MappedDataMemory
+from branch_predictor import PREDICTED_CLASSES
+
+SIGN_BIT = 1 << 63
+
+
+def _to_signed(value):
+    return value - (1 << 64) if value & SIGN_BIT else value
+
+
+def _nzcv_add(a, b, carry_in=0):
+    """Cộng 64-bit, trả về (kết quả, dict cờ NZCV)."""
+    full = a + b + carry_in
+    res = full & MASK64
+    flags = {
+        'N': res >> 63,
+        'Z': 1 if res == 0 else 0,
+        'V': ((a ^ res) & (b ^ res)) >> 63 & 1,
+        'C': full >> 64 & 1,
+    }
+    return res, flags
+
+
+def _nzcv_logic(res):
+    return {'N': res >> 63, 'Z': 1 if res == 0 else 0, 'V': 0, 'C': 0}
+
+
+# --- Handlers: handler(sim, d, pc) -> next_pc ---
+# Mỗi handler nhận bản ghi đã giải mã 'd', chỉ làm đúng việc của lệnh đó.
+def _exec_add(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rn] + r[d.rm]) & MASK64
+    return pc + 4
+
+
+def _exec_sub(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rn] - r[d.rm]) & MASK64
+    return pc + 4
+
+
+def _exec_and(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] & r[d.rm]
+    return pc + 4
+
+
+def _exec_orr(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] | r[d.rm]
+    return pc + 4
+
+
+def _exec_eor(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] ^ r[d.rm]
+    return pc + 4
+
+
+def _exec_mul(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rn] * r[d.rm]) & MASK64
+    return pc + 4
+
+
+def _exec_sdiv(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        a, b = _to_signed(r[d.rn]), _to_signed(r[d.rm])
+        if b == 0:
+            q = 0 # ARMv8: chia cho 0 trả về 0
+        else:
+            q = abs(a) // abs(b)
+            if (a < 0) != (b < 0):
+                q = -q
+        r[d.rd] = q & MASK64
+    return pc + 4
+
+
+def _exec_udiv(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        b = r[d.rm]
+        r[d.rd] = r[d.rn] // b if b else 0
+    return pc + 4
+
+
+def _exec_lsl(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rn] << d.shamt) & MASK64
+    return pc + 4
+
+
+def _exec_lsr(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] >> d.shamt
+    return pc + 4
+
+
+def _exec_adds(sim, d, pc):
+    r = sim.registers
+    res, sim.flags = _nzcv_add(r[d.rn], r[d.rm])
+    if d.rd != XZR:
+        r[d.rd] = res
+    return pc + 4
+
+
+def _exec_subs(sim, d, pc):
+    r = sim.registers
+    res, sim.flags = _nzcv_add(r[d.rn], ~r[d.rm] & MASK64, 1)
+    if d.rd != XZR:
+        r[d.rd] = res
+    return pc + 4
+
+
+def _exec_ands(sim, d, pc):
+    r = sim.registers
+    res = r[d.rn] & r[d.rm]
+    sim.flags = _nzcv_logic(res)
+    if d.rd != XZR:
+        r[d.rd] = res
+    return pc + 4
+
+
+def _exec_addi(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rn] + d.imm) & MASK64
+    return pc + 4
+
+
+def _exec_subi(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rn] - d.imm) & MASK64
+    return pc + 4
+
+
+def _exec_andi(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] & d.imm
+    return pc + 4
+
+
+def _exec_orri(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] | d.imm
+    return pc + 4
+
+
+def _exec_eori(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = r[d.rn] ^ d.imm
+    return pc + 4
+
+
+def _exec_addis(sim, d, pc):
+    r = sim.registers
+    res, sim.flags = _nzcv_add(r[d.rn], d.imm)
+    if d.rd != XZR:
+        r[d.rd] = res
+    return pc + 4
+
+
+def _exec_subis(sim, d, pc):
+    r = sim.registers
+    res, sim.flags = _nzcv_add(r[d.rn], ~d.imm & MASK64, 1)
+    if d.rd != XZR:
+        r[d.rd] = res
+    return pc + 4
+
+
+def _exec_andis(sim, d, pc):
+    r = sim.registers
+    res = r[d.rn] & d.imm
+    sim.flags = _nzcv_logic(res)
+    if d.rd != XZR:
+        r[d.rd] = res
+    return pc + 4
+
+
+def _exec_ldur(sim, d, pc):
+    addr = (sim.registers[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    value = sim.data_memory.load(addr, 8)
+    if d.rd != XZR:
+        sim.registers[d.rd] = value
+    return pc + 4
+
+
+def _exec_ldursw(sim, d, pc):
+    addr = (sim.registers[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    value = sim.data_memory.load(addr, 4, signed=True) & MASK64 # Mở rộng dấu 32 -> 64 bit
+    if d.rd != XZR:
+        sim.registers[d.rd] = value
+    return pc + 4
+
+
+def _exec_ldurh(sim, d, pc):
+    addr = (sim.registers[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    value = sim.data_memory.load(addr, 2)
+    if d.rd != XZR:
+        sim.registers[d.rd] = value
+    return pc + 4
+
+
+def _exec_ldurb(sim, d, pc):
+    addr = (sim.registers[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    value = sim.data_memory.load(addr, 1)
+    if d.rd != XZR:
+        sim.registers[d.rd] = value
+    return pc + 4
+
+
+def _exec_stur(sim, d, pc):
+    r = sim.registers
+    addr = (r[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    sim.data_memory.store(addr, 8, r[d.rd])
+    return pc + 4
+
+
+def _exec_sturw(sim, d, pc):
+    r = sim.registers
+    addr = (r[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    sim.data_memory.store(addr, 4, r[d.rd])
+    return pc + 4
+
+
+def _exec_sturh(sim, d, pc):
+    r = sim.registers
+    addr = (r[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    sim.data_memory.store(addr, 2, r[d.rd])
+    return pc + 4
+
+
+def _exec_sturb(sim, d, pc):
+    r = sim.registers
+    addr = (r[d.rn] + d.imm) & MASK64
+    sim._mem_addr = addr
+    sim.data_memory.store(addr, 1, r[d.rd])
+    return pc + 4
+
+
+def _exec_b(sim, d, pc):
+    return d.target
+
+
+def _exec_bl(sim, d, pc):
+    sim.registers[LR] = pc + 4
+    return d.target
+
+
+def _exec_br(sim, d, pc):
+    return sim.registers[d.rn]
+
+
+def _exec_cbz(sim, d, pc):
+    return d.target if sim.registers[d.rn] == 0 else pc + 4
+
+
+def _exec_cbnz(sim, d, pc):
+    return d.target if sim.registers[d.rn] != 0 else pc + 4
+
+
+# Điều kiện B.cond theo mã điều kiện (0..14), đọc từ dict cờ
+CONDITION_CHECKS = (
+    lambda f: f['Z'] == 1,                                  # EQ
+    lambda f: f['Z'] == 0,                                  # NE
+    lambda f: f['C'] == 1,                                  # HS
+    lambda f: f['C'] == 0,                                  # LO
+    lambda f: f['N'] == 1,                                  # MI
+    lambda f: f['N'] == 0,                                  # PL
+    lambda f: f['V'] == 1,                                  # VS
+    lambda f: f['V'] == 0,                                  # VC
+    lambda f: f['C'] == 1 and f['Z'] == 0,                  # HI
+    lambda f: not (f['C'] == 1 and f['Z'] == 0),            # LS
+    lambda f: f['N'] == f['V'],                             # GE
+    lambda f: f['N'] != f['V'],                             # LT
+    lambda f: f['Z'] == 0 and f['N'] == f['V'],             # GT
+    lambda f: not (f['Z'] == 0 and f['N'] == f['V']),       # LE
+    lambda f: True,                                         # AL
+)
+
+
+def _exec_bcond(sim, d, pc):
+    return d.target if CONDITION_CHECKS[d.cond](sim.flags) else pc + 4
+
+
+def _exec_movz(sim, d, pc):
+    if d.rd != XZR:
+        sim.registers[d.rd] = d.imm << d.shamt
+    return pc + 4
+
+
+def _exec_movk(sim, d, pc):
+    r = sim.registers
+    if d.rd != XZR:
+        r[d.rd] = (r[d.rd] & ~(0xFFFF << d.shamt) & MASK64) | (d.imm << d.shamt)
+    return pc + 4
+
+
+def _exec_halt(sim, d, pc):
+    sim.halted = True
+    return pc # PC không tăng nữa
+
+
+def _exec_nop(sim, d, pc):
+    return pc + 4
+
+
+# Bảng dispatch: mnemonic -> handler
+HANDLERS = {
+    'ADD': _exec_add, 'SUB': _exec_sub, 'AND': _exec_and, 'ORR': _exec_orr,
+    'EOR': _exec_eor, 'MUL': _exec_mul, 'SDIV': _exec_sdiv, 'UDIV': _exec_udiv,
+    'LSL': _exec_lsl, 'LSR': _exec_lsr,
+    'ADDS': _exec_adds, 'SUBS': _exec_subs, 'ANDS': _exec_ands,
+    'ADDI': _exec_addi, 'SUBI': _exec_subi, 'ANDI': _exec_andi, 'ORRI': _exec_orri,
+    'EORI': _exec_eori, 'ADDIS': _exec_addis, 'SUBIS': _exec_subis, 'ANDIS': _exec_andis,
+    'LDUR': _exec_ldur, 'LDURSW': _exec_ldursw, 'LDURH': _exec_ldurh, 'LDURB': _exec_ldurb,
+    'STUR': _exec_stur, 'STURW': _exec_sturw, 'STURH': _exec_sturh, 'STURB': _exec_sturb,
+    'B': _exec_b, 'BL': _exec_bl, 'BR': _exec_br,
+    'CBZ': _exec_cbz, 'CBNZ': _exec_cbnz, 'B.cond': _exec_bcond,
+    'MOVZ': _exec_movz, 'MOVK': _exec_movk,
+    'HALT': _exec_halt, 'NOP': _exec_nop,
+}
+
+
+def compile_condition(expression):
+    """
+    Biên dịch biểu thức điều kiện breakpoint thành hàm f(sim) -> bool.
+    Tên dùng được: X0..X31 (không dấu), SP, FP, LR, XZR, cờ N/Z/V/C, signed(x) và
+    mem(addr, width=8). Ném ValueError nếu biểu thức sai cú pháp.
+    """
+    try:
+        code = compile(expression, '<breakpoint condition>', 'eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid breakpoint condition '{expression}': {e.msg}") from None
+
+    def condition(sim):
+        scope = {f'X{i}': value for i, value in enumerate(sim.registers)}
+        scope.update(SP=sim.registers[28], FP=sim.registers[29], LR=sim.registers[LR], XZR=0,
+                     signed=_to_signed, mem=sim.get_memory_value)
+        scope.update(sim.flags)
+        return bool(eval(code, {'__builtins__': {}}, scope))
+    return condition
+
 
 class LEGv8_Simplified_Simulator:
     """
-    Lớp mô phỏng lõi (rất đơn giản hóa) cho LEGv8.
-    CHÚ Ý: Phần xử lý lệnh ('step') hiện tại chỉ là placeholder,
-           cần được triển khai chi tiết cho từng lệnh LEGv8 thực tế.
+    Lớp mô phỏng lõi (single-cycle) cho LEGv8.
+    Mỗi lệnh được giải mã một lần (decoder.decode_word), cache theo PC,
+    sau đó 'step' chỉ dispatch qua bảng HANDLERS.
     """
-    def __init__(self, num_registers=32, mem_size=1024):
+    def __init__(self, num_registers=32, mem_size=1024, memory_image=None, tracer=None):
         self.num_registers = num_registers
         self.mem_size = mem_size # Kích thước bộ nhớ dữ liệu (theo byte)
         self.initial_pc = 0x00000000 # Địa chỉ bắt đầu mặc định
 
         # Trạng thái nội bộ
         self.registers = [0] * self.num_registers
-        self.data_memory = {} # Dùng dictionary cho bộ nhớ dữ liệu thưa
-        self.instruction_memory = {} # Lưu lệnh đã biên dịch {addr: instruction_data}
+        # Bộ nhớ dữ liệu byte-addressable: trang 4 KiB cấp phát lười, hoặc file image mmap
+        if memory_image:
+            self.data_memory = MappedDataMemory(mem_size, memory_image)
+        else:
+            self.data_memory = DataMemory(mem_size)
+        self.program = Program() # Chương trình đã biên dịch (mã máy 32-bit)
         self.pc = self.initial_pc
         self.flags = {'N': 0, 'Z': 0, 'V': 0, 'C': 0}
         self.halted = False
-        self.pc_to_line_map = {} # Lưu map từ GUI để dễ debug (không dùng trực tiếp trong step)
         self.label_to_pc_map = {} # Lưu map nhãn từ assembler
 
+        # Cache lệnh đã giải mã {addr: DecodedInstruction}, chỉ xóa khi nạp chương trình mới
+        self._decoded = {}
+        self._mem_addr = None # Địa chỉ bộ nhớ mà lệnh vừa chạy đã truy cập
+        self.instruction_count = 0 # Số lệnh đã thực thi kể từ lần reset gần nhất
+        self.block_engine = None # Engine dịch basic block (tùy chọn), xem enable_block_engine()
+        self._block_steps = 0 # Số lệnh region vừa chạy xong (block engine ghi khi region trả về / ném lỗi)
+        self._block_pc = 0 # PC của lệnh ném lỗi trong region (block engine)
+        self._state_map = None # (đường dẫn, mmap) của state file mà các trang bộ nhớ còn trỏ vào, xem load_state()
+
         # Trạng thái chu kỳ trước (để trả về cho GUI)
         self.last_state = {}
 
-        print("LEGv8 Simulator Initialized")
+        # Trace (mặc định dùng TRACER chung, đang tắt -> không tốn chi phí)
+        self.tracer = tracer if tracer is not None else TRACER
+        self.tracer.emit('system', "LEGv8 Simulator Initialized")
+        self.recorder = None # trace_recorder.TraceRecorder (tùy chọn), xem attach_recorder()
+        self.history = None # history.ExecutionHistory (tùy chọn) cho Step Back, xem enable_history()
+        self.breakpoints = set() # Các PC dừng lại khi chạy (kể cả chạy lùi), xem add_breakpoint()
+        self.breakpoint_conditions = {} # {pc: hàm(sim) -> bool} cho breakpoint có điều kiện
+        self.stop_reason = None # Lý do run() gần nhất dừng: 'breakpoint', 'watchpoint' hoặc None
+        self.caches = None # cache.CacheHierarchy (tùy chọn) cho fetch và truy cập dữ liệu, xem attach_caches()
+        self.branch_predictor = None # branch_predictor.BranchPredictor (tùy chọn), xem attach_branch_predictor()
+        self.profiler = None # profiler.Profiler (tùy chọn): số đếm theo PC, xem attach_profiler()
 
     def reset(self):
         """Reset trạng thái runtime của simulator (PC, registers, flags), giữ nguyên chương trình."""
-        print("Simulator Resetting...")
         self.pc = self.initial_pc
         self.registers = [0] * self.num_registers
         # self.data_memory = {} # Quyết định xem có xóa bộ nhớ dữ liệu khi reset hay không
         self.flags = {'N': 0, 'Z': 0, 'V': 0, 'C': 0}
         self.halted = False
+        self.instruction_count = 0
         self.last_state = {} # Xóa trạng thái cũ
-        print(f"Simulator Reset. PC = {self.pc:#0x}")
-
-    def load_program(self, instruction_memory, label_to_pc_map):
-        """Nạp chương trình đã biên dịch vào bộ nhớ lệnh."""
-        print(f"Loading program. {len(instruction_memory)} instructions.")
-        self.instruction_memory = instruction_memory
-        self.label_to_pc_map = label_to_pc_map
-        # Tìm địa chỉ bắt đầu thực tế nếu có (ví dụ: lệnh đầu tiên)
-        if self.instruction_memory:
-             # Mặc định bắt đầu từ địa chỉ nhỏ nhất được nạp
-            self.initial_pc = min(self.instruction_memory.keys())
-        else:
-            self.initial_pc = 0x00000000
+        if self.history is not None:
+            self.history.clear()
+        if self._state_map is not None:
+            from state_file import release_state
+            release_state(self)
+        if self.caches is not None:
+            self.caches.reset()
+        if self.branch_predictor is not None:
+            self.branch_predictor.reset()
+        if self.profiler is not None:
+            self.profiler.clear()
+        if self.tracer.active:
+            self.tracer.emit('system', f"Simulator Reset. PC = {self.pc:#0x}")
+
+    def load_program(self, program):
+        """Nạp chương trình đã biên dịch (assembler.Program) vào bộ nhớ lệnh."""
+        if program is None:
+            program = Program()
+        if self.tracer.active:
+            self.tracer.emit('system', f"Loading program. {len(program)} instructions.")
+        self.program = program
+        self.label_to_pc_map = program.label_to_pc_map
+        self._decoded = {} # Chương trình mới -> bỏ toàn bộ lệnh đã giải mã
+        if self.block_engine is not None:
+            self.block_engine.invalidate()
+        if self.profiler is not None:
+            self.profiler.load(program)
+        self.initial_pc = program.base_pc # Bắt đầu từ lệnh đầu tiên
         self.reset() # Reset trạng thái sau khi nạp chương trình mới
         self.halted = False # Đảm bảo không bị dừng sau khi load
 
-    def step(self):
+    def save_state(self, path):
+        """Ghi toàn bộ trạng thái máy (registers, PC, cờ, chương trình, bộ nhớ) ra file nhị phân 'path'."""
+        from state_file import save_state
+        save_state(self, path)
+
+    def load_state(self, path):
+        """Khôi phục trạng thái đã lưu bằng save_state(); trang bộ nhớ được chép lười từ file mmap."""
+        from state_file import load_state
+        load_state(self, path)
+
+    def decode_at(self, pc):
         """
-        Thực thi một lệnh tại địa chỉ PC hiện tại.
-        *** PHẦN NÀY CẦN TRIỂN KHAI CHI TIẾT LOGIC CỦA TỪNG LỆNH LEGv8 ***
-        Hiện tại chỉ là mô phỏng đơn giản việc chạy và tạo state giả.
+        Trả về lệnh đã giải mã tại 'pc' (giải mã và cache ở lần đầu).
+        Trả về None nếu 'pc' nằm ngoài bộ nhớ lệnh.
         """
+        decoded = self._decoded.get(pc)
+        if decoded is not None:
+            return decoded
+        program = self.program
+        word = program.word_at(pc)
+        if word is None:
+            return None
+        decoded = decode_word(word, pc, line=program.line_for_pc(pc), text=program.text_at(pc))
+        decoded.handler = HANDLERS[decoded.name]
+        self._decoded[pc] = decoded
+        return decoded
+
+    def step(self):
+        """Thực thi một lệnh tại địa chỉ PC hiện tại và trả về state cho GUI."""
         current_pc = self.pc
 
         if self.halted:
-            print("Simulator HALTED.")
+            self.tracer.emit('system', "Simulator HALTED.")
             self.last_state = {'halted': True, 'pc': current_pc}
             return self.last_state
 
-        if current_pc not in self.instruction_memory:
-            print(f"Error: PC {current_pc:#0x} points outside loaded program memory.")
+        decoded = self._decoded.get(current_pc) or self.decode_at(current_pc)
+        if decoded is None:
+            if self.tracer.active:
+                self.tracer.emit('system', f"PC {current_pc:#0x} points outside loaded program memory.", WARNING)
             self.halted = True
             self.last_state = {'halted': True, 'pc': current_pc, 'error': 'Invalid PC'}
             return self.last_state
 
-        # --- Bắt đầu phần logic giả lập ---
-        # Lấy "lệnh" giả định (trong thực tế cần giải mã từ instruction_memory[current_pc])
-        mock_instruction_info = self._get_mock_instruction_info(current_pc)
-        instruction_name = mock_instruction_info.get('name', 'UNKNOWN')
-        print(f"Executing at PC={current_pc:#0x}: Instruction '{instruction_name}' (Mock)")
+        self._mem_addr = None
+        if self.history is not None:
+            self.history.before_execute(current_pc, decoded)
+            try:
+                next_pc = decoded.handler(self, decoded, current_pc)
+            except Exception:
+                self.history.discard_last() # Lệnh lỗi không được để lại bản ghi undo
+                raise
+        else:
+            next_pc = decoded.handler(self, decoded, current_pc)
+        if self.observing:
+            self._observe(current_pc, decoded, next_pc)
+        if self.branch_predictor is not None and decoded.iclass in PREDICTED_CLASSES:
+            self.branch_predictor.record(current_pc, decoded.target, next_pc != current_pc + 4)
+        signals = decoded.signals
 
-        # Tạo trạng thái giả lập cho GUI
         state = {
             'pc': current_pc,
-            'next_pc': current_pc + 4, # Giả định lệnh dài 4 byte
-            'control_signals': self._get_mock_control_signals(instruction_name),
-            'active_component': self._get_mock_active_component(instruction_name),
-            'mem_addr': None,
-            'mem_write': False,
-            'mem_read': False,
-            'reg_written': None, # Thanh ghi nào được ghi
-            'flags': self.flags.copy(), # Trạng thái cờ TRƯỚC khi lệnh chạy (hoặc sau tùy thiết kế)
-            'halted': False,
-            'instruction_raw': self.instruction_memory.get(current_pc, None) # Gửi lệnh thô nếu cần
+            'next_pc': next_pc,
+            'instruction': decoded.name,
+            'control_signals': signals, # Dict dùng chung theo lệnh, chỉ đọc
+            'active_component': decoded.active_component,
+            'mem_addr': self._mem_addr,
+            'mem_write': bool(signals['MemWrite']),
+            'mem_read': bool(signals['MemRead']),
+            'reg_written': f'X{decoded.rd}' if signals['RegWrite'] and decoded.rd != XZR else None,
+            'flags': self.flags.copy(), # Trạng thái cờ SAU khi lệnh chạy
+            'halted': self.halted,
+            'instruction_raw': decoded.word, # Mã máy 32-bit của lệnh
+            'line': decoded.line,
         }
 
-        # --- Giả lập thay đổi trạng thái ---
-        # Ví dụ: Nếu là lệnh ADD/ADDI, giả lập ghi vào thanh ghi
-        if instruction_name in ["ADD", "ADDI", "SUB"]:
-            reg_idx = random.randint(1, self.num_registers - 1) # Ghi vào X1-X31
-            old_val = self.registers[reg_idx]
-            self.registers[reg_idx] = random.randint(0, 1000) # Giá trị ngẫu nhiên
-            state['reg_written'] = f'X{reg_idx}'
-            print(f"  Mock: Write {self.registers[reg_idx]} to X{reg_idx} (was {old_val})")
-            # Giả lập cập nhật cờ Z
-            if self.registers[reg_idx] == 0:
-                 state['flags']['Z'] = 1
-            else:
-                 state['flags']['Z'] = 0
-
-        # Ví dụ: Nếu là lệnh LDUR/STUR, giả lập truy cập bộ nhớ
-        elif instruction_name in ["LDUR", "STUR"]:
-            mem_addr = random.randint(0, self.mem_size - 8) & ~0x7 # Địa chỉ căn 8 byte
-            state['mem_addr'] = mem_addr
-            state['active_component'] = 'MEM' # Ưu tiên MEM nếu có truy cập
-            if instruction_name == "STUR":
-                state['mem_write'] = True
-                write_val = random.randint(0, 255)
-                self.data_memory[mem_addr] = write_val # Lưu giá trị vào bộ nhớ giả
-                print(f"  Mock: Write {write_val} to Memory Address {mem_addr:#0x}")
-            else: # LDUR
-                state['mem_read'] = True
-                read_val = self.data_memory.get(mem_addr, 0) # Đọc từ bộ nhớ giả
-                reg_idx = random.randint(1, self.num_registers - 1)
-                self.registers[reg_idx] = read_val
-                state['reg_written'] = f'X{reg_idx}'
-                print(f"  Mock: Read {read_val} from Memory Address {mem_addr:#0x} into X{reg_idx}")
-
-        # Ví dụ: Lệnh HALT
-        elif instruction_name == "HALT":
-            state['halted'] = True
-            self.halted = True
-            state['next_pc'] = current_pc # PC không tăng nữa
-            print("  Mock: HALT instruction encountered.")
-
-        # --- Kết thúc phần logic giả lập ---
-
         # Cập nhật PC cho bước tiếp theo (trừ khi HALT)
         if not self.halted:
-            self.pc = state['next_pc']
-        self.flags = state['flags'].copy() # Cập nhật cờ trạng thái của simulator
+            self.pc = next_pc
+        self.instruction_count += 1
 
         self.last_state = state # Lưu lại trạng thái để GUI có thể truy vấn nếu cần
         return state
 
-    # --- Các hàm helper giả lập ---
-    def _get_mock_instruction_info(self, pc):
-        # Hàm này cần phân tích instruction_memory[pc] thực tế
-        # Hiện tại chỉ trả về tên lệnh giả dựa trên PC
-        seed = pc // 4
-        mock_ops = ["ADDI", "LDUR", "ADD", "STUR", "SUB", "B", "CBZ", "HALT"]
-        if pc > 0x40 : # Giả sử chương trình kết thúc bằng HALT
-             return {'name': 'HALT'}
-        return {'name': mock_ops[seed % (len(mock_ops)-1)]} # Tránh HALT quá sớm
-
-    def _get_mock_control_signals(self, instruction_name):
-        # Tạo tín hiệu điều khiển giả dựa trên tên lệnh
-        signals = {'RegWrite': 0, 'ALUSrc': 0, 'MemRead': 0, 'MemWrite': 0, 'Branch': 0, 'ALUOp': '??'}
-        if instruction_name in ["ADD", "SUB", "AND", "ORR"]:
-            signals['RegWrite'] = 1
-            signals['ALUOp'] = instruction_name[:3]
-        elif instruction_name in ["ADDI", "SUBI"]:
-            signals['RegWrite'] = 1
-            signals['ALUSrc'] = 1
-            signals['ALUOp'] = instruction_name[:3]
-        elif instruction_name == "LDUR":
-            signals['RegWrite'] = 1
-            signals['ALUSrc'] = 1
-            signals['MemRead'] = 1
-            signals['ALUOp'] = 'ADD' # Tính địa chỉ
-        elif instruction_name == "STUR":
-            signals['ALUSrc'] = 1
-            signals['MemWrite'] = 1
-            signals['ALUOp'] = 'ADD' # Tính địa chỉ
-        elif instruction_name in ["B", "CBZ", "B.cond"]:
-            signals['Branch'] = 1
-            signals['ALUOp'] = '??' # Có thể không cần ALU chính
-        return signals
-
-    def _get_mock_active_component(self, instruction_name):
-        # Xác định thành phần chính hoạt động (giả lập)
-        if instruction_name in ["ADD", "SUB", "AND", "ORR", "ADDI", "SUBI"]:
-            return 'ALU'
-        elif instruction_name in ["LDUR", "STUR"]:
-            return 'MEM' # ALU cũng hoạt động để tính địa chỉ, nhưng MEM là đích chính
-        elif instruction_name in ["B", "CBZ", "B.cond"]:
-            return 'BRANCH'
-        elif instruction_name == "HALT":
-            return 'NONE'
-        return 'DECODE' # Mặc định
+    def enable_block_engine(self, enabled=True):
+        """Bật/tắt engine dịch basic block (block_engine.BlockEngine) cho run()."""
+        if enabled:
+            from block_engine import BlockEngine
+            if self.block_engine is None:
+                self.block_engine = BlockEngine(self)
+        else:
+            self.block_engine = None
+
+    def run(self, max_steps=None, until_pc=None):
+        """
+        Chạy liên tục không qua GUI: không tạo dict 'state', không in ra console.
+        Dừng khi HALT, PC ra ngoài chương trình, đã chạy 'max_steps' lệnh,
+        hoặc PC chạm 'until_pc' (sau ít nhất một lệnh). Trả về số lệnh đã chạy.
+        Nếu block engine đang bật thì chạy theo từng basic block đã dịch;
+        step() luôn chạy từng lệnh một để GUI có state đầy đủ.
+        """
+        if self.history is not None and not self.observed:
+            return self._run_checkpointed(max_steps, until_pc)
+        return self._run_engine(max_steps, until_pc)
+
+    def _run_engine(self, max_steps=None, until_pc=None):
+        if self.block_engine is not None:
+            return self.block_engine.run(max_steps=max_steps, until_pc=until_pc)
+        return self._run_interpreter(max_steps, until_pc)
+
+    def _run_checkpointed(self, max_steps=None, until_pc=None):
+        """
+        run() khi có history nhưng không cần theo dõi từng lệnh: chạy bằng engine nhanh
+        theo từng đoạn history.snapshot_interval lệnh, chỉ chụp snapshot ở đầu mỗi đoạn
+        và khi dừng (không ghi undo từng lệnh). Lùi về giữa một đoạn = khôi phục
+        snapshot đầu đoạn rồi chạy lại phần còn thiếu (history.seek).
+        """
+        history = self.history
+        interval = history.snapshot_interval
+        self.stop_reason = None
+        steps = 0
+        try:
+            while max_steps is None or steps < max_steps:
+                history.checkpoint()
+                budget = interval if max_steps is None else min(interval, max_steps - steps)
+                executed = self._run_engine(budget, until_pc)
+                steps += executed
+                if (executed < budget or self.halted or self.stop_reason
+                        or (until_pc is not None and self.pc == until_pc)):
+                    break
+        finally:
+            history.checkpoint() # Lùi từ điểm dừng (kể cả sau lỗi) không cần chạy lại
+        return steps
+
+    def _run_interpreter(self, max_steps=None, until_pc=None):
+        """Vòng lặp thông dịch từng lệnh (tham chiếu cho mọi engine nhanh hơn)."""
+        self.stop_reason = None
+        if self.halted:
+            return 0
+        if self.observed:
+            return self._run_observed(max_steps, until_pc) # Chọn biến thể có trace/ghi một lần
+        get_decoded = self._decoded.get
+        limit = -1 if max_steps is None else max_steps
+        # Breakpoint và until_pc gộp thành một set: mỗi lệnh chỉ tốn một phép 'in'
+        stops = self._stop_pcs(until_pc)
+        conditions = self.breakpoint_conditions
+        pc = self.pc
+        steps = 0
+        try:
+            while steps != limit:
+                decoded = get_decoded(pc)
+                if decoded is None:
+                    decoded = self.decode_at(pc)
+                    if decoded is None:
+                        self.halted = True
+                        self.last_state = {'halted': True, 'pc': pc, 'error': 'Invalid PC'}
+                        break
+                next_pc = decoded.handler(self, decoded, pc)
+                steps += 1
+                if next_pc == pc and self.halted: # HALT giữ nguyên PC
+                    break
+                pc = next_pc
+                if pc in stops:
+                    self.pc = pc
+                    if self._breaks_at(pc, until_pc, conditions):
+                        break
+        finally:
+            self.pc = pc
+            self.instruction_count += steps
+        return steps
+
+    @property
+    def observing(self):
+        """True nếu _observe() có việc để làm (cache, profiler, recorder hoặc tracer)."""
+        return (self.tracer.active or self.recorder is not None or self.caches is not None
+                or self.profiler is not None)
+
+    @property
+    def observed(self):
+        """
+        True nếu từng lệnh cần được trace, ghi lại hoặc theo dõi (không chạy được bằng block engine).
+        History không tính: run() chỉ chụp snapshot theo đoạn, xem _run_checkpointed().
+        """
+        return (self.observing or self.branch_predictor is not None
+                or bool(self.data_memory.watchpoints))
+
+    def enable_history(self, enabled=True, snapshot_interval=None):
+        """Bật/tắt lịch sử thực thi (history.ExecutionHistory) để chạy lùi."""
+        if enabled:
+            from history import ExecutionHistory, DEFAULT_SNAPSHOT_INTERVAL
+            self.history = ExecutionHistory(self, snapshot_interval or DEFAULT_SNAPSHOT_INTERVAL)
+        else:
+            self.history = None
+
+    def attach_recorder(self, recorder):
+        """Gắn (hoặc gỡ nếu None) bộ ghi trace dạng cột cho mọi lệnh thực thi sau đó."""
+        self.recorder = recorder
+
+    def attach_caches(self, caches):
+        """Gắn (hoặc gỡ nếu None) mô hình cache (cache.CacheHierarchy) trước fetch và bộ nhớ dữ liệu."""
+        self.caches = caches
+
+    def attach_profiler(self, profiler):
+        """Gắn (hoặc gỡ nếu None) profiler; profiler được nạp lại khi load_program()."""
+        self.profiler = profiler
+
+    def attach_branch_predictor(self, predictor):
+        """Gắn (hoặc gỡ nếu None) bộ dự đoán rẽ nhánh; pipeline cũng dùng bộ này để fetch."""
+        self.branch_predictor = predictor
+
+    def _run_observed(self, max_steps=None, until_pc=None):
+        """
+        Giống _run_interpreter nhưng trace/ghi lại từng lệnh. PC và instruction_count
+        được cập nhật sau mỗi lệnh vì history chụp snapshot giữa chừng.
+        """
+        limit = -1 if max_steps is None else max_steps
+        history = self.history
+        predictor = self.branch_predictor
+        memory = self.data_memory
+        memory.watch_hit = None
+        stops = self._stop_pcs(until_pc)
+        conditions = self.breakpoint_conditions
+        steps = 0
+        while steps != limit:
+            pc = self.pc
+            decoded = self.decode_at(pc)
+            if decoded is None:
+                self.tracer.emit('system', f"PC {pc:#0x} points outside loaded program memory.", WARNING)
+                self.halted = True
+                self.last_state = {'halted': True, 'pc': pc, 'error': 'Invalid PC'}
+                break
+            self._mem_addr = None
+            if history is not None:
+                history.before_execute(pc, decoded)
+                try:
+                    next_pc = decoded.handler(self, decoded, pc)
+                except Exception:
+                    history.discard_last()
+                    raise
+            else:
+                next_pc = decoded.handler(self, decoded, pc)
+            steps += 1
+            self.instruction_count += 1
+            self._observe(pc, decoded, next_pc)
+            if predictor is not None and decoded.iclass in PREDICTED_CLASSES:
+                predictor.record(pc, decoded.target, next_pc != pc + 4)
+            if next_pc == pc and self.halted:
+                break
+            self.pc = next_pc
+            if memory.watch_hit is not None:
+                self.stop_reason = 'watchpoint'
+                break
+            if next_pc in stops and self._breaks_at(next_pc, until_pc, conditions):
+                break
+        return steps
+
+    # --- Breakpoint / watchpoint ---
+    def add_breakpoint(self, pc, condition=None):
+        """
+        Đặt breakpoint tại 'pc'. 'condition' (tùy chọn) là hàm f(sim) -> bool hoặc biểu thức
+        Python theo tên thanh ghi/cờ, vd. "X1 == 5 and Z", chỉ dừng khi điều kiện đúng.
+        """
+        self.breakpoints.add(pc)
+        if condition is None:
+            self.breakpoint_conditions.pop(pc, None)
+        else:
+            self.breakpoint_conditions[pc] = (compile_condition(condition)
+                                              if isinstance(condition, str) else condition)
+
+    def remove_breakpoint(self, pc):
+        self.breakpoints.discard(pc)
+        self.breakpoint_conditions.pop(pc, None)
+
+    def toggle_breakpoint(self, pc):
+        """Bật/tắt breakpoint tại 'pc', trả về True nếu breakpoint đang bật sau khi đổi."""
+        if pc in self.breakpoints:
+            self.remove_breakpoint(pc)
+            return False
+        self.add_breakpoint(pc)
+        return True
+
+    def clear_breakpoints(self):
+        self.breakpoints.clear()
+        self.breakpoint_conditions.clear()
+
+    def should_break(self, pc):
+        """True nếu có breakpoint tại 'pc' và điều kiện (nếu có) đang đúng."""
+        if pc not in self.breakpoints:
+            return False
+        condition = self.breakpoint_conditions.get(pc)
+        return condition is None or bool(condition(self))
+
+    def add_watchpoint(self, start, length=8, access='w'):
+        """Dừng run() sau lệnh đọc/ghi vùng [start, start+length) ('r', 'w' hoặc 'rw')."""
+        self.data_memory.add_watchpoint(start, length, access)
+
+    def remove_watchpoint(self, start):
+        self.data_memory.remove_watchpoint(start)
+
+    def clear_watchpoints(self):
+        self.data_memory.clear_watchpoints()
+
+    def _stop_pcs(self, until_pc):
+        if until_pc is None:
+            return self.breakpoints
+        return self.breakpoints | {until_pc}
+
+    def _breaks_at(self, pc, until_pc, conditions):
+        """Gọi khi PC chạm một phần tử của tập dừng: quyết định có dừng thật hay không."""
+        if pc == until_pc:
+            return True
+        condition = conditions.get(pc)
+        if condition is not None and not condition(self):
+            return False
+        self.stop_reason = 'breakpoint'
+        return True
+
+    def _observe(self, pc, decoded, next_pc):
+        """Chuyển lệnh vừa chạy cho profiler, cache, recorder và tracer (nếu có)."""
+        if self.profiler is not None:
+            self.profiler.record(pc, next_pc)
+        if self.caches is not None:
+            self.caches.record(pc, decoded, self._mem_addr)
+        if self.recorder is not None:
+            self.recorder.record_executed(self, pc, decoded, next_pc)
+        if self.tracer.active:
+            self._trace_executed(pc, decoded, next_pc)
+
+    def _trace_executed(self, pc, decoded, next_pc):
+        """Ghi các sự kiện fetch / reg-write / mem / branch của lệnh vừa chạy."""
+        tracer = self.tracer
+        categories = tracer.categories
+        if tracer.level > INFO:
+            return
+        if 'fetch' in categories:
+            tracer.emit('fetch', f"PC={pc:#010x} {decoded.name:<6} {decoded.text.strip()}")
+        signals = decoded.signals
+        if 'reg-write' in categories and signals['RegWrite'] and decoded.rd != XZR:
+            tracer.emit('reg-write', f"X{decoded.rd} <- {self.registers[decoded.rd]:#x}")
+        if 'mem' in categories and self._mem_addr is not None:
+            kind = 'W' if signals['MemWrite'] else 'R'
+            tracer.emit('mem', f"{kind} [{self._mem_addr:#010x}] = {self.registers[decoded.rd]:#x}")
+        if 'branch' in categories and (signals['Branch'] or signals['UncondBranch']):
+            taken = next_pc != pc + 4
+            tracer.emit('branch', f"PC={pc:#010x} {'taken' if taken else 'not taken'} -> {next_pc:#010x}")
 
     def get_register_value(self, reg_index):
         if 0 <= reg_index < self.num_registers:
             return self.registers[reg_index]
         return None
 
-    def get_memory_value(self, address):
-         # Nên xử lý alignment và kích thước đọc/ghi thực tế
-        return self.data_memory.get(address, 0) # Trả về 0 nếu chưa có gì
+    def get_memory_value(self, address, width=8):
+        """Đọc 'width' byte (little-endian) tại 'address'."""
+        return self.data_memory.load(address, width)
 
     def get_state_summary(self):
         """Trả về tóm tắt trạng thái hiện tại (hữu ích cho update_display)."""
@@ -203,4 +816,4 @@ class LEGv8_Simplified_Simulator:
             'flags': self.flags.copy(),
             'halted': self.halted,
             # Thêm các thông tin khác nếu cần hiển thị tức thì
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,373 @@
+# lockstep.py
+"""
+Kiểm tra vi sai (differential) cho các engine nhanh.
+- LockstepChecker chạy song song một lõi tham chiếu (step() từng lệnh) và một lõi
+  nhanh (run() theo lô của interpreter hoặc block engine) trên cùng chương trình.
+  Cứ 'interval' lệnh so PC, registers, cờ, halted, số lệnh và các trang bộ nhớ đã ghi.
+  Khi lệch, cả hai quay về checkpoint gần nhất (history.Snapshot) và tìm nhị phân
+  lệnh đầu tiên gây lệch, kèm các lệnh chạy ngay trước đó làm ngữ cảnh.
+- random_program() sinh chuỗi lệnh hợp lệ ngẫu nhiên (luôn dừng; có vòng lặp quay lui
+  và cặp BL/BR) để fuzz bằng fuzz().
+"""
+import random
+from collections import deque
+
+from assembler import assemble
+from history import Snapshot
+from legv8_simulator import LEGv8_Simplified_Simulator
+from memory import MemoryAccessError, PAGE_SHIFT, PAGE_SIZE
+from pipeline import FLAG_SETTERS
+from profiler import BRANCH_CLASSES
+
+FAST_ENGINES = ('interp', 'block')
+DEFAULT_CHECK_INTERVAL = 256
+DEFAULT_CONTEXT = 8
+DEFAULT_MEM_SIZE = 1 << 16
+_ZERO_PAGE = bytes(PAGE_SIZE)
+
+
+class Divergence:
+    """
+    Lệnh đầu tiên mà lõi nhanh cho kết quả khác lõi tham chiếu. Với block engine,
+    khác biệt chỉ quan sát được ở ranh giới block, nên lệnh sai thật có thể nằm
+    trước đó trong cùng block: các lệnh ngữ cảnh ghi vào giá trị bị lệch được đánh dấu.
+    """
+
+    def __init__(self, engine, step, pc, text, line, differences, context):
+        self.engine = engine
+        self.step = step # Số thứ tự (từ 1) của lệnh gây lệch
+        self.pc = pc
+        self.text = text
+        self.line = line
+        self.differences = differences # [(tên, giá trị tham chiếu, giá trị lõi nhanh)]
+        self.context = context # [(pc, text, suspect)] các lệnh chạy ngay trước, cũ nhất trước
+
+    def report(self):
+        where = f"line {self.line}, " if self.line is not None else ""
+        lines = [f"Divergence ({self.engine} engine) at instruction #{self.step}: "
+                 f"PC={self.pc:#010x} ({where}{self.text.strip() or '?'})"]
+        for name, expected, actual in self.differences:
+            lines.append(f"  {name}: reference {_format(expected)}, {self.engine} {_format(actual)}")
+        if self.context:
+            lines.append("  Preceding instructions (* = writes a differing value):")
+            for pc, text, suspect in self.context:
+                lines.append(f"  {'*' if suspect else ' '} {pc:#010x}: {text.strip()}")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.report()
+
+
+def _format(value):
+    return f"{value:#x}" if isinstance(value, int) and not isinstance(value, bool) else str(value)
+
+
+def _compare(ref, fast, ref_error, fast_error):
+    """Danh sách khác biệt [(tên, tham chiếu, nhanh)] giữa hai simulator (rỗng nếu khớp)."""
+    diffs = []
+    if ref_error != fast_error:
+        diffs.append(('error', ref_error, fast_error))
+    if ref.pc != fast.pc:
+        diffs.append(('PC', ref.pc, fast.pc))
+    for i, (a, b) in enumerate(zip(ref.registers, fast.registers)):
+        if a != b:
+            diffs.append((f'X{i}', a, b))
+    for flag in 'NZCV':
+        if ref.flags[flag] != fast.flags[flag]:
+            diffs.append((f'flag {flag}', ref.flags[flag], fast.flags[flag]))
+    if ref.halted != fast.halted:
+        diffs.append(('halted', ref.halted, fast.halted))
+    if ref.instruction_count != fast.instruction_count:
+        diffs.append(('instruction count', ref.instruction_count, fast.instruction_count))
+    diffs.extend(_compare_memory(ref.data_memory, fast.data_memory))
+    return diffs
+
+
+def _compare_memory(ref_mem, fast_mem):
+    """So các trang đã ghi (trang chưa cấp phát = toàn 0); báo word 8 byte đầu tiên khác nhau."""
+    ref_pages, fast_pages = ref_mem.pages, fast_mem.pages
+    for index in sorted(ref_pages.keys() | fast_pages.keys()):
+        a = ref_pages.get(index, _ZERO_PAGE)
+        b = fast_pages.get(index, _ZERO_PAGE)
+        if a is b or a == b:
+            continue
+        off = next(i for i in range(PAGE_SIZE) if a[i] != b[i]) & ~7
+        addr = (index << PAGE_SHIFT) + off
+        return [(f'mem[{addr:#x}]', int.from_bytes(a[off:off + 8], 'little'),
+                 int.from_bytes(b[off:off + 8], 'little'))]
+    return []
+
+
+class LockstepChecker:
+    """
+    So lõi nhanh 'engine' ('interp' = vòng run() theo lô, 'block' = block engine) với
+    step() của interpreter trên 'program' (program.Program), mỗi 'interval' lệnh.
+    """
+
+    def __init__(self, program, engine='block', interval=DEFAULT_CHECK_INTERVAL,
+                 mem_size=DEFAULT_MEM_SIZE, context=DEFAULT_CONTEXT):
+        if engine not in FAST_ENGINES:
+            raise ValueError(f"Unknown engine '{engine}' (use {', '.join(FAST_ENGINES)})")
+        if interval < 1:
+            raise ValueError("Check interval must be at least 1")
+        self.engine = engine
+        self.interval = interval
+        self.reference = LEGv8_Simplified_Simulator(mem_size=mem_size)
+        self.fast = LEGv8_Simplified_Simulator(mem_size=mem_size)
+        for sim in (self.reference, self.fast):
+            sim.load_program(program)
+        if engine == 'block':
+            self.fast.enable_block_engine()
+        self._recent = deque(maxlen=context) # (pc, text) các lệnh tham chiếu gần nhất
+        self.checks = 0
+        self.divergence = None
+
+    @property
+    def steps(self):
+        return self.reference.instruction_count
+
+    def _step_reference(self, count):
+        """Chạy 'count' lệnh bằng step(); trả về thông báo lỗi (hoặc None)."""
+        ref = self.reference
+        recent = self._recent
+        try:
+            for _ in range(count):
+                if ref.halted:
+                    break
+                decoded = ref.decode_at(ref.pc)
+                if decoded is not None:
+                    recent.append((ref.pc, decoded.text))
+                ref.step()
+        except (MemoryAccessError, ValueError) as e:
+            ref.halted = True
+            return str(e)
+        return None
+
+    def _run_fast(self, count):
+        """Chạy tối đa 'count' lệnh bằng lõi nhanh; trả về (số lệnh đã chạy, lỗi hoặc None)."""
+        fast = self.fast
+        before = fast.instruction_count
+        try:
+            fast.run(max_steps=count)
+        except (MemoryAccessError, ValueError) as e:
+            fast.halted = True
+            return fast.instruction_count - before, str(e)
+        return fast.instruction_count - before, None
+
+    def _advance(self, count):
+        """Chạy cả hai lõi thêm 'count' lệnh, trả về danh sách khác biệt."""
+        executed, fast_error = self._run_fast(count)
+        # Lệnh lỗi không được tính vào instruction_count: tham chiếu chạy thêm lệnh đó
+        ref_error = self._step_reference(executed + (1 if fast_error else 0))
+        if ref_error is None and fast_error is None and executed < count and not self.reference.halted:
+            ref_error = self._step_reference(count - executed) # Lõi nhanh dừng sớm bất thường
+        return _compare(self.reference, self.fast, ref_error, fast_error)
+
+    def run(self, max_steps=None):
+        """
+        Chạy đến khi cả hai lõi dừng (HALT/lỗi), lệch nhau, hoặc đã chạy 'max_steps' lệnh.
+        Trả về Divergence đầu tiên, hoặc None nếu hai lõi khớp nhau suốt quá trình.
+        """
+        ref, fast = self.reference, self.fast
+        while not (ref.halted and fast.halted):
+            if max_steps is not None and self.steps >= max_steps:
+                break
+            count = self.interval if max_steps is None else min(self.interval, max_steps - self.steps)
+            checkpoint = (Snapshot(ref), Snapshot(fast), list(self._recent))
+            diffs = self._advance(count)
+            self.checks += 1
+            if diffs:
+                self.divergence = self._locate(checkpoint, count)
+                return self.divergence
+        return None
+
+    def _restore(self, checkpoint):
+        ref_snapshot, fast_snapshot, recent = checkpoint
+        ref_snapshot.restore(self.reference)
+        fast_snapshot.restore(self.fast)
+        self._recent.clear()
+        self._recent.extend(recent)
+
+    def _locate(self, checkpoint, count):
+        """Tìm nhị phân số lệnh nhỏ nhất (tính từ checkpoint) làm hai lõi lệch nhau."""
+        low, high = 1, count
+        while low < high:
+            mid = (low + high) // 2
+            self._restore(checkpoint)
+            if self._advance(mid):
+                high = mid
+            else:
+                low = mid + 1
+        self._restore(checkpoint)
+        start = self.reference.instruction_count
+        if low > 1:
+            self._step_reference(low - 1)
+        ref = self.reference
+        pc = ref.pc
+        recent = list(self._recent)
+        decoded = ref.decode_at(pc)
+        self._restore(checkpoint)
+        diffs = self._advance(low)
+        context = [(cpc, text, _writes(ref.decode_at(cpc), diffs)) for cpc, text in recent]
+        return Divergence(self.engine, start + low, pc,
+                          decoded.text if decoded is not None else '',
+                          decoded.line if decoded is not None else None, diffs, context)
+
+
+def _writes(decoded, diffs):
+    """True nếu lệnh 'decoded' ghi vào một trong các giá trị bị lệch trong 'diffs'."""
+    if decoded is None:
+        return False
+    for name, _, _ in diffs:
+        if name == f'X{decoded.rd}' and decoded.signals['RegWrite']:
+            return True
+        if name.startswith('mem[') and decoded.iclass == 'STORE':
+            return True
+        if name.startswith('flag ') and decoded.name in FLAG_SETTERS:
+            return True
+        if name == 'PC' and decoded.iclass in BRANCH_CLASSES:
+            return True
+    return False
+
+
+def check_program(program, engine='block', interval=DEFAULT_CHECK_INTERVAL,
+                  mem_size=DEFAULT_MEM_SIZE, max_steps=None):
+    """Chạy lockstep 'program'; trả về (LockstepChecker, Divergence hoặc None)."""
+    checker = LockstepChecker(program, engine, interval, mem_size)
+    return checker, checker.run(max_steps)
+
+
+# --- Sinh chương trình ngẫu nhiên ---
+# X26: bộ đếm vòng lặp ngoài, X27: địa chỉ vùng dữ liệu, X25: bộ đếm vòng lặp trong,
+# X30 (LR): địa chỉ trả về; lệnh ngẫu nhiên chỉ ghi X0..X15
+_INNER_REG = 25
+_LOOP_REG = 26
+_BASE_REG = 27
+_DATA_BASE = 0x1000
+_WORK_REGS = list(range(16))
+_MAX_INNER_ITERATIONS = 6
+_MAX_UNIT_LENGTH = 5 # Số lệnh ngẫu nhiên tối đa trong thân vòng lặp trong / hàm con
+
+_R_OPS = ('ADD', 'SUB', 'AND', 'ORR', 'EOR', 'MUL', 'SDIV', 'UDIV', 'ADDS', 'SUBS', 'ANDS')
+_I_OPS = ('ADDI', 'SUBI', 'ANDI', 'ORRI', 'EORI', 'ADDIS', 'SUBIS', 'ANDIS')
+_SHIFT_OPS = ('LSL', 'LSR')
+_LOADS = (('LDUR', 8), ('LDURSW', 4), ('LDURH', 2), ('LDURB', 1))
+_STORES = (('STUR', 8), ('STURW', 4), ('STURH', 2), ('STURB', 1))
+_CONDITIONS = ('EQ', 'NE', 'HS', 'LO', 'MI', 'PL', 'VS', 'VC', 'HI', 'LS', 'GE', 'LT', 'GT', 'LE', 'AL')
+
+
+def _random_operation(rng):
+    """Một lệnh ngẫu nhiên không rẽ nhánh (ALU, cờ, MOVZ/MOVK, load/store tại X27)."""
+    reg = lambda: f"X{rng.choice(_WORK_REGS)}"
+    dest = lambda: "XZR" if rng.random() < 0.05 else reg()
+    kind = rng.random() * 0.83
+    if kind < 0.30:
+        return f"{rng.choice(_R_OPS)} {dest()}, {reg()}, {reg()}"
+    if kind < 0.50:
+        return f"{rng.choice(_I_OPS)} {dest()}, {reg()}, #{rng.randrange(4096)}"
+    if kind < 0.57:
+        return f"{rng.choice(_SHIFT_OPS)} {dest()}, {reg()}, #{rng.randrange(64)}"
+    if kind < 0.65:
+        op = rng.choice(('MOVZ', 'MOVK'))
+        return f"{op} {dest()}, #{rng.randrange(1 << 16)}, LSL #{rng.choice((0, 16, 32, 48))}"
+    if kind < 0.73:
+        name, width = rng.choice(_LOADS)
+        return f"{name} {dest()}, [X{_BASE_REG}, #{rng.randrange(0, 256 - width + 1)}]"
+    name, width = rng.choice(_STORES)
+    return f"{name} {reg()}, [X{_BASE_REG}, #{rng.randrange(0, 256 - width + 1)}]"
+
+
+def _random_operations(rng):
+    return [_random_operation(rng) for _ in range(rng.randint(1, _MAX_UNIT_LENGTH))]
+
+
+def _random_loop(rng, index):
+    """
+    Vòng lặp trong có giới hạn: X25 đếm ngược từ 1.._MAX_INNER_ITERATIONS, cạnh quay lui
+    là CBNZ (hoặc SUBIS + B.NE). Thân chỉ gồm lệnh không rẽ nhánh nên cả vòng lặp là
+    một block tự lặp của block engine.
+    """
+    label = f"I{index}"
+    lines = [f"MOVZ X{_INNER_REG}, #{rng.randint(1, _MAX_INNER_ITERATIONS)}", f"{label}:"]
+    lines.extend(_random_operations(rng))
+    if rng.random() < 0.7:
+        lines += [f"SUBI X{_INNER_REG}, X{_INNER_REG}, #1", f"CBNZ X{_INNER_REG}, {label}"]
+    else:
+        lines += [f"SUBIS X{_INNER_REG}, X{_INNER_REG}, #1", f"B.NE {label}"]
+    return lines
+
+
+def _random_unit(rng, index, length, targets, functions):
+    """
+    Các dòng lệnh ngẫu nhiên ở vị trí 'index' của thân: một lệnh thường, một nhánh chỉ
+    nhảy tới (vào 'targets'), một vòng lặp trong, hoặc BL tới một hàm con mới (thêm vào
+    'functions', kết thúc bằng BR X30). Nhánh không bao giờ nhảy vào giữa vòng lặp trong.
+    """
+    kind = rng.random()
+    if kind < 0.06:
+        return _random_loop(rng, index)
+    if kind < 0.10:
+        label = f"F{index}"
+        functions.append([f"{label}:"] + _random_operations(rng) + ["BR X30"])
+        return [f"BL {label}"]
+    if kind < 0.84 or index + 1 >= length:
+        return [_random_operation(rng)]
+    reg = f"X{rng.choice(_WORK_REGS)}"
+    target = rng.randrange(index + 1, length + 1) # length = nhãn ngay trước phần kết thúc vòng
+    targets.add(target)
+    label = f"L{target}"
+    kind = rng.random()
+    if kind < 0.6:
+        return [f"B.{rng.choice(_CONDITIONS)} {label}"]
+    if kind < 0.9:
+        return [f"{rng.choice(('CBZ', 'CBNZ'))} {reg}, {label}"]
+    return [f"B {label}"]
+
+
+def random_program(seed, length=48, iterations=8):
+    """
+    Mã nguồn assembly ngẫu nhiên nhưng hợp lệ: khởi tạo X0..X15 và vùng dữ liệu, rồi một
+    thân 'length' đơn vị (ALU, cờ, load/store trong 256 byte tại X27, nhánh chỉ nhảy tới,
+    vòng lặp trong có giới hạn, BL/BR tới hàm con đặt sau HALT) được lặp 'iterations' lần.
+    Chương trình luôn dừng ở HALT.
+    """
+    rng = random.Random(seed)
+    lines = [f"MOVZ X{_BASE_REG}, #{_DATA_BASE}", f"MOVZ X{_LOOP_REG}, #{iterations}"]
+    for i in _WORK_REGS:
+        lines.append(f"MOVZ X{i}, #{rng.randrange(1 << 16)}, LSL #{rng.choice((0, 16, 32, 48))}")
+        if rng.random() < 0.5:
+            lines.append(f"MOVK X{i}, #{rng.randrange(1 << 16)}, LSL #{rng.choice((0, 16, 32, 48))}")
+    for off in range(0, 256, 8):
+        lines.append(f"STUR X{rng.choice(_WORK_REGS)}, [X{_BASE_REG}, #{off}]")
+    targets = set()
+    functions = []
+    body = [_random_unit(rng, i, length, targets, functions) for i in range(length)]
+    lines.append("LOOP:")
+    for i, unit in enumerate(body):
+        if i in targets:
+            lines.append(f"L{i}:")
+        lines.extend(text if text.endswith(':') else f"    {text}" for text in unit)
+    if length in targets:
+        lines.append(f"L{length}:")
+    lines.append(f"SUBI X{_LOOP_REG}, X{_LOOP_REG}, #1")
+    lines.append(f"CBNZ X{_LOOP_REG}, LOOP")
+    lines.append("HALT")
+    for function in functions:
+        lines.extend(text if text.endswith(':') else f"    {text}" for text in function)
+    return "\n".join(lines) + "\n"
+
+
+def fuzz(count, seed=0, engine='block', interval=DEFAULT_CHECK_INTERVAL, length=48, iterations=8, progress=None):
+    """
+    Chạy lockstep 'count' chương trình ngẫu nhiên (seed, seed+1, ...).
+    Trả về danh sách (seed, mã nguồn, Divergence) của các chương trình bị lệch.
+    """
+    failures = []
+    for s in range(seed, seed + count):
+        source = random_program(s, length, iterations)
+        _, divergence = check_program(assemble(source), engine, interval)
+        if divergence is not None:
+            failures.append((s, source, divergence))
+        if progress:
+            progress(s, divergence)
+    return failures
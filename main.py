@@ -1,10 +1,250 @@
 # main.py
-import tkinter as tk
-from simulator_gui import SimulatorGUI
+import argparse
+import sys
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LEGv8 Simulator")
+    parser.add_argument('--headless', metavar='FILE',
+                        help="Run an assembly file without the GUI and print the final state")
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help="Stop after this many instructions (headless mode)")
+    parser.add_argument('--until-pc', type=lambda s: int(s, 0), default=None,
+                        help="Stop when PC reaches this address (headless mode)")
+    parser.add_argument('--engine', choices=('interp', 'block'), default='interp',
+                        help="Execution engine for headless mode (default: interp)")
+    parser.add_argument('--mem-size', type=lambda s: int(s, 0), default=1024,
+                        help="Data memory size in bytes (default: 1024)")
+    parser.add_argument('--memory-image', metavar='PATH', default=None,
+                        help="Back data memory with an mmap'd image file")
+    parser.add_argument('--record-trace', metavar='PATH', default=None,
+                        help="Record every executed instruction to a compressed binary trace file (headless mode)")
+    parser.add_argument('--replay-trace', metavar='PATH', default=None,
+                        help="Print events reconstructed from a --record-trace file instead of running; "
+                             "with --headless FILE, source lines are shown too")
+    parser.add_argument('--at', type=int, default=0,
+                        help="First trace event printed by --replay-trace, negative counts from the end (default: 0)")
+    parser.add_argument('--count', type=int, default=1,
+                        help="Number of trace events printed by --replay-trace (default: 1)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Run on the cycle-accurate 5-stage pipeline and report cycles/CPI (headless mode)")
+    parser.add_argument('--no-forwarding', action='store_true',
+                        help="Disable EX/MEM forwarding in the pipeline (stall until write-back)")
+    parser.add_argument('--cache', metavar='SPEC', default=None,
+                        help="Simulate caches, e.g. 'l1i=4k:2:32,l1d=8k:4:32:wb:lru,l2=64k:8:64' "
+                             "(size:assoc:block:wb|wt:lru|fifo|random) or 'default' (headless mode)")
+    parser.add_argument('--branch-predictor', metavar='SPEC', default=None,
+                        help="Branch predictor: not-taken, btfn, 1bit[:index_bits], 2bit[:index_bits] "
+                             "or gshare[:history_bits[:index_bits]] (headless mode)")
+    parser.add_argument('--profile', metavar='PATH', default=None,
+                        help="Profile the program and export per-PC counts to PATH (.json for JSON, else CSV) "
+                             "(headless mode)")
+    parser.add_argument('--save-state', metavar='PATH', default=None,
+                        help="Save the final machine state (registers, flags, program, memory) to PATH (headless mode)")
+    parser.add_argument('--load-state', metavar='PATH', default=None,
+                        help="Resume from a saved machine state instead of assembling FILE (headless mode)")
+    parser.add_argument('--batch', metavar='PATH', default=None,
+                        help="Run every .s file in a directory, or the jobs of a JSON manifest, in parallel")
+    parser.add_argument('--fixture', metavar='PATH', default=None,
+                        help="JSON inputs/expectations applied to every batch job")
+    parser.add_argument('--report', metavar='PATH', default=None,
+                        help="Write the batch report to PATH (.json for JSON, else CSV)")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Worker processes for --batch (default: all cores)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Wall-clock limit per program in seconds (headless default: none, batch default: 10)")
+    parser.add_argument('--vector-inputs', metavar='PATH', default=None,
+                        help="Run FILE once per input set in a JSON case list, vectorized with NumPy "
+                             "(headless mode; uses --max-steps, --mem-size, --report)")
+    parser.add_argument('--lockstep', action='store_true',
+                        help="Check the --engine against the step-by-step reference interpreter and report "
+                             "the first divergent instruction (headless mode)")
+    parser.add_argument('--check-interval', type=int, default=None,
+                        help="Instructions between lockstep state comparisons (default: 256)")
+    parser.add_argument('--fuzz', type=int, metavar='N', default=None,
+                        help="Lockstep-check N random programs against the --engine")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="First random seed for --fuzz (default: 0)")
+    parser.add_argument('--trace', metavar='CATEGORIES', default=None,
+                        help="Enable tracing for comma-separated categories "
+                             "(fetch,reg-write,mem,branch,assembler,system,datapath) or 'all'")
+    parser.add_argument('--trace-file', metavar='PATH', default=None,
+                        help="Write trace records to PATH (default: in-memory ring buffer dumped to stderr)")
+    parser.add_argument('--trace-level', choices=('debug', 'info', 'warning', 'error'), default='info',
+                        help="Minimum trace level (default: info)")
+    return parser.parse_args(argv)
+
+
+def configure_tracing(args):
+    """Bật TRACER theo tham số dòng lệnh; trả về sink (hoặc None nếu không trace)."""
+    import tracing
+
+    if not args.trace:
+        return None
+    if args.trace == 'all':
+        categories = tracing.CATEGORIES
+    else:
+        categories = [c.strip() for c in args.trace.split(',') if c.strip()]
+    if args.trace_file:
+        sink = tracing.BufferedFileSink(args.trace_file)
+    else:
+        sink = tracing.RingBufferSink()
+    level = getattr(tracing, args.trace_level.upper())
+    tracing.TRACER.configure(sink, categories, level)
+    return sink
+
+
+def finish_tracing(sink):
+    import tracing
+
+    if sink is None:
+        return
+    tracing.TRACER.disable()
+    if isinstance(sink, tracing.RingBufferSink):
+        for line in sink.lines():
+            print(line, file=sys.stderr)
+    sink.close()
+
+
+def main_headless(args):
+    from headless import run_program, format_report
+
+    assembly_code = None
+    try:
+        if not args.load_state:
+            with open(args.headless, encoding='utf-8') as f:
+                assembly_code = f.read()
+        result = run_program(assembly_code, max_steps=args.max_steps, until_pc=args.until_pc,
+                             engine=args.engine, mem_size=args.mem_size,
+                             memory_image=args.memory_image, record_trace=args.record_trace,
+                             pipeline=args.pipeline, forwarding=not args.no_forwarding,
+                             cache_spec=args.cache, predictor_spec=args.branch_predictor,
+                             profile_path=args.profile, load_state=args.load_state,
+                             save_state=args.save_state, timeout=args.timeout)
+    except (OSError, ValueError) as e: # File không đọc được, lỗi biên dịch, state file hỏng...
+        sys.exit(f"Error: {e}")
+    print(format_report(result))
+    return 1 if result['error'] else 0
+
+
+def main_replay(args):
+    from assembler import assemble
+    from trace_recorder import TraceReader, format_event
+
+    program = None
+    try:
+        if args.headless:
+            with open(args.headless, encoding='utf-8') as f:
+                program = assemble(f.read())
+        reader = TraceReader(args.replay_trace)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Error: {e}")
+    with reader:
+        total = len(reader)
+        start = args.at + total if args.at < 0 else args.at
+        if not 0 <= start < total:
+            sys.exit(f"Error: trace event {args.at} out of range (trace has {total} events)")
+        for i in range(start, min(start + max(args.count, 1), total)):
+            print(format_event(reader, i, program))
+    return 0
+
+
+def main_lockstep(args):
+    from assembler import assemble
+    from lockstep import check_program, DEFAULT_CHECK_INTERVAL
+
+    with open(args.headless, encoding='utf-8') as f:
+        program = assemble(f.read())
+    checker, divergence = check_program(program, engine=args.engine,
+                                        interval=args.check_interval or DEFAULT_CHECK_INTERVAL,
+                                        mem_size=args.mem_size, max_steps=args.max_steps)
+    if divergence is not None:
+        print(divergence.report())
+        return 1
+    print(f"No divergence: {checker.steps} instructions, {checker.checks} checks ({args.engine} engine)")
+    return 0
+
+
+def main_fuzz(args):
+    from lockstep import fuzz, DEFAULT_CHECK_INTERVAL
+
+    failures = fuzz(args.fuzz, seed=args.seed, engine=args.engine,
+                    interval=args.check_interval or DEFAULT_CHECK_INTERVAL)
+    for seed, source, divergence in failures:
+        print(f"--- seed {seed} ---")
+        print(source)
+        print(divergence.report())
+    print(f"{args.fuzz} random programs, {len(failures)} divergent ({args.engine} engine)")
+    return 1 if failures else 0
+
+
+def main_batch(args):
+    from batch import collect_jobs, run_batch, write_report, format_results
+
+    defaults = {'engine': args.engine, 'mem_size': args.mem_size}
+    for key, value in (('max_steps', args.max_steps), ('timeout', args.timeout)):
+        if value is not None:
+            defaults[key] = value
+    try:
+        jobs = collect_jobs(args.batch, fixture=args.fixture, defaults=defaults)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Error: {e}")
+    results = run_batch(jobs, workers=args.jobs,
+                        progress=lambda r: print(f"{r['name']}: {r['status']}", file=sys.stderr))
+    print(format_results(results))
+    if args.report:
+        write_report(results, args.report)
+    return 0 if all(r['passed'] for r in results) else 1
+
+
+def main_vector(args):
+    from batch import collect_cases, run_vector_cases, write_report, format_results, DEFAULT_MAX_STEPS
+
+    try:
+        cases = collect_cases(args.vector_inputs)
+        results = run_vector_cases(args.headless, cases, max_steps=args.max_steps or DEFAULT_MAX_STEPS,
+                                   mem_size=args.mem_size)
+    except (ImportError, OSError, ValueError) as e:
+        sys.exit(f"Error: {e}")
+    print(format_results(results))
+    if args.report:
+        write_report(results, args.report)
+    return 0 if all(r['passed'] for r in results) else 1
+
+
+def main_gui():
+    import tkinter as tk
+    from simulator_gui import SimulatorGUI
 
-if __name__ == "__main__":
     print("Starting LEGv8 Simulator Application...")
     root = tk.Tk()
     app = SimulatorGUI(root)
     root.mainloop()
-    print("LEGv8 Simulator Application Closed.")
\ No newline at end of file
+    print("LEGv8 Simulator Application Closed.")
+    return 0
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        trace_sink = configure_tracing(args)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    try:
+        if args.batch:
+            status = main_batch(args)
+        elif args.fuzz is not None:
+            status = main_fuzz(args)
+        elif args.replay_trace:
+            status = main_replay(args)
+        elif args.headless and args.vector_inputs:
+            status = main_vector(args)
+        elif args.headless and args.lockstep:
+            status = main_lockstep(args)
+        elif args.headless or args.load_state:
+            status = main_headless(args)
+        else:
+            status = main_gui()
+    finally:
+        finish_tracing(trace_sink)
+    sys.exit(status)
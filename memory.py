@@ -0,0 +1,278 @@
+# memory.py
+"""
+Bộ nhớ dữ liệu byte-addressable cho simulator LEGv8.
+- DataMemory: các trang 4 KiB (bytearray) cấp phát lười, phù hợp cho không gian địa chỉ
+  lớn nhưng thưa.
+- MappedDataMemory: toàn bộ bộ nhớ nằm trong một file image được mmap (cho bộ nhớ
+  hàng trăm MB mà không chiếm RAM của Python).
+Mọi load/store đều little-endian, độ rộng 8/4/2/1 byte.
+"""
+import mmap
+import os
+import struct
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT # 4 KiB
+PAGE_MASK = PAGE_SIZE - 1
+
+# struct.Struct theo độ rộng truy cập: (unsigned, signed)
+_UNSIGNED = {8: struct.Struct('<Q'), 4: struct.Struct('<I'), 2: struct.Struct('<H'), 1: struct.Struct('<B')}
+_SIGNED = {8: struct.Struct('<q'), 4: struct.Struct('<i'), 2: struct.Struct('<h'), 1: struct.Struct('<b')}
+_WORD = _UNSIGNED[8]
+
+
+class MemoryAccessError(Exception):
+    """Truy cập bộ nhớ ngoài phạm vi hoặc sai căn chỉnh (alignment)."""
+
+
+class DataMemory:
+    """Bộ nhớ dữ liệu chia trang, trang chỉ được cấp phát khi có lệnh ghi."""
+
+    def __init__(self, size, strict_alignment=False):
+        self.size = size
+        self.strict_alignment = strict_alignment
+        self.pages = {} # {page_index: bytearray(PAGE_SIZE)}
+        self._shared = set() # Trang đang dùng chung với snapshot (copy-on-write)
+        self.watchpoints = [] # [(start, end, access)] - end không tính, access: 'r', 'w', 'rw'
+        self._watched_pages = set()
+        self.watch_hit = None # (addr, width, 'r'/'w') của lần chạm watchpoint gần nhất
+
+    # --- Kiểm tra ---
+    def _check(self, addr, width):
+        if addr < 0 or addr + width > self.size:
+            raise MemoryAccessError(
+                f"Memory access out of range: {addr:#x} (+{width} bytes, memory size {self.size:#x})")
+        if self.strict_alignment and addr % width:
+            raise MemoryAccessError(f"Unaligned {width}-byte access at {addr:#x}")
+
+    def _page_for_write(self, index):
+        page = self.pages.get(index)
+        if page is None:
+            page = self.pages[index] = bytearray(PAGE_SIZE)
+        elif index in self._shared:
+            # Trang còn thuộc về một snapshot -> chép ra trước khi ghi
+            page = self.pages[index] = bytearray(page)
+            self._shared.discard(index)
+        return page
+
+    # --- Load / store ---
+    def load(self, addr, width=8, signed=False):
+        """Đọc 'width' byte tại 'addr' (little-endian)."""
+        self._check(addr, width)
+        off = addr & PAGE_MASK
+        if off + width <= PAGE_SIZE:
+            page = self.pages.get(addr >> PAGE_SHIFT)
+            if page is None:
+                return 0
+            return (_SIGNED if signed else _UNSIGNED)[width].unpack_from(page, off)[0]
+        # Truy cập vắt qua ranh giới trang
+        return int.from_bytes(self.read_block(addr, width), 'little', signed=signed)
+
+    def store(self, addr, width, value):
+        """Ghi 'width' byte thấp của 'value' vào 'addr' (little-endian)."""
+        self._check(addr, width)
+        value &= (1 << (width * 8)) - 1
+        off = addr & PAGE_MASK
+        if off + width <= PAGE_SIZE:
+            _UNSIGNED[width].pack_into(self._page_for_write(addr >> PAGE_SHIFT), off, value)
+        else:
+            self.write_block(addr, value.to_bytes(width, 'little'))
+
+    # --- Watchpoint ---
+    # Chỉ khi có watchpoint, load/store của instance mới bị thay bằng bản có kiểm tra;
+    # bản đó chỉ so khoảng địa chỉ khi trang được truy cập có cờ "được theo dõi".
+    def add_watchpoint(self, start, length=8, access='w'):
+        if access not in ('r', 'w', 'rw'):
+            raise ValueError(f"Invalid watchpoint access '{access}' (use 'r', 'w' or 'rw')")
+        if length < 1:
+            raise ValueError("Watchpoint length must be positive")
+        self.watchpoints.append((start, start + length, access))
+        self._update_watch_hooks()
+
+    def remove_watchpoint(self, start):
+        self.watchpoints = [w for w in self.watchpoints if w[0] != start]
+        self._update_watch_hooks()
+
+    def clear_watchpoints(self):
+        self.watchpoints = []
+        self._update_watch_hooks()
+
+    def _update_watch_hooks(self):
+        self._watched_pages = {page for start, end, _ in self.watchpoints
+                               for page in range(start >> PAGE_SHIFT, ((end - 1) >> PAGE_SHIFT) + 1)}
+        if self.watchpoints:
+            self.load = self._watched_load
+            self.store = self._watched_store
+        else:
+            self.__dict__.pop('load', None)
+            self.__dict__.pop('store', None)
+
+    def _check_watch(self, addr, width, access):
+        end = addr + width
+        for w_start, w_end, w_access in self.watchpoints:
+            if addr < w_end and w_start < end and access in w_access:
+                self.watch_hit = (addr, width, access)
+                return
+
+    def _watched_load(self, addr, width=8, signed=False):
+        value = type(self).load(self, addr, width, signed)
+        pages = self._watched_pages
+        if addr >> PAGE_SHIFT in pages or (addr + width - 1) >> PAGE_SHIFT in pages:
+            self._check_watch(addr, width, 'r')
+        return value
+
+    def _watched_store(self, addr, width, value):
+        type(self).store(self, addr, width, value)
+        pages = self._watched_pages
+        if addr >> PAGE_SHIFT in pages or (addr + width - 1) >> PAGE_SHIFT in pages:
+            self._check_watch(addr, width, 'w')
+
+    # --- Truy cập khối ---
+    def read_block(self, addr, length):
+        """Đọc 'length' byte liên tiếp bắt đầu từ 'addr', trả về bytes."""
+        self._check(addr, length)
+        out = bytearray(length)
+        view = memoryview(out)
+        pos = 0
+        while pos < length:
+            cur = addr + pos
+            off = cur & PAGE_MASK
+            chunk = min(PAGE_SIZE - off, length - pos)
+            page = self.pages.get(cur >> PAGE_SHIFT)
+            if page is not None:
+                view[pos:pos + chunk] = memoryview(page)[off:off + chunk]
+            pos += chunk
+        return bytes(out)
+
+    def write_block(self, addr, data):
+        """Ghi toàn bộ 'data' (bytes-like) bắt đầu từ 'addr'."""
+        data = memoryview(data).cast('B')
+        length = len(data)
+        self._check(addr, length)
+        pos = 0
+        while pos < length:
+            cur = addr + pos
+            off = cur & PAGE_MASK
+            chunk = min(PAGE_SIZE - off, length - pos)
+            piece = data[pos:pos + chunk]
+            page = self.pages.get(cur >> PAGE_SHIFT)
+            if page is not None or any(piece):
+                # Không cấp phát trang chỉ để ghi toàn số 0
+                memoryview(self._page_for_write(cur >> PAGE_SHIFT))[off:off + chunk] = piece
+            pos += chunk
+
+    def clear(self):
+        self.pages = {}
+        self._shared = set()
+
+    # --- Snapshot (copy-on-write) ---
+    def snapshot(self):
+        """
+        Chụp nội dung bộ nhớ mà không chép trang: snapshot giữ chính các bytearray hiện có,
+        còn bộ nhớ sẽ chép một trang ở lần ghi đầu tiên sau đó. Chi phí O(số trang).
+        """
+        self._shared = set(self.pages)
+        return dict(self.pages)
+
+    def restore(self, snapshot):
+        """Quay về nội dung của một snapshot (snapshot vẫn dùng lại được)."""
+        self.pages = dict(snapshot)
+        self._shared = set(self.pages)
+
+    # --- Hiển thị ---
+    def nonzero_words(self):
+        """Sinh (địa chỉ, giá trị) cho mọi word 8 byte (căn 8) khác 0, theo thứ tự địa chỉ."""
+        for index in sorted(self.pages):
+            page = self.pages[index]
+            base = index << PAGE_SHIFT
+            for off, (value,) in enumerate(_WORD.iter_unpack(page)):
+                if value:
+                    yield base + off * 8, value
+
+    def allocated_bytes(self):
+        return len(self.pages) * PAGE_SIZE
+
+    def page_items(self):
+        """(chỉ số trang, nội dung) của các trang đã cấp phát, theo thứ tự địa chỉ."""
+        return sorted(self.pages.items())
+
+
+class MappedDataMemory(DataMemory):
+    """
+    Bộ nhớ dữ liệu nằm trong file image được mmap.
+    File được tạo (hoặc mở rộng) đến 'size' byte; thay đổi được ghi thẳng vào file.
+    """
+
+    def __init__(self, size, image_path, strict_alignment=False):
+        super().__init__(size, strict_alignment)
+        self.image_path = image_path
+        mode = 'r+b' if os.path.exists(image_path) else 'w+b'
+        self._file = open(image_path, mode)
+        if os.fstat(self._file.fileno()).st_size < size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def load(self, addr, width=8, signed=False):
+        self._check(addr, width)
+        return (_SIGNED if signed else _UNSIGNED)[width].unpack_from(self._map, addr)[0]
+
+    def store(self, addr, width, value):
+        self._check(addr, width)
+        _UNSIGNED[width].pack_into(self._map, addr, value & ((1 << (width * 8)) - 1))
+
+    def read_block(self, addr, length):
+        self._check(addr, length)
+        return self._map[addr:addr + length]
+
+    def write_block(self, addr, data):
+        data = memoryview(data).cast('B')
+        self._check(addr, len(data))
+        self._map[addr:addr + len(data)] = data
+
+    def clear(self):
+        zero = bytes(PAGE_SIZE)
+        for base in range(0, self.size, PAGE_SIZE):
+            chunk = min(PAGE_SIZE, self.size - base)
+            self._map[base:base + chunk] = zero[:chunk]
+
+    def snapshot(self):
+        """File image không chia sẻ trang được: chép các trang khác 0 (bytes)."""
+        zero = bytes(PAGE_SIZE)
+        pages = {}
+        for base in range(0, self.size, PAGE_SIZE):
+            block = self._map[base:base + PAGE_SIZE]
+            if block != zero[:len(block)]:
+                pages[base >> PAGE_SHIFT] = block
+        return pages
+
+    def restore(self, snapshot):
+        self.clear()
+        for index, block in snapshot.items():
+            base = index << PAGE_SHIFT
+            self._map[base:base + len(block)] = block
+
+    def nonzero_words(self):
+        zero = bytes(PAGE_SIZE)
+        for base in range(0, self.size - self.size % 8, PAGE_SIZE):
+            chunk = min(PAGE_SIZE, self.size - base) & ~7
+            block = self._map[base:base + chunk]
+            if block == zero[:chunk]:
+                continue # Bỏ qua nhanh các trang toàn 0
+            for off, (value,) in enumerate(_WORD.iter_unpack(block)):
+                if value:
+                    yield base + off * 8, value
+
+    def allocated_bytes(self):
+        return self.size
+
+    def page_items(self):
+        return sorted(self.snapshot().items())
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
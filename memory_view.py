@@ -0,0 +1,180 @@
+# memory_view.py
+import tkinter as tk
+from tkinter import ttk, font, messagebox
+
+BYTES_PER_ROW = 16
+SP_INDEX = 28
+
+FOLLOW_NONE = 'none'
+FOLLOW_SP = 'sp'
+FOLLOW_ACCESS = 'access'
+
+# Printable ASCII for the right-hand column, '.' for everything else
+_ASCII = ''.join(chr(b) if 32 <= b < 127 else '.' for b in range(256))
+
+
+def format_row(addr, data):
+    """One hexdump row: address, 16 hex bytes, ASCII, and the two 64-bit words"""
+    hex_bytes = data.hex(' ')
+    ascii_text = ''.join(_ASCII[b] for b in data)
+    words = ' '.join(f"{int.from_bytes(data[i:i + 8], 'little'):016x}"
+                     for i in range(0, len(data) - 7, 8))
+    return f"{addr:010x}  {hex_bytes[:23]:<23}  {hex_bytes[24:]:<23}  |{ascii_text:<16}|  {words}"
+
+
+class MemoryView:
+    """
+    Virtualized hexdump of the simulator's data memory.
+    Only the rows that fit in the viewport are rendered; the scrollbar maps onto the
+    whole address space. refresh() re-reads the visible rows and rewrites only the
+    rows whose bytes changed since they were last drawn.
+    """
+
+    def __init__(self, parent, simulator):
+        self.simulator = simulator
+        self.top_row = 0          # First row shown in the viewport
+        self.visible_rows = 1
+        self._drawn = {}          # {viewport line: (row index, bytes shown)}
+        self.snapshot = None      # Background worker snapshot drawn instead of the live simulator
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # Toolbar: jump to address + follow mode
+        toolbar = ttk.Frame(self.frame)
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(toolbar, text="Address:").pack(side=tk.LEFT)
+        self.addr_entry = ttk.Entry(toolbar, width=14, font=('Consolas', 10))
+        self.addr_entry.pack(side=tk.LEFT, padx=5)
+        self.addr_entry.bind('<Return>', lambda e: self.jump_to_entry())
+        ttk.Button(toolbar, text="Go", command=self.jump_to_entry, width=4).pack(side=tk.LEFT)
+
+        self.follow = tk.StringVar(value=FOLLOW_NONE)
+        ttk.Label(toolbar, text="Follow:").pack(side=tk.LEFT, padx=(15, 0))
+        for text, value in (("Off", FOLLOW_NONE), ("SP", FOLLOW_SP), ("Last access", FOLLOW_ACCESS)):
+            ttk.Radiobutton(toolbar, text=text, value=value, variable=self.follow,
+                            command=self.refresh).pack(side=tk.LEFT, padx=3)
+
+        body = ttk.Frame(self.frame)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.font = font.Font(family='Consolas', size=10)
+        self.text = tk.Text(body, font=self.font, wrap=tk.NONE,
+                            state=tk.DISABLED, cursor='arrow')
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_configure('accessed', background='#ffe0b0')
+
+        self.text.bind('<Configure>', self._on_resize)
+        self.text.bind('<MouseWheel>', self._on_mousewheel)
+        self.text.bind('<Button-4>', lambda e: self.scroll_rows(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll_rows(3))
+
+    # --- Geometry ---
+    @property
+    def total_rows(self):
+        size = self.simulator.data_memory.size
+        return max(1, (size + BYTES_PER_ROW - 1) // BYTES_PER_ROW)
+
+    def _clamp_top(self, row):
+        return max(0, min(row, self.total_rows - self.visible_rows))
+
+    def _on_resize(self, event=None):
+        rows = max(1, self.text.winfo_height() // self.font.metrics('linespace'))
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self._drawn = {}
+            self.text.config(state=tk.NORMAL)
+            self.text.delete('1.0', tk.END)
+            self.text.insert('1.0', '\n' * (rows - 1))
+            self.text.config(state=tk.DISABLED)
+        self.top_row = self._clamp_top(self.top_row)
+        self.refresh()
+
+    # --- Scrolling ---
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.set_top_row(int(float(args[1]) * self.total_rows))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll_rows(amount)
+
+    def _on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def scroll_rows(self, amount):
+        self.set_top_row(self.top_row + amount)
+
+    def set_top_row(self, row):
+        self.follow.set(FOLLOW_NONE)  # Manual scrolling stops following
+        self.top_row = self._clamp_top(row)
+        self.refresh()
+
+    def jump_to(self, address):
+        """Scroll so that 'address' is on the first visible row"""
+        self.follow.set(FOLLOW_NONE)
+        self.top_row = self._clamp_top(address // BYTES_PER_ROW)
+        self.refresh()
+
+    def jump_to_entry(self):
+        try:
+            address = int(self.addr_entry.get().strip(), 0)
+        except ValueError:
+            messagebox.showerror("Error", "Enter an address such as 0x1000 or 4096.")
+            return
+        if not 0 <= address < self.simulator.data_memory.size:
+            messagebox.showerror("Error", f"Address {address:#x} is outside data memory.")
+            return
+        self.jump_to(address)
+
+    # --- Rendering ---
+    def refresh(self):
+        """Repaint the rows in the viewport whose contents changed since last drawn"""
+        sim = self.simulator
+        snapshot = self.snapshot
+        if snapshot is not None:
+            memory = snapshot['memory']
+            if memory is None:
+                return  # Memory images are not copied into snapshots; redrawn when the run stops
+            registers, last_state = snapshot['registers'], snapshot['last_state']
+        else:
+            memory, registers, last_state = sim.data_memory, sim.registers, sim.last_state
+        access = last_state.get('mem_addr')
+        follow = self.follow.get()
+        target = None
+        if follow == FOLLOW_SP:
+            target = registers[SP_INDEX]
+        elif follow == FOLLOW_ACCESS:
+            target = access
+        if target is not None and 0 <= target < memory.size:
+            self.top_row = self._clamp_top(target // BYTES_PER_ROW)
+
+        first = self.top_row * BYTES_PER_ROW
+        length = min(self.visible_rows * BYTES_PER_ROW, memory.size - first)
+        data = memory.read_block(first, length) if length > 0 else b''
+
+        access_row = access // BYTES_PER_ROW if access is not None else None
+
+        self.text.config(state=tk.NORMAL)
+        for line in range(self.visible_rows):
+            row = self.top_row + line
+            chunk = data[line * BYTES_PER_ROW:(line + 1) * BYTES_PER_ROW]
+            if self._drawn.get(line) == (row, chunk):
+                continue
+            self._drawn[line] = (row, chunk)
+            index = f"{line + 1}.0"
+            self.text.delete(index, f"{line + 1}.end")
+            if chunk:
+                self.text.insert(index, format_row(row * BYTES_PER_ROW, chunk))
+
+        self.text.tag_remove('accessed', '1.0', tk.END)
+        if access_row is not None and self.top_row <= access_row < self.top_row + self.visible_rows:
+            line = access_row - self.top_row + 1
+            self.text.tag_add('accessed', f"{line}.0", f"{line}.end")
+        self.text.config(state=tk.DISABLED)
+
+        total = self.total_rows
+        self.scrollbar.set(self.top_row / total, min(1.0, (self.top_row + self.visible_rows) / total))
@@ -0,0 +1,302 @@
+# pipeline.py
+"""
+Lõi pipeline 5 tầng (IF/ID/EX/MEM/WB) mô phỏng theo từng chu kỳ, dùng chung
+DecodedInstruction và handler với LEGv8_Simplified_Simulator.
+- Mỗi chu kỳ nội dung các thanh ghi pipeline (IF/ID, ID/EX, EX/MEM, MEM/WB) dịch
+  sang tầng kế tiếp; 'stages' là lệnh đang ở IF, ID, EX, MEM, WB trong chu kỳ vừa chạy.
+- Lệnh được thực thi (gọi handler) khi vào tầng EX, theo đúng thứ tự chương trình,
+  nên kết quả kiến trúc luôn giống simulator single-cycle; phần còn lại mô hình timing.
+- Hazard dữ liệu: có forwarding (EX/MEM, MEM/WB -> EX) thì chỉ load-use mới stall
+  1 chu kỳ; không forwarding thì lệnh ở ID chờ đến khi lệnh ghi đã tới WB
+  (ghi nửa đầu, đọc nửa sau chu kỳ). Cờ NZCV được xem như một thanh ghi.
+- Rẽ nhánh: IF dự đoán PC kế tiếp (mặc định không nhảy, hoặc sim.branch_predictor
+  với B/B.cond/CBZ, đích lấy như từ BTB); nhánh được quyết định ở EX, đoán sai ->
+  flush IF và ID (FLUSH_PENALTY chu kỳ).
+Lệnh bị flush chưa từng chạy handler, vì vậy flush() luôn an toàn: bỏ các lệnh
+chưa vào EX và nạp lại từ sim.pc.
+"""
+from collections import deque
+
+from decoder import XZR
+from branch_predictor import PREDICTED_CLASSES
+
+STAGE_NAMES = ('IF', 'ID', 'EX', 'MEM', 'WB')
+FLAGS = 32 # "Thanh ghi" NZCV trong phát hiện hazard
+FLAG_SETTERS = {'ADDS', 'SUBS', 'ANDS', 'ADDIS', 'SUBIS', 'ANDIS'}
+DEFAULT_TIMELINE_CYCLES = 200 # Số chu kỳ gần nhất giữ lại cho GUI
+FLUSH_PENALTY = 2 # Số chu kỳ mất khi flush IF và ID (nhánh quyết định ở EX)
+
+
+class Slot:
+    """Một lệnh trong pipeline kèm thông tin hazard tính sẵn (cache theo PC)."""
+    __slots__ = ('pc', 'decoded', 'srcs', 'dests', 'is_load', 'is_halt', 'predicted')
+
+    def __init__(self, pc, decoded):
+        self.pc = pc
+        self.decoded = decoded
+        self.srcs, self.dests = _operands(decoded) if decoded is not None else ((), ())
+        self.is_load = decoded is not None and decoded.iclass == 'LOAD'
+        self.is_halt = decoded is not None and decoded.iclass == 'HALT'
+        self.predicted = decoded is not None and decoded.iclass in PREDICTED_CLASSES
+
+    @property
+    def label(self):
+        if self.decoded is None:
+            return f"{self.pc:#x} ???"
+        return self.decoded.text.strip() or self.decoded.name
+
+
+def _operands(d):
+    """(thanh ghi nguồn, thanh ghi đích) của một lệnh, bỏ XZR."""
+    iclass = d.iclass
+    if iclass == 'R':
+        srcs = (d.rn,) if d.name in ('LSL', 'LSR') else (d.rn, d.rm)
+    elif iclass in ('I', 'LOAD', 'CBZ', 'BR'):
+        srcs = (d.rn,)
+    elif iclass == 'IW':
+        srcs = (d.rd,) if d.name == 'MOVK' else ()
+    elif iclass == 'STORE':
+        srcs = (d.rn, d.rd)
+    elif iclass == 'BCOND':
+        srcs = (FLAGS,)
+    else:
+        srcs = ()
+    dests = ()
+    if d.signals['RegWrite'] and d.rd != XZR:
+        dests = (d.rd,)
+    if d.name in FLAG_SETTERS:
+        dests += (FLAGS,)
+    return tuple(r for r in srcs if r != XZR), dests
+
+
+class PipelineStats:
+    """Bộ đếm hiệu năng của pipeline."""
+    __slots__ = ('cycles', 'retired', 'stalls', 'flushes', 'squashed', 'branches')
+
+    def __init__(self):
+        self.cycles = 0
+        self.retired = 0 # Lệnh đã ra khỏi WB
+        self.stalls = 0 # Chu kỳ stall do hazard dữ liệu
+        self.flushes = 0 # Số lần flush do rẽ nhánh
+        self.squashed = 0 # Số lệnh bị hủy bởi flush
+        self.branches = 0
+
+    @property
+    def cpi(self):
+        return self.cycles / self.retired if self.retired else 0.0
+
+    @property
+    def flush_cycles(self):
+        """Số chu kỳ mất vì flush (rẽ nhánh đoán sai / BR)."""
+        return self.flushes * FLUSH_PENALTY
+
+    def as_dict(self):
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result['flush_cycles'] = self.flush_cycles
+        result['cpi'] = self.cpi
+        return result
+
+
+class PipelineSimulator:
+    """
+    Chạy chương trình đã nạp trong 'sim' trên pipeline 5 tầng.
+    Trạng thái kiến trúc (registers, flags, bộ nhớ, pc, instruction_count) vẫn nằm
+    trong 'sim'; nếu sim bị thay đổi từ bên ngoài (step/run single-cycle, step back...)
+    thì lần chạy kế tiếp tự flush và nạp lại từ sim.pc.
+    """
+
+    def __init__(self, sim, forwarding=True, timeline_cycles=DEFAULT_TIMELINE_CYCLES):
+        self.sim = sim
+        self.forwarding = forwarding
+        self.timeline = deque(maxlen=timeline_cycles) if timeline_cycles else None
+        self._slots = {}
+        self._program = None
+        self.reset()
+
+    def reset(self):
+        """Làm rỗng pipeline và xóa thống kê (sau reset / nạp chương trình mới)."""
+        self.stats = PipelineStats()
+        if self.timeline is not None:
+            self.timeline.clear()
+        self.flush()
+
+    def flush(self):
+        """Bỏ mọi lệnh trong pipeline, lần fetch kế tiếp bắt đầu từ sim.pc."""
+        sim = self.sim
+        if sim.program is not self._program:
+            self._program = sim.program
+            self._slots = {}
+        self.stages = [None] * 5
+        self.fetch_pc = sim.pc
+        self._if_next = self._id_next = None # PC fetch dự đoán sau lệnh ở IF / ID
+        self._squash = None # 'branch'/'halt': lệnh ở IF/ID của chu kỳ vừa rồi bị hủy ở chu kỳ sau
+        self._fetching = not sim.halted
+        self.finished = sim.halted
+        self.last_event = ''
+        self._synced = (sim.pc, sim.instruction_count)
+
+    def _slot(self, pc):
+        slot = self._slots.get(pc)
+        if slot is None:
+            slot = self._slots[pc] = Slot(pc, self.sim.decode_at(pc))
+        return slot
+
+    def _must_stall(self, consumer, ex, mem):
+        """True nếu 'consumer' (ở ID) chưa thể vào EX ở chu kỳ tới."""
+        srcs = consumer.srcs
+        if not srcs:
+            return False
+        if self.forwarding:
+            # Chỉ load-use: dữ liệu của LOAD có ở cuối tầng MEM
+            return ex is not None and ex.is_load and any(r in srcs for r in ex.dests)
+        for producer in (ex, mem):
+            if producer is not None and any(r in srcs for r in producer.dests):
+                return True
+        return False
+
+    # --- Chạy ---
+    def _sync(self):
+        """Flush nếu sim đã bị thay đổi từ bên ngoài kể từ chu kỳ cuối."""
+        sim = self.sim
+        if sim.program is not self._program or (sim.pc, sim.instruction_count) != self._synced:
+            self.flush()
+
+    def step_cycle(self):
+        """Chạy một chu kỳ. Trả về False nếu pipeline đã xong (HALT đã qua WB)."""
+        self._sync()
+        if self.finished:
+            return False
+        self.sim.stop_reason = None
+        self._advance()
+        return True
+
+    def run(self, max_cycles=None, max_steps=None, until_pc=None):
+        """
+        Chạy đến khi pipeline xong, đã chạy 'max_cycles' chu kỳ hoặc 'max_steps' lệnh,
+        hoặc dừng ở breakpoint/watchpoint/'until_pc' (như simulator.run()).
+        Trả về số chu kỳ đã chạy.
+        """
+        sim = self.sim
+        self._sync()
+        sim.stop_reason = None
+        sim.data_memory.watch_hit = None
+        stops = sim._stop_pcs(until_pc)
+        conditions = sim.breakpoint_conditions
+        cycle_limit = -1 if max_cycles is None else max_cycles
+        step_limit = None if max_steps is None else sim.instruction_count + max_steps
+        cycles = 0
+        advance = self._advance
+        while cycles != cycle_limit and not self.finished:
+            executed = advance()
+            cycles += 1
+            if executed is None:
+                continue
+            if sim.data_memory.watch_hit is not None:
+                sim.stop_reason = 'watchpoint'
+                break
+            if step_limit is not None and sim.instruction_count >= step_limit:
+                break
+            if sim.pc in stops and not sim.halted and sim._breaks_at(sim.pc, until_pc, conditions):
+                break
+        return cycles
+
+    def _advance(self):
+        """Dịch pipeline một chu kỳ; trả về Slot vừa thực thi ở EX (hoặc None)."""
+        sim = self.sim
+        stats = self.stats
+        if_slot, id_slot, ex_slot, mem_slot, _ = self.stages
+        event = ''
+        if self._squash is not None:
+            if self._squash == 'branch':
+                stats.squashed += (id_slot is not None) + (if_slot is not None)
+            if_slot = id_slot = None
+            self._if_next = self._id_next = None
+            self._squash = None
+
+        stall = id_slot is not None and self._must_stall(id_slot, ex_slot, mem_slot)
+        if stall:
+            stats.stalls += 1
+            new_ex = None
+            new_id = id_slot
+            new_if = if_slot
+            event = f"stall ({'load-use' if self.forwarding else 'data'} hazard)"
+        else:
+            new_ex = id_slot
+            new_id = if_slot
+            new_if = None
+            ex_next = self._id_next
+            self._id_next = self._if_next
+            self._if_next = None
+            if self._fetching:
+                pc = self.fetch_pc
+                new_if = self._slot(pc)
+                predictor = sim.branch_predictor
+                if (predictor is not None and new_if.predicted
+                        and predictor.predict(pc, new_if.decoded.target)):
+                    self.fetch_pc = self._if_next = new_if.decoded.target
+                else:
+                    self.fetch_pc = pc + 4
+        self.stages = [new_if, new_id, new_ex, ex_slot, mem_slot]
+        stats.cycles += 1
+        if mem_slot is not None:
+            stats.retired += 1
+            if mem_slot.is_halt:
+                self.finished = True
+
+        if new_ex is not None:
+            event = self._execute(new_ex, ex_next) or event
+        self.last_event = event
+        self._synced = (sim.pc, sim.instruction_count)
+        if self.timeline is not None:
+            self.timeline.append((stats.cycles, tuple(self.stages), event))
+        return new_ex
+
+    def _execute(self, slot, predicted_next):
+        """
+        Thực thi lệnh ở tầng EX ('predicted_next': PC đã fetch sau nó, None = pc+4);
+        trả về mô tả sự kiện (flush/halt) hoặc ''.
+        """
+        sim = self.sim
+        decoded = slot.decoded
+        pc = slot.pc
+        if decoded is None:
+            # Lệnh ngoài bộ nhớ chương trình đi tới EX: dừng như simulator
+            sim.halted = True
+            sim.last_state = {'halted': True, 'pc': pc, 'error': 'Invalid PC'}
+            self._stop_fetch()
+            self.finished = True
+            return "invalid PC"
+        sim._mem_addr = None
+        if sim.history is not None:
+            sim.history.before_execute(pc, decoded)
+            try:
+                next_pc = decoded.handler(sim, decoded, pc)
+            except Exception:
+                sim.history.discard_last()
+                raise
+        else:
+            next_pc = decoded.handler(sim, decoded, pc)
+        sim.instruction_count += 1
+        if sim.observing:
+            sim._observe(pc, decoded, next_pc)
+        if sim.halted:
+            self._stop_fetch()
+            return "halt"
+        sim.pc = next_pc
+        signals = decoded.signals
+        if signals['Branch'] or signals['UncondBranch']:
+            self.stats.branches += 1
+        expected = pc + 4 if predicted_next is None else predicted_next
+        if slot.predicted and sim.branch_predictor is not None:
+            sim.branch_predictor.update(pc, next_pc != pc + 4, expected != pc + 4)
+        if next_pc != expected:
+            # Đoán sai: lệnh ở IF và ID là nhánh sai
+            self.stats.flushes += 1
+            self._squash = 'branch'
+            self.fetch_pc = next_pc
+            return f"flush -> {next_pc:#x}"
+        return ''
+
+    def _stop_fetch(self):
+        self._fetching = False
+        self._squash = 'halt'
@@ -0,0 +1,136 @@
+# profiler.py
+"""
+Profiler cho chương trình LEGv8 đang chạy.
+Khi chạy chỉ ghi hai mảng đếm cấp phát sẵn, đánh chỉ số (pc - base_pc) / 4:
+số lần thực thi và số lần rẽ nhánh thực sự nhảy. Mọi thống kê khác (instruction
+mix, taken/not-taken, lưu lượng bộ nhớ theo dòng) được suy ra khi lập báo cáo,
+từ số đếm và lệnh đã giải mã. Không gắn profiler thì không tốn gì.
+"""
+import csv
+import json
+from array import array
+
+from decoder import MEM_ACCESS_WIDTH, decode_word
+
+BRANCH_CLASSES = frozenset(('B', 'BL', 'BR', 'CBZ', 'BCOND'))
+CSV_COLUMNS = ('pc', 'line', 'instruction', 'class', 'count', 'taken', 'not_taken', 'mem_bytes', 'source')
+
+
+class Profiler:
+    """Số đếm theo PC cho 'program' (program.Program); gắn qua sim.attach_profiler()."""
+
+    def __init__(self, program):
+        self.load(program)
+
+    def load(self, program):
+        """Dùng cho chương trình mới: cấp phát lại mảng đếm theo kích thước chương trình."""
+        self.program = program
+        self.base_pc = program.base_pc
+        self.counts = array('Q', [0]) * len(program)
+        self.taken = array('Q', [0]) * len(program)
+
+    def clear(self):
+        """Đặt mọi số đếm về 0 (giữ chương trình)."""
+        self.load(self.program)
+
+    def record(self, pc, next_pc):
+        i = (pc - self.base_pc) >> 2
+        self.counts[i] += 1
+        if next_pc != pc + 4:
+            self.taken[i] += 1
+
+    # --- Báo cáo ---
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def line_counts(self):
+        """{số dòng nguồn: số lần thực thi} cho các dòng đã chạy (dùng cho heat map)."""
+        lines = self.program.lines
+        result = {}
+        for i, count in enumerate(self.counts):
+            if count:
+                result[lines[i]] = result.get(lines[i], 0) + count
+        return result
+
+    def rows(self):
+        """Một dict cho mỗi lệnh đã chạy ít nhất một lần, theo thứ tự PC."""
+        program = self.program
+        rows = []
+        for i, count in enumerate(self.counts):
+            if not count:
+                continue
+            pc = self.base_pc + i * 4
+            try:
+                decoded = decode_word(program.words[i], pc)
+                name, iclass = decoded.name, decoded.iclass
+            except ValueError:
+                name = iclass = '???'
+            taken = self.taken[i] if iclass in BRANCH_CLASSES else 0
+            rows.append({
+                'pc': pc,
+                'line': program.lines[i],
+                'instruction': name,
+                'class': iclass,
+                'count': count,
+                'taken': taken,
+                'not_taken': count - taken if iclass in BRANCH_CLASSES else 0,
+                'mem_bytes': count * MEM_ACCESS_WIDTH.get(name, 0),
+                'source': program.text_at(pc).strip(),
+            })
+        return rows
+
+    def report(self, rows=None):
+        """Báo cáo đầy đủ: tổng số lệnh, instruction mix, nhánh, lưu lượng bộ nhớ theo dòng, theo PC."""
+        rows = self.rows() if rows is None else rows
+        mix = {}
+        memory_by_line = {}
+        loads = stores = 0
+        for row in rows:
+            mix[row['class']] = mix.get(row['class'], 0) + row['count']
+            if row['mem_bytes']:
+                traffic = memory_by_line.setdefault(row['line'], {'loads': 0, 'stores': 0, 'bytes': 0})
+                if row['class'] == 'STORE':
+                    traffic['stores'] += row['count']
+                    stores += row['count']
+                else:
+                    traffic['loads'] += row['count']
+                    loads += row['count']
+                traffic['bytes'] += row['mem_bytes']
+        return {
+            'instructions': sum(row['count'] for row in rows),
+            'mix': dict(sorted(mix.items(), key=lambda item: -item[1])),
+            'branches': [{'pc': row['pc'], 'line': row['line'], 'count': row['count'],
+                          'taken': row['taken'], 'not_taken': row['not_taken']}
+                         for row in rows if row['class'] in BRANCH_CLASSES],
+            'memory': {'loads': loads, 'stores': stores,
+                       'by_line': dict(sorted(memory_by_line.items()))},
+            'pcs': rows,
+        }
+
+    def hot_spots(self, top=5):
+        """Các dòng chạy nhiều nhất: [(số dòng, số lần, tỉ lệ)]."""
+        counts = self.line_counts()
+        total = sum(counts.values()) or 1
+        hottest = sorted(counts.items(), key=lambda item: -item[1])[:top]
+        return [(line, count, count / total) for line, count in hottest]
+
+    # --- Xuất file ---
+    def export_csv(self, path):
+        """Ghi số đếm theo PC ra CSV (một dòng cho mỗi lệnh đã chạy)."""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            for row in self.rows():
+                writer.writerow(row)
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def export(self, path):
+        """Xuất JSON nếu 'path' kết thúc bằng .json, ngược lại CSV."""
+        if path.lower().endswith('.json'):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
@@ -0,0 +1,94 @@
+# program.py
+"""
+Ảnh chương trình đã biên dịch: mã máy 32-bit nằm liên tiếp trong array('I'),
+kèm mảng song song số dòng nguồn cho từng lệnh.
+"""
+from array import array
+from collections.abc import Mapping
+
+
+class PcLineMap(Mapping):
+    """View {pc: line_number} chỉ đọc trên mảng số dòng của Program (không tạo dict)."""
+
+    def __init__(self, program):
+        self._program = program
+
+    def __getitem__(self, pc):
+        line = self._program.line_for_pc(pc)
+        if line is None:
+            raise KeyError(pc)
+        return line
+
+    def __contains__(self, pc):
+        return pc in self._program
+
+    def __iter__(self):
+        return iter(self._program.pcs())
+
+    def __len__(self):
+        return len(self._program)
+
+
+class Program:
+    """Chương trình LEGv8 đã biên dịch, bắt đầu tại 'base_pc'."""
+    __slots__ = ('base_pc', 'words', 'lines', 'source_lines', 'label_to_pc_map', 'warnings')
+
+    def __init__(self, base_pc=0, words=None, lines=None, source_lines=None,
+                 label_to_pc_map=None, warnings=None):
+        self.base_pc = base_pc
+        self.words = words if words is not None else array('I')   # Mã máy 32-bit
+        self.lines = lines if lines is not None else array('I')   # Số dòng nguồn (1-based) theo lệnh
+        self.source_lines = source_lines if source_lines is not None else []
+        self.label_to_pc_map = label_to_pc_map if label_to_pc_map is not None else {}
+        self.warnings = warnings if warnings is not None else []
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, pc):
+        offset = pc - self.base_pc
+        return 0 <= offset < len(self.words) * 4 and not offset & 3
+
+    @property
+    def end_pc(self):
+        return self.base_pc + len(self.words) * 4
+
+    @property
+    def pc_to_line_map(self):
+        return PcLineMap(self)
+
+    def pcs(self):
+        return range(self.base_pc, self.end_pc, 4)
+
+    def index_of(self, pc):
+        return (pc - self.base_pc) >> 2
+
+    def word_at(self, pc):
+        """Mã máy tại 'pc', hoặc None nếu 'pc' nằm ngoài chương trình."""
+        if pc not in self:
+            return None
+        return self.words[(pc - self.base_pc) >> 2]
+
+    def line_for_pc(self, pc):
+        if pc not in self:
+            return None
+        return self.lines[(pc - self.base_pc) >> 2]
+
+    def pc_for_line(self, line_number):
+        """PC của lệnh đầu tiên ở dòng 'line_number' hoặc sau đó, None nếu không có."""
+        lines = self.lines
+        lo, hi = 0, len(lines)
+        while lo < hi: # Số dòng tăng dần theo PC -> tìm nhị phân
+            mid = (lo + hi) // 2
+            if lines[mid] < line_number:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.base_pc + lo * 4 if lo < len(lines) else None
+
+    def text_at(self, pc):
+        """Dòng nguồn (nguyên bản) của lệnh tại 'pc'."""
+        line = self.line_for_pc(pc)
+        if line is None or line > len(self.source_lines):
+            return ''
+        return self.source_lines[line - 1]
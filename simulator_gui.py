@@ -1,10 +1,34 @@
 # simulator_gui.py
+import math
+import time
 import tkinter as tk
 from tkinter import ttk, scrolledtext, font, messagebox
 from datapath_visualizer import DatapathVisualizer
+from memory_view import MemoryView
 from legv8_simulator import LEGv8_Simplified_Simulator
-from assembler import placeholder_assembler
+from assembler import assemble
+from worker import SimulationWorker
+from pipeline import PipelineSimulator, STAGE_NAMES
+from cache import parse_cache_spec, DEFAULT_CACHE_SPEC
+from branch_predictor import PREDICTORS, make_predictor
+from profiler import Profiler
 
+# Upper bound for "Run to Cursor" so a program that never reaches the cursor can't hang the GUI
+RUN_TO_CURSOR_LIMIT = 5_000_000
+
+# Continuous Run mode
+FRAME_MS = 33                 # Target frame time (~30 display updates per second)
+RUN_BUDGET_FRACTION = 0.6     # Share of each frame spent executing; the rest is left to Tk
+MIN_BATCH, MAX_BATCH = 1, 2_000_000
+ANIMATED_MAX_RATE = 4         # At or below this many instructions/s, Run animates every step
+MAX_RUN_SPEED = 7             # Run speed slider is log10(instructions/s); the top means "as fast as possible"
+WORKER_POLL_MS = 50           # How often the GUI picks up the background worker's newest snapshot
+
+# Profiler heat map: light to dark red, chosen on a log scale of each line's execution count
+HEAT_COLORS = ('#fff5f0', '#fee0d2', '#fcbba1', '#fc9272', '#fb6a4a', '#ef3b2c', '#cb181d', '#a50f15')
+
+# Pipeline view
+PIPELINE_RUN_LIMIT = 5_000_000  # Cycle cap for "Run Pipeline" so an endless loop can't hang the GUI
 
 
 class SimulatorGUI:
@@ -29,11 +53,21 @@ class SimulatorGUI:
         
         # Initialize simulator and visualizer
         self.simulator = LEGv8_Simplified_Simulator()
+        self.simulator.enable_history() # Step Back: undo log while stepping, snapshots only while running
+        self.simulator.enable_block_engine()  # run() (Run, Run to Cursor, worker) executes translated blocks
         self.visualizer = None
         self.pc_map = {}
         self.current_highlight_tag = "highlight"
+        self.breakpoint_lines = set()  # Source lines with a breakpoint (mapped to PCs on load)
         self.is_paused = False
         self.animation_speed = 400  # Default animation speed
+        self.running = False        # Continuous Run mode active
+        self._run_after_id = None
+        self._run_batch = 64        # Instructions per frame, adapted to hit FRAME_MS
+        self.worker = SimulationWorker(self.simulator)  # Runs "Max" speed off the Tk thread
+        self._snapshot = None       # Worker snapshot being shown while a background run is active
+        self.pipeline = PipelineSimulator(self.simulator)  # 5-stage core for the Pipeline tab
+        self._pipeline_shown = None  # Newest timeline entry shown in the pipeline table
         
         self.setup_gui()
         self.update_display()
@@ -56,12 +90,23 @@ class SimulatorGUI:
         )
         asm_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
+        # Breakpoint gutter: click next to a line to toggle a breakpoint
+        self.gutter = tk.Canvas(
+            asm_frame, width=18, bg='#e0e0e0',
+            highlightthickness=0, cursor='hand2'
+        )
+        self.gutter.pack(side=tk.LEFT, fill=tk.Y)
+        self.gutter.bind('<Button-1>', self.on_gutter_click)
+        
         self.asm_text = scrolledtext.ScrolledText(
             asm_frame, wrap=tk.WORD, height=25,
             font=('Consolas', 11), relief=tk.SOLID, borderwidth=1,
             padx=10, pady=10
         )
-        self.asm_text.pack(fill=tk.BOTH, expand=True)
+        self.asm_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.asm_text.config(yscrollcommand=self._on_asm_scroll)
+        self.asm_text.bind('<KeyRelease>', lambda e: self.redraw_gutter())
+        self.asm_text.bind('<Configure>', lambda e: self.redraw_gutter())
         
         # Add sample code
         sample_code = """// LEGv8 Assembly Code
@@ -84,6 +129,12 @@ END:
             background='yellow', 
             foreground='black'
         )
+        self.asm_text.tag_configure('breakpoint', background='#ffd6d6')
+        self.asm_text.tag_raise(self.current_highlight_tag)
+        for level, color in enumerate(HEAT_COLORS):
+            self.asm_text.tag_configure(f'heat{level}', background=color)
+            self.asm_text.tag_lower(f'heat{level}')  # Below the current-line and breakpoint tags
+        self._heat_levels = {}  # {line: heat level} currently painted
         
         # Control buttons frame
         control_frame = ttk.Frame(left_panel, style='TFrame')
@@ -102,6 +153,12 @@ END:
         )
         self.step_btn.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
         
+        self.step_back_btn = ttk.Button(
+            control_frame, text="Step Back", 
+            command=self.do_step_back, state=tk.DISABLED, width=10
+        )
+        self.step_back_btn.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        
         self.reset_btn = ttk.Button(
             control_frame, text="Reset", 
             command=self.do_reset, state=tk.DISABLED, width=8
@@ -139,6 +196,50 @@ END:
         )
         self.pause_btn.pack(pady=(10, 0))
         
+        # Run / Stop
+        run_frame = ttk.Frame(exec_frame)
+        run_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        self.run_btn = ttk.Button(
+            run_frame, text="Run", 
+            command=self.do_run, state=tk.DISABLED, width=8
+        )
+        self.run_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.stop_btn = ttk.Button(
+            run_frame, text="Stop", 
+            command=self.do_stop, state=tk.DISABLED, width=8
+        )
+        self.stop_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(run_frame, text="Run speed:").pack(side=tk.LEFT)
+        self.run_speed_scale = ttk.Scale(
+            run_frame, from_=0, to=MAX_RUN_SPEED, 
+            command=self._update_run_speed_label
+        )
+        self.run_speed_scale.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+        self.run_speed_label = ttk.Label(run_frame, text="", width=10)
+        self.run_speed_label.pack(side=tk.LEFT)
+        self.run_speed_scale.set(MAX_RUN_SPEED)
+        
+        self.run_back_btn = ttk.Button(
+            exec_frame, text="Run Back to Breakpoint", 
+            command=self.do_run_back, state=tk.DISABLED
+        )
+        self.run_back_btn.pack(pady=(5, 0))
+        
+        self.run_to_cursor_btn = ttk.Button(
+            exec_frame, text="Run to Cursor", 
+            command=self.do_run_to_cursor, state=tk.DISABLED
+        )
+        self.run_to_cursor_btn.pack(pady=(5, 0))
+        
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            exec_frame, text="Profile (heat map)", 
+            variable=self.profile_var, command=self.toggle_profiler
+        ).pack(anchor=tk.W, pady=(5, 0))
+        
         # Animation speed control
         speed_frame = ttk.Frame(exec_frame)
         speed_frame.pack(fill=tk.X, pady=(10, 0))
@@ -161,7 +262,7 @@ END:
         # Register table
         self.reg_table = ttk.Treeview(
             reg_frame, columns=('hex', 'decimal'), 
-            show='headings', height=12
+            show='tree headings', height=12
         )
         self.reg_table.heading('#0', text='REGISTER')
         self.reg_table.heading('hex', text='HEX')
@@ -183,6 +284,14 @@ END:
         reg_frame.grid_rowconfigure(0, weight=1)
         reg_frame.grid_columnconfigure(0, weight=1)
         
+        self.reg_table.tag_configure('changed', background='#fff3a0')
+        
+        # Rows are created once with stable ids ("X0".."X31") and updated in place
+        self._reg_values = [None] * len(self.simulator.registers)
+        self._changed_regs = set()
+        for i in range(len(self.simulator.registers)):
+            self.reg_table.insert('', 'end', iid=f"X{i}", text=f"X{i}", values=('', ''))
+        
         # Right panel - Datapath and tabs
         right_panel = ttk.Frame(main_frame, style='TFrame')
         right_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -190,6 +299,7 @@ END:
         # Notebook for tabs
         notebook = ttk.Notebook(right_panel)
         notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook = notebook
         
         # Datapath tab
         datapath_tab = ttk.Frame(notebook)
@@ -211,25 +321,138 @@ END:
         memory_tab = ttk.Frame(notebook)
         notebook.add(memory_tab, text="Memory")
         
-        self.mem_text = scrolledtext.ScrolledText(
-            memory_tab, wrap=tk.WORD, 
-            font=('Consolas', 10), state=tk.DISABLED
-        )
-        self.mem_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.memory_view = MemoryView(memory_tab, self.simulator)
         
         # CPU State tab
         cpu_tab = ttk.Frame(notebook)
         notebook.add(cpu_tab, text="CPU State")
         
+        self.cpu_text = tk.Text(
+            cpu_tab, font=('Consolas', 10), 
+            state=tk.DISABLED, height=10
+        )
+        self.cpu_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
         # Control Signals tab
         ctrl_tab = ttk.Frame(notebook)
         notebook.add(ctrl_tab, text="Control Signals")
         
+        self.ctrl_table = ttk.Treeview(
+            ctrl_tab, columns=('value',), 
+            show='tree headings', height=10
+        )
+        self.ctrl_table.heading('#0', text='SIGNAL')
+        self.ctrl_table.heading('value', text='VALUE')
+        self.ctrl_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Pipeline tab: 5-stage core stepped one cycle at a time
+        pipeline_tab = ttk.Frame(notebook)
+        notebook.add(pipeline_tab, text="Pipeline")
+        
+        pipe_toolbar = ttk.Frame(pipeline_tab)
+        pipe_toolbar.pack(fill=tk.X, padx=5, pady=5)
+        self.cycle_btn = ttk.Button(
+            pipe_toolbar, text="Step Cycle", 
+            command=self.do_step_cycle, state=tk.DISABLED
+        )
+        self.cycle_btn.pack(side=tk.LEFT, padx=(0, 5))
+        self.pipeline_run_btn = ttk.Button(
+            pipe_toolbar, text="Run Pipeline", 
+            command=self.do_run_pipeline, state=tk.DISABLED
+        )
+        self.pipeline_run_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.forwarding_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            pipe_toolbar, text="Forwarding", 
+            variable=self.forwarding_var, command=self.toggle_forwarding
+        ).pack(side=tk.LEFT)
+        ttk.Label(pipe_toolbar, text="Predictor:").pack(side=tk.LEFT, padx=(10, 0))
+        self.predictor_var = tk.StringVar(value='none')
+        predictor_box = ttk.Combobox(
+            pipe_toolbar, textvariable=self.predictor_var, 
+            values=('none',) + tuple(PREDICTORS), state='readonly', width=10
+        )
+        predictor_box.pack(side=tk.LEFT, padx=5)
+        predictor_box.bind('<<ComboboxSelected>>', lambda e: self.select_predictor())
+        self.pipeline_stats_label = ttk.Label(pipe_toolbar, text="", font=('Consolas', 10))
+        self.pipeline_stats_label.pack(side=tk.LEFT, padx=(15, 0))
+        
+        # One row per cycle: what each stage holds and what happened
+        self.pipeline_table = ttk.Treeview(
+            pipeline_tab, columns=STAGE_NAMES + ('event',), 
+            show='tree headings', height=10
+        )
+        self.pipeline_table.heading('#0', text='CYCLE')
+        self.pipeline_table.column('#0', width=70, anchor=tk.E)
+        for stage in STAGE_NAMES:
+            self.pipeline_table.heading(stage, text=stage)
+            self.pipeline_table.column(stage, width=140, anchor=tk.W)
+        self.pipeline_table.heading('event', text='EVENT')
+        self.pipeline_table.column('event', width=160, anchor=tk.W)
+        self.pipeline_table.tag_configure('stall', background='#ffe0b0')
+        self.pipeline_table.tag_configure('flush', background='#ffd6d6')
+        pipe_vsb = ttk.Scrollbar(pipeline_tab, orient="vertical", command=self.pipeline_table.yview)
+        self.pipeline_table.configure(yscrollcommand=pipe_vsb.set)
+        pipe_vsb.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+        self.pipeline_table.pack(fill=tk.BOTH, expand=True, padx=(5, 0), pady=5)
+        
+        # Caches tab: optional cache model in front of fetch and data memory
+        cache_tab = ttk.Frame(notebook)
+        notebook.add(cache_tab, text="Caches")
+        
+        cache_toolbar = ttk.Frame(cache_tab)
+        cache_toolbar.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(cache_toolbar, text="Config:").pack(side=tk.LEFT)
+        self.cache_spec_entry = ttk.Entry(cache_toolbar, width=50, font=('Consolas', 10))
+        self.cache_spec_entry.insert(0, DEFAULT_CACHE_SPEC)
+        self.cache_spec_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.cache_spec_entry.bind('<Return>', lambda e: self.apply_cache_config())
+        ttk.Button(cache_toolbar, text="Enable", command=self.apply_cache_config).pack(side=tk.LEFT)
+        ttk.Button(cache_toolbar, text="Disable", command=self.disable_caches).pack(side=tk.LEFT, padx=(5, 0))
+        
+        cache_columns = ('config', 'accesses', 'hits', 'misses', 'miss_rate', 'evictions', 'writebacks', 'amat')
+        self.cache_table = ttk.Treeview(
+            cache_tab, columns=cache_columns, 
+            show='tree headings', height=4
+        )
+        self.cache_table.heading('#0', text='CACHE')
+        self.cache_table.column('#0', width=60, anchor=tk.W)
+        for column, heading, width in zip(
+                cache_columns,
+                ('CONFIG', 'ACCESSES', 'HITS', 'MISSES', 'MISS %', 'EVICTIONS', 'WRITEBACKS', 'AMAT'),
+                (230, 90, 90, 80, 70, 90, 100, 70)):
+            self.cache_table.heading(column, text=heading)
+            self.cache_table.column(column, width=width, anchor=tk.W if column == 'config' else tk.E)
+        self.cache_table.pack(fill=tk.X, padx=5, pady=5)
+        self.cache_amat_label = ttk.Label(cache_tab, text="Caches disabled.", font=('Consolas', 10))
+        self.cache_amat_label.pack(anchor=tk.W, padx=5)
+        
+        # Panels on notebook tabs are only refreshed while visible;
+        # hidden ones are marked dirty and refreshed when their tab is selected
+        self._tab_refreshers = {
+            str(memory_tab): self.update_memory_display,
+            str(cpu_tab): self.update_cpu_state,
+            str(ctrl_tab): self.update_control_signals,
+            str(pipeline_tab): self.update_pipeline_view,
+            str(cache_tab): self.update_cache_stats,
+        }
+        self._dirty_tabs = set(self._tab_refreshers)
+        notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+        
         # Initialize register table
         self.update_register_table()
 
     def toggle_pause(self):
         """Toggle pause state of the simulation"""
+        if self.worker.is_running:
+            # Background run: pause/resume the worker itself
+            if self.worker.is_paused:
+                self.worker.resume()
+                self.pause_btn.config(text="Pause")
+            else:
+                self.worker.pause()
+                self.pause_btn.config(text="Resume")
+            return
         self.is_paused = not self.is_paused
         if self.is_paused:
             self.pause_btn.config(text="Resume")
@@ -250,6 +473,7 @@ END:
 
     def assemble_and_load(self):
         """Assemble and load the program into simulator"""
+        self.do_stop()
         assembly_code = self.asm_text.get("1.0", tk.END)
 
         if not assembly_code.strip():
@@ -257,29 +481,33 @@ END:
             return
 
         try:
-            instruction_mem, pc_map, label_map = placeholder_assembler(assembly_code)
+            program = assemble(assembly_code)
 
-            if not instruction_mem:
+            if not len(program):
                 messagebox.showinfo("Info", "No executable instructions.")
-                self.simulator.load_program({}, {})
+                self.simulator.load_program(None)
                 self.pc_map = {}
                 self.visualizer.draw_static_datapath()
                 self.do_reset(reload_assembly=False)
                 return
 
-            self.simulator.load_program(instruction_mem, label_map)
-            self.pc_map = pc_map
+            self.simulator.load_program(program)
+            self.pc_map = program.pc_to_line_map
+            self._sync_breakpoints()
             self.visualizer.draw_static_datapath()
             self.do_reset(reload_assembly=False)
 
             # Enable pause button
             self.pause_btn.config(state=tk.NORMAL)
             
-            messagebox.showinfo("Success", f"{len(instruction_mem)} instructions loaded.")
+            message = f"{len(program)} instructions loaded."
+            if program.warnings:
+                message += "\n\nWarnings:\n" + "\n".join(program.warnings)
+            messagebox.showinfo("Success", message)
 
         except Exception as e:
             messagebox.showerror("Error", f"Assembly error:\n{e}")
-            self.simulator.load_program({}, {})
+            self.simulator.load_program(None)
             self.pc_map = {}
             if self.visualizer:
                 self.visualizer.reset_datapath_visualization()
@@ -327,9 +555,404 @@ END:
             self.update_display()
             self._update_button_states()
 
+    # --- Continuous Run mode ---
+    def _run_rate(self):
+        """Target instructions per second, or None for unlimited"""
+        value = float(self.run_speed_scale.get())
+        if value >= MAX_RUN_SPEED - 0.01:
+            return None
+        return 10 ** value
+
+    def _update_run_speed_label(self, value=None):
+        rate = self._run_rate()
+        self.run_speed_label.config(text="Max" if rate is None else f"{rate:,.0f}/s")
+
+    def do_run(self):
+        """
+        Start continuous execution. At "Max" speed the simulator runs on the
+        background worker; slower speeds are paced from master.after()
+        """
+        if self.running or self.simulator.halted or not len(self.simulator.program):
+            return
+        self.running = True
+        self._update_button_states()
+        if self._run_rate() is None:
+            if self.visualizer:
+                self.visualizer.reset_datapath_visualization()
+            self.worker.start()
+            self._run_after_id = self.master.after(WORKER_POLL_MS, self._poll_worker)
+        else:
+            self._run_batch = 64
+            self._run_tick()
+
+    def do_stop(self):
+        """Stop continuous execution"""
+        if not self.running:
+            return
+        self.running = False
+        if self._run_after_id is not None:
+            self.master.after_cancel(self._run_after_id)
+            self._run_after_id = None
+        if self.worker.is_running:
+            self.worker.stop()
+            self.worker.latest_snapshot()  # Discard; the simulator itself is now idle
+            self.pause_btn.config(text="Pause")
+            self.highlight_assembly_line(self.simulator.pc)
+            self.update_display()
+        self._update_button_states()
+
+    def _poll_worker(self):
+        """Render the newest snapshot published by the background worker"""
+        self._run_after_id = None
+        snapshot = self.worker.latest_snapshot()
+        if snapshot is not None:
+            if snapshot['running']:
+                self.update_display(snapshot)
+            else:
+                # Final snapshot: wait for the thread to exit, then show the live simulator
+                self.worker.stop()
+                self.running = False
+                self.pause_btn.config(text="Pause")
+                self.highlight_assembly_line(snapshot['pc'])
+                self.update_display()
+                self._update_button_states()
+                if snapshot['error']:
+                    messagebox.showerror("Error", f"Runtime error:\n{snapshot['error']}")
+                else:
+                    self._report_stop()
+                return
+        if self.running:
+            self._run_after_id = self.master.after(WORKER_POLL_MS, self._poll_worker)
+
+    def _run_tick(self):
+        """Execute one frame's worth of instructions, then refresh the display once"""
+        self._run_after_id = None
+        if not self.running:
+            return
+        sim = self.simulator
+        rate = self._run_rate()
+        try:
+            if rate is not None and rate <= ANIMATED_MAX_RATE:
+                # Slow speeds: one animated instruction per tick, like pressing Step
+                state = sim.step()
+                self.highlight_assembly_line(state.get('pc'))
+                if self.visualizer:
+                    self.visualizer.update_datapath_visualization(state)
+                self.update_display()
+                if not sim.halted and sim.should_break(sim.pc):
+                    sim.stop_reason = 'breakpoint'
+                delay = int(1000 / rate)
+            else:
+                delay = self._run_frame(rate)
+        except Exception as e:
+            self.do_stop()
+            messagebox.showerror("Error", f"Runtime error:\n{e}")
+            sim.halted = True
+            self.update_display()
+            self._update_button_states()
+            return
+
+        if sim.halted or sim.stop_reason:
+            self.do_stop()
+            self._report_stop()
+            return
+        self._run_after_id = self.master.after(delay, self._run_tick)
+
+    def _run_frame(self, rate):
+        """Batch mode: run an adaptively sized batch, return the delay to the next frame (ms)"""
+        sim = self.simulator
+        budget_ms = FRAME_MS * RUN_BUDGET_FRACTION
+        batch = self._run_batch
+        if rate is not None:
+            batch = min(batch, max(1, int(rate * FRAME_MS / 1000)))
+
+        start = time.perf_counter()
+        # All but the last instruction run without building state dicts;
+        # the last one goes through step() so the datapath shows what just executed
+        sim.stop_reason = None
+        if batch > 1:
+            sim.run(max_steps=batch - 1)
+        state = None
+        if not sim.halted and not sim.stop_reason:
+            state = sim.step()
+            if not sim.halted and sim.should_break(sim.pc):
+                sim.stop_reason = 'breakpoint'
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        # Adapt the batch so execution takes about budget_ms (grow/shrink at most 2x per frame)
+        if elapsed_ms > 0:
+            factor = max(0.5, min(2.0, budget_ms / elapsed_ms))
+            self._run_batch = max(MIN_BATCH, min(MAX_BATCH, int(batch * factor) or 1))
+
+        self.highlight_assembly_line(sim.pc)
+        if self.visualizer and state is not None:
+            self.visualizer.update_datapath_visualization(state, animate=False)
+        self.update_display()
+        return max(1, int(FRAME_MS - elapsed_ms))
+
+    def _report_stop(self):
+        """Tell the user why Run stopped"""
+        sim = self.simulator
+        if sim.stop_reason == 'breakpoint':
+            messagebox.showinfo("Breakpoint", f"Stopped at breakpoint (PC = {sim.pc:#x}).")
+        elif sim.stop_reason == 'watchpoint':
+            addr, width, access = sim.data_memory.watch_hit
+            kind = "write" if access == 'w' else "read"
+            messagebox.showinfo("Watchpoint", f"Memory {kind} at {addr:#x} ({width} bytes).")
+        elif sim.halted:
+            messagebox.showinfo("Halted", "Execution completed.")
+
+    def do_step_back(self):
+        """Undo the last executed instruction"""
+        history = self.simulator.history
+        if history is None or not history.step_back():
+            messagebox.showinfo("Info", "No earlier instruction in history.")
+            return
+        self._refresh_after_jump()
+
+    def do_run_back(self):
+        """Step backwards until a breakpoint PC (or the start of history) is reached"""
+        history = self.simulator.history
+        if history is None or not history.can_step_back():
+            messagebox.showinfo("Info", "No earlier instruction in history.")
+            return
+        history.run_back(self.simulator.breakpoints)
+        self._refresh_after_jump()
+
+    def _refresh_after_jump(self):
+        """Refresh views after jumping to a new PC (step back, run back, run to cursor)"""
+        self.highlight_assembly_line(self.simulator.pc)
+        if self.visualizer:
+            self.visualizer.reset_datapath_visualization()
+        self.update_display()
+        self._update_button_states()
+
+    def do_run_to_cursor(self):
+        """Run until the instruction at the text cursor (or a breakpoint) is reached"""
+        line = int(self.asm_text.index(tk.INSERT).split('.')[0])
+        target_pc = self.simulator.program.pc_for_line(line)
+        if target_pc is None:
+            messagebox.showinfo("Info", "No instruction at or after the cursor.")
+            return
+        try:
+            steps = self.simulator.run(max_steps=RUN_TO_CURSOR_LIMIT, until_pc=target_pc)
+        except Exception as e:
+            messagebox.showerror("Error", f"Runtime error:\n{e}")
+            self.simulator.halted = True
+            steps = None
+        self._refresh_after_jump()
+        if self.simulator.stop_reason or self.simulator.halted:
+            self._report_stop()
+        elif steps == RUN_TO_CURSOR_LIMIT and self.simulator.pc != target_pc:
+            messagebox.showinfo("Info", f"Cursor not reached after {steps:,} instructions.")
+
+    # --- Pipeline ---
+    def do_step_cycle(self):
+        """Advance the 5-stage pipeline by one clock cycle"""
+        try:
+            if not self.pipeline.step_cycle():
+                messagebox.showinfo("Info", "Pipeline has drained (HALT reached write-back).")
+        except Exception as e:
+            messagebox.showerror("Error", f"Runtime error:\n{e}")
+            self.simulator.halted = True
+        self._refresh_after_cycles()
+
+    def do_run_pipeline(self):
+        """Run the pipeline until it drains, a breakpoint is hit, or the cycle cap"""
+        try:
+            self.pipeline.run(max_cycles=PIPELINE_RUN_LIMIT)
+        except Exception as e:
+            messagebox.showerror("Error", f"Runtime error:\n{e}")
+            self.simulator.halted = True
+        self._refresh_after_cycles()
+        if self.simulator.stop_reason:
+            self._report_stop()
+
+    def toggle_forwarding(self):
+        self.pipeline.forwarding = self.forwarding_var.get()
+
+    def select_predictor(self):
+        """Attach a fresh branch predictor (used by every core) or detach with 'none'"""
+        self.do_stop()
+        name = self.predictor_var.get()
+        self.simulator.attach_branch_predictor(None if name == 'none' else make_predictor(name))
+        self.update_pipeline_view()
+
+    def _refresh_after_cycles(self):
+        pipeline = self.pipeline
+        ex_slot = pipeline.stages[2]
+        self.highlight_assembly_line(ex_slot.pc if ex_slot is not None else None)
+        self.micro_step_label.config(
+            text=f"Cycle {pipeline.stats.cycles}" + (f": {pipeline.last_event}" if pipeline.last_event else ""))
+        if self.visualizer:
+            self.visualizer.reset_datapath_visualization()
+        self.update_display()
+        self._update_button_states()
+
+    def update_pipeline_view(self):
+        """Append the cycles recorded since the last refresh to the pipeline table"""
+        pipeline = self.pipeline
+        table = self.pipeline_table
+        stats = pipeline.stats
+        text = (f"Cycles {stats.cycles}  Instr {stats.retired}  Stalls {stats.stalls}  "
+                f"Flushes {stats.flushes} ({stats.flush_cycles} cyc)  CPI {stats.cpi:.2f}")
+        predictor = self.simulator.branch_predictor
+        if self._snapshot is not None:
+            prediction = self._snapshot['prediction']
+        else:
+            prediction = (predictor.branches, predictor.accuracy) if predictor is not None else None
+        if prediction is not None and prediction[0]:
+            text += f"  Prediction {prediction[1] * 100:.1f}%"
+        self.pipeline_stats_label.config(text=text)
+        timeline = pipeline.timeline
+        shown = self._pipeline_shown
+        start = 0
+        if shown is not None and timeline:
+            # Continue after the last entry shown if it is still in the timeline
+            start = shown[0] - timeline[0][0] + 1
+            if not (0 < start <= len(timeline) and timeline[start - 1] is shown):
+                start = None
+        if start is None or shown is not None and not timeline:
+            # Pipeline was reset or ran past the retained window: rebuild
+            table.delete(*table.get_children())
+            start = 0
+        for i in range(start, len(timeline)):
+            cycle, stages, event = timeline[i]
+            cells = tuple(slot.label if slot is not None else '' for slot in stages)
+            tags = ('stall',) if event.startswith('stall') else ('flush',) if event.startswith('flush') else ()
+            table.insert('', 'end', iid=str(cycle), text=str(cycle), values=cells + (event,), tags=tags)
+        self._pipeline_shown = timeline[-1] if timeline else None
+        children = table.get_children()
+        if len(children) > timeline.maxlen:
+            table.delete(*children[:len(children) - timeline.maxlen])
+        if children:
+            table.see(children[-1])
+
+    # --- Caches ---
+    def apply_cache_config(self):
+        """Attach a fresh cache hierarchy built from the config entry"""
+        try:
+            caches = parse_cache_spec(self.cache_spec_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid cache configuration:\n{e}")
+            return
+        self.do_stop()
+        self.simulator.attach_caches(caches)
+        self.update_cache_stats()
+
+    def disable_caches(self):
+        self.do_stop()
+        self.simulator.attach_caches(None)
+        self.update_cache_stats()
+
+    def update_cache_stats(self):
+        """Update the Caches tab from the attached cache hierarchy"""
+        table = self.cache_table
+        caches = self.simulator.caches
+        if self._snapshot is not None:
+            stats = self._snapshot['cache_stats'] or {}
+        else:
+            stats = caches.stats() if caches is not None else {}
+        for key in ('l1i', 'l1d', 'l2'):
+            s = stats.get(key)
+            if s is None:
+                if table.exists(key):
+                    table.delete(key)
+                continue
+            values = (s['config'], s['accesses'], s['hits'], s['misses'], f"{s['miss_rate'] * 100:.2f}",
+                      s['evictions'], s['writebacks'], f"{s['amat']:.2f}")
+            if table.exists(key):
+                table.item(key, values=values)
+            else:
+                table.insert('', 'end', iid=key, text=key.upper(), values=values)
+        if caches is None:
+            self.cache_amat_label.config(text="Caches disabled.")
+        else:
+            amat = stats['amat']
+            self.cache_amat_label.config(
+                text="AMAT: " + ", ".join(f"{kind} {value:.2f} cycles" for kind, value in amat.items()))
+
+    # --- Profiler ---
+    def toggle_profiler(self):
+        """Attach or detach the profiler; attaching starts counting from now"""
+        self.do_stop()
+        if self.profile_var.get():
+            self.simulator.attach_profiler(Profiler(self.simulator.program))
+        else:
+            self.simulator.attach_profiler(None)
+        self.update_heatmap()
+
+    def update_heatmap(self):
+        """Repaint only the source lines whose heat level changed"""
+        if self._snapshot is not None:
+            counts = self._snapshot['line_counts'] or {}
+        else:
+            profiler = self.simulator.profiler
+            counts = profiler.line_counts() if profiler is not None else {}
+        levels = {}
+        if counts:
+            scale = (len(HEAT_COLORS) - 1) / math.log1p(max(counts.values()))
+            levels = {line: int(math.log1p(count) * scale) for line, count in counts.items()}
+        painted = self._heat_levels
+        for line, level in painted.items():
+            if levels.get(line) != level:
+                self.asm_text.tag_remove(f'heat{level}', f"{line}.0", f"{line}.end")
+        for line, level in levels.items():
+            if painted.get(line) != level:
+                self.asm_text.tag_add(f'heat{level}', f"{line}.0", f"{line}.end")
+        self._heat_levels = levels
+
+    # --- Breakpoint gutter ---
+    def on_gutter_click(self, event):
+        """Toggle a breakpoint on the source line next to the click"""
+        line = int(self.asm_text.index(f"@0,{event.y}").split('.')[0])
+        if line in self.breakpoint_lines:
+            self.breakpoint_lines.discard(line)
+        else:
+            self.breakpoint_lines.add(line)
+        self._sync_breakpoints()
+        self.redraw_gutter()
+
+    def _sync_breakpoints(self):
+        """Map breakpoint lines to PCs of the loaded program"""
+        self.simulator.clear_breakpoints()
+        self.asm_text.tag_remove('breakpoint', "1.0", tk.END)
+        program = self.simulator.program
+        for line in self.breakpoint_lines:
+            self.asm_text.tag_add('breakpoint', f"{line}.0", f"{line}.end")
+            pc = program.pc_for_line(line)
+            if pc is not None:
+                self.simulator.add_breakpoint(pc)
+
+    def _on_asm_scroll(self, first, last):
+        self.asm_text.vbar.set(first, last)
+        self.redraw_gutter()
+
+    def redraw_gutter(self):
+        """Draw breakpoint markers for the visible lines only"""
+        self.gutter.delete('all')
+        if not self.breakpoint_lines:
+            return
+        index = self.asm_text.index("@0,0")
+        while True:
+            info = self.asm_text.dlineinfo(index)
+            if info is None:
+                break
+            line = int(index.split('.')[0])
+            if line in self.breakpoint_lines:
+                y = info[1] + info[3] // 2
+                self.gutter.create_oval(4, y - 5, 14, y + 5, fill='red', outline='darkred')
+            next_index = self.asm_text.index(f"{index} +1 lines linestart")
+            if next_index == index:
+                break
+            index = next_index
+
     def do_reset(self, reload_assembly=True):
         """Reset the simulator state"""
+        self.do_stop()
         self.simulator.reset()
+        self.pipeline.reset()
+        self.micro_step_label.config(text="Fetch (1/5)")
         self.is_paused = False
         self.pause_btn.config(text="Pause")
         
@@ -354,51 +977,112 @@ END:
             except Exception:
                 pass
 
-    def update_register_table(self):
-        """Update the register table display"""
-        self.reg_table.delete(*self.reg_table.get_children())
-        
-        for i, val in enumerate(self.simulator.registers):
-            reg_name = f"X{i}"
-            hex_val = f"0x{val:016x}"
-            dec_val = str(val)
-            
-            self.reg_table.insert('', 'end', text=reg_name, 
-                                values=(hex_val, dec_val))
+    def update_register_table(self, values=None):
+        """Update only the register rows whose value changed since the last refresh"""
+        table = self.reg_table
+        cache = self._reg_values
+        for iid in self._changed_regs:
+            table.item(iid, tags=())
+        changed = set()
+        for i, val in enumerate(values if values is not None else self.simulator.registers):
+            if cache[i] == val:
+                continue
+            iid = f"X{i}"
+            first_fill = cache[i] is None
+            cache[i] = val
+            table.item(iid, values=(f"0x{val:016x}", str(val)),
+                       tags=() if first_fill else ('changed',))
+            if not first_fill:
+                changed.add(iid)
+        self._changed_regs = changed
             
     def update_memory_display(self):
-        """Update the memory display"""
-        self.mem_text.config(state=tk.NORMAL)
-        self.mem_text.delete(1.0, tk.END)
-        
-        content = "Memory Contents:\n" + "="*40 + "\n"
-        for addr, val in sorted(self.simulator.data_memory.items()):
-            content += f"{addr:#010x}: {val}\n"
-            
-        self.mem_text.insert(1.0, content)
-        self.mem_text.config(state=tk.DISABLED)
+        """Update the memory display (only the visible hexdump rows that changed)"""
+        self.memory_view.snapshot = self._snapshot
+        self.memory_view.refresh()
+
+    def update_cpu_state(self):
+        """Update the CPU State tab (PC, flags, counters)"""
+        sim = self.simulator
+        state = self._snapshot or {'pc': sim.pc, 'flags': sim.flags, 'halted': sim.halted,
+                                   'instruction_count': sim.instruction_count}
+        flags = state['flags']
+        lines = [
+            f"PC:            {state['pc']:#010x}",
+            f"Flags:         N={flags['N']} Z={flags['Z']} V={flags['V']} C={flags['C']}",
+            f"Halted:        {state['halted']}",
+            f"Instructions:  {state['instruction_count']}",
+            f"Breakpoints:   {len(sim.breakpoints)}",
+        ]
+        self.cpu_text.config(state=tk.NORMAL)
+        self.cpu_text.delete(1.0, tk.END)
+        self.cpu_text.insert(1.0, "\n".join(lines))
+        self.cpu_text.config(state=tk.DISABLED)
+
+    def update_control_signals(self):
+        """Update the Control Signals tab from the last executed instruction"""
+        last_state = self._snapshot['last_state'] if self._snapshot is not None else self.simulator.last_state
+        signals = last_state.get('control_signals') or {}
+        table = self.ctrl_table
+        for name, value in signals.items():
+            if table.exists(name):
+                table.item(name, values=(value,))
+            else:
+                table.insert('', 'end', iid=name, text=name, values=(value,))
+        for iid in table.get_children():
+            if iid not in signals:
+                table.delete(iid)
 
-    def update_display(self):
-        """Update all displays"""
-        state_summary = self.simulator.get_state_summary()
+    def _on_tab_changed(self, event=None):
+        selected = self.notebook.select()
+        if selected in self._dirty_tabs:
+            self._dirty_tabs.discard(selected)
+            self._tab_refreshers[selected]()
+
+    def update_display(self, snapshot=None):
+        """
+        Update all displays. While a background run is active, everything is drawn
+        from the worker's snapshot: the simulator itself is being mutated by the worker
+        """
+        self._snapshot = snapshot
+        state_summary = snapshot or self.simulator.get_state_summary()
         pc_val = state_summary.get('pc', 0)
         
-        # Update current instruction
-        if pc_val in self.simulator.instruction_memory:
-            instr_data = self.simulator.instruction_memory[pc_val]
-            self.curr_instr_label.config(text=f"{pc_val:#x} ({instr_data[1].strip()})")
+        # Update current instruction (the program itself is not changed by a run)
+        program = self.simulator.program
+        if pc_val in program:
+            instr_text = program.text_at(pc_val)
+            self.curr_instr_label.config(text=f"{pc_val:#x} ({instr_text.strip()})")
         
-        # Update registers and memory
-        self.update_register_table()
-        self.update_memory_display()
+        # Registers are always visible; tab panels refresh only if their tab is showing
+        self.update_register_table(snapshot['registers'] if snapshot else None)
+        if self.simulator.profiler is not None or self._heat_levels:
+            self.update_heatmap()
+        self._dirty_tabs = set(self._tab_refreshers)
+        self._on_tab_changed()
 
     def _update_button_states(self):
         """Update button states based on simulator state"""
-        can_step = bool(self.simulator.instruction_memory) and not self.simulator.halted
+        # Check self.running first: the simulator must not be read while the worker runs it
+        can_step = not self.running and bool(len(self.simulator.program)) and not self.simulator.halted
         self.step_btn.config(state=tk.NORMAL if can_step else tk.DISABLED)
+        self.run_to_cursor_btn.config(state=tk.NORMAL if can_step else tk.DISABLED)
+        self.run_btn.config(state=tk.NORMAL if can_step else tk.DISABLED)
+        self.stop_btn.config(state=tk.NORMAL if self.running else tk.DISABLED)
 
-        can_reset = bool(self.simulator.instruction_memory)
+        can_reset = bool(len(self.simulator.program))
         self.reset_btn.config(state=tk.NORMAL if can_reset else tk.DISABLED)
+
+        history = self.simulator.history
+        can_go_back = not self.running and history is not None and history.can_step_back()
+        self.step_back_btn.config(state=tk.NORMAL if can_go_back else tk.DISABLED)
+        self.run_back_btn.config(state=tk.NORMAL if can_go_back else tk.DISABLED)
+
+        # The pipeline keeps cycling after HALT executes until it has drained
+        can_cycle = (not self.running and bool(len(self.simulator.program))
+                     and not (self.simulator.halted and self.pipeline.finished))
+        self.cycle_btn.config(state=tk.NORMAL if can_cycle else tk.DISABLED)
+        self.pipeline_run_btn.config(state=tk.NORMAL if can_cycle else tk.DISABLED)
     
 
 
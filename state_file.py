@@ -0,0 +1,206 @@
+# state_file.py
+"""
+Lưu / khôi phục toàn bộ trạng thái máy (sim.save_state() / sim.load_state()).
+
+Định dạng file (little-endian):
+  header   : magic 'LGST', version (H), số thanh ghi (H), pc, initial_pc,
+             instruction_count, mem_size (Q), cờ NZCV (B), halted (B), số trang (I)
+  registers: mỗi thanh ghi một Q
+  program  : base_pc (Q), số lệnh (I), độ dài nguồn (I), độ dài bảng nhãn (I),
+             mã máy (I...), số dòng (I...), mã nguồn UTF-8, bảng nhãn JSON UTF-8
+  pages    : mỗi trang một bản ghi (chỉ số trang, offset trong file, độ dài)
+  dữ liệu  : nội dung thô của từng trang, căn theo PAGE_SIZE trong file
+Khi khôi phục, file được mmap và mỗi trang bộ nhớ chỉ là một view vào file: đọc
+không chép gì, trang chỉ được chép ra bytearray ở lần ghi đầu tiên (copy-on-write
+của DataMemory). mmap được giữ trong sim._state_map và đóng bởi release_state():
+khi reset / nạp chương trình mới, hoặc trước khi save_state() ghi đè chính file đó
+(Windows không cho đổi tên đè lên file đang được map).
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from memory import DataMemory, MappedDataMemory, PAGE_SIZE
+from program import Program
+from trace_recorder import pack_flags, unpack_flags
+
+MAGIC = b'LGST'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHHQQQQBB2xI')
+_PROGRAM = struct.Struct('<QIII')
+_PAGE_ENTRY = struct.Struct('<QQI4x')
+
+_SWAP = sys.byteorder != 'little' # File luôn little-endian
+
+
+def _array_bytes(values, typecode):
+    data = array(typecode, values)
+    if _SWAP:
+        data.byteswap()
+    return data.tobytes()
+
+
+def _array_from(buffer, offset, count, typecode):
+    data = array(typecode)
+    data.frombytes(buffer[offset:offset + count * data.itemsize])
+    if _SWAP:
+        data.byteswap()
+    return data
+
+
+def save_state(sim, path):
+    """
+    Ghi registers, PC, cờ, halted, số lệnh, chương trình và bộ nhớ dữ liệu của 'sim'
+    ra 'path'. File được ghi sang file tạm rồi đổi tên, nên file cũ (có thể đang
+    được mmap bởi một lần load_state() trước) không bị ghi đè giữa chừng.
+    """
+    program = sim.program
+    source = "\n".join(program.source_lines).encode('utf-8')
+    labels = json.dumps(program.label_to_pc_map).encode('utf-8')
+    pages = [(index, page) for index, page in sim.data_memory.page_items()]
+
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, len(sim.registers), sim.pc, sim.initial_pc,
+                     sim.instruction_count, sim.data_memory.size, pack_flags(sim.flags),
+                     1 if sim.halted else 0, len(pages)),
+        _array_bytes(sim.registers, 'Q'),
+        _PROGRAM.pack(program.base_pc, len(program), len(source), len(labels)),
+        _array_bytes(program.words, 'I'),
+        _array_bytes(program.lines, 'I'),
+        source,
+        labels,
+    ]
+    offset = sum(map(len, parts)) + len(pages) * _PAGE_ENTRY.size
+    offset = -(-offset // PAGE_SIZE) * PAGE_SIZE # Trang đầu tiên căn theo PAGE_SIZE
+    table = []
+    for index, page in pages:
+        table.append(_PAGE_ENTRY.pack(index, offset, len(page)))
+        offset += PAGE_SIZE
+    parts.extend(table)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        for part in parts:
+            f.write(part)
+        for index, page in pages:
+            f.seek(-(-f.tell() // PAGE_SIZE) * PAGE_SIZE)
+            f.write(page)
+    pages = page = None # Bỏ các view vào mmap cũ trước khi đóng nó
+    if sim._state_map is not None and os.path.exists(path) and os.path.samefile(path, sim._state_map[0]):
+        release_state(sim)
+    os.replace(tmp_path, path)
+
+
+def release_state(sim):
+    """
+    Đóng mmap của state file mà 'sim' đã nạp: các trang còn là view vào file (trong bộ
+    nhớ và trong snapshot của history) được chép ra bytearray trước. View còn nằm ở nơi
+    khác (vd. snapshot của GUI worker) giữ mmap sống đến khi chúng được giải phóng.
+    """
+    if sim._state_map is None:
+        return
+    _, mapped = sim._state_map
+    sim._state_map = None
+    page_dicts = [sim.data_memory.pages]
+    if sim.history is not None:
+        page_dicts.extend(snapshot.memory for snapshot in sim.history.snapshots)
+    _copy_views(page_dicts)
+    try:
+        mapped.close()
+    except BufferError:
+        pass # Còn view ở nơi khác: mmap tự đóng khi view cuối cùng được giải phóng
+
+
+def _copy_views(page_dicts):
+    """Thay mọi trang là memoryview trong các dict trang bằng bytearray (giữ nguyên việc dùng chung)."""
+    copies = {} # id(view) -> bytearray
+    for pages in page_dicts:
+        for index, page in pages.items():
+            if isinstance(page, memoryview):
+                copy = copies.get(id(page))
+                if copy is None:
+                    copy = copies[id(page)] = bytearray(page)
+                pages[index] = copy
+
+
+def _page_views(mapped, entries, pad):
+    """{chỉ số trang: view vào 'mapped'}; với 'pad', trang cuối ngắn được chép và bù 0 đủ PAGE_SIZE."""
+    view = memoryview(mapped)
+    pages = {}
+    for index, page_offset, length in entries:
+        if length < PAGE_SIZE and pad:
+            pages[index] = bytearray(view[page_offset:page_offset + length]) + bytearray(PAGE_SIZE - length)
+        else:
+            pages[index] = view[page_offset:page_offset + length]
+    return pages
+
+
+def load_state(sim, path):
+    """
+    Nạp trạng thái đã lưu bằng save_state() vào 'sim' (thay cả chương trình).
+    Ném ValueError nếu file không phải state file hoặc version không hỗ trợ.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"{path} is not a LEGv8 state file") from None
+    memory = sim.data_memory
+    mapped_memory = isinstance(memory, MappedDataMemory)
+    try:
+        if len(mapped) < _HEADER.size:
+            raise ValueError(f"{path} is not a LEGv8 state file")
+        (magic, version, num_registers, pc, initial_pc, count, mem_size, nzcv, halted,
+         num_pages) = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a LEGv8 state file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported state file version {version} (expected {VERSION})")
+        if mapped_memory and memory.size != mem_size:
+            raise ValueError(f"State memory size {mem_size:#x} does not match image size {memory.size:#x}")
+        offset = _HEADER.size
+        registers = _array_from(mapped, offset, num_registers, 'Q')
+        offset += num_registers * 8
+        base_pc, num_words, source_len, labels_len = _PROGRAM.unpack_from(mapped, offset)
+        offset += _PROGRAM.size
+        words = _array_from(mapped, offset, num_words, 'I')
+        offset += num_words * 4
+        lines = _array_from(mapped, offset, num_words, 'I')
+        offset += num_words * 4
+        source = mapped[offset:offset + source_len].decode('utf-8')
+        offset += source_len
+        labels = json.loads(mapped[offset:offset + labels_len].decode('utf-8'))
+        offset += labels_len
+        entries = [_PAGE_ENTRY.unpack_from(mapped, offset + i * _PAGE_ENTRY.size) for i in range(num_pages)]
+    except BaseException:
+        mapped.close() # Chưa có view nào vào file
+        raise
+
+    if memory.size != mem_size:
+        resized = DataMemory(mem_size, memory.strict_alignment)
+        for start, end, access in memory.watchpoints:
+            resized.add_watchpoint(start, end - start, access)
+        sim.data_memory = memory = resized
+        sim.mem_size = mem_size
+    elif not mapped_memory:
+        memory.clear() # Trang của state file cũ (nếu có) không cần chép khi load_program() nhả mmap cũ
+
+    program = Program(base_pc, words, lines, source.split("\n") if source else [], labels)
+    sim.load_program(program)
+    sim.num_registers = num_registers
+    sim.registers = list(registers)
+    sim.initial_pc = initial_pc
+    sim.pc = pc
+    sim.flags = unpack_flags(nzcv)
+    sim.halted = bool(halted)
+    sim.instruction_count = count
+    # Trang là view vào file; DataMemory chép ra khi ghi lần đầu
+    memory.restore(_page_views(mapped, entries, not mapped_memory))
+    if mapped_memory:
+        mapped.close() # restore() đã chép các trang vào image
+    else:
+        sim._state_map = (path, mapped)
@@ -0,0 +1,108 @@
+# tests/test_assembler.py
+"""Assembler hai lượt: round-trip mã hóa/giải mã cho mọi lệnh, nhãn, alias và lỗi theo dòng."""
+import pytest
+
+from assembler import assemble, encode_instruction, parse_instruction
+from decoder import INSTRUCTION_SPECS, HALT_WORD, NOP_WORD, decode_word
+
+ALL_FORMS = """
+START:
+    ADD X1, X2, X3
+    ADDS X4, X5, X6
+    SUB X7, X8, X9
+    SUBS X10, X11, X12
+    AND X13, X14, X15
+    ANDS X16, X17, X18
+    ORR X19, X20, X21
+    EOR X22, X23, X24
+    MUL X25, X26, X27
+    SDIV X1, X2, X3
+    UDIV X4, X5, X6
+    LSL X7, X8, #63
+    LSR X9, X10, #1
+    BR X30
+    ADDI X1, X2, #4095
+    ADDIS X3, X4, #0
+    SUBI SP, SP, #16
+    SUBIS X5, X6, #7
+    ANDI X7, X8, #255
+    ANDIS X9, X10, #1
+    ORRI X11, X12, #2
+    EORI X13, X14, #3
+    LDUR X1, [SP, #-256]
+    LDURSW X2, [X3, #255]
+    LDURH X4, [X5, #2]
+    LDURB X6, [X7]
+    STUR X8, [X9, #-8]
+    STURW X10, [X11, #4]
+    STURH X12, [X13, #6]
+    STURB X14, [X15, #1]
+    B START
+    BL END
+    CBZ X1, START
+    CBNZ X2, END
+    B.EQ START
+    B.NE END
+    B.GE START
+    B.LT END
+    MOVZ X1, #65535, LSL #48
+    MOVK X2, #1, LSL #16
+    NOP
+END:
+    HALT
+"""
+
+FIELDS = ('name', 'rd', 'rn', 'rm', 'imm', 'shamt', 'cond', 'target')
+
+
+def test_every_instruction_is_covered():
+    program = assemble(ALL_FORMS)
+    names = {decode_word(word, pc).name for pc, word in zip(program.pcs(), program.words)}
+    assert names == set(INSTRUCTION_SPECS)
+
+
+def test_round_trip_encode_decode():
+    program = assemble(ALL_FORMS)
+    assert len(program) == 42
+    for pc, word, line in zip(program.pcs(), program.words, program.lines):
+        decoded = decode_word(word, pc)
+        assert encode_instruction(decoded) == word
+        parsed = parse_instruction(program.source_lines[line - 1].strip(), pc, program.label_to_pc_map)
+        for field in FIELDS:
+            assert getattr(decoded, field) == getattr(parsed, field), (program.text_at(pc), field)
+
+
+def test_labels_lines_and_base_pc():
+    program = assemble("// comment\nA: B: ADDI X1, X1, #1 // tail\n\nC:\n    B A\n", base_pc=0x400)
+    assert program.label_to_pc_map == {'A': 0x400, 'B': 0x400, 'C': 0x404}
+    assert list(program.lines) == [2, 5]
+    assert decode_word(program.word_at(0x404), 0x404).target == 0x400
+    assert program.line_for_pc(0x404) == 5
+    assert program.pc_for_line(3) == 0x404
+
+
+def test_pseudo_instructions():
+    program = assemble("CMP X1, X2\nCMPI X3, #4\nMOV X5, X6\nHALT\nNOP")
+    names = [decode_word(w).name for w in program.words]
+    assert names == ['SUBS', 'SUBIS', 'ORR', 'HALT', 'NOP']
+    assert program.words[3] == HALT_WORD and program.words[4] == NOP_WORD
+
+
+def test_duplicate_label_warns():
+    program = assemble("L: NOP\nL: HALT")
+    assert program.label_to_pc_map == {'L': 0}
+    assert program.warnings and 'duplicate' in program.warnings[0]
+
+
+@pytest.mark.parametrize('source, message', [
+    ("NOP\nADD X1, X2", "Line 2:"),
+    ("FOO X1", "Line 1:"),
+    ("ADDI X1, X2, #4096", "Line 1:"),
+    ("LDUR X1, [X2, #256]", "out of range"),
+    ("B NOWHERE", "Undefined label"),
+    ("ADD X32, X1, X2", "Invalid register"),
+    ("MOVZ X1, #1, LSL #8", "Invalid MOVZ"),
+])
+def test_errors_name_the_line(source, message):
+    with pytest.raises(ValueError, match=message):
+        assemble(source)
@@ -0,0 +1,139 @@
+# tests/test_batch.py
+"""Chạy hàng loạt: thu thập job (thư mục, manifest, fixture), chạy, kiểm tra kết quả và báo cáo."""
+import csv
+import json
+
+import pytest
+
+from batch import collect_jobs, run_batch, run_job, summarize, write_report, format_results
+
+SUM = """
+    ADD X1, XZR, XZR
+loop:
+    CBZ X0, done
+    ADD X1, X1, X0
+    SUBI X0, X0, #1
+    B loop
+done:
+    STUR X1, [X2, #8]
+    HALT
+"""
+FOREVER = "START:\n    B START\n"
+
+
+def _write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def jobs_dir(tmp_path):
+    _write(tmp_path / 'sum.s', SUM)
+    _write(tmp_path / 'sum.json', json.dumps({
+        'inputs': {'registers': {'X0': 10}},
+        'expect': {'registers': {'X1': 55}, 'memory': {'0x8': 55}},
+    }))
+    _write(tmp_path / 'wrong.s', SUM)
+    _write(tmp_path / 'wrong.json', json.dumps({
+        'inputs': {'registers': {'X0': 3}}, 'expect': {'registers': {'X1': 7}},
+    }))
+    _write(tmp_path / 'forever.s', FOREVER)
+    _write(tmp_path / 'broken.s', "ADDX X1, X2\n")
+    _write(tmp_path / 'notes.txt', "không phải job")
+    return tmp_path
+
+
+def test_collect_jobs_from_directory(jobs_dir):
+    jobs = collect_jobs(str(jobs_dir), defaults={'max_steps': 5000})
+    assert [job['name'] for job in jobs] == ['broken', 'forever', 'sum', 'wrong']
+    job = jobs[2]
+    assert job['registers'] == {0: 10}
+    assert job['expect_registers'] == {1: 55} and job['expect_memory'] == {8: 55}
+    assert job['max_steps'] == 5000
+
+
+def test_run_batch_statuses(jobs_dir):
+    jobs = collect_jobs(str(jobs_dir), defaults={'max_steps': 5000})
+    results = {r['name']: r for r in run_batch(jobs, workers=1)}
+    assert results['sum']['status'] == 'halted' and results['sum']['passed']
+    assert [c['ok'] for c in results['sum']['checks']] == [True, True]
+    assert results['wrong']['status'] == 'halted' and not results['wrong']['passed']
+    assert results['wrong']['checks'][0]['actual'] == 6
+    assert results['forever']['status'] == 'step_limit' and results['forever']['steps'] == 5000
+    assert results['broken']['status'] == 'error' and results['broken']['error']
+    summary = summarize(list(results.values()))
+    assert summary['passed'] == 1
+    assert summary['statuses'] == {'halted': 2, 'step_limit': 1, 'error': 1}
+    assert '1/4 passed' in format_results(list(results.values()))
+
+
+def test_parallel_matches_sequential(jobs_dir):
+    jobs = collect_jobs(str(jobs_dir), defaults={'max_steps': 5000})
+    sequential = [{k: v for k, v in r.items() if k != 'elapsed'} for r in run_batch(jobs, workers=1)]
+    parallel = [{k: v for k, v in r.items() if k != 'elapsed'} for r in run_batch(jobs, workers=2)]
+    assert parallel == sequential
+
+
+def test_timeout_stops_infinite_loop(tmp_path):
+    path = _write(tmp_path / 'forever.s', FOREVER)
+    manifest = _write(tmp_path / 'jobs.json', json.dumps({
+        'defaults': {'timeout': 0.2, 'max_steps': 10 ** 12},
+        'jobs': [{'file': 'forever.s', 'name': 'loop'}],
+    }))
+    [job] = collect_jobs(manifest)
+    assert (job['name'], job['path']) == ('loop', path)
+    result = run_job(job)
+    assert result['status'] == 'timeout'
+    assert result['elapsed'] < 5
+
+
+def test_fixture_and_manifest_override(tmp_path):
+    _write(tmp_path / 'sum.s', SUM)
+    fixture = _write(tmp_path / 'fixture.json', json.dumps({
+        'inputs': {'registers': {'X0': 4}}, 'expect': {'registers': {'X1': 10}},
+    }))
+    manifest = _write(tmp_path / 'jobs.json', json.dumps({'jobs': [
+        {'file': 'sum.s', 'name': 'default'},
+        {'file': 'sum.s', 'name': 'five', 'inputs': {'registers': {'X0': '0x5'}},
+         'expect': {'registers': {'X1': 15}}},
+    ]}))
+    jobs = collect_jobs(manifest, fixture=fixture)
+    assert [job['registers'] for job in jobs] == [{0: 4}, {0: 5}]
+    assert all(r['passed'] for r in run_batch(jobs, workers=1))
+
+
+@pytest.mark.parametrize('settings, message', [
+    ({'inputs': {'registers': {'X32': 1}}}, 'Invalid register name'),
+    ({'inputs': {'memory': {'0x4': 1}}}, 'must be 8-byte aligned'),
+    ({'max_steps': 'many'}, 'Invalid max_steps'),
+])
+def test_invalid_job_settings(tmp_path, settings, message):
+    _write(tmp_path / 'sum.s', SUM)
+    _write(tmp_path / 'sum.json', json.dumps(settings))
+    with pytest.raises(ValueError, match=message):
+        collect_jobs(str(tmp_path))
+
+
+def test_invalid_manifest(tmp_path):
+    bad = _write(tmp_path / 'bad.json', "{")
+    with pytest.raises(ValueError, match='invalid JSON'):
+        collect_jobs(bad)
+    no_file = _write(tmp_path / 'jobs.json', json.dumps({'jobs': [{'name': 'x'}]}))
+    with pytest.raises(ValueError, match="has no 'file'"):
+        collect_jobs(no_file)
+
+
+def test_write_report(jobs_dir, tmp_path):
+    results = run_batch(collect_jobs(str(jobs_dir), defaults={'max_steps': 5000}), workers=1)
+    json_path = str(tmp_path / 'report.json')
+    csv_path = str(tmp_path / 'report.csv')
+    write_report(results, json_path)
+    write_report(results, csv_path)
+    with open(json_path, encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['summary']['jobs'] == 4
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = {row['name']: row for row in csv.DictReader(f)}
+    assert rows['wrong']['failed_checks'] == 'X1'
+    assert rows['sum']['X1'] == '55'
+    assert rows['broken']['X1'] == ''
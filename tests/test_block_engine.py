@@ -0,0 +1,85 @@
+# tests/test_block_engine.py
+"""Block engine phải cho đúng trạng thái như interpreter: workload mẫu, lỗi giữa block, giới hạn lệnh."""
+import pytest
+
+from assembler import assemble
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload
+from legv8_simulator import LEGv8_Simplified_Simulator
+from memory import MemoryAccessError
+
+
+def run(source, engine, mem_size=WORKLOAD_MEM_SIZE, **kwargs):
+    sim = LEGv8_Simplified_Simulator(mem_size=mem_size)
+    sim.load_program(assemble(source))
+    if engine == 'block':
+        sim.enable_block_engine()
+    error = None
+    try:
+        sim.run(**kwargs)
+    except MemoryAccessError as e:
+        error = str(e)
+    return sim, error
+
+
+def state(sim):
+    return (sim.pc, list(sim.registers), dict(sim.flags), sim.halted, sim.instruction_count,
+            dict(sim.data_memory.nonzero_words()))
+
+
+@pytest.mark.parametrize('name', sorted(WORKLOADS))
+def test_workloads_match_interpreter(name):
+    source = load_workload(name)
+    interp, _ = run(source, 'interp')
+    block, _ = run(source, 'block')
+    assert interp.halted and interp.registers[0] == WORKLOADS[name]
+    assert state(block) == state(interp)
+
+
+def test_fault_inside_block_stops_at_faulting_instruction():
+    source = """
+        MOVZ X1, #1
+        ADDI X2, X1, #2
+        MOVZ X3, #65535
+        LDUR X4, [X3, #0]
+        ADDI X5, X5, #1
+        HALT
+    """
+    interp, interp_error = run(source, 'interp', mem_size=0x1000)
+    block, block_error = run(source, 'block', mem_size=0x1000)
+    assert interp_error is not None and block_error == interp_error
+    assert block.pc == interp.pc == 12
+    assert state(block) == state(interp)
+
+
+@pytest.mark.parametrize('budget', [1, 2, 3, 7, 64])
+def test_step_budget_slices_match(budget):
+    source = load_workload('cbz_loop')
+    interp = LEGv8_Simplified_Simulator(mem_size=WORKLOAD_MEM_SIZE)
+    block = LEGv8_Simplified_Simulator(mem_size=WORKLOAD_MEM_SIZE)
+    for sim in (interp, block):
+        sim.load_program(assemble(source))
+    block.enable_block_engine()
+    for _ in range(200):
+        assert block.run(max_steps=budget) == interp.run(max_steps=budget)
+        assert state(block) == state(interp)
+
+
+def test_breakpoints_stop_inside_blocks():
+    source = load_workload('fibonacci')
+    interp, _ = run(source, 'interp', max_steps=0)
+    block, _ = run(source, 'block', max_steps=0)
+    for sim in (interp, block):
+        sim.add_breakpoint(32) # STUR X0, [SP, #8]: giữa basic block của FIB
+    for _ in range(5):
+        interp.run()
+        block.run()
+        assert block.stop_reason == interp.stop_reason == 'breakpoint'
+        assert state(block) == state(interp)
+
+
+def test_reload_invalidates_translations():
+    sim, _ = run("ADDI X1, X1, #1\nHALT", 'block')
+    assert sim.registers[1] == 1
+    sim.load_program(assemble("ADDI X1, X1, #5\nHALT"))
+    sim.run()
+    assert sim.registers[1] == 5
@@ -0,0 +1,100 @@
+# tests/test_branch_predictor.py
+"""Bộ dự đoán rẽ nhánh: cấu hình chuỗi, hành vi từng mô hình và thống kê khi gắn vào simulator."""
+import pytest
+
+from assembler import assemble
+from branch_predictor import (make_predictor, format_branch_stats, NotTakenPredictor,
+                              BTFNPredictor, OneBitPredictor, TwoBitPredictor, GsharePredictor)
+from legv8_simulator import LEGv8_Simplified_Simulator
+
+LOOP = """
+    ADDI X1, XZR, #10
+loop:
+    SUBI X1, X1, #1
+    CBNZ X1, loop
+    HALT
+"""
+
+
+@pytest.mark.parametrize('spec, cls, describe', [
+    ('not-taken', NotTakenPredictor, 'not-taken'),
+    ('BTFN', BTFNPredictor, 'btfn'),
+    ('1bit:4', OneBitPredictor, '1-bit (16 entries)'),
+    ('2bit', TwoBitPredictor, '2-bit (1024 entries)'),
+    ('gshare:4:0x6', GsharePredictor, 'gshare (4-bit history, 64 entries)'),
+])
+def test_make_predictor(spec, cls, describe):
+    predictor = make_predictor(spec)
+    assert type(predictor) is cls
+    assert predictor.describe() == describe
+
+
+@pytest.mark.parametrize('spec', ['tage', '2bit:x', 'btfn:1', '1bit:4:4', 'gshare:12:10'])
+def test_make_predictor_errors(spec):
+    with pytest.raises(ValueError):
+        make_predictor(spec)
+
+
+def test_btfn_direction():
+    predictor = BTFNPredictor()
+    assert predictor.predict(100, 40)
+    assert predictor.predict(100, 100)
+    assert not predictor.predict(100, 140)
+    assert not predictor.predict(100, None) # BR: đích chưa biết
+
+
+def test_two_bit_saturates_and_has_hysteresis():
+    predictor = TwoBitPredictor(index_bits=4)
+    assert not predictor.predict(0, 0) # Khởi tạo weakly not taken
+    for _ in range(5):
+        predictor.record(0, 0, True)
+    assert predictor.table[0] == 3
+    predictor.record(0, 0, False) # Một lần not taken chưa đổi dự đoán
+    assert predictor.predict(0, 0)
+    predictor.record(0, 0, False)
+    assert not predictor.predict(0, 0)
+
+
+def test_one_bit_remembers_last_outcome():
+    predictor = OneBitPredictor(index_bits=4)
+    outcomes = [predictor.record(8, 0, taken) for taken in (True, True, False, False)]
+    assert outcomes == [False, True, False, True]
+    assert (predictor.branches, predictor.correct, predictor.mispredictions) == (4, 2, 2)
+
+
+def test_gshare_learns_alternating_pattern():
+    # Nhánh luân phiên taken/not taken: 2-bit đoán sai liên tục, gshare học được theo lịch sử
+    two_bit, gshare = TwoBitPredictor(), GsharePredictor(history_bits=2)
+    for i in range(200):
+        two_bit.record(0, 0, i % 2 == 0)
+        gshare.record(0, 0, i % 2 == 0)
+    assert gshare.accuracy > 0.95
+    assert two_bit.accuracy <= 0.5
+
+
+@pytest.mark.parametrize('spec, mispredictions', [
+    ('not-taken', 9), ('btfn', 1), ('1bit', 2), ('2bit', 2),
+])
+def test_simulator_records_loop_branch(spec, mispredictions):
+    sim = LEGv8_Simplified_Simulator()
+    sim.load_program(assemble(LOOP))
+    predictor = make_predictor(spec)
+    sim.attach_branch_predictor(predictor)
+    sim.run()
+    stats = predictor.stats()
+    assert stats['branches'] == 10
+    assert stats['mispredictions'] == mispredictions
+    assert stats['per_branch'][8]['taken'] == 9
+    text = format_branch_stats(stats)
+    assert '10 branches' in text and '0x00000008' in text
+
+
+def test_reset_clears_tables_and_stats():
+    sim = LEGv8_Simplified_Simulator()
+    sim.load_program(assemble(LOOP))
+    predictor = TwoBitPredictor()
+    sim.attach_branch_predictor(predictor)
+    sim.run()
+    sim.reset()
+    assert predictor.branches == 0 and predictor.per_branch == {}
+    assert all(value == 1 for value in predictor.table)
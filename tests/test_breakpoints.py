@@ -0,0 +1,79 @@
+# tests/test_breakpoints.py
+"""Breakpoint (kể cả có điều kiện), watchpoint và run-to-cursor trên cả hai engine."""
+import pytest
+
+from assembler import assemble
+from legv8_simulator import LEGv8_Simplified_Simulator
+
+ENGINES = ['interp', 'block']
+
+SOURCE = """
+    MOVZ X1, #10
+LOOP:
+    ADDI X0, X0, #3
+    STUR X0, [XZR, #64]
+    SUBI X1, X1, #1
+    CBNZ X1, LOOP
+    HALT
+"""
+
+
+def make_sim(engine):
+    sim = LEGv8_Simplified_Simulator(mem_size=0x100)
+    sim.load_program(assemble(SOURCE))
+    if engine == 'block':
+        sim.enable_block_engine()
+    return sim
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_breakpoint_stops_before_instruction(engine):
+    sim = make_sim(engine)
+    sim.add_breakpoint(12) # SUBI, giữa thân vòng lặp
+    hits = []
+    while not sim.halted:
+        sim.run()
+        if sim.stop_reason == 'breakpoint':
+            hits.append((sim.pc, sim.registers[0], sim.registers[1]))
+    assert hits == [(12, 3 * i, 11 - i) for i in range(1, 11)]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_conditional_breakpoint(engine):
+    sim = make_sim(engine)
+    sim.add_breakpoint(4, "X1 == 4 and X0 > 0")
+    sim.run()
+    assert sim.stop_reason == 'breakpoint'
+    assert (sim.pc, sim.registers[1], sim.registers[0]) == (4, 4, 18)
+    sim.run()
+    assert sim.halted and sim.registers[0] == 30
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_watchpoint_stops_after_access(engine):
+    sim = make_sim(engine)
+    sim.add_watchpoint(64, 8, 'w')
+    sim.run()
+    assert sim.stop_reason == 'watchpoint'
+    assert sim.pc == 12 and sim.data_memory.load(64) == 3
+    sim.clear_watchpoints()
+    sim.run()
+    assert sim.halted and sim.stop_reason is None
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_run_to_cursor(engine):
+    sim = make_sim(engine)
+    sim.run(until_pc=20)
+    assert sim.pc == 20 and sim.registers[1] == 0
+    assert sim.stop_reason is None
+
+
+def test_toggle_and_invalid_condition():
+    sim = make_sim('interp')
+    assert sim.toggle_breakpoint(8)
+    assert sim.should_break(8)
+    assert not sim.toggle_breakpoint(8)
+    assert not sim.should_break(8)
+    with pytest.raises(ValueError):
+        sim.add_breakpoint(8, "X1 ==")
@@ -0,0 +1,83 @@
+# tests/test_cache.py
+"""Mô hình cache: hit/miss, thay thế LRU/FIFO, write-back/write-through, AMAT và cấu hình chuỗi."""
+import pytest
+
+from assembler import assemble
+from cache import Cache, CacheHierarchy, parse_cache_spec, format_cache_stats
+from legv8_simulator import LEGv8_Simplified_Simulator
+
+
+def test_spatial_locality_within_block():
+    cache = Cache('L1', size=1024, associativity=1, block_size=32)
+    assert not cache.access(0)
+    assert all(cache.access(addr) for addr in range(1, 32))
+    assert not cache.access(32)
+    assert (cache.accesses, cache.misses) == (33, 2)
+
+
+def test_access_spanning_two_blocks():
+    cache = Cache('L1', size=1024, associativity=1, block_size=32)
+    assert not cache.access(28, width=8)
+    assert cache.misses == 2
+    assert cache.access(24, 8) and cache.access(32, 8)
+
+
+@pytest.mark.parametrize('policy, survivor', [('lru', 0), ('fifo', 128)])
+def test_replacement_policy(policy, survivor):
+    # 2 way, 4 set x 32 byte: các địa chỉ cách nhau 128 byte cùng rơi vào set 0
+    cache = Cache('L1', size=256, associativity=2, block_size=32, replacement=policy)
+    cache.access(0)
+    cache.access(128)
+    cache.access(0) # LRU: 0 mới dùng; FIFO: 0 vẫn là block nạp sớm nhất
+    cache.access(256) # Thay một trong hai block
+    assert cache.evictions == 1
+    hits_before = cache.hits
+    cache.access(survivor)
+    assert cache.hits == hits_before + 1
+
+
+def test_write_back_counts_dirty_evictions():
+    l2 = Cache('L2', size=4096, associativity=4, block_size=64, hit_time=10)
+    l1 = Cache('L1', size=64, associativity=1, block_size=32, next_level=l2)
+    l1.access(0, 8, is_write=True)
+    l1.access(64, 8) # Cùng set -> đẩy block bẩn xuống L2
+    assert (l1.evictions, l1.writebacks) == (1, 1)
+    assert l2.writes == 1
+
+
+def test_write_through_without_allocate():
+    l2 = Cache('L2', size=4096, associativity=4, block_size=64)
+    l1 = Cache('L1', size=64, associativity=1, block_size=32, write_policy='write-through', next_level=l2)
+    assert not l1.access(0, 8, is_write=True)
+    assert not l1.access(0, 8) # Không write-allocate: đọc sau đó vẫn miss
+    assert l1.writebacks == 0 and l2.writes == 1
+
+
+def test_amat():
+    l2 = Cache('L2', size=4096, associativity=4, block_size=64, hit_time=10)
+    l1 = Cache('L1', size=64, associativity=1, block_size=32, next_level=l2)
+    for addr in (0, 8, 16, 24): # 1 miss / 4 truy cập, L2 miss 1/1
+        l1.access(addr)
+    assert l1.amat(100) == pytest.approx(1 + 0.25 * (10 + 1.0 * 100))
+
+
+def test_parse_spec_and_errors():
+    caches = parse_cache_spec("l1i=4k:2:32,l1d=8k:4:32:wt:fifo,l2=64k:8:64")
+    assert caches.dcache.describe() == "8K 4-way 32B write-through fifo"
+    assert caches.icache.next_level is caches.l2 is caches.dcache.next_level
+    assert parse_cache_spec('default').l2 is not None
+    for spec in ("l3=4k", "l1d=3k:2:32", "l1d=4k:2:32:xx", "", "l1d=4k,l1d=8k"):
+        with pytest.raises(ValueError):
+            parse_cache_spec(spec)
+
+
+def test_simulator_feeds_hierarchy():
+    sim = LEGv8_Simplified_Simulator(mem_size=0x1000)
+    sim.load_program(assemble("MOVZ X1, #8\nL: STUR X1, [X1, #0]\nSUBI X1, X1, #1\nCBNZ X1, L\nHALT"))
+    caches = CacheHierarchy(Cache('L1I', 1024, 1, 32), Cache('L1D', 1024, 1, 32))
+    sim.attach_caches(caches)
+    sim.run()
+    stats = caches.stats()
+    assert stats['l1i']['accesses'] == sim.instruction_count
+    assert stats['l1d']['accesses'] == 8 and stats['l1d']['misses'] == 1
+    assert "L1D" in format_cache_stats(stats)
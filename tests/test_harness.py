@@ -0,0 +1,81 @@
+# tests/test_harness.py
+"""Harness đo hiệu năng: kiểm tra kết quả workload, chuẩn hóa theo hiệu chuẩn và so với baseline."""
+import json
+
+import pytest
+
+from benchmarks import WORKLOADS
+from benchmarks.harness import (DEFAULT_BASELINE, _check, calibrate, compare, metrics,
+                                measure_workload, format_comparison)
+
+
+def _results(calibration, ips, lines_per_second=1000.0, startup=0.2, peak=4096):
+    return {
+        'meta': {'calibration': calibration},
+        'workloads': {'fibonacci': {'interp': {'instructions': 100, 'seconds': 1.0, 'ips': ips}}},
+        'peak_memory': {'fibonacci': peak},
+        'assembler': {'lines': 100, 'seconds': 1.0, 'lines_per_second': lines_per_second},
+        'startup': {'seconds': startup},
+    }
+
+
+def test_check_rejects_wrong_result():
+    _check('fibonacci', {'error': None, 'halted': True, 'registers': [WORKLOADS['fibonacci']]})
+    with pytest.raises(ValueError, match='X0=1'):
+        _check('fibonacci', {'error': None, 'halted': True, 'registers': [1]})
+    with pytest.raises(ValueError, match='did not halt'):
+        _check('fibonacci', {'error': 'Timeout', 'halted': False, 'registers': [0]})
+
+
+def test_metrics_normalization():
+    results = _results(calibration=2.0, ips=1000.0, startup=0.5)
+    raw = metrics(results, normalize=False)
+    scaled = metrics(results)
+    assert raw['workloads.fibonacci.interp.ips'] == (1000.0, True)
+    assert scaled['workloads.fibonacci.interp.ips'] == (500.0, True)
+    assert scaled['assembler.lines_per_second'] == (500.0, True)
+    assert scaled['startup.seconds'] == (1.0, False)
+    assert scaled['peak_memory.fibonacci'] == (4096, False) # Không phụ thuộc tốc độ máy
+
+
+def test_compare_cancels_machine_speed():
+    # Máy nhanh gấp đôi: mọi chỉ số thời gian tốt gấp đôi nhưng sau chuẩn hóa không đổi
+    baseline = _results(calibration=1.0, ips=1000.0)
+    results = _results(calibration=2.0, ips=2000.0, lines_per_second=2000.0, startup=0.1)
+    rows = compare(results, baseline)
+    assert len(rows) == 4
+    assert all(row['change'] == pytest.approx(0.0) for row in rows)
+    assert not any(row['regression'] for row in rows)
+
+
+def test_compare_flags_regressions():
+    baseline = _results(calibration=1.0, ips=1000.0, peak=4096)
+    results = _results(calibration=1.0, ips=850.0, peak=4096 * 2)
+    rows = {row['metric']: row for row in compare(results, baseline, threshold=0.10)}
+    assert rows['workloads.fibonacci.interp.ips']['change'] == pytest.approx(-0.15)
+    assert rows['workloads.fibonacci.interp.ips']['regression']
+    assert rows['peak_memory.fibonacci']['regression']
+    assert not rows['assembler.lines_per_second']['regression']
+    assert 'REGRESSION' in format_comparison(list(rows.values()), 0.10)
+
+
+def test_compare_without_calibration_uses_raw_values():
+    baseline = _results(calibration=None, ips=1000.0)
+    results = _results(calibration=4.0, ips=1100.0)
+    rows = {row['metric']: row for row in compare(results, baseline)}
+    assert rows['workloads.fibonacci.interp.ips']['change'] == pytest.approx(0.10)
+
+
+def test_calibrate_and_measure_workload():
+    assert calibrate(repeat=1) > 0
+    m = measure_workload('fibonacci', 'block', repeat=1)
+    assert m['instructions'] > 0 and m['seconds'] > 0
+    assert m['ips'] == pytest.approx(m['instructions'] / m['seconds'])
+
+
+def test_baseline_covers_all_workloads():
+    with open(DEFAULT_BASELINE, encoding='utf-8') as f:
+        baseline = json.load(f)
+    assert baseline['meta']['calibration'] > 0
+    assert set(baseline['workloads']) == set(WORKLOADS)
+    assert set(baseline['peak_memory']) == set(WORKLOADS)
@@ -0,0 +1,83 @@
+# tests/test_headless.py
+"""Chế độ headless: run_program(), báo cáo text và dòng lệnh main.py --headless."""
+import os
+import subprocess
+import sys
+
+from headless import run_program, format_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COUNTDOWN = """
+    MOVZ X1, #100
+LOOP:
+    ADDI X0, X0, #2
+    SUBI X1, X1, #1
+    CBNZ X1, LOOP
+    STUR X0, [XZR, #8]
+    HALT
+"""
+
+
+def test_run_program_result():
+    result = run_program(COUNTDOWN)
+    assert result['halted'] and result['error'] is None
+    assert result['registers'][0] == 200
+    assert result['memory'] == {8: 200}
+    assert result['steps'] == 1 + 3 * 100 + 2
+
+
+def test_initial_inputs_and_limits():
+    result = run_program(COUNTDOWN, initial_registers={0: 1000}, max_steps=4)
+    assert not result['halted']
+    assert result['steps'] == 4
+    assert result['registers'][0] == 1002
+
+
+def test_error_is_reported():
+    result = run_program("MOVZ X1, #4096\nSTUR X1, [X1, #0]\nHALT", mem_size=1024)
+    assert result['halted']
+    assert 'out of range' in result['error']
+    assert format_report(result).startswith("Status: ERROR")
+
+
+def test_timeout_stops_infinite_loop():
+    result = run_program("L: B L", timeout=0.05)
+    assert result['timed_out']
+    assert "TIMEOUT" in format_report(result)
+
+
+def test_cli_headless(tmp_path):
+    path = os.path.join(tmp_path, 'countdown.s')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(COUNTDOWN)
+    out = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), '--headless', path, '--engine', 'block'],
+                         capture_output=True, text=True, check=True).stdout
+    assert "Status: HALTED" in out
+    assert f"Steps: {1 + 3 * 100 + 2}" in out
+
+
+def _run_cli(*args):
+    return subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), *args],
+                          capture_output=True, text=True)
+
+
+def test_cli_reports_syntax_error(tmp_path):
+    path = os.path.join(tmp_path, 'bad.s')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("MOVZ X1, #1\nFOO X1, X2\nHALT\n")
+    out = _run_cli('--headless', path)
+    assert out.returncode == 1
+    assert out.stderr.strip() == "Error: Line 2: Unknown instruction 'FOO'"
+    assert "Traceback" not in out.stderr
+
+
+def test_cli_reports_missing_files(tmp_path):
+    missing = os.path.join(tmp_path, 'missing.s')
+    out = _run_cli('--headless', missing)
+    assert out.returncode == 1
+    assert out.stderr.startswith("Error: ") and missing in out.stderr
+    assert "Traceback" not in out.stderr
+    out = _run_cli('--headless', missing, '--load-state', os.path.join(tmp_path, 'missing.lgst'))
+    assert out.returncode == 1
+    assert out.stderr.startswith("Error: ") and "Traceback" not in out.stderr
@@ -0,0 +1,119 @@
+# tests/test_history.py
+"""Chạy lùi: undo log, snapshot, seek sau run() nhanh, và lệnh lỗi không để lại bản ghi undo."""
+import pytest
+
+from assembler import assemble
+from benchmarks import WORKLOAD_MEM_SIZE, load_workload
+from legv8_simulator import LEGv8_Simplified_Simulator
+from memory import MemoryAccessError
+
+
+def make_sim(source, engine='interp', snapshot_interval=16, mem_size=WORKLOAD_MEM_SIZE):
+    sim = LEGv8_Simplified_Simulator(mem_size=mem_size)
+    sim.load_program(assemble(source))
+    if engine == 'block':
+        sim.enable_block_engine()
+    sim.enable_history(snapshot_interval=snapshot_interval)
+    return sim
+
+
+def state(sim):
+    return (sim.pc, list(sim.registers), dict(sim.flags), sim.halted, sim.instruction_count,
+            dict(sim.data_memory.nonzero_words()))
+
+
+def reference_states(source, count):
+    """Trạng thái sau 0..count lệnh, chạy bằng step() không có history."""
+    sim = LEGv8_Simplified_Simulator(mem_size=WORKLOAD_MEM_SIZE)
+    sim.load_program(assemble(source))
+    states = [state(sim)]
+    for _ in range(count):
+        sim.step()
+        states.append(state(sim))
+    return states
+
+
+def test_step_back_restores_every_state():
+    source = load_workload('memcpy')
+    sim = make_sim(source)
+    expected = reference_states(source, 100)
+    for _ in range(100):
+        sim.step()
+    assert state(sim) == expected[100]
+    for count in range(99, -1, -1):
+        assert sim.history.step_back()
+        assert state(sim) == expected[count]
+    assert not sim.history.step_back()
+
+
+@pytest.mark.parametrize('engine', ['interp', 'block'])
+def test_seek_after_fast_run(engine):
+    source = load_workload('linked_list')
+    sim = make_sim(source, engine, snapshot_interval=500)
+    sim.run(max_steps=3000)
+    expected = reference_states(source, 3000)
+    for count in (2999, 2500, 1234, 1, 0):
+        assert sim.history.seek(count)
+        assert state(sim) == expected[count]
+    assert not sim.history.seek(1) # seek chỉ đi lùi
+    sim.run(max_steps=2000) # Chạy tiếp từ trạng thái đã lùi về
+    assert state(sim) == expected[2000]
+    assert sim.history.seek(1500)
+    assert state(sim) == expected[1500]
+
+
+def test_undo_after_faulting_instruction():
+    source = """
+        MOVZ X1, #7
+        STUR X1, [XZR, #8]
+        MOVZ X2, #65535
+        STUR X1, [X2, #0]
+        HALT
+    """
+    sim = make_sim(source, mem_size=0x1000)
+    for _ in range(3):
+        sim.step()
+    before = state(sim)
+    with pytest.raises(MemoryAccessError):
+        sim.step()
+    assert state(sim) == before
+    assert len(sim.history.undo_log) == 3 # Lệnh lỗi không để lại bản ghi
+    assert sim.history.step_back()
+    assert sim.pc == 8 and sim.registers[2] == 0
+    assert sim.history.step_back()
+    assert sim.data_memory.load(8) == 0
+    sim.step()
+    sim.step()
+    assert state(sim) == before
+
+
+@pytest.mark.parametrize('engine', ['interp', 'block'])
+def test_step_back_after_fault_in_fast_run(engine):
+    source = "MOVZ X1, #3\nL: SUBI X1, X1, #1\nCBNZ X1, L\nMOVZ X2, #65535\nLDUR X3, [X2, #0]\nHALT"
+    sim = make_sim(source, engine, mem_size=0x1000)
+    with pytest.raises(MemoryAccessError):
+        sim.run()
+    assert sim.pc == 16 and sim.instruction_count == 8
+    assert sim.history.step_back()
+    assert sim.pc == 12 and sim.registers[2] == 0
+
+
+def test_run_back_to_breakpoint():
+    source = load_workload('cbz_loop')
+    sim = make_sim(source)
+    for _ in range(50):
+        sim.step()
+    sim.add_breakpoint(8)
+    steps = sim.history.run_back()
+    assert steps > 0 and sim.pc == 8
+    assert state(sim) == reference_states(source, 50)[50 - steps]
+
+
+def test_history_limited_to_kept_snapshots():
+    sim = make_sim(load_workload('cbz_loop'), snapshot_interval=4)
+    sim.history.max_snapshots = 3
+    for _ in range(40):
+        sim.step()
+    assert sim.history.earliest > 0
+    assert not sim.history.seek(0)
+    assert sim.history.seek(sim.history.earliest)
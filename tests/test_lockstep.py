@@ -0,0 +1,72 @@
+# tests/test_lockstep.py
+"""Kiểm tra vi sai: chương trình ngẫu nhiên hợp lệ, hai engine nhanh khớp tham chiếu, tìm đúng lệnh lệch."""
+import re
+
+import pytest
+
+import block_engine
+from assembler import assemble
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload
+from legv8_simulator import LEGv8_Simplified_Simulator
+from lockstep import LockstepChecker, check_program, fuzz, random_program
+
+SOURCE = """
+    MOVZ X1, #12
+    MOVZ X2, #10
+    ADDI X3, X1, #1
+    EOR X4, X1, X2
+    ADD X5, X4, X3
+    CBZ X5, end
+    ADDI X6, X5, #1
+end:
+    HALT
+"""
+
+
+def test_random_program_is_deterministic_and_halts():
+    source = random_program(0)
+    assert random_program(0) == source
+    assert random_program(1) != source
+    # Có vòng lặp trong quay lui và lời gọi BL tới hàm con kết thúc bằng BR X30
+    assert re.search(r'^I\d+:', source, re.M)
+    assert 'BL F' in source and 'BR X30' in source
+    sim = LEGv8_Simplified_Simulator(mem_size=1 << 16)
+    sim.load_program(assemble(source))
+    sim.run(max_steps=1_000_000)
+    assert sim.halted
+
+
+@pytest.mark.parametrize('engine', ['interp', 'block'])
+def test_fuzz_finds_no_divergence(engine):
+    assert fuzz(10, seed=100, engine=engine) == []
+
+
+@pytest.mark.parametrize('engine', ['interp', 'block'])
+@pytest.mark.parametrize('name', ['fibonacci', 'linked_list'])
+def test_workloads_in_lockstep(name, engine):
+    checker, divergence = check_program(assemble(load_workload(name)), engine, mem_size=WORKLOAD_MEM_SIZE)
+    assert divergence is None
+    assert checker.fast.registers[0] == WORKLOADS[name]
+    assert checker.fast.halted and checker.reference.halted
+
+
+def test_locates_miscompiled_instruction(monkeypatch):
+    monkeypatch.setitem(block_engine._INLINE_R, 'EOR', "r[{rn}] | r[{rm}]")
+    _, divergence = check_program(assemble(SOURCE), 'block', interval=8)
+    assert divergence is not None
+    # Block engine chỉ lộ sai ở cuối block: lệch thấy tại CBZ, EOR/ADD được đánh dấu nghi vấn
+    assert (divergence.step, divergence.pc) == (6, 20)
+    assert divergence.differences == [('X4', 6, 14), ('X5', 19, 27)]
+    suspects = [pc for pc, _, suspect in divergence.context if suspect]
+    assert suspects == [12, 16]
+    assert 'EOR X4, X1, X2' in divergence.report()
+
+
+def test_max_steps_and_invalid_arguments():
+    checker = LockstepChecker(assemble(load_workload('fibonacci')), 'block', interval=16)
+    assert checker.run(max_steps=40) is None
+    assert checker.steps == 40
+    with pytest.raises(ValueError):
+        LockstepChecker(assemble(SOURCE), 'vector')
+    with pytest.raises(ValueError):
+        LockstepChecker(assemble(SOURCE), interval=0)
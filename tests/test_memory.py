@@ -0,0 +1,92 @@
+# tests/test_memory.py
+"""Bộ nhớ dữ liệu chia trang: độ rộng truy cập, ranh giới trang, lỗi, snapshot COW, image mmap."""
+import os
+
+import pytest
+
+from memory import DataMemory, MappedDataMemory, MemoryAccessError, PAGE_SIZE
+
+
+@pytest.mark.parametrize('width', [1, 2, 4, 8])
+def test_store_load_widths(width):
+    mem = DataMemory(0x10000)
+    mem.store(0x100, width, -1)
+    assert mem.load(0x100, width) == (1 << (width * 8)) - 1
+    assert mem.load(0x100, width, signed=True) == -1
+    assert mem.load(0x100 + width, 1) == 0
+
+
+def test_little_endian_layout():
+    mem = DataMemory(0x1000)
+    mem.store(0, 8, 0x0102030405060708)
+    assert mem.read_block(0, 8) == bytes([8, 7, 6, 5, 4, 3, 2, 1])
+    assert mem.load(0, 4) == 0x05060708
+    assert list(mem.nonzero_words()) == [(0, 0x0102030405060708)]
+
+
+def test_access_across_page_boundary():
+    mem = DataMemory(3 * PAGE_SIZE)
+    addr = PAGE_SIZE - 3
+    mem.store(addr, 8, 0x1122334455667788)
+    assert mem.load(addr, 8) == 0x1122334455667788
+    assert sorted(mem.pages) == [0, 1]
+
+
+def test_lazy_allocation():
+    mem = DataMemory(1 << 30)
+    assert mem.load(123456789, 8) == 0
+    mem.write_block(0x5000, bytes(64)) # Toàn số 0: không cấp phát
+    assert mem.allocated_bytes() == 0
+    mem.store(0x5000, 1, 1)
+    assert mem.allocated_bytes() == PAGE_SIZE
+
+
+def test_out_of_range_and_alignment():
+    mem = DataMemory(0x100)
+    with pytest.raises(MemoryAccessError):
+        mem.load(0xFC, 8)
+    with pytest.raises(MemoryAccessError):
+        mem.store(-1, 1, 0)
+    strict = DataMemory(0x100, strict_alignment=True)
+    with pytest.raises(MemoryAccessError):
+        strict.load(4, 8)
+    assert strict.load(8, 8) == 0
+
+
+def test_snapshot_is_copy_on_write():
+    mem = DataMemory(0x10000)
+    mem.store(0, 8, 1)
+    snapshot = mem.snapshot()
+    mem.store(0, 8, 2)
+    mem.store(PAGE_SIZE, 8, 3)
+    assert snapshot[0] is not mem.pages[0]
+    mem.restore(snapshot)
+    assert mem.load(0, 8) == 1
+    assert mem.load(PAGE_SIZE, 8) == 0
+    mem.store(0, 8, 4) # Ghi sau restore không làm hỏng snapshot
+    assert int.from_bytes(snapshot[0][:8], 'little') == 1
+
+
+def test_watchpoint_hit():
+    mem = DataMemory(0x1000)
+    mem.add_watchpoint(0x40, 8, 'w')
+    mem.load(0x40, 8)
+    assert mem.watch_hit is None
+    mem.store(0x44, 4, 7)
+    assert mem.watch_hit == (0x44, 4, 'w')
+    mem.clear_watchpoints()
+    assert 'store' not in mem.__dict__
+    with pytest.raises(ValueError):
+        mem.add_watchpoint(0, 8, 'x')
+
+
+def test_mapped_memory_persists(tmp_path):
+    path = os.path.join(tmp_path, 'image.bin')
+    mem = MappedDataMemory(0x2000, path)
+    mem.store(0x1FF8, 8, 0xDEADBEEF)
+    mem.close()
+    assert os.path.getsize(path) == 0x2000
+    again = MappedDataMemory(0x2000, path)
+    assert again.load(0x1FF8, 8) == 0xDEADBEEF
+    assert list(again.nonzero_words()) == [(0x1FF8, 0xDEADBEEF)]
+    again.close()
@@ -0,0 +1,75 @@
+# tests/test_pipeline.py
+"""Pipeline 5 tầng: kết quả kiến trúc giống interpreter, số chu kỳ theo hazard và rẽ nhánh."""
+import pytest
+
+from assembler import assemble
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload
+from branch_predictor import make_predictor
+from legv8_simulator import LEGv8_Simplified_Simulator
+from pipeline import PipelineSimulator, FLUSH_PENALTY
+
+
+def run_pipeline(source, forwarding=True, predictor=None, mem_size=0x1000):
+    sim = LEGv8_Simplified_Simulator(mem_size=mem_size)
+    sim.load_program(assemble(source))
+    if predictor:
+        sim.attach_branch_predictor(make_predictor(predictor))
+    core = PipelineSimulator(sim, forwarding=forwarding)
+    core.run()
+    return sim, core.stats
+
+
+def check_cycle_count(stats):
+    # 4 chu kỳ đổ đầy pipeline + 1 chu kỳ mỗi lệnh + stall + phạt flush
+    assert stats.cycles == stats.retired + 4 + stats.stalls + stats.flushes * FLUSH_PENALTY
+
+
+@pytest.mark.parametrize('name', sorted(WORKLOADS))
+@pytest.mark.parametrize('forwarding', [True, False])
+def test_workloads_match_interpreter(name, forwarding):
+    source = load_workload(name)
+    sim, stats = run_pipeline(source, forwarding, 'gshare', mem_size=WORKLOAD_MEM_SIZE)
+    reference = LEGv8_Simplified_Simulator(mem_size=WORKLOAD_MEM_SIZE)
+    reference.load_program(assemble(source))
+    reference.run()
+    assert sim.registers == reference.registers and sim.flags == reference.flags
+    assert sim.instruction_count == reference.instruction_count == stats.retired
+    assert dict(sim.data_memory.nonzero_words()) == dict(reference.data_memory.nonzero_words())
+    check_cycle_count(stats)
+
+
+def test_independent_instructions_do_not_stall():
+    _, stats = run_pipeline("ADDI X1, X1, #1\nADDI X2, X2, #1\nADDI X3, X3, #1\nHALT")
+    assert (stats.cycles, stats.stalls) == (8, 0)
+
+
+def test_forwarding_removes_alu_stall():
+    source = "ADDI X1, X1, #1\nADDI X2, X1, #1\nHALT"
+    assert run_pipeline(source)[1].stalls == 0
+    _, stats = run_pipeline(source, forwarding=False)
+    assert stats.stalls == 2
+    check_cycle_count(stats)
+
+
+def test_load_use_stalls_once():
+    _, stats = run_pipeline("LDUR X1, [XZR, #0]\nADDI X2, X1, #1\nHALT")
+    assert stats.stalls == 1
+    check_cycle_count(stats)
+
+
+def test_flags_are_a_dependency():
+    _, stats = run_pipeline("SUBIS X1, X1, #0\nB.EQ L\nNOP\nL: HALT", forwarding=False)
+    assert stats.stalls == 2
+
+
+def test_taken_branches_flush_without_predictor():
+    sim, stats = run_pipeline("MOVZ X1, #5\nL: SUBI X1, X1, #1\nCBNZ X1, L\nHALT")
+    assert sim.registers[1] == 0
+    assert (stats.branches, stats.flushes, stats.squashed) == (5, 4, 8)
+    check_cycle_count(stats)
+
+
+def test_predictor_reduces_flushes():
+    _, stats = run_pipeline("MOVZ X1, #5\nL: SUBI X1, X1, #1\nCBNZ X1, L\nHALT", predictor='btfn')
+    assert stats.flushes == 1 # Chỉ lần thoát vòng lặp bị đoán sai
+    check_cycle_count(stats)
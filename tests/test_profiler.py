@@ -0,0 +1,92 @@
+# tests/test_profiler.py
+"""Profiler: số đếm theo PC/dòng, instruction mix, nhánh, lưu lượng bộ nhớ và xuất CSV/JSON."""
+import csv
+import json
+
+import pytest
+
+from assembler import assemble
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload
+from legv8_simulator import LEGv8_Simplified_Simulator
+from profiler import Profiler, CSV_COLUMNS
+
+SOURCE = """
+    ADDI X1, XZR, #4
+loop:
+    STUR X1, [X2, #0]
+    LDUR X3, [X2, #0]
+    SUBI X1, X1, #1
+    CBNZ X1, loop
+    HALT
+"""
+
+
+def _profiled(source=SOURCE, mem_size=None):
+    sim = LEGv8_Simplified_Simulator(**({'mem_size': mem_size} if mem_size else {}))
+    sim.load_program(assemble(source))
+    profiler = Profiler(sim.program)
+    sim.attach_profiler(profiler)
+    sim.run()
+    return sim, profiler
+
+
+def test_counts_per_pc_and_line():
+    sim, profiler = _profiled()
+    assert list(profiler.counts) == [1, 4, 4, 4, 4, 1]
+    assert profiler.total == sim.instruction_count == 18
+    assert profiler.line_counts() == {2: 1, 4: 4, 5: 4, 6: 4, 7: 4, 8: 1}
+
+
+def test_report_mix_branches_and_memory():
+    _, profiler = _profiled()
+    report = profiler.report()
+    assert report['instructions'] == 18
+    assert report['mix'] == {'I': 5, 'STORE': 4, 'LOAD': 4, 'CBZ': 4, 'HALT': 1}
+    assert report['branches'] == [{'pc': 16, 'line': 7, 'count': 4, 'taken': 3, 'not_taken': 1}]
+    assert report['memory'] == {
+        'loads': 4, 'stores': 4,
+        'by_line': {4: {'loads': 0, 'stores': 4, 'bytes': 32},
+                    5: {'loads': 4, 'stores': 0, 'bytes': 32}},
+    }
+    row = report['pcs'][1]
+    assert (row['instruction'], row['source']) == ('STUR', 'STUR X1, [X2, #0]')
+
+
+def test_hot_spots():
+    _, profiler = _profiled()
+    hottest = profiler.hot_spots(top=2)
+    assert [line for line, _, _ in hottest] == [4, 5]
+    assert hottest[0][1:] == (4, pytest.approx(4 / 18))
+
+
+def test_clear_and_reload():
+    sim, profiler = _profiled()
+    sim.reset()
+    assert profiler.total == 0
+    sim.load_program(assemble("ADDI X0, XZR, #1\nHALT"))
+    assert len(profiler.counts) == 2
+    sim.run()
+    assert list(profiler.counts) == [1, 1]
+
+
+@pytest.mark.parametrize('name', sorted(WORKLOADS))
+def test_profiled_workload_matches_instruction_count(name):
+    sim, profiler = _profiled(load_workload(name), WORKLOAD_MEM_SIZE)
+    assert sim.registers[0] == WORKLOADS[name]
+    assert profiler.total == sim.instruction_count
+
+
+def test_export_csv_and_json(tmp_path):
+    _, profiler = _profiled()
+    csv_path = tmp_path / 'profile.csv'
+    json_path = tmp_path / 'profile.JSON'
+    profiler.export(str(csv_path))
+    profiler.export(str(json_path))
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert tuple(rows[0]) == CSV_COLUMNS
+    assert [int(row['count']) for row in rows] == [1, 4, 4, 4, 4, 1]
+    with open(json_path, encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['instructions'] == 18
+    assert report['memory']['by_line']['4']['stores'] == 4
@@ -0,0 +1,96 @@
+# tests/test_simulator.py
+"""Lõi interpreter: ngữ nghĩa từng lệnh qua step() / run() và cache lệnh đã giải mã."""
+import pytest
+
+from assembler import assemble
+from decoder import MASK64
+from legv8_simulator import LEGv8_Simplified_Simulator
+from memory import MemoryAccessError
+
+
+def make_sim(source, mem_size=0x1000):
+    sim = LEGv8_Simplified_Simulator(mem_size=mem_size)
+    sim.load_program(assemble(source))
+    return sim
+
+
+def test_arithmetic_and_flags():
+    sim = make_sim("""
+        MOVZ X1, #5
+        SUBIS X2, X1, #7
+        ADDS X3, X1, X1
+        HALT
+    """)
+    sim.step()
+    sim.step()
+    assert sim.registers[2] == (5 - 7) & MASK64
+    assert sim.flags == {'N': 1, 'Z': 0, 'V': 0, 'C': 0}
+    sim.run()
+    assert sim.registers[3] == 10
+    assert sim.halted
+    assert sim.instruction_count == 4
+
+
+def test_xzr_is_never_written():
+    sim = make_sim("MOVZ XZR, #9\nADDI X1, XZR, #3\nHALT")
+    sim.run()
+    assert sim.registers[31] == 0
+    assert sim.registers[1] == 3
+
+
+def test_step_state_describes_instruction():
+    sim = make_sim("MOVZ X1, #64\nSTUR X1, [X1, #8]\nHALT")
+    sim.step()
+    state = sim.step()
+    assert state['instruction'] == 'STUR'
+    assert state['mem_addr'] == 72
+    assert state['mem_write'] and not state['mem_read']
+    assert state['next_pc'] == 8
+    assert sim.get_memory_value(72) == 64
+
+
+def test_branch_loop_and_call():
+    sim = make_sim("""
+        MOVZ X0, #0
+        MOVZ X1, #10
+    LOOP:
+        BL ADD_ONE
+        SUBI X1, X1, #1
+        CBNZ X1, LOOP
+        HALT
+    ADD_ONE:
+        ADDI X0, X0, #1
+        BR X30
+    """)
+    sim.run()
+    assert sim.registers[0] == 10
+    assert sim.halted
+
+
+def test_run_limits():
+    sim = make_sim("L: ADDI X1, X1, #1\nB L")
+    assert sim.run(max_steps=11) == 11
+    assert sim.registers[1] == 6
+    assert sim.pc == 4
+    assert sim.run(until_pc=4) == 2 # Ít nhất một lệnh trước khi dừng ở until_pc
+    assert sim.pc == 4
+    assert sim.registers[1] == 7
+
+
+def test_out_of_range_access_raises():
+    sim = make_sim("MOVZ X1, #4096\nLDUR X2, [X1, #0]\nHALT", mem_size=0x1000)
+    sim.step()
+    with pytest.raises(MemoryAccessError):
+        sim.step()
+    assert sim.pc == 4 # Lệnh lỗi không làm PC tiến lên
+    assert sim.instruction_count == 1
+
+
+def test_decoded_cache_reset_on_load():
+    sim = make_sim("ADDI X1, X1, #1\nHALT")
+    first = sim.decode_at(0)
+    assert sim.decode_at(0) is first
+    sim.load_program(assemble("ADDI X1, X1, #2\nHALT"))
+    assert sim.decode_at(0).imm == 2
+    sim.run()
+    assert sim.registers[1] == 2
@@ -0,0 +1,133 @@
+# tests/test_state_file.py
+"""State file: lưu/khôi phục giữa chừng, copy-on-write trên trang mmap, đóng mmap và file hỏng."""
+import pytest
+
+from assembler import assemble
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload
+from legv8_simulator import LEGv8_Simplified_Simulator
+from state_file import MAGIC, VERSION
+
+
+def _sim(name='bubble_sort', mem_size=WORKLOAD_MEM_SIZE, **kwargs):
+    sim = LEGv8_Simplified_Simulator(mem_size=mem_size, **kwargs)
+    sim.load_program(assemble(load_workload(name)))
+    return sim
+
+
+def _machine_state(sim):
+    return (list(sim.registers), sim.pc, sim.flags, sim.halted, sim.instruction_count,
+            bytes(sim.data_memory.read_block(0, sim.data_memory.size)))
+
+
+@pytest.mark.parametrize('block', [False, True])
+def test_round_trip_mid_run(tmp_path, block):
+    path = str(tmp_path / 'state.lgst')
+    original = _sim()
+    original.run(max_steps=50_000)
+    original.save_state(path)
+
+    restored = LEGv8_Simplified_Simulator() # Kích thước bộ nhớ lấy theo file
+    restored.load_state(path)
+    assert restored.data_memory.size == WORKLOAD_MEM_SIZE
+    assert _machine_state(restored) == _machine_state(original)
+    assert restored.program.words == original.program.words
+    assert restored.program.source_lines == original.program.source_lines
+    assert restored.program.label_to_pc_map == original.program.label_to_pc_map
+
+    if block:
+        restored.enable_block_engine()
+    original.run()
+    restored.run()
+    assert restored.registers[0] == WORKLOADS['bubble_sort']
+    assert _machine_state(restored) == _machine_state(original)
+
+
+def test_writes_after_load_do_not_touch_file(tmp_path):
+    path = str(tmp_path / 'state.lgst')
+    sim = _sim()
+    sim.data_memory.store(0x100, 8, 0x1122334455667788)
+    sim.save_state(path)
+
+    sim.load_state(path)
+    sim.data_memory.store(0x100, 8, 42) # Trang view vào file được chép ra trước khi ghi
+    assert sim.data_memory.load(0x100) == 42
+    other = LEGv8_Simplified_Simulator()
+    other.load_state(path)
+    assert other.data_memory.load(0x100) == 0x1122334455667788
+
+
+def test_reset_releases_mapping(tmp_path):
+    path = str(tmp_path / 'state.lgst')
+    sim = _sim()
+    sim.run(max_steps=1000)
+    sim.save_state(path)
+    sim.load_state(path)
+    _, mapped = sim._state_map
+    before = _machine_state(sim)[5]
+    sim.reset()
+    assert sim._state_map is None
+    assert mapped.closed
+    sim.load_state(path)
+    assert _machine_state(sim)[5] == before
+
+
+def test_history_snapshots_survive_release(tmp_path):
+    path = str(tmp_path / 'state.lgst')
+    sim = _sim()
+    sim.run(max_steps=2000)
+    sim.save_state(path)
+    sim.load_state(path)
+    sim.enable_history(snapshot_interval=100)
+    expected = _machine_state(sim)
+    sim.run(max_steps=500)
+    _, mapped = sim._state_map
+    sim.save_state(path) # Ghi đè chính file đang map: snapshot được chép ra, mmap đóng
+    assert mapped.closed
+    sim.history.seek(2000)
+    assert _machine_state(sim) == expected
+
+
+def test_save_over_loaded_file(tmp_path):
+    path = str(tmp_path / 'state.lgst')
+    sim = _sim()
+    sim.run(max_steps=1000)
+    sim.save_state(path)
+    sim.load_state(path)
+    sim.run(max_steps=1000)
+    sim.save_state(path)
+    expected = _machine_state(sim)
+    sim.load_state(path)
+    assert _machine_state(sim) == expected
+    assert sim.instruction_count == 2000
+
+
+def test_mapped_memory_image(tmp_path):
+    path = str(tmp_path / 'state.lgst')
+    original = _sim()
+    original.run(max_steps=20_000)
+    original.save_state(path)
+    image = str(tmp_path / 'memory.img')
+    sim = _sim(memory_image=image)
+    sim.load_state(path)
+    assert sim._state_map is None # Trang đã chép vào image, mmap của state file đóng ngay
+    assert _machine_state(sim) == _machine_state(original)
+
+    small = _sim(mem_size=1 << 12, memory_image=str(tmp_path / 'small.img'))
+    with pytest.raises(ValueError, match='does not match'):
+        small.load_state(path)
+
+
+@pytest.mark.parametrize('content, message', [
+    (b'', 'not a LEGv8 state file'),
+    (b'LGS', 'not a LEGv8 state file'),
+    (b'ABCD' + bytes(60), 'not a LEGv8 state file'),
+    (MAGIC + (VERSION + 1).to_bytes(2, 'little') + bytes(58), 'Unsupported state file version'),
+])
+def test_bad_files(tmp_path, content, message):
+    path = tmp_path / 'bad.lgst'
+    path.write_bytes(content)
+    sim = _sim()
+    before = _machine_state(sim)
+    with pytest.raises(ValueError, match=message):
+        sim.load_state(str(path))
+    assert _machine_state(sim) == before # Lỗi không làm hỏng trạng thái đang có
@@ -0,0 +1,101 @@
+# tests/test_trace_recorder.py
+"""Trace nhị phân dạng cột: ghi bằng simulator, đọc ngẫu nhiên qua index, dựng lại state, CLI replay."""
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from assembler import assemble
+from legv8_simulator import LEGv8_Simplified_Simulator
+from trace_recorder import (TraceRecorder, TraceReader, format_event, MEM_NONE, MEM_READ, MEM_WRITE)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE = """
+    MOVZ X1, #50
+LOOP:
+    STUR X1, [XZR, #16]
+    LDUR X2, [XZR, #16]
+    SUBIS X1, X1, #1
+    B.NE LOOP
+    HALT
+"""
+
+
+def record(chunk_events=16):
+    program = assemble(SOURCE)
+    sim = LEGv8_Simplified_Simulator(mem_size=0x100)
+    sim.load_program(program)
+    buffer = io.BytesIO()
+    recorder = TraceRecorder(buffer, chunk_events=chunk_events)
+    sim.attach_recorder(recorder)
+    sim.run()
+    recorder.close()
+    return program, sim, buffer.getvalue()
+
+
+def test_every_instruction_is_recorded():
+    _, sim, data = record()
+    with TraceReader(data) as reader:
+        assert len(reader) == sim.instruction_count == 1 + 4 * 50 + 1
+        assert len(reader.index) == -(-len(reader) // 16)
+        pcs = reader.column('pc')
+        assert list(pcs[:6]) == [0, 4, 8, 12, 16, 4]
+        assert list(reader.column('pc', 195, 300)) == [event.pc for event in reader.events(195)]
+
+
+def test_event_fields():
+    _, _, data = record()
+    reader = TraceReader(data)
+    store, load, subs = reader[1], reader[2], reader[3]
+    assert (store.mem_kind, store.mem_addr, store.reg) == (MEM_WRITE, 16, -1)
+    assert (load.mem_kind, load.reg, load.value) == (MEM_READ, 2, 50)
+    assert (subs.mem_kind, subs.reg, subs.value) == (MEM_NONE, 1, 49)
+    assert reader[-1].pc == reader[-1].next_pc == 20 # HALT
+    with pytest.raises(IndexError):
+        reader.event(len(reader))
+
+
+def test_state_at_matches_step():
+    program, _, data = record()
+    reader = TraceReader(data)
+    sim = LEGv8_Simplified_Simulator(mem_size=0x100)
+    sim.load_program(program)
+    for i in range(len(reader)):
+        state = sim.step()
+        replayed = reader.state_at(i, program)
+        for key in ('pc', 'next_pc', 'instruction', 'mem_addr', 'reg_written', 'flags', 'line'):
+            assert replayed[key] == state[key], (i, key)
+
+
+def test_format_event_shows_effects():
+    program, _, data = record()
+    text = format_event(TraceReader(data), 2, program)
+    assert "LDUR  (line 5: LDUR X2, [XZR, #16])" in text
+    assert "X2 <- 0x32   mem read [0x10]" in text
+
+
+def test_rejects_bad_files():
+    with pytest.raises(ValueError):
+        TraceReader(b'XXXX' + bytes(64))
+    _, _, data = record()
+    with pytest.raises(ValueError, match="truncated"):
+        TraceReader(data[:-4])
+
+
+def test_cli_record_and_replay(tmp_path):
+    source = os.path.join(tmp_path, 'loop.s')
+    trace = os.path.join(tmp_path, 'loop.trace')
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write(SOURCE)
+    main = os.path.join(ROOT, 'main.py')
+    subprocess.run([sys.executable, main, '--headless', source, '--record-trace', trace],
+                   check=True, capture_output=True)
+    out = subprocess.run([sys.executable, main, '--replay-trace', trace, '--at', '-1'],
+                         check=True, capture_output=True, text=True).stdout
+    assert out.startswith("#201") and "HALT" in out
+    failed = subprocess.run([sys.executable, main, '--replay-trace', trace, '--at', '999'],
+                            capture_output=True, text=True)
+    assert failed.returncode == 1 and "out of range" in failed.stderr
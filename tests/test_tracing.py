@@ -0,0 +1,59 @@
+# tests/test_tracing.py
+"""Trace có cấp độ và nhóm: sink, lọc, và simulator dùng Tracer riêng."""
+import pytest
+
+from assembler import assemble
+from legv8_simulator import LEGv8_Simplified_Simulator
+from tracing import Tracer, RingBufferSink, BufferedFileSink, DEBUG, INFO, WARNING
+
+
+def test_inactive_by_default():
+    tracer = Tracer()
+    assert not tracer.active
+    tracer.emit('system', "ignored")
+    assert not tracer.enabled('system')
+
+
+def test_filters_by_category_and_level():
+    sink = RingBufferSink()
+    tracer = Tracer(sink, ('mem', 'system'), level=INFO)
+    tracer.emit('mem', "kept")
+    tracer.emit('fetch', "other category")
+    tracer.emit('system', "too detailed", DEBUG)
+    tracer.emit('system', "warning", WARNING)
+    assert sink.lines() == ["[INFO] mem: kept", "[WARNING] system: warning"]
+
+
+def test_ring_buffer_keeps_latest():
+    sink = RingBufferSink(capacity=3)
+    tracer = Tracer(sink, ('system',))
+    for i in range(5):
+        tracer.emit('system', str(i))
+    assert [line[-1] for line in sink.lines()] == ['2', '3', '4']
+
+
+def test_unknown_category_rejected():
+    with pytest.raises(ValueError):
+        Tracer(RingBufferSink(), ('nope',))
+
+
+def test_file_sink(tmp_path):
+    path = tmp_path / 'trace.log'
+    sink = BufferedFileSink(str(path))
+    tracer = Tracer(sink, ('branch',))
+    tracer.emit('branch', "taken")
+    tracer.disable()
+    sink.close()
+    assert path.read_text(encoding='utf-8') == "[INFO] branch: taken\n"
+
+
+def test_simulator_emits_execution_records():
+    sink = RingBufferSink()
+    sim = LEGv8_Simplified_Simulator(mem_size=0x100, tracer=Tracer(sink, ('fetch', 'reg-write', 'mem', 'branch')))
+    sim.load_program(assemble("MOVZ X1, #8\nSTUR X1, [X1, #0]\nCBZ XZR, END\nNOP\nEND: HALT"))
+    sim.run()
+    lines = sink.lines()
+    assert "[INFO] reg-write: X1 <- 0x8" in lines
+    assert "[INFO] mem: W [0x00000008] = 0x8" in lines
+    assert any("branch: PC=0x00000008 taken" in line for line in lines)
+    assert sum('fetch:' in line for line in lines) == 4
@@ -0,0 +1,114 @@
+# tests/test_vector_engine.py
+"""Engine vector hóa: mỗi lane cho kết quả giống hệt interpreter, kể cả khi lane rẽ nhánh khác nhau hay lỗi."""
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from assembler import assemble  # noqa: E402
+from batch import collect_cases, run_vector_cases  # noqa: E402
+from benchmarks import WORKLOADS, WORKLOAD_MEM_SIZE, load_workload  # noqa: E402
+from headless import run_program  # noqa: E402
+from vector_engine import MAX_MEMORY, VectorSimulator, run_vectorized  # noqa: E402
+
+SUM = """
+    ADD X1, XZR, XZR
+loop:
+    CBZ X0, done
+    ADD X1, X1, X0
+    SUBI X0, X0, #1
+    B loop
+done:
+    STUR X1, [X2, #8]
+    SUBS X3, X1, X4
+    LDUR X5, [X2, #0]
+    HALT
+"""
+STATE_KEYS = ('registers', 'flags', 'memory', 'pc', 'steps', 'halted')
+
+
+def _reference(source, registers=None, memory=None, max_steps=None, mem_size=1024):
+    return run_program(source, max_steps=max_steps, mem_size=mem_size,
+                       initial_registers=registers, initial_memory=memory)
+
+
+def _same_state(vector, reference):
+    return all(vector[key] == reference[key] for key in STATE_KEYS)
+
+
+@pytest.mark.parametrize('name', sorted(WORKLOADS))
+def test_workloads_match_interpreter(name):
+    source = load_workload(name)
+    _, [state] = run_vectorized(assemble(source), [({}, {})], mem_size=WORKLOAD_MEM_SIZE)
+    assert state['error'] is None
+    assert state['registers'][0] == WORKLOADS[name]
+    assert _same_state(state, _reference(source, mem_size=WORKLOAD_MEM_SIZE))
+
+
+def test_divergent_lanes_match_interpreter():
+    inputs = [({0: n, 2: 16 * (n % 3), 4: 10}, {16 * (n % 3): n * 1000}) for n in (0, 1, 5, 9, 5, 2)]
+    sims, states = run_vectorized(assemble(SUM), inputs)
+    for (registers, memory), state in zip(inputs, states):
+        assert _same_state(state, _reference(SUM, registers, memory))
+    assert states[2]['registers'][1] == 15
+    assert states[3]['flags']['N'] == 0 and states[0]['flags']['N'] == 1
+    # Lane cùng PC chạy chung một lần dispatch
+    assert len(sims) == 1
+    assert sims[0].groups < sum(state['steps'] for state in states)
+
+
+def test_lane_fault_and_step_limit():
+    # Lane 1 ghi ra ngoài bộ nhớ, các lane khác chạy tiếp bình thường
+    inputs = [({0: 3}, {}), ({0: 3, 2: 4096}, {}), ({0: 100}, {})]
+    _, states = run_vectorized(assemble(SUM), inputs, max_steps=50)
+    assert states[0]['halted'] and states[0]['error'] is None
+    assert states[1]['error'] and states[1]['halted']
+    assert states[1]['pc'] == _reference(SUM, *inputs[1], max_steps=50)['pc']
+    assert not states[2]['halted'] and states[2]['steps'] == 50
+    assert _same_state(states[2], _reference(SUM, *inputs[2], max_steps=50))
+
+
+def test_inputs_split_to_fit_memory_limit():
+    inputs = [({0: n, 4: 10}, {8: n}) for n in range(7)]
+    program = assemble(SUM)
+    sims, states = run_vectorized(program, inputs, mem_size=64, max_memory=192)
+    assert [sim.lanes for sim in sims] == [3, 3, 1]
+    _, together = run_vectorized(program, inputs, mem_size=64)
+    assert states == together
+    assert [state['registers'][1] for state in states] == [n * (n + 1) // 2 for n in range(7)]
+    with pytest.raises(ValueError, match='vector engine limit'):
+        run_vectorized(program, inputs, mem_size=256, max_memory=192)
+
+
+def test_invalid_configuration():
+    program = assemble(SUM)
+    with pytest.raises(ValueError, match='at least 1'):
+        VectorSimulator(program, 0)
+    with pytest.raises(ValueError, match='at least 1 byte'):
+        VectorSimulator(program, 4, mem_size=0)
+    with pytest.raises(ValueError, match='vector engine limit'):
+        VectorSimulator(program, 2, mem_size=MAX_MEMORY)
+    with pytest.raises(ValueError, match='vector engine limit'):
+        VectorSimulator(program, 4, mem_size=64, max_memory=128)
+    sim = VectorSimulator(program, 1, mem_size=64)
+    with pytest.raises(ValueError, match='outside lane memory'):
+        sim.store_word(0, 60, 1)
+
+
+def test_batch_vector_cases(tmp_path):
+    path = tmp_path / 'sum.s'
+    path.write_text(SUM, encoding='utf-8')
+    cases_path = tmp_path / 'cases.json'
+    cases_path.write_text(json.dumps({
+        'defaults': {'inputs': {'registers': {'X4': 1}}},
+        'cases': [
+            {'name': 'ten', 'inputs': {'registers': {'X0': 10}}, 'expect': {'registers': {'X1': 55}}},
+            {'inputs': {'registers': {'X0': 4}}, 'expect': {'registers': {'X1': 11}, 'memory': {'0x8': 10}}},
+        ],
+    }), encoding='utf-8')
+    results = run_vector_cases(str(path), collect_cases(str(cases_path)))
+    assert [r['name'] for r in results] == ['ten', 'case2']
+    assert results[0]['passed']
+    assert not results[1]['passed']
+    assert [c['ok'] for c in results[1]['checks']] == [False, True]
@@ -0,0 +1,82 @@
+# tests/test_worker.py
+"""Worker nền của GUI: chạy đến HALT/breakpoint/lỗi, Stop/Pause, snapshot tách khỏi simulator."""
+import time
+
+from assembler import assemble
+from legv8_simulator import LEGv8_Simplified_Simulator
+from worker import SimulationWorker
+
+
+def make_worker(source, engine='block', **kwargs):
+    sim = LEGv8_Simplified_Simulator(mem_size=0x1000)
+    sim.load_program(assemble(source))
+    if engine == 'block':
+        sim.enable_block_engine()
+    return sim, SimulationWorker(sim, **kwargs)
+
+
+def final_snapshot(worker, timeout=5.0):
+    """Chờ snapshot cuối (running = False) của lần chạy."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        snapshot = worker.latest_snapshot()
+        if snapshot is not None and not snapshot['running']:
+            worker.stop()
+            return snapshot
+        time.sleep(0.005)
+    raise AssertionError("worker did not finish")
+
+
+def test_runs_to_halt():
+    sim, worker = make_worker("MOVZ X1, #20000\nL: SUBI X1, X1, #1\nSTUR X1, [XZR, #8]\nCBNZ X1, L\nHALT")
+    worker.start()
+    snapshot = final_snapshot(worker)
+    assert snapshot['halted'] and snapshot['error'] is None
+    assert snapshot['instruction_count'] == sim.instruction_count == 1 + 3 * 20000 + 1
+    assert snapshot['memory'].load(8) == 0
+    assert not worker.is_running
+
+
+def test_snapshot_memory_is_isolated():
+    sim, worker = make_worker("MOVZ X1, #5\nSTUR X1, [XZR, #8]\nHALT")
+    worker.start()
+    snapshot = final_snapshot(worker)
+    sim.data_memory.store(8, 8, 99)
+    assert snapshot['memory'].load(8) == 5
+
+
+def test_stop_and_pause_infinite_loop():
+    sim, worker = make_worker("L: ADDI X1, X1, #1\nB L", slice_seconds=0.005, publish_seconds=0.01)
+    worker.start()
+    time.sleep(0.05)
+    worker.pause()
+    time.sleep(0.05)
+    assert worker.is_paused and worker.is_running
+    paused_count = sim.instruction_count
+    time.sleep(0.05)
+    assert sim.instruction_count == paused_count
+    worker.resume()
+    time.sleep(0.05)
+    assert worker.stop()
+    assert not worker.is_running and not sim.halted
+    assert sim.instruction_count > paused_count
+
+
+def test_breakpoint_and_step_limit():
+    source = "L: ADDI X1, X1, #1\nADDI X2, X2, #1\nB L"
+    sim, worker = make_worker(source)
+    sim.add_breakpoint(4)
+    worker.start()
+    snapshot = final_snapshot(worker)
+    assert snapshot['stop_reason'] == 'breakpoint' and snapshot['pc'] == 4
+    sim.clear_breakpoints()
+    worker.start(max_steps=1000)
+    snapshot = final_snapshot(worker)
+    assert snapshot['instruction_count'] == 1001
+
+
+def test_error_is_published():
+    _, worker = make_worker("MOVZ X1, #65535\nLDUR X2, [X1, #0]\nHALT", engine='interp')
+    worker.start()
+    snapshot = final_snapshot(worker)
+    assert snapshot['halted'] and 'out of range' in snapshot['error']
@@ -0,0 +1,338 @@
+# trace_recorder.py
+"""
+Ghi lại từng lệnh đã thực thi dưới dạng cột (array) thay vì dict 'state',
+rồi đẩy ra file nhị phân chia chunk nén zlib kèm bảng chỉ mục để tìm nhanh.
+
+Định dạng file (little-endian):
+  header : magic 'LGTR', version (H), số cột (H), số sự kiện mỗi chunk (I)
+  chunk  : zlib(cột_1 | cột_2 | ...) - mỗi cột là mảng liên tiếp của chunk đó
+  index  : mỗi chunk một bản ghi (sự kiện đầu, offset, độ dài nén, số sự kiện)
+  footer : offset của index (Q), tổng số sự kiện (Q), magic 'LGTX'
+Một sự kiện: pc, next_pc, mã máy, thanh ghi được ghi (-1 nếu không có) và giá trị mới,
+địa chỉ bộ nhớ + loại truy cập (0 không / 1 đọc / 2 ghi), cờ NZCV sau lệnh.
+"""
+import io
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from decoder import XZR, decode_word
+
+MAGIC = b'LGTR'
+FOOTER_MAGIC = b'LGTX'
+VERSION = 1
+DEFAULT_CHUNK_EVENTS = 1 << 16
+
+_HEADER = struct.Struct('<4sHHI')
+_INDEX_ENTRY = struct.Struct('<QQII')
+_FOOTER = struct.Struct('<QQ4s')
+
+# (tên cột, typecode của array)
+COLUMNS = (
+    ('pc', 'Q'), ('next_pc', 'Q'), ('word', 'I'), ('reg', 'b'), ('value', 'Q'),
+    ('mem_addr', 'Q'), ('mem_kind', 'B'), ('flags', 'B'),
+)
+
+MEM_NONE, MEM_READ, MEM_WRITE = 0, 1, 2
+
+TraceEvent = namedtuple('TraceEvent', [name for name, _ in COLUMNS])
+
+_SWAP = sys.byteorder != 'little' # File luôn little-endian
+
+
+def pack_flags(flags):
+    return flags['N'] << 3 | flags['Z'] << 2 | flags['C'] << 1 | flags['V']
+
+
+def unpack_flags(bits):
+    return {'N': bits >> 3 & 1, 'Z': bits >> 2 & 1, 'V': bits & 1, 'C': bits >> 1 & 1}
+
+
+class TraceRecorder:
+    """
+    Bộ ghi trace dạng cột. 'target' là đường dẫn file hoặc đối tượng file nhị phân
+    (mặc định io.BytesIO trong bộ nhớ). Mỗi khi đủ 'chunk_events' sự kiện,
+    chunk được nén và ghi ra ngay nên bộ nhớ dùng không tăng theo độ dài trace.
+    Gọi close() để ghi index + footer.
+    """
+
+    def __init__(self, target=None, chunk_events=DEFAULT_CHUNK_EVENTS):
+        if target is None:
+            target = io.BytesIO()
+        self._owns_file = isinstance(target, (str, bytes)) or hasattr(target, '__fspath__')
+        self.file = open(target, 'wb') if self._owns_file else target
+        self.chunk_events = chunk_events
+        self.index = [] # [(sự kiện đầu, offset, độ dài nén, số sự kiện)]
+        self.total_events = 0
+        self.closed = False
+        self._new_columns()
+        self.file.write(_HEADER.pack(MAGIC, VERSION, len(COLUMNS), chunk_events))
+
+    def _new_columns(self):
+        self.columns = [array(code) for _, code in COLUMNS]
+        (self._pc, self._next_pc, self._word, self._reg, self._value,
+         self._mem_addr, self._mem_kind, self._flags) = self.columns
+
+    def __len__(self):
+        return self.total_events
+
+    def record(self, pc, next_pc, word, reg, value, mem_addr, mem_kind, flags):
+        """Thêm một sự kiện (các giá trị đã là số nguyên, 'flags' đã pack_flags)."""
+        self._pc.append(pc)
+        self._next_pc.append(next_pc)
+        self._word.append(word)
+        self._reg.append(reg)
+        self._value.append(value)
+        self._mem_addr.append(mem_addr)
+        self._mem_kind.append(mem_kind)
+        self._flags.append(flags)
+        self.total_events += 1
+        if len(self._pc) >= self.chunk_events:
+            self._flush_chunk()
+
+    def record_executed(self, sim, pc, decoded, next_pc):
+        """Ghi lệnh 'decoded' vừa được simulator 'sim' thực thi tại 'pc'."""
+        signals = decoded.signals
+        rd = decoded.rd
+        if signals['RegWrite'] and rd != XZR:
+            reg, value = rd, sim.registers[rd]
+        else:
+            reg, value = -1, 0
+        mem_addr = sim._mem_addr
+        if mem_addr is None:
+            mem_addr, mem_kind = 0, MEM_NONE
+        else:
+            mem_kind = MEM_WRITE if signals['MemWrite'] else MEM_READ
+        f = sim.flags
+        # Gọi thẳng append thay vì qua record() vì đây là đường nóng (mỗi lệnh một lần)
+        self._pc.append(pc)
+        self._next_pc.append(next_pc)
+        self._word.append(decoded.word)
+        self._reg.append(reg)
+        self._value.append(value)
+        self._mem_addr.append(mem_addr)
+        self._mem_kind.append(mem_kind)
+        self._flags.append(f['N'] << 3 | f['Z'] << 2 | f['C'] << 1 | f['V'])
+        self.total_events += 1
+        if len(self._pc) >= self.chunk_events:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        count = len(self._pc)
+        if not count:
+            return
+        if _SWAP:
+            for column in self.columns:
+                column.byteswap()
+        payload = zlib.compress(b''.join(column.tobytes() for column in self.columns))
+        offset = self.file.tell()
+        self.file.write(payload)
+        self.index.append((self.total_events - count, offset, len(payload), count))
+        self._new_columns()
+
+    def close(self):
+        """Ghi chunk cuối, index và footer. File do recorder mở sẽ được đóng."""
+        if self.closed:
+            return
+        self._flush_chunk()
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(_INDEX_ENTRY.pack(*entry))
+        self.file.write(_FOOTER.pack(index_offset, self.total_events, FOOTER_MAGIC))
+        self.file.flush()
+        if self._owns_file:
+            self.file.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """
+    Đọc file trace: truy cập ngẫu nhiên theo số thứ tự sự kiện qua bảng index,
+    chỉ giải nén chunk chứa sự kiện cần đọc (giữ cache chunk gần nhất).
+    'source' là đường dẫn, bytes, hoặc file nhị phân seek được.
+    """
+
+    def __init__(self, source):
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        self._owns_file = not hasattr(source, 'read')
+        self.file = open(source, 'rb') if self._owns_file else source
+        magic, version, ncols, self.chunk_events = _HEADER.unpack(self.file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION or ncols != len(COLUMNS):
+            raise ValueError("Not a LEGv8 trace file (or unsupported version)")
+        self.file.seek(-_FOOTER.size, io.SEEK_END)
+        index_offset, self.total_events, footer_magic = _FOOTER.unpack(self.file.read(_FOOTER.size))
+        if footer_magic != FOOTER_MAGIC:
+            raise ValueError("Trace file is truncated (missing index)")
+        end = self.file.seek(0, io.SEEK_END)
+        count = (end - _FOOTER.size - index_offset) // _INDEX_ENTRY.size
+        self.file.seek(index_offset)
+        raw = self.file.read(count * _INDEX_ENTRY.size)
+        self.index = [_INDEX_ENTRY.unpack_from(raw, i * _INDEX_ENTRY.size) for i in range(count)]
+        self._chunk_starts = [entry[0] for entry in self.index]
+        self._cached_chunk = None # (số chunk, danh sách cột)
+        self._decoded = {} # {(pc, word): DecodedInstruction} cho replay
+
+    def __len__(self):
+        return self.total_events
+
+    def close(self):
+        if self._owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _chunk(self, chunk_no):
+        cached = self._cached_chunk
+        if cached is not None and cached[0] == chunk_no:
+            return cached[1]
+        _, offset, length, count = self.index[chunk_no]
+        self.file.seek(offset)
+        data = zlib.decompress(self.file.read(length))
+        columns = []
+        pos = 0
+        for _, code in COLUMNS:
+            column = array(code)
+            size = column.itemsize * count
+            column.frombytes(data[pos:pos + size])
+            if _SWAP:
+                column.byteswap()
+            columns.append(column)
+            pos += size
+        self._cached_chunk = (chunk_no, columns)
+        return columns
+
+    def event(self, i):
+        """Sự kiện thứ 'i' (0-based, cho phép chỉ số âm) dưới dạng TraceEvent."""
+        if i < 0:
+            i += self.total_events
+        if not 0 <= i < self.total_events:
+            raise IndexError(f"Trace event {i} out of range")
+        chunk_no = bisect_right(self._chunk_starts, i) - 1
+        columns = self._chunk(chunk_no)
+        j = i - self._chunk_starts[chunk_no]
+        return TraceEvent(*(column[j] for column in columns))
+
+    __getitem__ = event
+
+    def events(self, start=0, stop=None):
+        """Duyệt tuần tự các sự kiện [start, stop), giải nén mỗi chunk một lần."""
+        stop = self.total_events if stop is None else min(stop, self.total_events)
+        i = start
+        while i < stop:
+            chunk_no = bisect_right(self._chunk_starts, i) - 1
+            columns = self._chunk(chunk_no)
+            first = self._chunk_starts[chunk_no]
+            end = min(stop, first + len(columns[0]))
+            for j in range(i - first, end - first):
+                yield TraceEvent(*(column[j] for column in columns))
+            i = end
+
+    def __iter__(self):
+        return self.events()
+
+    def column(self, name, start=0, stop=None):
+        """Trả về array của một cột trong đoạn [start, stop) (vd. toàn bộ PC để thống kê)."""
+        k = [n for n, _ in COLUMNS].index(name)
+        stop = self.total_events if stop is None else min(stop, self.total_events)
+        out = array(COLUMNS[k][1])
+        i = start
+        while i < stop:
+            chunk_no = bisect_right(self._chunk_starts, i) - 1
+            first = self._chunk_starts[chunk_no]
+            col = self._chunk(chunk_no)[k]
+            end = min(stop, first + len(col))
+            out.extend(col[i - first:end - first])
+            i = end
+        return out
+
+    def state_at(self, i, program=None):
+        """
+        Dựng lại dict state (giống simulator.step()) cho sự kiện 'i' để đưa vào
+        DatapathVisualizer.update_datapath_visualization mà không cần mô phỏng lại.
+        'program' (tùy chọn) dùng để điền số dòng nguồn.
+        """
+        e = self.event(i)
+        key = (e.pc, e.word)
+        decoded = self._decoded.get(key)
+        if decoded is None:
+            decoded = self._decoded[key] = decode_word(e.word, e.pc)
+        signals = decoded.signals
+        return {
+            'pc': e.pc,
+            'next_pc': e.next_pc,
+            'instruction': decoded.name,
+            'control_signals': signals,
+            'active_component': decoded.active_component,
+            'mem_addr': e.mem_addr if e.mem_kind != MEM_NONE else None,
+            'mem_write': bool(signals['MemWrite']),
+            'mem_read': bool(signals['MemRead']),
+            'reg_written': f'X{e.reg}' if e.reg >= 0 else None,
+            'flags': unpack_flags(e.flags),
+            'halted': decoded.iclass == 'HALT',
+            'instruction_raw': e.word,
+            'line': program.line_for_pc(e.pc) if program is not None else None,
+        }
+
+
+def format_event(reader, i, program=None):
+    """
+    Hai dòng text mô tả sự kiện 'i' của 'reader' (lệnh, thanh ghi / bộ nhớ được truy cập,
+    cờ, PC kế tiếp) cho chế độ --replay-trace. 'program' (tùy chọn) để in dòng nguồn.
+    """
+    state = reader.state_at(i, program)
+    e = reader.event(i)
+    where = ""
+    if state['line'] is not None:
+        where = f"  (line {state['line']}: {program.text_at(e.pc).strip()})"
+    effects = []
+    if state['reg_written'] is not None:
+        effects.append(f"{state['reg_written']} <- {e.value:#x}")
+    if e.mem_kind != MEM_NONE:
+        effects.append(f"mem {'write' if e.mem_kind == MEM_WRITE else 'read'} [{e.mem_addr:#x}]")
+    flags = state['flags']
+    effects.append("NZCV=" + "".join(str(flags[k]) for k in 'NZCV'))
+    effects.append(f"next PC={state['next_pc']:#010x}")
+    return (f"#{i:<10} PC={e.pc:#010x}  {state['instruction']}{where}\n"
+            f"{'':12}{'   '.join(effects)}")
+
+
+def replay_trace(visualizer, reader, start=0, stop=None, delay_ms=500, program=None, on_event=None):
+    """
+    Phát lại các sự kiện [start, stop) của 'reader' lên 'visualizer' qua canvas.after
+    (không chặn mainloop). 'on_event(i, state)' được gọi sau mỗi sự kiện nếu có.
+    Trả về hàm cancel() để dừng phát lại.
+    """
+    stop = len(reader) if stop is None else min(stop, len(reader))
+    pending = {'after_id': None}
+
+    def show(i):
+        pending['after_id'] = None
+        if i >= stop:
+            return
+        state = reader.state_at(i, program)
+        visualizer.update_datapath_visualization(state)
+        if on_event is not None:
+            on_event(i, state)
+        pending['after_id'] = visualizer.canvas.after(delay_ms, show, i + 1)
+
+    def cancel():
+        if pending['after_id'] is not None:
+            visualizer.canvas.after_cancel(pending['after_id'])
+            pending['after_id'] = None
+
+    show(start)
+    return cancel
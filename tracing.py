@@ -0,0 +1,115 @@
+# tracing.py
+"""
+Hệ thống trace có cấp độ và nhóm (category), thay cho print() trong các đường nóng.
+Mặc định TRACER không hoạt động: simulator chọn biến thể step/run không trace nên
+gần như không tốn chi phí. Khi bật, bản ghi được ghi vào ring buffer trong bộ nhớ
+hoặc file có buffer lớn.
+"""
+import sys
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+# Các nhóm trace được hỗ trợ
+CATEGORIES = ('fetch', 'reg-write', 'mem', 'branch', 'assembler', 'system', 'datapath')
+
+
+def format_record(record):
+    category, level, message = record
+    return f"[{LEVEL_NAMES.get(level, level)}] {category}: {message}"
+
+
+class RingBufferSink:
+    """Giữ 'capacity' bản ghi gần nhất trong bộ nhớ."""
+
+    def __init__(self, capacity=10000):
+        self.records = deque(maxlen=capacity)
+
+    def write(self, record):
+        self.records.append(record)
+
+    def lines(self):
+        return [format_record(r) for r in self.records]
+
+    def clear(self):
+        self.records.clear()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BufferedFileSink:
+    """Ghi bản ghi ra file qua buffer lớn (mặc định 1 MiB) để giảm số lần ghi đĩa."""
+
+    def __init__(self, path, buffer_size=1 << 20):
+        self.path = path
+        self._file = open(path, 'w', buffering=buffer_size, encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(format_record(record) + '\n')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class StreamSink:
+    """Ghi bản ghi ra một stream (mặc định stderr), dùng khi debug tương tác."""
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stderr
+
+    def write(self, record):
+        self.stream.write(format_record(record) + '\n')
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class Tracer:
+    """
+    Bộ điều phối trace. 'active' chỉ True khi có sink và ít nhất một category;
+    code nóng kiểm tra 'active' một lần rồi chọn biến thể có/không trace.
+    """
+
+    def __init__(self, sink=None, categories=(), level=INFO):
+        self.configure(sink, categories, level)
+
+    def configure(self, sink=None, categories=CATEGORIES, level=INFO):
+        self.sink = sink
+        self.categories = frozenset(categories)
+        unknown = self.categories - set(CATEGORIES)
+        if unknown:
+            raise ValueError(f"Unknown trace categories: {', '.join(sorted(unknown))}")
+        self.level = level
+        self.active = sink is not None and bool(self.categories)
+
+    def disable(self):
+        if self.sink is not None:
+            self.sink.flush()
+        self.configure(None, (), self.level)
+
+    def enabled(self, category, level=INFO):
+        return self.active and level >= self.level and category in self.categories
+
+    def emit(self, category, message, level=INFO):
+        if self.active and level >= self.level and category in self.categories:
+            self.sink.write((category, level, message))
+
+
+# Tracer dùng chung của ứng dụng (mặc định tắt)
+TRACER = Tracer()
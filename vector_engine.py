@@ -0,0 +1,374 @@
+# vector_engine.py
+"""
+Engine vector hóa: chạy MỘT chương trình trên N bộ input cùng lúc (N "lane").
+- Registers là mảng NumPy (N, 32) uint64, cờ N/Z/V/C là 4 mảng bool độ dài N,
+  PC là mảng uint64 và bộ nhớ dữ liệu là mảng (N, mem_size) uint8 (mỗi lane một hàng).
+- Mỗi bước chọn PC nhỏ nhất trong các lane còn chạy; mọi lane đang ở PC đó chạy
+  lệnh cùng lúc (masked execution). Lane rẽ nhánh khác nhau tách thành các nhóm PC
+  riêng và gộp lại khi chạm cùng PC; lane đã HALT / lỗi / hết số lệnh bị loại khỏi mask.
+- Lệnh được giải mã bằng decoder.decode_word như LEGv8_Simplified_Simulator, nên kết
+  quả từng lane giống hệt chạy interpreter riêng lẻ.
+Bộ nhớ mọi lane được cấp phát dày (lanes * mem_size byte) nên tổng bị giới hạn bởi
+MAX_MEMORY: VectorSimulator ném ValueError nếu vượt, còn run_vectorized() tự chia các
+bộ input thành nhiều lô vừa giới hạn rồi nối kết quả lại.
+NumPy là phụ thuộc tùy chọn: chỉ cần khi tạo VectorSimulator.
+"""
+from decoder import MASK64, XZR, LR, decode_word
+
+try:
+    import numpy as np
+except ImportError: # NumPy không bắt buộc cho phần còn lại của simulator
+    np = None
+
+DEFAULT_MEM_SIZE = 1024
+MAX_MEMORY = 1 << 30 # Tổng số byte bộ nhớ tối đa của mọi lane (1 GiB)
+
+# Độ rộng truy cập và dtype little-endian tương ứng của load/store
+_LOAD_WIDTHS = {'LDUR': 8, 'LDURSW': 4, 'LDURH': 2, 'LDURB': 1}
+_STORE_WIDTHS = {'STUR': 8, 'STURW': 4, 'STURH': 2, 'STURB': 1}
+_UNSIGNED_DTYPES = {8: '<u8', 4: '<u4', 2: '<u2', 1: 'u1'}
+
+
+class VectorSimulator:
+    """
+    N bản simulator LEGv8 chạy lockstep trên 'program' (program.Program).
+    Nạp input từng lane bằng set_register()/store_word(), chạy bằng run(),
+    đọc kết quả bằng lane_state() hoặc results().
+    """
+
+    def __init__(self, program, lanes, mem_size=DEFAULT_MEM_SIZE, max_memory=MAX_MEMORY):
+        if np is None:
+            raise ImportError("The vectorized engine requires NumPy (pip install numpy)")
+        if lanes < 1:
+            raise ValueError("Number of lanes must be at least 1")
+        if mem_size < 1:
+            raise ValueError("Memory size must be at least 1 byte")
+        if lanes * mem_size > max_memory:
+            raise ValueError(f"{lanes} lanes x {mem_size:#x} bytes of memory = {lanes * mem_size:,} bytes "
+                             f"exceeds the vector engine limit of {max_memory:,} bytes; "
+                             f"use a smaller memory size or fewer lanes")
+        self.program = program
+        self.lanes = lanes
+        self.mem_size = mem_size
+        self._decoded = {}
+        self._handlers = {
+            'ADD': self._alu, 'SUB': self._alu, 'AND': self._alu, 'ORR': self._alu,
+            'EOR': self._alu, 'MUL': self._alu, 'LSL': self._alu, 'LSR': self._alu,
+            'ADDI': self._alu, 'SUBI': self._alu, 'ANDI': self._alu, 'ORRI': self._alu,
+            'EORI': self._alu, 'MOVZ': self._alu, 'MOVK': self._alu,
+            'SDIV': self._div, 'UDIV': self._div,
+            'ADDS': self._add_flags, 'SUBS': self._add_flags,
+            'ADDIS': self._add_flags, 'SUBIS': self._add_flags,
+            'ANDS': self._and_flags, 'ANDIS': self._and_flags,
+            'LDUR': self._load, 'LDURSW': self._load, 'LDURH': self._load, 'LDURB': self._load,
+            'STUR': self._store, 'STURW': self._store, 'STURH': self._store, 'STURB': self._store,
+            'B': self._branch, 'BL': self._branch, 'BR': self._branch,
+            'CBZ': self._branch, 'CBNZ': self._branch, 'B.cond': self._branch,
+            'HALT': self._halt, 'NOP': self._nop,
+        }
+        self.reset()
+
+    def reset(self):
+        """Mọi lane về trạng thái đầu: PC = base_pc, registers/cờ/bộ nhớ = 0."""
+        n = self.lanes
+        self.registers = np.zeros((n, 32), dtype=np.uint64)
+        self.flag_n = np.zeros(n, dtype=bool)
+        self.flag_z = np.zeros(n, dtype=bool)
+        self.flag_v = np.zeros(n, dtype=bool)
+        self.flag_c = np.zeros(n, dtype=bool)
+        self.pc = np.full(n, self.program.base_pc, dtype=np.uint64)
+        self.halted = np.zeros(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.memory = np.zeros((n, self.mem_size), dtype=np.uint8)
+        self.errors = [None] * n
+        self.groups = 0 # Số nhóm PC đã thực thi (= số lần dispatch một lệnh)
+
+    # --- Input ---
+    def set_register(self, lane, index, value):
+        if index != XZR:
+            self.registers[lane, index] = value & MASK64
+
+    def store_word(self, lane, addr, value, width=8):
+        """Ghi 'width' byte thấp của 'value' (little-endian) vào bộ nhớ của 'lane'."""
+        if addr < 0 or addr + width > self.mem_size:
+            raise ValueError(f"Memory address {addr:#x} (+{width} bytes) outside lane memory of {self.mem_size:#x} bytes")
+        self.memory[lane, addr:addr + width] = np.frombuffer(
+            (value & ((1 << (width * 8)) - 1)).to_bytes(width, 'little'), dtype=np.uint8)
+
+    def load_word(self, lane, addr, width=8):
+        return int.from_bytes(self.memory[lane, addr:addr + width].tobytes(), 'little')
+
+    # --- Chạy ---
+    def _decode(self, pc):
+        """Lệnh đã giải mã tại 'pc' (cache), None nếu ngoài chương trình; ValueError nếu lệnh sai."""
+        decoded = self._decoded.get(pc)
+        if decoded is None:
+            program = self.program
+            word = program.word_at(pc)
+            if word is None:
+                return None
+            decoded = decode_word(word, pc, line=program.line_for_pc(pc), text=program.text_at(pc))
+            self._decoded[pc] = decoded
+        return decoded
+
+    def _fail(self, lanes, message):
+        """Dừng các lane 'lanes' (mảng chỉ số) với thông báo lỗi."""
+        for lane in lanes.tolist():
+            self.errors[lane] = message
+        self.halted[lanes] = True
+
+    def run(self, max_steps=None):
+        """
+        Chạy đến khi mọi lane dừng (HALT, lỗi) hoặc đã chạy 'max_steps' lệnh (tính riêng
+        từng lane). Trả về số lần dispatch (mỗi lần một lệnh cho một nhóm lane cùng PC).
+        """
+        all_lanes = np.arange(self.lanes)
+        dispatched = 0
+        while True:
+            active = ~self.halted
+            if max_steps is not None:
+                active &= self.steps < max_steps
+            if not active.any():
+                break
+            pcs = self.pc[active]
+            pc = int(pcs.min())
+            if pcs.size == self.lanes and pcs.max() == pc:
+                sel = all_lanes # Mọi lane cùng PC: không cần lọc
+            else:
+                sel = np.flatnonzero(active & (self.pc == pc))
+            try:
+                decoded = self._decode(pc)
+            except ValueError as e:
+                self._fail(sel, str(e))
+                continue
+            if decoded is None:
+                self._fail(sel, 'Invalid PC')
+                continue
+            self.steps[sel] += 1
+            self._handlers[decoded.name](decoded, sel, pc)
+            dispatched += 1
+        self.groups += dispatched
+        return dispatched
+
+    # --- Thực thi từng nhóm lệnh: handler(d, sel, pc), 'sel' = chỉ số các lane ---
+    def _write(self, d, sel, values):
+        if d.rd != XZR:
+            self.registers[sel, d.rd] = values
+
+    def _alu(self, d, sel, pc):
+        r = self.registers
+        name = d.name
+        a = r[sel, d.rn]
+        if name in ('ADD', 'SUB', 'AND', 'ORR', 'EOR', 'MUL'):
+            b = r[sel, d.rm]
+            if name == 'ADD':
+                res = a + b
+            elif name == 'SUB':
+                res = a - b
+            elif name == 'AND':
+                res = a & b
+            elif name == 'ORR':
+                res = a | b
+            elif name == 'EOR':
+                res = a ^ b
+            else:
+                res = a * b
+        elif name == 'LSL':
+            res = a << np.uint64(d.shamt)
+        elif name == 'LSR':
+            res = a >> np.uint64(d.shamt)
+        elif name == 'MOVZ':
+            res = np.uint64(d.imm << d.shamt)
+        elif name == 'MOVK':
+            res = (r[sel, d.rd] & np.uint64(~(0xFFFF << d.shamt) & MASK64)) | np.uint64(d.imm << d.shamt)
+        else:
+            imm = np.uint64(d.imm)
+            if name == 'ADDI':
+                res = a + imm
+            elif name == 'SUBI':
+                res = a - imm
+            elif name == 'ANDI':
+                res = a & imm
+            elif name == 'ORRI':
+                res = a | imm
+            else:
+                res = a ^ imm
+        self._write(d, sel, res)
+        self.pc[sel] = pc + 4
+
+    def _div(self, d, sel, pc):
+        r = self.registers
+        a, b = r[sel, d.rn], r[sel, d.rm]
+        zero = b == 0
+        if d.name == 'UDIV':
+            res = a // np.where(zero, np.uint64(1), b)
+        else:
+            # Chia có dấu làm tròn về 0, tính trên độ lớn không dấu để không tràn với INT64_MIN
+            sign = np.uint64(63)
+            neg_a, neg_b = (a >> sign) == 1, (b >> sign) == 1
+            mag_a = np.where(neg_a, ~a + np.uint64(1), a)
+            mag_b = np.where(neg_b, ~b + np.uint64(1), b)
+            q = mag_a // np.where(zero, np.uint64(1), mag_b)
+            res = np.where(neg_a != neg_b, ~q + np.uint64(1), q)
+        self._write(d, sel, np.where(zero, np.uint64(0), res))
+        self.pc[sel] = pc + 4
+
+    def _add_flags(self, d, sel, pc):
+        r = self.registers
+        a = r[sel, d.rn]
+        b = r[sel, d.rm] if d.name in ('ADDS', 'SUBS') else np.uint64(d.imm)
+        sign = np.uint64(63)
+        if d.name in ('ADDS', 'ADDIS'):
+            res = a + b
+            carry = res < a
+            overflow = ((a ^ res) & (b ^ res)) >> sign
+        else:
+            res = a - b
+            carry = a >= b # Không mượn
+            overflow = ((a ^ b) & (a ^ res)) >> sign
+        self.flag_n[sel] = (res >> sign) == 1
+        self.flag_z[sel] = res == 0
+        self.flag_v[sel] = overflow == 1
+        self.flag_c[sel] = carry
+        self._write(d, sel, res)
+        self.pc[sel] = pc + 4
+
+    def _and_flags(self, d, sel, pc):
+        r = self.registers
+        b = r[sel, d.rm] if d.name == 'ANDS' else np.uint64(d.imm)
+        res = r[sel, d.rn] & b
+        self.flag_n[sel] = (res >> np.uint64(63)) == 1
+        self.flag_z[sel] = res == 0
+        self.flag_v[sel] = False
+        self.flag_c[sel] = False
+        self._write(d, sel, res)
+        self.pc[sel] = pc + 4
+
+    def _addresses(self, d, sel, width):
+        """Địa chỉ truy cập của các lane; lane ngoài phạm vi bị dừng với lỗi. Trả về (sel, addr)."""
+        addr = self.registers[sel, d.rn] + np.uint64(d.imm & MASK64)
+        if self.mem_size >= width:
+            bad = addr > np.uint64(self.mem_size - width)
+        else:
+            bad = np.ones(len(addr), dtype=bool)
+        if bad.any():
+            for lane, value in zip(np.asarray(sel)[bad].tolist(), addr[bad].tolist()):
+                self.errors[lane] = (f"Memory access out of range: {value:#x} "
+                                     f"(+{width} bytes, memory size {self.mem_size:#x})")
+                self.halted[lane] = True
+                self.steps[lane] -= 1 # Lệnh lỗi không được tính (như interpreter)
+            keep = ~bad
+            sel, addr = np.asarray(sel)[keep], addr[keep]
+        return sel, addr.astype(np.int64)
+
+    def _load(self, d, sel, pc):
+        width = _LOAD_WIDTHS[d.name]
+        sel, addr = self._addresses(d, sel, width)
+        if len(sel):
+            raw = self.memory[sel[:, None], addr[:, None] + np.arange(width)]
+            if d.name == 'LDURSW':
+                values = raw.view('<i4')[:, 0].astype(np.int64).view(np.uint64)
+            else:
+                values = raw.view(_UNSIGNED_DTYPES[width])[:, 0].astype(np.uint64)
+            self._write(d, sel, values)
+            self.pc[sel] = pc + 4
+
+    def _store(self, d, sel, pc):
+        width = _STORE_WIDTHS[d.name]
+        sel, addr = self._addresses(d, sel, width)
+        if len(sel):
+            values = self.registers[sel, d.rd].astype(_UNSIGNED_DTYPES[width])
+            self.memory[sel[:, None], addr[:, None] + np.arange(width)] = values.view(np.uint8).reshape(-1, width)
+            self.pc[sel] = pc + 4
+
+    def _branch(self, d, sel, pc):
+        name = d.name
+        if name == 'B':
+            self.pc[sel] = d.target
+            return
+        if name == 'BL':
+            self.registers[sel, LR] = pc + 4
+            self.pc[sel] = d.target
+            return
+        if name == 'BR':
+            self.pc[sel] = self.registers[sel, d.rn]
+            return
+        if name == 'CBZ':
+            taken = self.registers[sel, d.rn] == 0
+        elif name == 'CBNZ':
+            taken = self.registers[sel, d.rn] != 0
+        else:
+            taken = self._condition(d.cond, sel)
+        self.pc[sel] = np.where(taken, d.target, pc + 4)
+
+    def _condition(self, cond, sel):
+        """Mảng bool: điều kiện B.cond mã 'cond' đúng ở từng lane (xem CONDITION_CHECKS)."""
+        n, z, v, c = self.flag_n[sel], self.flag_z[sel], self.flag_v[sel], self.flag_c[sel]
+        base = cond >> 1
+        if base == 0:
+            result = z
+        elif base == 1:
+            result = c
+        elif base == 2:
+            result = n
+        elif base == 3:
+            result = v
+        elif base == 4:
+            result = c & ~z
+        elif base == 5:
+            result = n == v
+        elif base == 6:
+            result = ~z & (n == v)
+        else:
+            return np.ones(len(n), dtype=bool) # AL
+        return ~result if cond & 1 else result
+
+    def _halt(self, d, sel, pc):
+        self.halted[sel] = True # PC giữ nguyên như interpreter
+
+    def _nop(self, d, sel, pc):
+        self.pc[sel] = pc + 4
+
+    # --- Kết quả ---
+    def lane_state(self, lane):
+        """Trạng thái cuối của 'lane' theo dạng của headless.run_program (registers, flags, memory...)."""
+        row = self.memory[lane]
+        words = row[:len(row) & ~7].view('<u8')
+        memory = {int(i) * 8: int(words[i]) for i in np.flatnonzero(words)}
+        return {
+            'registers': [int(x) for x in self.registers[lane]],
+            'flags': {'N': int(self.flag_n[lane]), 'Z': int(self.flag_z[lane]),
+                      'V': int(self.flag_v[lane]), 'C': int(self.flag_c[lane])},
+            'memory': memory,
+            'pc': int(self.pc[lane]),
+            'steps': int(self.steps[lane]),
+            'halted': bool(self.halted[lane]),
+            'error': self.errors[lane],
+        }
+
+    def results(self):
+        return [self.lane_state(lane) for lane in range(self.lanes)]
+
+
+def run_vectorized(program, inputs, max_steps=None, mem_size=DEFAULT_MEM_SIZE, max_memory=MAX_MEMORY):
+    """
+    Chạy 'program' một lần cho mọi bộ input. 'inputs' là danh sách
+    ({chỉ số thanh ghi: giá trị}, {địa chỉ: word 8 byte}), một phần tử cho mỗi lane.
+    Các bộ input được chia thành lô, mỗi lô tối đa max_memory // mem_size lane.
+    Trả về (danh sách VectorSimulator theo lô, danh sách trạng thái cuối theo lane).
+    """
+    lanes_per_run = max(1, max_memory // max(mem_size, 1))
+    sims = []
+    states = []
+    for first in range(0, max(len(inputs), 1), lanes_per_run):
+        chunk = inputs[first:first + lanes_per_run]
+        sim = VectorSimulator(program, len(chunk), mem_size, max_memory)
+        for lane, (registers, memory) in enumerate(chunk):
+            for index, value in registers.items():
+                sim.set_register(lane, index, value)
+            for addr, value in memory.items():
+                sim.store_word(lane, addr, value)
+        sim.run(max_steps)
+        sims.append(sim)
+        states.extend(sim.results())
+    return sims, states
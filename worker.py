@@ -0,0 +1,155 @@
+# worker.py
+"""
+Chạy simulator trên một thread nền để GUI (Tk) không bị chặn.
+Worker chạy simulator.run() theo từng lát (slice) ngắn, sau mỗi lát kiểm tra lệnh
+Stop/Pause (độ trễ bị chặn bởi độ dài lát) và định kỳ đẩy snapshot trạng thái vào
+một hàng đợi 1 phần tử: snapshot cũ chưa được lấy sẽ bị thay bằng snapshot mới,
+nên GUI chỉ vẽ trạng thái mới nhất và tốc độ worker không phụ thuộc tốc độ vẽ.
+"""
+import queue
+import threading
+import time
+
+from memory import DataMemory, MappedDataMemory, MemoryAccessError
+
+DEFAULT_SLICE_SECONDS = 0.02 # Thời gian mục tiêu của một lát chạy (độ trễ Stop/Pause)
+DEFAULT_PUBLISH_SECONDS = 0.05 # Khoảng cách tối thiểu giữa hai snapshot
+MIN_SLICE_STEPS, MAX_SLICE_STEPS = 16, 1 << 20
+
+
+class SimulationWorker:
+    """
+    Điều khiển một LEGv8_Simplified_Simulator trên thread nền.
+    Trong lúc worker chạy, chỉ worker được gọi step/run/reset trên simulator;
+    phía GUI đọc trạng thái qua latest_snapshot().
+    """
+
+    def __init__(self, simulator, slice_seconds=DEFAULT_SLICE_SECONDS,
+                 publish_seconds=DEFAULT_PUBLISH_SECONDS):
+        self.simulator = simulator
+        self.slice_seconds = slice_seconds
+        self.publish_seconds = publish_seconds
+        self.snapshots = queue.Queue(maxsize=1)
+        self._thread = None
+        self._stop = threading.Event()
+        self._resume = threading.Event() # Được set khi KHÔNG tạm dừng
+        self._resume.set()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_paused(self):
+        return not self._resume.is_set()
+
+    # --- Lệnh ---
+    def start(self, max_steps=None):
+        """Bắt đầu chạy tối đa 'max_steps' lệnh (None = đến khi HALT/breakpoint/Stop)."""
+        if self.is_running:
+            raise RuntimeError("Worker is already running")
+        self._stop.clear()
+        self._resume.set()
+        self._drain()
+        self._thread = threading.Thread(target=self._loop, args=(max_steps,),
+                                        name='legv8-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Yêu cầu dừng và chờ worker kết thúc lát hiện tại. Trả về True nếu đã dừng."""
+        self._stop.set()
+        self._resume.set() # Đánh thức nếu đang tạm dừng
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+            self._thread = None
+        return True
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    # --- Snapshot ---
+    def latest_snapshot(self):
+        """Snapshot mới nhất chưa được đọc, hoặc None."""
+        try:
+            return self.snapshots.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _drain(self):
+        while self.latest_snapshot() is not None:
+            pass
+
+    def _publish(self, running, error=None, ips=0.0):
+        """
+        Đẩy mọi thứ GUI cần vẽ (registers, bộ nhớ, số đếm profiler, thống kê cache và
+        dự đoán rẽ nhánh) vào snapshot, chép trên thread nền: GUI không đọc simulator
+        đang chạy. Bộ nhớ là một DataMemory copy-on-write (None với file image mmap).
+        """
+        sim = self.simulator
+        memory = None
+        if not isinstance(sim.data_memory, MappedDataMemory):
+            memory = DataMemory(sim.data_memory.size)
+            memory.restore(sim.data_memory.snapshot())
+        predictor = sim.branch_predictor
+        snapshot = {
+            'pc': sim.pc,
+            'registers': list(sim.registers),
+            'flags': sim.flags.copy(),
+            'halted': sim.halted,
+            'instruction_count': sim.instruction_count,
+            'stop_reason': sim.stop_reason,
+            'last_state': sim.last_state, # run() chỉ thay dict này, không sửa tại chỗ
+            'memory': memory,
+            'line_counts': sim.profiler.line_counts() if sim.profiler is not None else None,
+            'cache_stats': sim.caches.stats() if sim.caches is not None else None,
+            'prediction': (predictor.branches, predictor.accuracy) if predictor is not None else None,
+            'error': error,
+            'running': running,
+            'paused': self.is_paused,
+            'ips': ips,
+        }
+        self._drain() # Hàng đợi chỉ giữ snapshot mới nhất
+        self.snapshots.put_nowait(snapshot)
+
+    # --- Vòng lặp của thread nền ---
+    def _loop(self, max_steps):
+        sim = self.simulator
+        remaining = max_steps
+        slice_steps = 1024
+        error = None
+        executed_total = 0
+        started = time.perf_counter()
+        last_publish = 0.0
+        try:
+            while not self._stop.is_set():
+                if not self._resume.is_set():
+                    self._publish(True, ips=0.0)
+                    self._resume.wait()
+                    continue
+                budget = slice_steps if remaining is None else min(slice_steps, remaining)
+                t0 = time.perf_counter()
+                executed = sim.run(max_steps=budget)
+                elapsed = time.perf_counter() - t0
+                executed_total += executed
+                if remaining is not None:
+                    remaining -= executed
+                # Điều chỉnh độ dài lát để mỗi lát mất khoảng slice_seconds
+                if elapsed > 0:
+                    factor = max(0.5, min(2.0, self.slice_seconds / elapsed))
+                    slice_steps = max(MIN_SLICE_STEPS, min(MAX_SLICE_STEPS, int(slice_steps * factor)))
+                if sim.halted or sim.stop_reason or remaining == 0 or executed < budget:
+                    break
+                now = time.perf_counter()
+                if now - last_publish >= self.publish_seconds:
+                    last_publish = now
+                    self._publish(True, ips=executed_total / (now - started))
+        except (MemoryAccessError, ValueError) as e:
+            sim.halted = True
+            error = str(e)
+        total_time = time.perf_counter() - started
+        self._publish(False, error=error, ips=executed_total / total_time if total_time > 0 else 0.0)